@@ -0,0 +1,73 @@
+"""Shared fixtures for the engine benchmarks.
+
+The synthetic account is sized by ``COSTPILOT_BENCH_SCALE`` — a fraction
+of a 50,000-instance, 200,000-snapshot account (default 0.1).
+"""
+
+from __future__ import annotations
+
+import os
+import tracemalloc
+from typing import Any, Callable
+
+import pytest
+
+from costpilot.config import Config, CostPilotConfig
+from costpilot.pricing import PriceCatalog
+from costpilot.synthetic import SyntheticAccount
+
+pytest.importorskip("pytest_benchmark")
+
+SCALE = float(os.environ.get("COSTPILOT_BENCH_SCALE", "0.1"))
+ROUNDS = int(os.environ.get("COSTPILOT_BENCH_ROUNDS", "3"))
+
+
+@pytest.fixture(scope="session")
+def scale() -> float:
+    """``COSTPILOT_BENCH_SCALE``, for benchmarks that size their own inputs."""
+    return SCALE
+
+
+@pytest.fixture(scope="session")
+def account():
+    """One synthetic account shared by every benchmark; building it isn't measured."""
+    return SyntheticAccount(
+        instances=int(50_000 * SCALE),
+        volumes=int(5_000 * SCALE),
+        snapshots=int(200_000 * SCALE),
+        addresses=int(500 * SCALE),
+        load_balancers=int(2_000 * SCALE),
+        databases=int(500 * SCALE),
+        cache_clusters=int(200 * SCALE),
+    )
+
+
+@pytest.fixture
+def replay_config(account):
+    """A Config whose session answers every call from the synthetic account."""
+    return Config(region="us-east-1", settings=CostPilotConfig(), replay=account)
+
+
+@pytest.fixture(scope="session")
+def catalog():
+    return PriceCatalog.builtin()
+
+
+@pytest.fixture
+def measure(benchmark, account):
+    """Benchmark ``fn`` for wall time, and record its peak traced memory.
+
+    Memory is measured in a separate, untimed run, since tracing slows
+    allocation-heavy code down several times.
+    """
+    def run(fn: Callable[[], Any]) -> Any:
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        benchmark.extra_info["peak_memory_mb"] = round(peak / 2 ** 20, 1)
+        benchmark.extra_info.update(account.summary())
+        return benchmark.pedantic(fn, rounds=ROUNDS, iterations=1)
+    return run
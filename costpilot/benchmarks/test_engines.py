@@ -0,0 +1,116 @@
+"""Wall time and peak memory of each engine against a synthetic account."""
+
+from datetime import date
+
+import numpy as np
+import pytest
+
+from costpilot.analyzer import CostAnalyzer
+from costpilot.attribution import ResourceCostIndex
+from costpilot.config import Config, CostPilotConfig
+from costpilot.replay import FixtureSource
+from costpilot.reservations import ReservationAnalyzer
+from costpilot.rightsizer import DatabaseRightSizer, RightSizer, VolumeRightSizer
+from costpilot.unused import UnusedDetector
+
+
+class TestEngineBenchmarks:
+    """One benchmark per engine; results carry ``peak_memory_mb`` and the account size."""
+
+    def test_cost_analyzer(self, measure, replay_config):
+        analyzer = CostAnalyzer(replay_config)
+
+        analysis = measure(lambda: analyzer.fetch(days=30))
+
+        assert analysis.total_cost > 0
+
+    def test_rightsizer(self, measure, replay_config, catalog, account):
+        rightsizer = RightSizer(replay_config, catalog=catalog)
+
+        recommendations = measure(rightsizer.fetch)
+
+        assert rightsizer.instances_analyzed == account.summary()["running"]
+        assert recommendations
+
+    def test_database_rightsizer(self, measure, replay_config, catalog, account):
+        rightsizer = DatabaseRightSizer(replay_config, catalog=catalog)
+
+        measure(rightsizer.fetch)
+
+        assert rightsizer.instances_analyzed == account.summary()["databases"]
+
+    def test_volume_rightsizer(self, measure, replay_config, catalog):
+        rightsizer = VolumeRightSizer(replay_config, catalog=catalog)
+
+        recommendations = measure(rightsizer.fetch)
+
+        assert recommendations
+
+    def test_unused_detector(self, measure, replay_config, catalog, account):
+        detector = UnusedDetector(replay_config, catalog=catalog)
+
+        resources = measure(detector.fetch)
+
+        assert len(resources) >= len(account.volumes)
+
+    def test_effective_rates(self, measure, replay_config, account):
+        index = measure(lambda: ResourceCostIndex.from_cost_explorer(replay_config))
+
+        assert len(index) == account.summary()["running"]
+        assert index.discount < 1.0
+
+    def test_reservation_analyzer(self, measure, replay_config):
+        analyzer = ReservationAnalyzer(replay_config)
+
+        ri, _ = measure(analyzer.fetch)
+
+        assert ri.recommendations
+
+
+class TestFixtureReplayBenchmarks:
+    """Replaying a recorded scan, against generating it."""
+
+    def test_unused_detector_from_fixture(self, measure, replay_config, catalog, tmp_path):
+        path = tmp_path / "unused.jsonl.gz"
+        recording = Config(region="us-east-1", settings=CostPilotConfig(), replay=replay_config.replay, record=path)
+        expected = UnusedDetector(recording, catalog=catalog).fetch()
+        recording.close()
+
+        config = Config(region="us-east-1", settings=CostPilotConfig(), replay=FixtureSource(path))
+        detector = UnusedDetector(config, catalog=catalog)
+
+        resources = measure(detector.fetch)
+
+        assert len(resources) == len(expected)
+
+
+class TestAllocationBenchmarks:
+    """Allocation rules over a CUR-sized tag table."""
+
+    def test_cost_allocator(self, measure, scale):
+        pa = pytest.importorskip("pyarrow")
+        from costpilot.allocation import AllocationRules, CostAllocator, CostTable
+
+        rows = int(10_000_000 * scale)
+        rng = np.random.default_rng(7)
+        teams = np.array([f"team-{i}" for i in range(200)] + [None] * 50, dtype=object)
+        envs = np.array(["prod", "staging", "dev", None], dtype=object)
+        table = pa.table({
+            "account": pa.array(rng.integers(100_000_000_000, 100_000_000_300, rows).astype(str)),
+            "service": pa.array(np.array([f"service-{i}" for i in range(150)])[rng.integers(0, 150, rows)]),
+            "tag_team": pa.array(teams[rng.integers(0, len(teams), rows)], pa.string()),
+            "tag_env": pa.array(envs[rng.integers(0, len(envs), rows)], pa.string()),
+            "cost": rng.random(rows),
+        })
+        rules = AllocationRules(
+            breakdown_tags=["env"],
+            accounts={str(100_000_000_000 + i): f"account-owner-{i}" for i in range(50)},
+            shared_services=["service-0", "service-1"],
+        )
+        allocator = CostAllocator(Config(region="us-east-1", settings=CostPilotConfig()), rules)
+
+        allocation = measure(lambda: allocator.allocate(
+            CostTable.from_arrow(table, ["team", "env"]), date(2026, 1, 1), date(2026, 2, 1)
+        ))
+
+        assert allocation.total == pytest.approx(float(table["cost"].to_numpy().sum()), rel=1e-6)
@@ -1,44 +1,397 @@
-"""CostPilot — Budget Alert System."""
+"""CostPilot — Budget Alert System.
+
+Budgets are declared in YAML and reconciled against AWS Budgets: the
+account's existing budgets are listed, diffed against the declaration,
+and only the differences are applied — creates, updates and deletes of
+budgets, their notifications and subscribers. Runs are idempotent; a
+second run with the same file makes no changes.
+
+Only budgets whose names start with the managed prefix (``CostPilot-``
+by default) are ever updated or deleted, so hand-made budgets are left
+alone. The ``watch`` budget belongs to ``costpilot watch`` and is never
+pruned, and an empty declaration only prunes when explicitly allowed. Calls run on a thread pool, paced by the session's shared rate
+limiter (see ``middleware.py``).
+"""
 
 import logging
-from typing import Any
-import boto3
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import yaml
+
 from .config import Config
 
 logger = logging.getLogger(__name__)
 
+MANAGED_PREFIX = "CostPilot-"
+# Managed by `costpilot watch`, not by budget declarations
+WATCH_BUDGET = f"{MANAGED_PREFIX}Monthly-Budget"
+DEFAULT_THRESHOLDS = [50.0, 75.0, 90.0, 100.0]
+
+# (notification type, comparison operator, threshold, threshold type)
+NotificationKey = tuple[str, str, float, str]
+# (subscription type, address)
+Subscriber = tuple[str, str]
+
+
+@dataclass
+class BudgetSpec:
+    """One declared budget.
+
+    ``accounts``, ``services`` and ``tags`` narrow what the budget
+    tracks (linked accounts, Cost Explorer service names, and tag key →
+    values). ``subscribers`` are email addresses or SNS topic ARNs.
+    """
+    name: str
+    amount: float
+    time_unit: str = "MONTHLY"
+    accounts: list[str] = field(default_factory=list)
+    services: list[str] = field(default_factory=list)
+    tags: dict[str, list[str]] = field(default_factory=dict)
+    thresholds: list[float] = field(default_factory=lambda: list(DEFAULT_THRESHOLDS))
+    forecast_thresholds: list[float] = field(default_factory=list)
+    subscribers: list[str] = field(default_factory=list)
+
+    def budget(self) -> dict:
+        """The ``Budget`` structure for CreateBudget/UpdateBudget."""
+        budget: dict[str, Any] = {
+            "BudgetName": self.name,
+            "BudgetLimit": {"Amount": f"{self.amount:.2f}", "Unit": "USD"},
+            "TimeUnit": self.time_unit,
+            "BudgetType": "COST",
+        }
+        filters = self.cost_filters()
+        if filters:
+            budget["CostFilters"] = filters
+        return budget
+
+    def cost_filters(self) -> dict[str, list[str]]:
+        filters: dict[str, list[str]] = {}
+        if self.accounts:
+            filters["LinkedAccount"] = sorted(str(a) for a in self.accounts)
+        if self.services:
+            filters["Service"] = sorted(self.services)
+        if self.tags:
+            # User-defined tags are filtered as "user:<key>$<value>"
+            filters["TagKeyValue"] = sorted(
+                f"{key if ':' in key else 'user:' + key}${value}"
+                for key, values in self.tags.items()
+                for value in ([values] if isinstance(values, str) else values)
+            )
+        return filters
+
+    def notifications(self) -> dict[NotificationKey, set[Subscriber]]:
+        subscribers = {
+            ("SNS" if address.startswith("arn:") else "EMAIL", address) for address in self.subscribers
+        }
+        # Declared alerts are all "spend above N% of the limit"
+        wanted = [("ACTUAL", "GREATER_THAN", float(t), "PERCENTAGE") for t in self.thresholds]
+        wanted += [("FORECASTED", "GREATER_THAN", float(t), "PERCENTAGE") for t in self.forecast_thresholds]
+        return {key: set(subscribers) for key in wanted}
+
+
+@dataclass
+class BudgetChange:
+    """What an update changes on one existing budget."""
+    spec: BudgetSpec
+    budget: bool = False  # limit, time unit or filters differ
+    add_notifications: list[NotificationKey] = field(default_factory=list)
+    remove_notifications: list[NotificationKey] = field(default_factory=list)
+    add_subscribers: dict[NotificationKey, set[Subscriber]] = field(default_factory=dict)
+    remove_subscribers: dict[NotificationKey, set[Subscriber]] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return bool(self.budget or self.add_notifications or self.remove_notifications
+                    or self.add_subscribers or self.remove_subscribers)
+
+
+@dataclass
+class BudgetPlan:
+    """The differences between declared and existing budgets."""
+    creates: list[BudgetSpec] = field(default_factory=list)
+    updates: list[BudgetChange] = field(default_factory=list)
+    deletes: list[str] = field(default_factory=list)
+    unchanged: int = 0
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def changes(self) -> int:
+        return len(self.creates) + len(self.updates) + len(self.deletes)
+
+
+def load_budgets(path: str | Path) -> list[BudgetSpec]:
+    """Read budget declarations from YAML.
+
+    The file is either a list of budgets or a mapping with ``budgets``
+    and optional ``defaults`` applied to every budget::
+
+        defaults:
+          subscribers: [finops@example.com]
+          thresholds: [80, 100]
+        budgets:
+          - name: team-web
+            amount: 5000
+            tags: {team: [web]}
+          - name: prod-account
+            amount: 20000
+            accounts: ["111111111111"]
+
+    Every budget with alert thresholds needs a subscriber (its own or
+    from ``defaults``); AWS Budgets rejects notifications without one.
+    """
+    with open(path) as f:
+        data = yaml.safe_load(f) or []
+    defaults: dict = {}
+    if isinstance(data, dict):
+        defaults = data.get("defaults", {})
+        data = data.get("budgets", [])
+    specs = []
+    for entry in data:
+        spec = BudgetSpec(**{**defaults, **entry})
+        spec.amount = float(spec.amount)
+        specs.append(spec)
+    names = [s.name for s in specs]
+    duplicates = {n for n in names if names.count(n) > 1}
+    if duplicates:
+        raise ValueError(f"Duplicate budget names: {', '.join(sorted(duplicates))}")
+    unsubscribed = [s.name for s in specs if (s.thresholds or s.forecast_thresholds) and not s.subscribers]
+    if unsubscribed:
+        raise ValueError(f"Budgets with thresholds but no subscribers: {', '.join(unsubscribed)}")
+    return specs
+
 
 class AlertManager:
-    def __init__(self, config: Config) -> None:
+    """Create and reconcile AWS Budgets alerts."""
+
+    def __init__(self, config: Config, max_workers: int = 8) -> None:
         self.session = config.get_session()
         self.budgets = self.session.client("budgets")
         self.sts = self.session.client("sts")
+        self.max_workers = max_workers
+        self._account_id: Optional[str] = None
+
+    @property
+    def account_id(self) -> str:
+        if self._account_id is None:
+            self._account_id = self.sts.get_caller_identity()["Account"]
+        return self._account_id
+
+    def create_budget_alert(self, budget: float, email: str) -> BudgetPlan:
+        """Create or update the single ``CostPilot-Monthly-Budget`` with alerts at 50/75/90/100%."""
+        spec = BudgetSpec(name=WATCH_BUDGET, amount=budget, subscribers=[email])
+        plan = self.apply([spec], prune=False)
+        logger.info(f"Budget alert set: ${budget}/month with alerts at {spec.thresholds}")
+        return plan
+
+    # ------------------------------------------------------------------
+    # Reconciliation
+    # ------------------------------------------------------------------
 
-    def create_budget_alert(self, budget: float, email: str) -> None:
-        account_id = self.sts.get_caller_identity()["Account"]
-        thresholds = [50, 75, 90, 100]
-
-        notifications = [
-            {
-                "Notification": {
-                    "NotificationType": "ACTUAL",
-                    "ComparisonOperator": "GREATER_THAN",
-                    "Threshold": t,
-                    "ThresholdType": "PERCENTAGE",
-                },
-                "Subscribers": [{"SubscriptionType": "EMAIL", "Address": email}],
-            }
-            for t in thresholds
-        ]
-
-        self.budgets.create_budget(
-            AccountId=account_id,
-            Budget={
-                "BudgetName": "CostPilot-Monthly-Budget",
-                "BudgetLimit": {"Amount": str(budget), "Unit": "USD"},
-                "TimeUnit": "MONTHLY",
-                "BudgetType": "COST",
-            },
-            NotificationsWithSubscribers=notifications,
+    def plan(
+        self, specs: list[BudgetSpec], prefix: str = MANAGED_PREFIX, prune: bool = True, allow_empty: bool = False
+    ) -> BudgetPlan:
+        """Diff declared budgets against the account's.
+
+        The plan holds copies of ``specs`` named with ``prefix`` where
+        they lack it; the caller's specs are left as they are. With
+        ``prune``, managed budgets that are no longer declared are
+        deleted, except the ``watch`` budget. Pruning against an empty
+        declaration would delete them all, so it raises ValueError
+        unless ``allow_empty``.
+        """
+        if prune and not specs and not allow_empty:
+            raise ValueError("No budgets declared; refusing to delete every managed budget")
+        specs = [spec if spec.name.startswith(prefix) else replace(spec, name=prefix + spec.name) for spec in specs]
+        existing = self.existing_budgets(prefix)
+        plan = BudgetPlan()
+        kept = [spec for spec in specs if spec.name in existing]
+        plan.creates = [spec for spec in specs if spec.name not in existing]
+        if prune:
+            declared = {spec.name for spec in specs}
+            plan.deletes = sorted(name for name in existing if name not in declared and name != WATCH_BUDGET)
+
+        def diff(spec: BudgetSpec) -> Optional[BudgetChange]:
+            try:
+                return self._diff(spec, existing[spec.name])
+            except Exception as e:
+                plan.errors.append(f"{spec.name}: could not read notifications: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for change in pool.map(diff, kept):
+                if change:
+                    plan.updates.append(change)
+                elif change is not None:
+                    plan.unchanged += 1
+        return plan
+
+    def apply(
+        self,
+        specs: list[BudgetSpec],
+        prefix: str = MANAGED_PREFIX,
+        prune: bool = True,
+        dry_run: bool = False,
+        allow_empty: bool = False,
+    ) -> BudgetPlan:
+        """Reconcile the account's budgets with ``specs``; returns the plan that was applied.
+
+        A failed change is logged and recorded in ``plan.errors``; the
+        rest still apply, and the next run picks up where this one failed.
+        """
+        plan = self.plan(specs, prefix, prune, allow_empty)
+        logger.info(
+            f"Budgets: {len(plan.creates)} to create, {len(plan.updates)} to update, "
+            f"{len(plan.deletes)} to delete, {plan.unchanged} unchanged"
+        )
+        if dry_run or not plan.changes:
+            return plan
+
+        tasks: list[tuple[str, Callable[[], None]]] = []
+        tasks += [(spec.name, lambda s=spec: self._create(s)) for spec in plan.creates]
+        tasks += [(change.spec.name, lambda c=change: self._update(c)) for change in plan.updates]
+        tasks += [(name, lambda n=name: self._delete(n)) for name in plan.deletes]
+
+        def run(task: tuple[str, Callable[[], None]]) -> None:
+            name, fn = task
+            try:
+                fn()
+            except Exception as e:
+                logger.warning(f"Could not reconcile budget {name}: {e}")
+                plan.errors.append(f"{name}: {e}")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            list(pool.map(run, tasks))
+        return plan
+
+    def existing_budgets(self, prefix: str = MANAGED_PREFIX) -> dict[str, dict]:
+        """The account's budgets whose names start with ``prefix``, by name."""
+        budgets = {}
+        for page in self.budgets.get_paginator("describe_budgets").paginate(
+            AccountId=self.account_id, PaginationConfig={"PageSize": 100}
+        ):
+            for budget in page.get("Budgets", []):
+                if budget["BudgetName"].startswith(prefix):
+                    budgets[budget["BudgetName"]] = budget
+        return budgets
+
+    def _diff(self, spec: BudgetSpec, current: dict) -> BudgetChange:
+        change = BudgetChange(spec)
+        limit = current.get("BudgetLimit", {})
+        filters = {k: sorted(v) for k, v in (current.get("CostFilters") or {}).items() if v}
+        change.budget = (
+            round(float(limit.get("Amount", 0)), 2) != round(spec.amount, 2)
+            or current.get("TimeUnit") != spec.time_unit
+            or filters != spec.cost_filters()
+        )
+
+        have = self._notifications(spec.name)
+        want = spec.notifications()
+        change.add_notifications = [key for key in want if key not in have]
+        change.remove_notifications = [key for key in have if key not in want]
+        for key in want.keys() & have.keys():
+            if want[key] - have[key]:
+                change.add_subscribers[key] = want[key] - have[key]
+            if have[key] - want[key]:
+                change.remove_subscribers[key] = have[key] - want[key]
+        return change
+
+    def _notifications(self, name: str) -> dict[NotificationKey, set[Subscriber]]:
+        notifications = {}
+        pages = self.budgets.get_paginator("describe_notifications_for_budget").paginate(
+            AccountId=self.account_id, BudgetName=name
         )
-        logger.info(f"Budget alert created: ${budget}/month with alerts at {thresholds}")
+        for page in pages:
+            for notification in page.get("Notifications", []):
+                subscribers = set()
+                for sub_page in self.budgets.get_paginator("describe_subscribers_for_notification").paginate(
+                    AccountId=self.account_id, BudgetName=name, Notification=notification
+                ):
+                    subscribers |= {(s["SubscriptionType"], s["Address"]) for s in sub_page.get("Subscribers", [])}
+                key = (
+                    notification["NotificationType"],
+                    notification["ComparisonOperator"],
+                    float(notification["Threshold"]),
+                    notification.get("ThresholdType", "PERCENTAGE"),
+                )
+                notifications[key] = subscribers
+        return notifications
+
+    # ------------------------------------------------------------------
+    # Changes
+    # ------------------------------------------------------------------
+
+    def _create(self, spec: BudgetSpec) -> None:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.budgets.create_budget(
+                AccountId=self.account_id,
+                Budget=spec.budget(),
+                NotificationsWithSubscribers=[
+                    {"Notification": _notification(key), "Subscribers": _subscribers(subscribers)}
+                    for key, subscribers in spec.notifications().items()
+                ],
+            )
+        except ClientError as e:
+            # Created by a concurrent run since we listed; reconcile it instead
+            if e.response.get("Error", {}).get("Code") != "DuplicateRecordException":
+                raise
+            self._update(self._diff(spec, self._describe(spec.name)))
+
+    def _update(self, change: BudgetChange) -> None:
+        name = change.spec.name
+        if change.budget:
+            self.budgets.update_budget(AccountId=self.account_id, NewBudget=change.spec.budget())
+        want = change.spec.notifications()
+        for key in change.add_notifications:
+            self.budgets.create_notification(
+                AccountId=self.account_id, BudgetName=name,
+                Notification=_notification(key), Subscribers=_subscribers(want[key]),
+            )
+        for key in change.remove_notifications:
+            self._ignore_missing(lambda k=key: self.budgets.delete_notification(
+                AccountId=self.account_id, BudgetName=name, Notification=_notification(k)
+            ))
+        for key, subscribers in change.add_subscribers.items():
+            for subscriber in _subscribers(subscribers):
+                self.budgets.create_subscriber(
+                    AccountId=self.account_id, BudgetName=name, Notification=_notification(key), Subscriber=subscriber
+                )
+        for key, subscribers in change.remove_subscribers.items():
+            for subscriber in _subscribers(subscribers):
+                self._ignore_missing(lambda k=key, s=subscriber: self.budgets.delete_subscriber(
+                    AccountId=self.account_id, BudgetName=name, Notification=_notification(k), Subscriber=s
+                ))
+
+    def _delete(self, name: str) -> None:
+        self._ignore_missing(lambda: self.budgets.delete_budget(AccountId=self.account_id, BudgetName=name))
+
+    def _describe(self, name: str) -> dict:
+        return self.budgets.describe_budget(AccountId=self.account_id, BudgetName=name)["Budget"]
+
+    @staticmethod
+    def _ignore_missing(call: Callable[[], Any]) -> None:
+        """Run a delete; something already gone is what we wanted."""
+        from botocore.exceptions import ClientError
+
+        try:
+            call()
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "NotFoundException":
+                raise
+
+
+def _notification(key: NotificationKey) -> dict:
+    notification_type, operator, threshold, threshold_type = key
+    return {
+        "NotificationType": notification_type,
+        "ComparisonOperator": operator,
+        "Threshold": threshold,
+        "ThresholdType": threshold_type,
+    }
+
+
+def _subscribers(subscribers: set[Subscriber]) -> list[dict]:
+    return [{"SubscriptionType": kind, "Address": address} for kind, address in sorted(subscribers)]
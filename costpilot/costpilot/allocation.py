@@ -0,0 +1,353 @@
+"""CostPilot — Tag-Based Cost Allocation.
+
+Charges spend back to owners (teams, cost centers) from resource tags:
+
+- **Direct cost** — spend tagged with the owner tag (``team`` by
+  default). Tag values can be aliased, e.g. ``Payments`` → ``payments``.
+- **Account owners** — untagged spend in an account that has an owner.
+- **Shared cost** — spend of shared services (Support, CloudTrail, ...),
+  spend tagged with a shared owner value such as ``platform``, and
+  whatever remains untagged. It is split across owners in proportion to
+  their direct cost.
+
+Costs come from Cost Explorer (``TAG`` group-by) or from CUR resource
+tags. Only the CUR carries several tags per line item, so breakdowns by
+further tags (``env``, ``cost-center``) need it.
+
+Rules are evaluated once per distinct value rather than once per row:
+each column is dictionary-encoded, the rules map the small dictionary,
+and rows are mapped with NumPy indexing. Three million cost rows
+allocate in under a second.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+import numpy as np
+import yaml
+
+from .config import Config
+from .models import OwnerCost
+
+logger = logging.getLogger(__name__)
+
+# Owner of spend that could be neither attributed nor split
+UNALLOCATED = "(unallocated)"
+# Owner of untagged spend when it isn't split
+UNTAGGED = "(untagged)"
+
+
+@dataclass
+class AllocationRules:
+    """How spend is attributed to owners.
+
+    Read from the ``allocation`` section of the config file, or a YAML
+    file with the same keys::
+
+        owner_tag: team
+        breakdown_tags: [env]
+        accounts: {"111111111111": payments}
+        aliases: {Payments: payments}
+        shared_services: [AWS Support (Business), AWS CloudTrail]
+        shared_owners: [platform, shared]
+        split_untagged: true
+    """
+    owner_tag: str = "team"
+    breakdown_tags: list[str] = field(default_factory=list)
+    accounts: dict[str, str] = field(default_factory=dict)
+    aliases: dict[str, str] = field(default_factory=dict)
+    shared_services: list[str] = field(default_factory=list)
+    shared_owners: list[str] = field(default_factory=list)
+    split_untagged: bool = True
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> "AllocationRules":
+        rules = cls()
+        for key, value in (data or {}).items():
+            if not hasattr(rules, key):
+                logger.warning(f"Ignoring unknown allocation rule {key!r}")
+                continue
+            setattr(rules, key, value)
+        # YAML reads unquoted account IDs as integers
+        rules.accounts = {str(k): str(v) for k, v in rules.accounts.items()}
+        return rules
+
+    @classmethod
+    def load(cls, path: str | Path) -> "AllocationRules":
+        with open(path) as f:
+            return cls.from_dict(yaml.safe_load(f))
+
+    def owner_of(self, tag: Optional[str], account: Optional[str]) -> Optional[str]:
+        """Owner of spend with this owner-tag value in this account, or None if shared."""
+        if tag:
+            owner = self.aliases.get(tag, tag)
+            return None if owner in self.shared_owners else owner
+        if account and account in self.accounts:
+            return self.accounts[account]
+        return None if self.split_untagged else UNTAGGED
+
+
+class _Column:
+    """A dictionary-encoded string column: row codes into a list of labels."""
+
+    __slots__ = ("codes", "labels")
+
+    def __init__(self, codes: np.ndarray, labels: list[Optional[str]]) -> None:
+        self.codes = codes
+        self.labels = labels
+
+    @classmethod
+    def encode(cls, values: Iterable[Optional[str]]) -> "_Column":
+        index: dict[Optional[str], int] = {}
+        codes = np.fromiter((index.setdefault(v, len(index)) for v in values), dtype=np.int64)
+        return cls(codes, list(index))
+
+    @classmethod
+    def from_arrow(cls, array: Any) -> "_Column":
+        """Encode an Arrow string column without a Python loop over its rows."""
+        import pyarrow as pa
+
+        encoded = array.combine_chunks().dictionary_encode() if isinstance(array, pa.ChunkedArray) \
+            else array.dictionary_encode()
+        labels = encoded.dictionary.to_pylist() + [None]
+        codes = encoded.indices.fill_null(len(labels) - 1).to_numpy(zero_copy_only=False).astype(np.int64)
+        return cls(codes, labels)
+
+
+@dataclass
+class CostTable:
+    """Spend rows to allocate: account, service and tag columns plus cost."""
+    account: _Column
+    service: _Column
+    tags: dict[str, _Column]
+    cost: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.cost)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict], tag_keys: Iterable[str]) -> "CostTable":
+        """From dicts with ``account``, ``service``, ``cost`` and one entry per tag key."""
+        rows = list(rows)
+        return cls(
+            account=_Column.encode(r.get("account") for r in rows),
+            service=_Column.encode(r.get("service") for r in rows),
+            tags={key: _Column.encode(r.get(key) for r in rows) for key in tag_keys},
+            cost=np.array([r["cost"] for r in rows], dtype=np.float64),
+        )
+
+    @classmethod
+    def from_arrow(cls, table: Any, tag_keys: Iterable[str]) -> "CostTable":
+        """From the ``tags`` table of :class:`~costpilot.cur.CurAggregates`."""
+        return cls(
+            account=_Column.from_arrow(table["account"]),
+            service=_Column.from_arrow(table["service"]),
+            tags={key: _Column.from_arrow(table[f"tag_{key}"]) for key in tag_keys},
+            cost=table["cost"].to_numpy().astype(np.float64),
+        )
+
+
+@dataclass
+class Allocation:
+    """Spend per owner for one period."""
+    start: date
+    end: date
+    owners: list[OwnerCost]  # largest first
+    services: list[str]
+    matrix: np.ndarray       # owners × services, direct plus shared cost
+    breakdown: list[dict] = field(default_factory=list)  # owner, <tag>..., cost (direct cost only)
+    shared_pool: float = 0.0
+    unallocated: float = 0.0
+
+    @property
+    def total(self) -> float:
+        return round(sum(o.total for o in self.owners), 2)
+
+    def service_rows(self, min_cost: float = 0.005) -> list[dict]:
+        """Long-form owner × service table of allocated cost."""
+        rows = []
+        for i, owner in enumerate(self.owners):
+            for j in np.flatnonzero(self.matrix[i] >= min_cost):
+                rows.append({"owner": owner.owner, "service": self.services[j], "cost": round(float(self.matrix[i, j]), 2)})
+        return rows
+
+
+class CostAllocator:
+    """Allocate spend to owners by tag, account and shared-cost rules."""
+
+    def __init__(self, config: Config, rules: Optional[AllocationRules] = None) -> None:
+        self.config = config
+        self.rules = rules or AllocationRules.from_dict(config.allocation)
+
+    def fetch(self, days: int = 30, end: Optional[date] = None) -> Allocation:
+        """Allocate the last ``days`` of Cost Explorer spend."""
+        end = end or datetime.now(timezone.utc).date()
+        start = end - timedelta(days=days)
+        if self.rules.breakdown_tags:
+            logger.warning("Cost Explorer groups by one tag only; breakdown tags need --cur")
+        table = self._ce_table(start, end)
+        return self.allocate(table, start, end)
+
+    def fetch_cur(self, paths: str | list[str], days: int = 30, end: Optional[date] = None) -> Allocation:
+        """Allocate spend from CUR Parquet files; ``end`` defaults to the day after the last usage day."""
+        from .cur import CurReader
+
+        keys = [self.rules.owner_tag, *self.rules.breakdown_tags]
+        reader = CurReader(paths, tag_keys=keys)
+        if end is None:
+            latest = reader.latest_day()
+            if latest is None:
+                raise ValueError("CUR files contain no line items")
+            end = latest + timedelta(days=1)
+        start = end - timedelta(days=days)
+        aggregates = reader.aggregate(start, end)
+        return self.allocate(CostTable.from_arrow(aggregates.tags, keys), start, end)
+
+    def allocate(self, table: CostTable, start: date, end: date) -> Allocation:
+        """Apply the rules to a cost table."""
+        rules = self.rules
+        owner_tag = table.tags[rules.owner_tag]
+
+        # Rules run once per distinct (tag, account) pair, then map back onto the rows
+        pairs, pair_codes = np.unique(
+            owner_tag.codes * len(table.account.labels) + table.account.codes, return_inverse=True
+        )
+        names: dict[str, int] = {}
+        pair_owner = np.array([
+            -1 if (owner := rules.owner_of(owner_tag.labels[t], table.account.labels[a])) is None
+            else names.setdefault(owner, len(names))
+            for t, a in zip(*np.divmod(pairs, len(table.account.labels)))
+        ], dtype=np.int64)
+        row_owner = pair_owner[pair_codes.reshape(-1)]
+
+        shared_services = set(rules.shared_services)
+        service_shared = np.array([label in shared_services for label in table.service.labels], dtype=bool)
+        row_owner = np.where(service_shared[table.service.codes], -1, row_owner)
+
+        # Owners × services of direct cost; shared rows form the pool
+        n_owners, n_services = len(names), len(table.service.labels)
+        direct_rows = row_owner >= 0
+        direct = np.bincount(
+            row_owner[direct_rows] * n_services + table.service.codes[direct_rows],
+            weights=table.cost[direct_rows], minlength=n_owners * n_services,
+        ).reshape(n_owners, n_services)
+        pool = np.bincount(table.service.codes[~direct_rows], weights=table.cost[~direct_rows], minlength=n_services)
+
+        totals = direct.sum(axis=1)
+        pool_total = float(pool.sum())
+        unallocated = 0.0
+        if totals.sum() > 0:
+            weights = totals / totals.sum()
+            shared = np.outer(weights, pool)
+        else:
+            shared = np.zeros_like(direct)
+            unallocated = pool_total
+
+        owner_names = list(names)
+        matrix = direct + shared
+        if unallocated:
+            owner_names.append(UNALLOCATED)
+            matrix = np.vstack([matrix, pool])
+            totals = np.append(totals, 0.0)
+            shared = np.vstack([shared, pool])
+
+        grand = matrix.sum()
+        owners = [
+            OwnerCost(
+                owner=name,
+                direct=round(float(totals[i]), 2),
+                shared=round(float(shared[i].sum()), 2),
+                total=round(float(matrix[i].sum()), 2),
+                share_pct=round(float(matrix[i].sum() / grand * 100), 1) if grand else 0.0,
+            )
+            for i, name in enumerate(owner_names)
+        ]
+        order = sorted(range(len(owners)), key=lambda i: -owners[i].total)
+        services = [label or "Unknown" for label in table.service.labels]
+        logger.info(
+            f"Allocated ${grand:,.2f} across {len(owner_names)} owners from {len(table):,} cost rows "
+            f"(${pool_total:,.2f} shared)"
+        )
+        return Allocation(
+            start=start,
+            end=end,
+            owners=[owners[i] for i in order],
+            services=services,
+            matrix=matrix[order] if len(order) else matrix,
+            breakdown=self._breakdown(table, row_owner, owner_names),
+            shared_pool=round(pool_total, 2),
+            unallocated=round(unallocated, 2),
+        )
+
+    def _breakdown(self, table: CostTable, row_owner: np.ndarray, owner_names: list[str]) -> list[dict]:
+        """Direct cost per owner and breakdown tag values."""
+        keys = [k for k in self.rules.breakdown_tags if k in table.tags]
+        if not keys:
+            return []
+        direct = row_owner >= 0
+        if not direct.any():
+            return []
+        shape = (len(owner_names), *(len(table.tags[k].labels) for k in keys))
+        flat = np.ravel_multi_index([row_owner[direct], *(table.tags[k].codes[direct] for k in keys)], shape)
+        groups, inverse = np.unique(flat, return_inverse=True)
+        sums = np.bincount(inverse.reshape(-1), weights=table.cost[direct], minlength=len(groups))
+        codes = np.unravel_index(groups, shape)
+        rows = []
+        for g in np.argsort(-sums):
+            row = {"owner": owner_names[codes[0][g]]}
+            for k, key in enumerate(keys, start=1):
+                row[key] = table.tags[key].labels[codes[k][g]] or UNTAGGED
+            row["cost"] = round(float(sums[g]), 2)
+            rows.append(row)
+        return rows
+
+    def _ce_table(self, start: date, end: date) -> CostTable:
+        """Monthly spend by owner tag and service, with untagged spend by account when accounts have owners.
+
+        Cost Explorer takes two group-bys, so untagged spend is queried
+        separately by account and service when account rules need it.
+        """
+        ce = self.config.get_session().client("ce")
+        tag = self.rules.owner_tag
+        rows = []
+        for keys, amount in _ce_groups(ce, start, end, [{"Type": "TAG", "Key": tag}, {"Type": "DIMENSION", "Key": "SERVICE"}]):
+            # Tag group keys are "<key>$<value>", and "<key>$" when untagged
+            value = keys[0].split("$", 1)[1] if "$" in keys[0] else keys[0]
+            if not value and self.rules.accounts:
+                continue
+            rows.append({"account": None, "service": keys[1], tag: value or None, "cost": amount})
+        if self.rules.accounts:
+            untagged = {"Tags": {"Key": tag, "MatchOptions": ["ABSENT"]}}
+            for keys, amount in _ce_groups(
+                ce, start, end,
+                [{"Type": "DIMENSION", "Key": "LINKED_ACCOUNT"}, {"Type": "DIMENSION", "Key": "SERVICE"}],
+                untagged,
+            ):
+                rows.append({"account": keys[0], "service": keys[1], tag: None, "cost": amount})
+        return CostTable.from_rows(rows, [tag])
+
+
+def _ce_groups(
+    ce: Any, start: date, end: date, group_by: list[dict], filter: Optional[dict] = None
+) -> Iterable[tuple[list[str], float]]:
+    """(group keys, unblended cost) for every group of every month, following page tokens."""
+    kwargs: dict[str, Any] = {
+        "TimePeriod": {"Start": str(start), "End": str(end)},
+        "Granularity": "MONTHLY",
+        "Metrics": ["UnblendedCost"],
+        "GroupBy": group_by,
+    }
+    if filter:
+        kwargs["Filter"] = filter
+    while True:
+        response = ce.get_cost_and_usage(**kwargs)
+        for period in response.get("ResultsByTime", []):
+            for group in period.get("Groups", []):
+                yield group["Keys"], float(group["Metrics"]["UnblendedCost"]["Amount"])
+        token = response.get("NextPageToken")
+        if not token:
+            break
+        kwargs["NextPageToken"] = token
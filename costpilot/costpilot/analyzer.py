@@ -5,11 +5,19 @@ trend detection, and savings recommendations.
 """
 
 import logging
-from datetime import datetime, timedelta, timezone
-from typing import Any
+from dataclasses import asdict
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Optional
 
 import boto3
+import numpy as np
+
+from .anomaly import SpikeDetector
 from .config import Config
+from .forecast import Forecaster, save_daily_costs
+from .history import DAY_TOTAL, ScanHistory
+from .models import CostAnalysis, DailyCost, RegionCost, ServiceCost
 
 logger = logging.getLogger(__name__)
 
@@ -17,11 +25,19 @@ logger = logging.getLogger(__name__)
 class CostAnalyzer:
     """Analyze AWS costs using Cost Explorer API."""
 
-    def __init__(self, config: Config) -> None:
+    def __init__(
+        self, config: Config, cache_path: Optional[str | Path] = None, history: Optional[ScanHistory] = None
+    ) -> None:
         self.session = config.get_session()
         self.ce = self.session.client("ce")
+        self.spike_detector = SpikeDetector(std_devs=config.spike_std_devs)
+        self.forecaster = Forecaster()
+        # Where to keep the daily cost matrix for offline forecasting (None disables caching)
+        self.cache_path = cache_path
+        # Store of finalized daily costs, so repeat runs only query recent days
+        self.history = history
 
-    def analyze(self, days: int = 30) -> dict[str, Any]:
+    def fetch(self, days: int = 30) -> CostAnalysis:
         """Run full cost analysis for the specified period."""
         end = datetime.now(timezone.utc).date()
         start = end - timedelta(days=days)
@@ -29,48 +45,205 @@ class CostAnalyzer:
         logger.info(f"Analyzing costs from {start} to {end}")
 
         # Get daily costs by service
-        daily = self._get_daily_costs(str(start), str(end))
+        daily, service_days = self._get_daily_costs(str(start), str(end))
         by_service = self._get_costs_by_service(str(start), str(end))
         by_region = self._get_costs_by_region(str(start), str(end))
+        return self._build(start, end, daily, by_service, by_region, service_days)
 
-        # Calculate metrics
-        total_spend = sum(d["amount"] for d in daily)
-        avg_daily = total_spend / max(len(daily), 1)
-        projected_monthly = avg_daily * 30
+    def fetch_cur(self, paths: str | list[str], days: int = 30, end: date | None = None) -> CostAnalysis:
+        """Run the same analysis from CUR Parquet files instead of Cost Explorer.
+
+        ``end`` defaults to the day after the last usage day in the files.
+        """
+        from .cur import CurReader
 
-        # Detect cost spikes (days > 2x average)
-        spikes = [d for d in daily if d["amount"] > avg_daily * 2]
+        reader = CurReader(paths)
+        if end is None:
+            latest = reader.latest_day()
+            end = latest + timedelta(days=1) if latest else datetime.now(timezone.utc).date()
+        start = end - timedelta(days=days)
 
-        # Top 5 services
-        top_services = sorted(by_service, key=lambda x: x["amount"], reverse=True)[:5]
+        logger.info(f"Analyzing CUR costs from {start} to {end}")
+        cur = reader.aggregate(start, end)
+        services, _, matrix = cur.service_day_matrix()
+        return self._build(
+            start, end, cur.daily(), cur.by_service(), cur.by_region(), dict(zip(services, matrix))
+        )
 
+    def analyze(self, days: int = 30) -> dict[str, Any]:
+        """Run full cost analysis for the specified period."""
+        return self.summarize(self.fetch(days))
+
+    def analyze_cur(self, paths: str | list[str], days: int = 30, end: date | None = None) -> dict[str, Any]:
+        """Dict result of :meth:`fetch_cur`."""
+        return self.summarize(self.fetch_cur(paths, days, end))
+
+    def summarize(self, analysis: CostAnalysis) -> dict[str, Any]:
+        """Dict view of a :class:`CostAnalysis`."""
+        by_service = [{"service": s.service_name, "amount": s.cost} for s in analysis.service_breakdown]
+        forecasts = [asdict(f) for f in analysis.forecasts]
         return {
-            "period": {"start": str(start), "end": str(end), "days": days},
-            "total_spend": round(total_spend, 2),
-            "avg_daily": round(avg_daily, 2),
-            "projected_monthly": round(projected_monthly, 2),
-            "daily_costs": daily,
+            "period": {
+                "start": str(analysis.start_date),
+                "end": str(analysis.end_date),
+                "days": (analysis.end_date - analysis.start_date).days,
+            },
+            "total_spend": analysis.total_cost,
+            "avg_daily": analysis.avg_daily,
+            "projected_monthly": analysis.projected_monthly,
+            "forecast": {
+                "total": forecasts[-1] if forecasts else None,
+                "by_service": sorted(forecasts[:-1], key=lambda f: f["next_30_days"], reverse=True),
+            },
+            "daily_costs": [{"date": str(d.date), "amount": d.cost} for d in analysis.daily_costs],
             "by_service": by_service,
-            "by_region": by_region,
-            "top_services": top_services,
-            "cost_spikes": spikes,
-            "potential_savings": self._estimate_savings(by_service),
+            "by_region": [{"region": r.region, "amount": r.cost} for r in analysis.region_breakdown],
+            "top_services": sorted(by_service, key=lambda x: x["amount"], reverse=True)[:5],
+            "cost_spikes": [
+                {
+                    "date": str(s.date),
+                    "service": s.service,
+                    "amount": s.actual_cost,
+                    "expected": s.average_cost,
+                    "deviation_pct": s.deviation_pct,
+                    "severity": s.severity.value,
+                    "score": s.score,
+                }
+                for s in analysis.spikes
+            ],
+            "potential_savings": analysis.estimated_savings,
         }
 
-    def _get_daily_costs(self, start: str, end: str) -> list[dict]:
-        """Get daily cost breakdown."""
-        response = self.ce.get_cost_and_usage(
-            TimePeriod={"Start": start, "End": end},
-            Granularity="DAILY",
-            Metrics=["UnblendedCost"],
+    def _build(
+        self,
+        start: date,
+        end: date,
+        daily: list[dict],
+        by_service: list[dict],
+        by_region: list[dict],
+        service_days: dict[str, np.ndarray],
+    ) -> CostAnalysis:
+        """Turn daily/service/region breakdowns into the analysis result.
+
+        ``service_days`` maps each service to its spend for every day from
+        ``start`` to ``end``.
+        """
+        # Calculate metrics
+        total_spend = sum(d["amount"] for d in daily)
+        avg_daily = total_spend / max(len(daily), 1)
+
+        # Every service plus the account total, one row per series
+        names, day_list, matrix = self._series_matrix(start, end, daily, service_days)
+        if self.cache_path:
+            try:
+                save_daily_costs(self.cache_path, names, day_list, matrix)
+            except OSError as e:
+                logger.warning(f"Could not cache daily costs to {self.cache_path}: {e}")
+
+        forecasts = self.forecaster.forecast(names, day_list, matrix)
+        projected_monthly = forecasts[-1].next_30_days if forecasts else avg_daily * 30
+
+        services_total = sum(s["amount"] for s in by_service)
+        return CostAnalysis(
+            start_date=start,
+            end_date=end,
+            total_cost=round(total_spend, 2),
+            projected_monthly=round(projected_monthly, 2),
+            avg_daily=round(avg_daily, 2),
+            daily_costs=[DailyCost(date.fromisoformat(d["date"]), d["amount"]) for d in daily],
+            service_breakdown=[
+                ServiceCost(
+                    s["service"],
+                    s["amount"],
+                    percentage=round(s["amount"] / services_total * 100, 1) if services_total else 0.0,
+                )
+                for s in by_service
+            ],
+            region_breakdown=[RegionCost(r["region"], r["amount"]) for r in by_region],
+            # Detect cost spikes per service and on the account total
+            spikes=self.spike_detector.detect(names, day_list, matrix),
+            forecasts=forecasts,
+            estimated_savings=self._estimate_savings(by_service),
         )
-        return [
-            {
-                "date": r["TimePeriod"]["Start"],
-                "amount": float(r["Total"]["UnblendedCost"]["Amount"]),
-            }
-            for r in response["ResultsByTime"]
-        ]
+
+    def _series_matrix(
+        self, start: date, end: date, daily: list[dict], service_days: dict[str, np.ndarray]
+    ) -> tuple[list[str], list[date], np.ndarray]:
+        """Stack every service series and the account total (last row) into one matrix."""
+        day_list = [start + timedelta(days=i) for i in range((end - start).days)]
+        total = np.zeros(len(day_list))
+        for d in daily:
+            offset = (date.fromisoformat(d["date"]) - start).days
+            if 0 <= offset < len(total):
+                total[offset] += d["amount"]
+        names = [*service_days, "Total"]
+        rows = [*service_days.values(), total]
+        return names, day_list, np.vstack(rows)
+
+    def _get_daily_costs(self, start: str, end: str) -> tuple[list[dict], dict[str, np.ndarray]]:
+        """Get daily totals and each service's daily spend in one grouped query.
+
+        With a scan history, days Cost Explorer has finalized are read from
+        the store and only the days after them are queried.
+        """
+        first = date.fromisoformat(start)
+        last = date.fromisoformat(end)
+        n_days = (last - first).days
+        totals: dict[str, float] = {}
+        services: dict[str, np.ndarray] = {}
+
+        def add(day: date, amount: float, by_service: dict[str, float]) -> None:
+            offset = (day - first).days
+            for service, cost in by_service.items():
+                series = services.setdefault(service, np.zeros(n_days))
+                if 0 <= offset < n_days:
+                    series[offset] += cost
+            totals[day.isoformat()] = totals.get(day.isoformat(), 0.0) + amount
+
+        # Finalized days form a prefix of the window; only the rest is queried
+        cached = self.history.finalized_costs(first, last) if self.history else {}
+        query_start = first
+        while query_start in cached:
+            costs = dict(cached[query_start])
+            add(query_start, costs.pop(DAY_TOTAL), costs)
+            query_start += timedelta(days=1)
+        if query_start >= last:
+            logger.info(f"All {n_days} days of costs are finalized and cached")
+            return [{"date": day, "amount": round(amount, 2)} for day, amount in totals.items()], services
+        if cached:
+            logger.info(f"Querying Cost Explorer from {query_start}; earlier days are finalized and cached")
+
+        finalized: dict[date, dict[str, float]] = {}
+        kwargs = {
+            "TimePeriod": {"Start": str(query_start), "End": end},
+            "Granularity": "DAILY",
+            "Metrics": ["UnblendedCost"],
+            "GroupBy": [{"Type": "DIMENSION", "Key": "SERVICE"}],
+        }
+        while True:
+            response = self.ce.get_cost_and_usage(**kwargs)
+            for r in response["ResultsByTime"]:
+                day = date.fromisoformat(r["TimePeriod"]["Start"])
+                groups = r.get("Groups", [])
+                by_service: dict[str, float] = {}
+                if groups:
+                    for group in groups:
+                        service = group["Keys"][0]
+                        by_service[service] = by_service.get(service, 0.0) + float(group["Metrics"]["UnblendedCost"]["Amount"])
+                    amount = sum(by_service.values())
+                else:
+                    amount = float(r.get("Total", {}).get("UnblendedCost", {}).get("Amount", 0))
+                add(day, amount, by_service)
+                if r.get("Estimated") is False:
+                    finalized[day] = {**by_service, DAY_TOTAL: amount}
+            token = response.get("NextPageToken")
+            if not token:
+                break
+            kwargs["NextPageToken"] = token
+        if self.history and finalized:
+            self.history.store_finalized_costs(finalized)
+        daily = [{"date": day, "amount": round(amount, 2)} for day, amount in totals.items()]
+        return daily, services
 
     def _get_costs_by_service(self, start: str, end: str) -> list[dict]:
         """Get costs grouped by AWS service."""
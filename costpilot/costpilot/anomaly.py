@@ -0,0 +1,118 @@
+"""CostPilot — Cost Spike Detection.
+
+Flags days whose spend breaks from each series' recent behaviour. Every
+series (a service, or the account total) is deseasonalized by weekday,
+then each day is scored against the median and MAD of the trailing
+window. All series are scored at once over a series × days matrix.
+"""
+
+import logging
+import warnings
+from datetime import date
+from typing import Sequence
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .models import CostSpike, Severity
+
+logger = logging.getLogger(__name__)
+
+# MAD × 1.4826 estimates the standard deviation of normally distributed data
+MAD_TO_STD = 1.4826
+
+
+class SpikeDetector:
+    """Rolling median/MAD anomaly detection with weekday seasonality."""
+
+    def __init__(
+        self,
+        std_devs: float = 2.0,
+        window: int = 14,
+        min_history: int = 7,
+        min_increase: float = 1.0,
+        relative_floor: float = 0.05,
+    ) -> None:
+        """
+        ``std_devs`` is the robust z-score a day must reach to count as a
+        spike. ``min_increase`` (USD/day) and ``relative_floor`` (fraction of
+        the baseline used as the smallest allowed spread) keep near-flat or
+        tiny series from flagging noise.
+        """
+        self.std_devs = std_devs
+        self.window = window
+        self.min_history = min_history
+        self.min_increase = min_increase
+        self.relative_floor = relative_floor
+
+    def detect(self, series: Sequence[str], days: Sequence[date], matrix: np.ndarray) -> list[CostSpike]:
+        """Spikes in a ``len(series) × len(days)`` spend matrix, most anomalous first."""
+        spend = np.asarray(matrix, dtype=np.float64)
+        if spend.ndim != 2 or spend.shape[1] <= self.min_history:
+            return []
+        n_series, n_days = spend.shape
+        weekday = np.array([d.weekday() for d in days])
+        factors = self.weekday_factors(spend, weekday)[:, weekday]
+        adjusted = spend / factors
+
+        # Window t holds the `window` days before day t; leading days see a shorter, NaN-padded history
+        padded = np.concatenate([np.full((n_series, self.window), np.nan), adjusted[:, :-1]], axis=1)
+        history = sliding_window_view(padded, self.window, axis=1)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            baseline = np.nanmedian(history, axis=2)
+            spread = np.nanmedian(np.abs(history - baseline[..., None]), axis=2) * MAD_TO_STD
+        observed = np.count_nonzero(~np.isnan(history), axis=2)
+
+        scale = np.maximum(spread, np.maximum(self.relative_floor * np.abs(baseline), 1e-2))
+        score = (adjusted - baseline) / scale
+        expected = baseline * factors
+        flagged = (
+            (observed >= self.min_history)
+            & (score >= self.std_devs)
+            & (spend - expected >= self.min_increase)
+        )
+
+        spikes = []
+        for i, t in zip(*np.nonzero(flagged)):
+            actual, baseline_cost = float(spend[i, t]), float(expected[i, t])
+            spikes.append(CostSpike(
+                date=days[t],
+                service=series[i],
+                actual_cost=round(actual, 2),
+                average_cost=round(baseline_cost, 2),
+                deviation_pct=round((actual - baseline_cost) / baseline_cost * 100, 1) if baseline_cost > 0 else 100.0,
+                severity=self._severity(float(score[i, t])),
+                score=round(float(score[i, t]), 2),
+            ))
+        logger.info(f"Scored {n_series * n_days:,} service-days, found {len(spikes)} spikes")
+        return sorted(spikes, key=lambda s: -s.score)
+
+    @staticmethod
+    def weekday_factors(spend: np.ndarray, weekday: np.ndarray) -> np.ndarray:
+        """Per-series multiplicative weekday profile (series × 7), mean 1.
+
+        Needs two full weeks; shorter matrices get a flat profile.
+        """
+        factors = np.ones((spend.shape[0], 7))
+        if spend.shape[1] < 14:
+            return factors
+        level = np.median(spend, axis=1)
+        active = level > 0
+        for d in range(7):
+            columns = weekday == d
+            if columns.any():
+                factors[active, d] = np.median(spend[active][:, columns], axis=1) / level[active]
+        # Weekdays with no spend would otherwise blow up the deseasonalized series
+        factors = np.clip(factors, 0.2, 5.0)
+        return factors / factors.mean(axis=1, keepdims=True)
+
+    def _severity(self, score: float) -> Severity:
+        ratio = score / self.std_devs
+        if ratio >= 3:
+            return Severity.CRITICAL
+        if ratio >= 2:
+            return Severity.HIGH
+        if ratio >= 1.5:
+            return Severity.MEDIUM
+        return Severity.LOW
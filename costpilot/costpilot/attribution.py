@@ -0,0 +1,178 @@
+"""CostPilot — Resource-Level Cost Attribution.
+
+Indexes trailing-30-day net amortized cost per resource ID, from CUR
+line items or Cost Explorer resource-level data (EC2 instances only),
+so detectors can
+report what a resource actually costs instead of an estimate from list
+prices. Net amortized cost is the effective rate: usage covered by
+Reserved Instances or Savings Plans is priced at the commitment's rate,
+with negotiated discounts applied. Savings computed from it are what
+the bill would actually lose.
+"""
+
+import logging
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Iterable, NamedTuple, Optional
+
+from .models import CostSource
+
+logger = logging.getLogger(__name__)
+
+WINDOW_DAYS = 30
+# Cost Explorer keeps resource-level data for the last 14 days
+RESOURCE_LOOKBACK_DAYS = 14
+# Cost Explorer's last two days are still being filled in
+CE_DATA_LAG_DAYS = 2
+# The only service GetCostAndUsageWithResources accepts; EBS, ELB, RDS
+# and ElastiCache resource costs come from the CUR
+RESOURCE_SERVICE = "Amazon Elastic Compute Cloud - Compute"
+# Errors meaning resource-level data isn't available to this caller
+UNAVAILABLE_ERRORS = ("DataUnavailableException", "AccessDeniedException")
+
+
+class ResourceCost(NamedTuple):
+    """Actual spend attributed to one resource."""
+    monthly_cost: float
+    usage_type: str  # usage type carrying the most spend
+    service: str
+
+
+class ResourceCostIndex:
+    """Hash index of resource ID → trailing-30-day net amortized cost.
+
+    ``discount`` is the account's net-to-gross ratio (1.0 without
+    negotiated discounts), for scaling savings quoted at public rates.
+    """
+
+    def __init__(
+        self,
+        rows: Iterable[tuple[str, str, str, float]] = (),
+        source: CostSource = CostSource.CUR,
+        discount: float = 1.0,
+    ) -> None:
+        self.source = source
+        self.discount = discount
+        self._costs: dict[str, ResourceCost] = {}
+        totals: dict[str, list] = {}
+        for resource_id, usage_type, service, cost in rows:
+            entry = totals.get(resource_id)
+            if entry is None:
+                totals[resource_id] = [cost, usage_type or "", service or "", cost]
+                continue
+            entry[0] += cost
+            if cost > entry[3]:
+                entry[1], entry[2], entry[3] = usage_type or "", service or "", cost
+        for resource_id, (total, usage_type, service, _) in totals.items():
+            cost = ResourceCost(round(total, 2), usage_type, service)
+            self._costs[resource_id] = cost
+            # CUR reports some resources by ARN (snapshots, volumes, databases); index the bare ID too
+            if resource_id.startswith("arn:"):
+                self._costs.setdefault(re.split("[/:]", resource_id)[-1], cost)
+
+    @classmethod
+    def from_cur(cls, paths: str | list[str], days: int = WINDOW_DAYS) -> "ResourceCostIndex":
+        """Build from the last ``days`` days of CUR Parquet data, scaled to a 30-day month."""
+        import pyarrow.compute as pc
+
+        from .cur import CurReader
+
+        reader = CurReader(paths)
+        latest = reader.latest_day()
+        if latest is None:
+            return cls()
+        end = latest + timedelta(days=1)
+        resources = reader.aggregate(end - timedelta(days=days), end).resources
+        scale = WINDOW_DAYS / days
+        net, gross = pc.sum(resources["cost"]).as_py() or 0.0, pc.sum(resources["gross"]).as_py() or 0.0
+        index = cls(
+            zip(
+                resources["resource_id"].to_pylist(),
+                resources["usage_type"].to_pylist(),
+                resources["service"].to_pylist(),
+                (c * scale for c in resources["cost"].to_pylist()),
+            ),
+            discount=_ratio(net, gross),
+        )
+        logger.info(f"Indexed CUR cost for {len(index):,} resources")
+        return index
+
+    @classmethod
+    def from_cost_explorer(
+        cls, config: Any, days: int = RESOURCE_LOOKBACK_DAYS, end: Optional[date] = None
+    ) -> "ResourceCostIndex":
+        """Build from Cost Explorer's resource-level ``NetAmortizedCost``, scaled to a 30-day month.
+
+        One paginated daily GetCostAndUsageWithResources query covers every
+        EC2 instance, so the number of calls grows with pages, not with the
+        fleet. The window ends at the last complete day, and each resource
+        is scaled by the days it has cost in, so one launched mid-window
+        gets its running rate rather than a share of the window. The API
+        only serves EC2 compute, so other resources keep list prices
+        unless the CUR is used. Resource-level data must be enabled in
+        Cost Explorer's preferences. Without it (or without permission),
+        the index is empty and engines fall back to list prices; any
+        other error is raised.
+        """
+        from botocore.exceptions import ClientError
+
+        end = end or datetime.now(timezone.utc).date() - timedelta(days=CE_DATA_LAG_DAYS)
+        days = min(days, RESOURCE_LOOKBACK_DAYS - CE_DATA_LAG_DAYS)
+        ce = config.get_session().client("ce")
+        kwargs: dict[str, Any] = {
+            "TimePeriod": {"Start": str(end - timedelta(days=days)), "End": str(end)},
+            "Granularity": "DAILY",
+            "Metrics": ["NetAmortizedCost", "AmortizedCost"],
+            "GroupBy": [{"Type": "DIMENSION", "Key": "RESOURCE_ID"}, {"Type": "DIMENSION", "Key": "USAGE_TYPE"}],
+            "Filter": {"Dimensions": {"Key": "SERVICE", "Values": [RESOURCE_SERVICE]}},
+        }
+        rows, net, gross = [], 0.0, 0.0
+        resource_days: dict[str, set[str]] = {}
+        try:
+            while True:
+                resp = ce.get_cost_and_usage_with_resources(**kwargs)
+                for period in resp.get("ResultsByTime", []):
+                    day = period.get("TimePeriod", {}).get("Start", "")
+                    for group in period.get("Groups", []):
+                        resource_id, usage_type = group["Keys"]
+                        metrics = group["Metrics"]
+                        cost = float(metrics["NetAmortizedCost"]["Amount"])
+                        net += cost
+                        gross += float(metrics["AmortizedCost"]["Amount"])
+                        if resource_id and resource_id != "NoResourceId":
+                            rows.append((resource_id, usage_type, RESOURCE_SERVICE, cost))
+                            resource_days.setdefault(resource_id, set()).add(day)
+                token = resp.get("NextPageToken")
+                if not token:
+                    break
+                kwargs["NextPageToken"] = token
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in UNAVAILABLE_ERRORS:
+                raise
+            logger.warning(f"Resource-level Cost Explorer data unavailable, using list prices: {e}")
+            return cls(source=CostSource.COST_EXPLORER)
+        index = cls(
+            ((r, u, s, cost * WINDOW_DAYS / len(resource_days[r])) for r, u, s, cost in rows),
+            source=CostSource.COST_EXPLORER,
+            discount=_ratio(net, gross),
+        )
+        logger.info(f"Indexed Cost Explorer amortized cost for {len(index):,} resources")
+        return index
+
+    def get(self, resource_id: str) -> Optional[ResourceCost]:
+        return self._costs.get(resource_id)
+
+    def monthly_cost(self, resource_id: str, default: float) -> float:
+        """Actual monthly cost, or ``default`` (the estimate) when the CUR has no record."""
+        cost = self._costs.get(resource_id)
+        return cost.monthly_cost if cost is not None else default
+
+    def __contains__(self, resource_id: str) -> bool:
+        return resource_id in self._costs
+
+    def __len__(self) -> int:
+        return len(self._costs)
+
+
+def _ratio(net: float, gross: float) -> float:
+    return round(net / gross, 4) if gross > 0 else 1.0
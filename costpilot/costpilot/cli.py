@@ -1,70 +1,250 @@
-"""CostPilot CLI — Cloud Cost Optimization Engine."""
+"""CostPilot CLI — Cloud Cost Optimization Engine.
+
+Importing this module must stay cheap: `costpilot --help` and shell
+completion only build the click commands. Engines, boto3, numpy and the
+config loader are imported inside the command that needs them, and
+logging is configured once a command actually runs.
+"""
+
+from __future__ import annotations
 
 import click
 import logging
-from .analyzer import CostAnalyzer
-from .rightsizer import RightSizer
-from .unused import UnusedDetector
-from .reporter import ReportGenerator
-from .config import Config
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Optional
+
+from .pipeline import DEFAULT_STAGE_TIMEOUT, PipelineRunner, Stage, StageResult
+
+if TYPE_CHECKING:
+    from .attribution import ResourceCostIndex
+    from .config import Config
+    from .history import ScanHistory
+    from .middleware import ApiMiddleware
+    from .models import CostReport, ScanDiff
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+logger = logging.getLogger(__name__)
+
+# Scan stages whose findings make up the report's rightsizing section
+RIGHTSIZING_STAGES = ("rightsizing", "rds", "elasticache", "ebs")
 
 
 @click.group()
 @click.option("--profile", default=None, help="AWS profile name")
-@click.option("--region", default="us-east-1", help="AWS region")
+@click.option("--region", default=None, help="AWS region (default: aws_region from the config file)")
+@click.option("--record", type=click.Path(dir_okay=False), default=None,
+              help="Record every AWS response to a compressed fixture (.jsonl.gz)")
+@click.option("--replay", type=click.Path(exists=True, dir_okay=False), default=None,
+              help="Answer AWS calls from a recorded fixture instead of AWS")
 @click.pass_context
-def cli(ctx: click.Context, profile: str, region: str) -> None:
+def cli(ctx: click.Context, profile: str, region: str, record: Optional[str], replay: Optional[str]) -> None:
     """☁️ CostPilot — AWS Cloud Cost Optimization Engine."""
+    from .config import Config
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
     ctx.ensure_object(dict)
-    ctx.obj["config"] = Config(profile=profile, region=region)
+    source = None
+    if replay:
+        from .replay import FixtureSource
+        source = FixtureSource(replay)
+        click.echo(f"▶️  Replaying {source.records} recorded responses from {replay}")
+    config = Config(profile=profile, region=region, replay=source, record=record)
+    ctx.call_on_close(config.close)
+    ctx.obj["config"] = config
+
+
+def _scan(
+    config: Config,
+    days: int,
+    cur_path: Optional[str] = None,
+    history: Optional[ScanHistory] = None,
+    timeout: float = DEFAULT_STAGE_TIMEOUT,
+    inventories: tuple[str, ...] = (),
+    list_prices: bool = False,
+    reservations: bool = False,
+) -> tuple[CostReport, dict[str, StageResult]]:
+    """Run the cost analysis, rightsizing, unused-resource and S3 stages concurrently into one report.
+
+    Rightsizing runs as one stage per engine (EC2, RDS, ElastiCache,
+    EBS), sharing one price catalog, merged by savings into the report.
+    Findings are priced at net amortized rates, from the CUR when given
+    or else Cost Explorer's resource-level data (EC2 instances only),
+    unless ``list_prices``.
+    Stages that fail or time out are left out, so the report may be partial.
+    """
+    from .analyzer import CostAnalyzer
+    from .forecast import DEFAULT_CACHE_PATH
+    from .models import CostReport
+    from .rightsizer import CacheRightSizer, DatabaseRightSizer, RightSizer, VolumeRightSizer
+    from .s3 import S3Analyzer
+    from .unused import UnusedDetector
+    costs = _cost_index(config, cur_path, list_prices)
+
+    # Engines create their clients here, on this thread; the stages only use them
+    analyzer = CostAnalyzer(config, cache_path=DEFAULT_CACHE_PATH, history=history)
+    rightsizer = RightSizer(config, costs=costs, history=history)
+    databases = DatabaseRightSizer(config, catalog=rightsizer.catalog, costs=costs, history=history)
+    caches = CacheRightSizer(config, catalog=rightsizer.catalog, costs=costs, history=history)
+    volumes = VolumeRightSizer(config, catalog=rightsizer.catalog, costs=costs, history=history)
+    detector = UnusedDetector(config, costs=costs, history=history)
+    storage = S3Analyzer(config)
+    stages = [
+        Stage("costs", lambda: analyzer.fetch_cur(cur_path, days=days) if cur_path else analyzer.fetch(days=days)),
+        Stage("rightsizing", rightsizer.fetch),
+        Stage("rds", databases.fetch),
+        Stage("elasticache", caches.fetch),
+        Stage("ebs", volumes.fetch),
+        Stage("unused", detector.fetch),
+        Stage("s3", lambda: storage.fetch(inventories)),
+    ]
+    if reservations:
+        from .reservations import ReservationAnalyzer
+        reserved = ReservationAnalyzer(config, rates=costs)
+        stages.append(Stage("reservations", lambda: reserved.fetch()[0]))
+    click.echo(f"⏳ Running {', '.join(s.name for s in stages)} in parallel...")
+    runner = PipelineRunner(config.api, timeout=timeout, on_finish=_show_stage)
+    results = runner.run(stages)
+
+    report = CostReport(
+        generated_at=datetime.now(timezone.utc),
+        analysis=results["costs"].value,
+        rightsizing=sorted(
+            (r for name in RIGHTSIZING_STAGES for r in results[name].value or []), key=lambda r: -r.monthly_savings
+        ),
+        unused_resources=[*(results["unused"].value or []), *(results["s3"].value or [])],
+        reservations=results["reservations"].value if reservations else None,
+        advisories=storage.advisories if results["s3"].ok else [],
+    )
+    report.calculate_savings()
+    return report, results
+
+
+def _cost_index(config: Config, cur_path: Optional[str], list_prices: bool) -> Optional[ResourceCostIndex]:
+    """Net amortized costs from the CUR or Cost Explorer; None (list prices) when skipped or unavailable.
+
+    A Cost Explorer failure (throttling, an endpoint error) must not cost
+    the whole scan, so it falls back to list prices with a warning.
+    """
+    from .attribution import ResourceCostIndex
+    if cur_path:
+        return ResourceCostIndex.from_cur(cur_path)
+    if list_prices:
+        return None
+    try:
+        return ResourceCostIndex.from_cost_explorer(config)
+    except Exception as e:
+        logger.warning(f"Could not read resource costs from Cost Explorer, using list prices: {e}")
+        return None
+
+
+def _show_stage(result: StageResult) -> None:
+    if result.ok:
+        click.echo(f"  ✅ {result.name} ({result.seconds:.1f}s)")
+    else:
+        click.echo(f"  ⚠️  {result.name} {result.error}")
+
+
+def _show_stage_profile(results: dict[str, StageResult]) -> None:
+    click.echo("\n⏱️  Stage profile:")
+    for result in results.values():
+        click.echo(f"  {result.name:<12} {result.seconds:>8.2f}s {result.total_calls:>7,} API calls")
+        for operation, count in sorted(result.api_calls.items(), key=lambda x: -x[1]):
+            click.echo(f"    {operation:<40} {count:>7,}")
 
 
 @cli.command()
 @click.option("--days", default=30, help="Analysis period in days (30/60/90)")
 @click.option("--output", default="report", help="Output directory")
+@click.option("--cur", "cur_path", default=None, help="Read costs from CUR Parquet files (local path or s3://) instead of Cost Explorer")
+@click.option("--save", "save_path", default=None, help="Also save the typed report (.json, or .msgpack for msgpack)")
+@click.option("--format", "formats", multiple=True, type=click.Choice(["md", "html"]), default=("md", "html"), help="Report format (repeatable)")
+@click.option("--export", "export_path", default=None, help="Export all findings to a .csv or .parquet file")
+@click.option("--s3-inventory", "inventories", multiple=True,
+              help="S3 Inventory manifest.json (local path or s3://) for object-level S3 findings (repeatable)")
+@click.option("--include-reservations", "reservations", is_flag=True, help="Add RI/Savings Plans utilization and purchase recommendations")
+@click.option("--list-prices", is_flag=True, help="Price findings at list prices instead of net amortized (RI/SP-aware) rates")
+@click.option("--stage-timeout", default=DEFAULT_STAGE_TIMEOUT, help="Seconds before a pipeline stage is abandoned")
+@click.option("--profile-stages", is_flag=True, help="Print wall time and API calls per stage")
 @click.pass_context
-def analyze(ctx: click.Context, days: int, output: str) -> None:
+def analyze(
+    ctx: click.Context,
+    days: int,
+    output: str,
+    cur_path: str,
+    save_path: str,
+    formats: tuple[str, ...],
+    export_path: str,
+    inventories: tuple[str, ...],
+    reservations: bool,
+    list_prices: bool,
+    stage_timeout: float,
+    profile_stages: bool,
+) -> None:
     """Run full cost analysis with recommendations."""
     config = ctx.obj["config"]
     click.echo(f"🔍 Analyzing {days} days of AWS cost data...")
 
-    analyzer = CostAnalyzer(config)
-    results = analyzer.analyze(days=days)
-
-    rightsizer = RightSizer(config)
-    sizing = rightsizer.analyze()
-
-    detector = UnusedDetector(config)
-    unused = detector.scan()
+    report, results = _scan(
+        config, days, cur_path, timeout=stage_timeout, inventories=inventories,
+        list_prices=list_prices, reservations=reservations,
+    )
+    total_savings = report.total_potential_savings
+    failed = [r.name for r in results.values() if not r.ok]
+    if failed:
+        click.echo(f"⚠️  Partial report — missing: {', '.join(failed)}")
+    if profile_stages:
+        _show_stage_profile(results)
+    _show_api_usage(config.api)
 
+    from .reporter import DEFAULT_REPORT_CACHE, ReportGenerator
+    from .serialize import dump
     reporter = ReportGenerator(config)
-    reporter.generate(results, sizing, unused, output_dir=output)
+    reporter.generate(report, output_dir=output, formats=formats)
+    if export_path:
+        reporter.export_findings(report, export_path)
+
+    try:
+        DEFAULT_REPORT_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        dump(report, DEFAULT_REPORT_CACHE)
+    except OSError as e:
+        logger.warning(f"Could not cache report for `costpilot report`: {e}")
+    if save_path:
+        dump(report, save_path)
 
-    total_savings = results.get("potential_savings", 0) + sizing.get("potential_savings", 0) + unused.get("potential_savings", 0)
     click.echo(f"\n💰 Total potential savings: ${total_savings:,.2f}/month")
     click.echo(f"📄 Report saved to {output}/")
 
 
 @cli.command()
 @click.option("--output", default="report", help="Output directory")
+@click.option("--from", "source", default=None, help="Saved report to render (default: the last analysis)")
+@click.option("--export", "export_path", default=None, help="Export all findings to a .csv or .parquet file")
 @click.pass_context
-def report(ctx: click.Context, output: str) -> None:
+def report(ctx: click.Context, output: str, source: str, export_path: str) -> None:
     """Generate cost report from latest analysis."""
+    from .reporter import ReportGenerator
     config = ctx.obj["config"]
     reporter = ReportGenerator(config)
     click.echo(f"📊 Generating report...")
-    reporter.generate_from_cache(output_dir=output)
+    try:
+        reporter.generate_from_cache(output_dir=output, path=source)
+    except FileNotFoundError:
+        raise click.ClickException("No saved report — run `costpilot analyze` first")
+    if export_path:
+        from .serialize import load
+        from .reporter import DEFAULT_REPORT_CACHE
+        reporter.export_findings(load(source or DEFAULT_REPORT_CACHE), export_path)
     click.echo(f"📄 Report saved to {output}/")
 
 
 @cli.command()
+@click.option("--cur", "cur_path", default=None, help="Price findings from CUR Parquet files instead of Cost Explorer")
+@click.option("--list-prices", is_flag=True, help="Price findings at list prices instead of net amortized rates")
 @click.pass_context
-def unused(ctx: click.Context) -> None:
+def unused(ctx: click.Context, cur_path: str, list_prices: bool) -> None:
     """Find unused/idle AWS resources."""
+    from .unused import UnusedDetector
     config = ctx.obj["config"]
-    detector = UnusedDetector(config)
+    detector = UnusedDetector(config, costs=_cost_index(config, cur_path, list_prices))
     click.echo("🔎 Scanning for unused resources...")
 
     results = detector.scan()
@@ -81,6 +261,83 @@ def unused(ctx: click.Context) -> None:
                 click.echo(f"    • {item['id']} — ${item.get('monthly_cost', 0):.2f}/mo")
 
 
+@cli.command()
+@click.option("--interval", default=360, help="Minutes between scans")
+@click.option("--days", default=30, help="Analysis period in days")
+@click.option("--history", "history_path", default=None, help="Scan history database (default ~/.costpilot/history.db)")
+@click.option("--once", is_flag=True, help="Run one incremental scan and exit")
+@click.pass_context
+def daemon(ctx: click.Context, interval: int, days: int, history_path: str, once: bool) -> None:
+    """Rescan on a schedule, reusing cached data, and show what changed since the last scan."""
+    config = ctx.obj["config"]
+    from .history import ScanHistory, diff_reports
+    with ScanHistory(history_path) as history:
+        try:
+            while True:
+                started = time.monotonic()
+                config.api.reset()
+                click.echo(f"🔁 Scanning ({days} days of cost data)...")
+                report, results = _scan(config, days, history=history)
+                elapsed = time.monotonic() - started
+                failed = [r.name for r in results.values() if not r.ok]
+                previous = history.latest_snapshot()
+
+                if failed:
+                    # A partial snapshot would show the failed stages' findings as resolved
+                    click.echo(f"⚠️  {', '.join(failed)} failed — snapshot not saved")
+                elif previous is None:
+                    history.save_snapshot(report)
+                    click.echo(
+                        f"📸 First snapshot saved in {elapsed:.1f}s — "
+                        f"${report.total_potential_savings:,.2f}/month potential savings"
+                    )
+                else:
+                    history.save_snapshot(report)
+                    _show_diff(diff_reports(previous.report, report), previous.taken_at, elapsed)
+                _show_api_usage(config.api)
+
+                if once:
+                    break
+                time.sleep(max(interval * 60 - elapsed, 0))
+        except KeyboardInterrupt:
+            click.echo("\n👋 Stopped")
+
+
+def _show_api_usage(api: ApiMiddleware, top: int = 8) -> None:
+    stats = api.stats()
+    if not stats:
+        return
+    retries = sum(s.retries for s in stats.values())
+    throttles = sum(s.throttles for s in stats.values())
+    click.echo(
+        f"\n📡 {api.total_calls:,} AWS API calls, {retries:,} retries ({throttles:,} throttled), "
+        f"~${api.total_cost:,.2f} in API charges"
+    )
+    for key, s in list(stats.items())[:top]:
+        cost = f"  ${s.cost:,.2f}" if s.cost else ""
+        click.echo(f"  {key:<45} {s.calls:>7,} calls  {s.avg_latency_ms:>6.0f} ms avg{cost}")
+
+
+def _show_diff(diff: ScanDiff, since: datetime, elapsed: float) -> None:
+    new = diff.new_waste + diff.new_rightsizing
+    resolved = diff.resolved_waste + diff.resolved_rightsizing
+    click.echo(f"\n📸 Scan took {elapsed:.1f}s — changes since {since:%Y-%m-%d %H:%M} UTC:")
+    click.echo(f"  ➕ {len(new)} new findings (${_monthly(new):,.2f}/month)")
+    for item in new[:5]:
+        click.echo(f"    • {item.resource_id}")
+    click.echo(f"  ✅ {len(resolved)} resolved (${_monthly(resolved):,.2f}/month)")
+    click.echo(f"  💰 Potential savings: ${diff.savings_after:,.2f}/month ({diff.savings_delta:+,.2f})")
+
+
+def _usd(amount: float) -> str:
+    return f"${amount:,.2f}"
+
+
+def _monthly(findings: list) -> float:
+    """Monthly waste or savings of a mix of unused resources and rightsizing recommendations."""
+    return sum(getattr(f, "monthly_savings", None) or getattr(f, "monthly_cost", 0.0) for f in findings)
+
+
 @cli.command()
 @click.option("--budget", required=True, type=float, help="Monthly budget in USD")
 @click.option("--email", required=True, help="Alert email address")
@@ -91,12 +348,171 @@ def watch(ctx: click.Context, budget: float, email: str) -> None:
     from .alerts import AlertManager
     manager = AlertManager(config)
     click.echo(f"⏰ Setting up ${budget:,.0f}/month budget alert...")
-    manager.create_budget_alert(budget=budget, email=email)
-    click.echo(f"✅ Budget alert created. Notifications at 50%, 75%, 90%, 100%.")
+    plan = manager.create_budget_alert(budget=budget, email=email)
+    if plan.errors:
+        raise click.ClickException(f"Budget alert not set: {plan.errors[0]}")
+    click.echo(f"✅ Budget alert {'set' if plan.changes else 'already up to date'}. Notifications at 50%, 75%, 90%, 100%.")
+
+
+@cli.command()
+@click.argument("budgets_file", type=click.Path(exists=True, dir_okay=False))
+@click.option("--prefix", default=None, help="Name prefix of the budgets CostPilot manages (default CostPilot-)")
+@click.option("--prune/--no-prune", default=True,
+              help="Delete managed budgets missing from the file (never the `watch` budget)")
+@click.option("--allow-empty", is_flag=True, help="Prune even when the file declares no budgets")
+@click.option("--dry-run", is_flag=True, help="Show the changes without applying them")
+@click.pass_context
+def budgets(
+    ctx: click.Context, budgets_file: str, prefix: Optional[str], prune: bool, allow_empty: bool, dry_run: bool
+) -> None:
+    """Reconcile AWS Budgets with a YAML declaration, applying only the differences."""
+    from .alerts import MANAGED_PREFIX, AlertManager, load_budgets
+    config = ctx.obj["config"]
+    try:
+        specs = load_budgets(budgets_file)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    manager = AlertManager(config)
+    click.echo(f"📋 Reconciling {len(specs)} declared budgets...")
+    try:
+        plan = manager.apply(specs, prefix=prefix or MANAGED_PREFIX, prune=prune, dry_run=dry_run,
+                             allow_empty=allow_empty)
+    except ValueError as e:
+        raise click.ClickException(f"{e} (pass --allow-empty to confirm, or --no-prune)")
+
+    for spec in plan.creates:
+        click.echo(f"  + {spec.name} (${spec.amount:,.2f}/{spec.time_unit.lower()})")
+    for change in plan.updates:
+        parts = []
+        if change.budget:
+            parts.append(f"limit/filters → ${change.spec.amount:,.2f}")
+        if change.add_notifications or change.remove_notifications:
+            parts.append(f"+{len(change.add_notifications)}/-{len(change.remove_notifications)} notifications")
+        if change.add_subscribers or change.remove_subscribers:
+            parts.append("subscribers")
+        click.echo(f"  ~ {change.spec.name} ({', '.join(parts)})")
+    for name in plan.deletes:
+        click.echo(f"  - {name}")
+    verb = "to apply" if dry_run else "applied"
+    click.echo(
+        f"\n{'🔍' if dry_run else '✅'} {plan.changes} changes {verb} "
+        f"({len(plan.creates)} create, {len(plan.updates)} update, {len(plan.deletes)} delete), "
+        f"{plan.unchanged} unchanged"
+    )
+    if plan.errors:
+        for error in plan.errors:
+            click.echo(f"  ⚠️  {error}")
+        raise click.ClickException(f"{len(plan.errors)} budget changes failed — rerun to retry them")
+
+
+@cli.command()
+@click.option("--days", default=30, help="Allocation period in days")
+@click.option("--cur", "cur_path", default=None, help="Allocate from CUR Parquet files (local path or s3://) instead of Cost Explorer")
+@click.option("--rules", "rules_path", type=click.Path(exists=True, dir_okay=False), default=None,
+              help="Allocation rules YAML (default: the allocation section of the config file)")
+@click.option("--by", "breakdown", multiple=True, help="Also break owners' cost down by this tag (repeatable, needs --cur)")
+@click.option("--export", "export_path", default=None, help="Write the owner × service table to a CSV file")
+@click.pass_context
+def allocate(
+    ctx: click.Context, days: int, cur_path: str, rules_path: str, breakdown: tuple[str, ...], export_path: str
+) -> None:
+    """Charge spend back to owners by tag, with shared and untagged costs split proportionally."""
+    from .allocation import AllocationRules, CostAllocator
+    config = ctx.obj["config"]
+    rules = AllocationRules.load(rules_path) if rules_path else AllocationRules.from_dict(config.allocation)
+    if breakdown:
+        rules.breakdown_tags = list(breakdown)
+    allocator = CostAllocator(config, rules)
+    click.echo(f"🏷️  Allocating {days} days of spend by tag '{rules.owner_tag}'...")
+    result = allocator.fetch_cur(cur_path, days=days) if cur_path else allocator.fetch(days=days)
+
+    click.echo(f"\n{'Owner':<28} {'Direct':>12} {'Shared':>12} {'Total':>12} {'Share':>7}")
+    for owner in result.owners:
+        click.echo(
+            f"{owner.owner:<28} {_usd(owner.direct):>12} {_usd(owner.shared):>12} {_usd(owner.total):>12} "
+            f"{owner.share_pct:>6.1f}%"
+        )
+    click.echo(f"\n💰 ${result.total:,.2f} allocated, ${result.shared_pool:,.2f} of it shared")
+    if result.unallocated:
+        click.echo(f"⚠️  ${result.unallocated:,.2f} could not be allocated — no spend is attributed to any owner")
+    if result.breakdown:
+        keys = rules.breakdown_tags
+        click.echo(f"\n{'Owner':<28} " + " ".join(f"{k:<16}" for k in keys) + f" {'Direct':>12}")
+        for row in result.breakdown:
+            click.echo(f"{row['owner']:<28} " + " ".join(f"{row[k]:<16}" for k in keys) + f" {_usd(row['cost']):>12}")
+    if export_path:
+        import csv
+        with open(export_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["owner", "service", "cost"])
+            writer.writeheader()
+            writer.writerows(result.service_rows())
+        click.echo(f"📄 Owner × service costs written to {export_path}")
+
+
+@cli.command()
+@click.argument("usage_csv", required=False, type=click.Path(exists=True, dir_okay=False))
+@click.option("--cur", "cur_path", default=None, help="Simulate the last 30 days of CUR Parquet files (local path or s3://) instead of a CSV")
+@click.option("--commitment", "commitments", multiple=True, type=float, help="Hourly commitment to evaluate (repeatable)")
+@click.option("--discount", default=0.28, type=float, help="Savings Plan discount off On-Demand (0-1)")
+def simulate(usage_csv: Optional[str], cur_path: Optional[str], commitments: tuple[float, ...], discount: float) -> None:
+    """Simulate Savings Plan commitments over hourly on-demand usage (hour,family,region,cost CSV, or --cur)."""
+    from .simulator import CommitmentSimulator, HourlyUsage
+    if (usage_csv is None) == (cur_path is None):
+        raise click.UsageError("Give either a usage CSV or --cur")
+    usage = HourlyUsage.from_cur(cur_path) if cur_path else HourlyUsage.from_csv(usage_csv)
+    if not usage.groups:
+        raise click.ClickException("No On-Demand instance usage to simulate")
+    sim = CommitmentSimulator(usage, discount)
+    for s in sim.evaluate(commitments):
+        click.echo(
+            f"  ${s.commitment_hourly:,.2f}/hr → net ${s.monthly_savings:,.2f}/mo "
+            f"(utilization {s.utilization_pct}%, coverage {s.coverage_pct}%)"
+        )
+    best = sim.optimize()
+    click.echo(f"\n🎯 Best commitment: ${best.commitment_hourly:,.2f}/hr saving ${best.monthly_savings:,.2f}/month")
+
+
+@cli.command()
+@click.option("--cache", "cache_path", default=None, help="Daily cost cache (default ~/.costpilot/daily-costs.npz)")
+@click.option("--top", default=5, help="Number of services to show")
+def forecast(cache_path: str, top: int) -> None:
+    """Forecast spend offline from the daily costs cached by the last analysis."""
+    from .forecast import Forecaster, load_daily_costs
+    try:
+        series, days, matrix = load_daily_costs(cache_path)
+    except FileNotFoundError:
+        raise click.ClickException("No cached daily costs — run `costpilot analyze` first")
+    forecasts = Forecaster().forecast(series, days, matrix)
+    total = forecasts[-1]
+    click.echo(f"📈 Forecast from {len(days)} days of data ending {days[-1]}")
+    click.echo(
+        f"\n  End of month: ${total.end_of_month:,.2f} "
+        f"(${total.end_of_month_low:,.2f} – ${total.end_of_month_high:,.2f}), month to date ${total.month_to_date:,.2f}"
+    )
+    click.echo(
+        f"  Next 30 days: ${total.next_30_days:,.2f} (${total.next_30_days_low:,.2f} – ${total.next_30_days_high:,.2f})"
+    )
+    for f in sorted(forecasts[:-1], key=lambda f: -f.next_30_days)[:top]:
+        click.echo(f"    {f.series}: ${f.next_30_days:,.2f} (${f.next_30_days_low:,.2f} – ${f.next_30_days_high:,.2f})")
+
+
+@cli.command("import-prices")
+@click.argument("offer_files", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option("--db", default=None, help="Catalog path (default ~/.costpilot/pricing.db)")
+def import_prices(offer_files: tuple[str, ...], db: str) -> None:
+    """Import AWS Pricing bulk offer files (CSV, or small JSON offers) into the local price catalog."""
+    from .pricing import PriceCatalog
+    click.echo(f"📥 Importing {len(offer_files)} offer file(s)...")
+    try:
+        counts = PriceCatalog.build(offer_files, db)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"✅ {counts['instance_prices']:,} instance prices, {counts['volume_prices']:,} volume prices imported.")
 
 
 def main() -> None:
-    cli(obj={})
+    # A fixed prog name keeps shell completion on _COSTPILOT_COMPLETE under `python -m` too
+    cli(obj={}, prog_name="costpilot")
 
 
 if __name__ == "__main__":
@@ -4,16 +4,28 @@ from __future__ import annotations
 
 import logging
 import os
+import threading
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 import yaml
 
+from .middleware import ApiMiddleware
+
+if TYPE_CHECKING:
+    from .replay import Recorder, ResponseSource
+    from .sessions import PooledSession
+
 logger = logging.getLogger(__name__)
 
 DEFAULT_CONFIG_PATH = Path.home() / ".costpilot" / "config.yaml"
 
+# HTTP connections kept per client — pipeline stages share clients across threads
+MAX_POOL_CONNECTIONS = 50
+# Attempts per call under botocore's standard retry mode (jittered exponential backoff)
+MAX_ATTEMPTS = 8
+
 
 @dataclass
 class CostPilotConfig:
@@ -30,6 +42,11 @@ class CostPilotConfig:
     ses_recipients: list[str] = field(default_factory=list)
     ses_region: str = "us-east-1"
     output_dir: str = "./reports"
+    # Cost allocation rules, see allocation.AllocationRules
+    allocation: dict = field(default_factory=dict)
+    # Role assumed in other accounts by Config.get_session(account=...)
+    assume_role_name: Optional[str] = None
+    assume_role_external_id: Optional[str] = None
 
     @classmethod
     def load(cls, path: Optional[str] = None) -> "CostPilotConfig":
@@ -84,3 +101,112 @@ class CostPilotConfig:
         with open(config_path, "w") as f:
             yaml.dump(data, f, default_flow_style=False)
         logger.info("Saved config to %s", config_path)
+
+
+class Config:
+    """Runtime configuration: loaded settings plus one shared boto3 session.
+
+    Settings fields (``spike_std_devs``, ``stopped_ec2_days``, ...) are
+    readable directly on the config.
+    """
+
+    def __init__(
+        self,
+        profile: Optional[str] = None,
+        region: Optional[str] = None,
+        settings: Optional[CostPilotConfig] = None,
+        max_pool_connections: int = MAX_POOL_CONNECTIONS,
+        replay: Optional[ResponseSource] = None,
+        record: Optional[str | Path] = None,
+    ) -> None:
+        """``replay`` answers every API call from canned responses instead of
+        AWS; ``record`` writes the responses the session receives to a fixture.
+        """
+        self.settings = settings or CostPilotConfig.load()
+        self.profile = profile or self.settings.aws_profile
+        self.region = region or self.settings.aws_region
+        self.max_pool_connections = max_pool_connections
+        self.replay = replay
+        self.recorder: Optional[Recorder] = None
+        if record:
+            from .replay import Recorder
+            self.recorder = Recorder(record)
+        # Accounting and rate limiting for every API call made through the session;
+        # replayed calls never reach AWS, so they aren't rate limited
+        self.api = ApiMiddleware(limits={} if replay is not None else None)
+        self._sessions: dict[Optional[str], PooledSession] = {}
+        self._lock = threading.RLock()
+
+    def get_session(self, account: Optional[str] = None) -> PooledSession:
+        """The shared session for ``account`` (default: the configured profile's), created on first use.
+
+        Its clients are pooled per (region, service), so engines share
+        them (see ``sessions.py``). Each client keeps up to
+        ``max_pool_connections`` HTTP connections, so engines running
+        concurrently don't queue on the default pool of 10. Clients retry
+        throttled calls with jittered backoff and go through the
+        :class:`ApiMiddleware` hooks.
+
+        Other accounts are reached by assuming ``assume_role_name`` there
+        with the profile's credentials, refreshed before they expire.
+        When replaying, calls are answered by the replay source, and the
+        configured profile, credentials and roles aren't used.
+        """
+        with self._lock:
+            pooled = self._sessions.get(account)
+            if pooled is None:
+                pooled = self._sessions[account] = self._new_session(account)
+            return pooled
+
+    def client(self, service: str, region: Optional[str] = None, account: Optional[str] = None):
+        """The pooled client for (``account``, ``region``, ``service``)."""
+        return self.get_session(account).client(service, region_name=region)
+
+    def role_arn(self, account: str) -> str:
+        if not self.settings.assume_role_name:
+            raise ValueError(f"No assume_role_name configured to reach account {account}")
+        return f"arn:aws:iam::{account}:role/{self.settings.assume_role_name}"
+
+    def _new_session(self, account: Optional[str]) -> PooledSession:
+        import boto3
+        import botocore.session
+        from botocore.config import Config as ClientConfig
+
+        from .sessions import PooledSession, assumed_role_credentials, use_credentials
+
+        core = botocore.session.get_session()
+        core.set_default_client_config(ClientConfig(
+            max_pool_connections=self.max_pool_connections,
+            retries={"mode": "standard", "max_attempts": MAX_ATTEMPTS},
+        ))
+        if self.replay is not None:
+            session = boto3.Session(
+                botocore_session=core, aws_access_key_id="replay", aws_secret_access_key="replay",
+                region_name=self.region,
+            )
+        elif account is None:
+            session = boto3.Session(botocore_session=core, profile_name=self.profile, region_name=self.region)
+        else:
+            source = self.get_session().session._session
+            use_credentials(core, assumed_role_credentials(
+                source, self.role_arn(account), self.settings.assume_role_external_id
+            ))
+            session = boto3.Session(botocore_session=core, region_name=self.region)
+        self.api.install(session)
+        if self.recorder is not None:
+            self.recorder.install(session)
+        if self.replay is not None:
+            from .replay import Replayer
+            Replayer(self.replay).install(session)
+        return PooledSession(session, account)
+
+    def close(self) -> None:
+        """Finish any recording in progress."""
+        if self.recorder is not None:
+            self.recorder.close()
+
+    def __getattr__(self, name: str):
+        # Only reached for attributes not set in __init__: fall through to the settings
+        if name == "settings":
+            raise AttributeError(name)
+        return getattr(self.settings, name)
@@ -0,0 +1,303 @@
+"""CostPilot — Cost and Usage Report (CUR) Ingestion.
+
+Streams local or S3 CUR Parquet files batch by batch, reading only the
+columns CostPilot needs, and rolls line items up with vectorized Arrow
+group-bys. Partial aggregates are compacted as they accumulate, so
+memory is bounded by the number of distinct groups rather than the
+number of line items.
+
+Requires the optional ``pyarrow`` dependency (``pip install costpilot[cur]``).
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+logger = logging.getLogger(__name__)
+
+# Logical field → candidate CUR column names (legacy CUR first, then CUR 2.0)
+CUR_COLUMNS = {
+    "start": ["line_item_usage_start_date"],
+    "service": ["product_product_name", "line_item_product_code"],
+    "region": ["product_region_code", "product_region"],
+    "account": ["line_item_usage_account_id"],
+    "resource_id": ["line_item_resource_id"],
+    "usage_type": ["line_item_usage_type"],
+    "cost": ["line_item_unblended_cost"],
+    "line_type": ["line_item_line_item_type"],
+    "net_cost": ["line_item_net_unblended_cost"],
+    "ri_cost": ["reservation_net_effective_cost", "reservation_effective_cost"],
+    "ri_gross": ["reservation_effective_cost"],
+    "sp_cost": ["savings_plan_net_savings_plan_effective_cost", "savings_plan_savings_plan_effective_cost"],
+    "sp_gross": ["savings_plan_savings_plan_effective_cost"],
+}
+REQUIRED_FIELDS = ("start", "service", "cost")
+
+CUBE_KEYS = ["day", "service", "region", "account"]
+RESOURCE_KEYS = ["resource_id", "usage_type", "service"]
+HOURLY_KEYS = ["hour", "family", "region"]
+
+# On-Demand EC2 instance usage types ("BoxUsage:m5.large", "USW2-DedicatedUsage:c5.xlarge") and their family
+INSTANCE_USAGE = r"(?:^|-)(?:BoxUsage|DedicatedUsage):(?P<family>[^.]+)\."
+
+# Commitment fees and negations are amortized into the covered usage lines
+AMORTIZED_LINE_TYPES = ["SavingsPlanNegation", "SavingsPlanRecurringFee", "SavingsPlanUpfrontFee", "RIFee", "Fee"]
+
+# Compact partial aggregates once this many rows have piled up
+COMPACT_ROWS = 500_000
+
+
+@dataclass
+class CurAggregates:
+    """Rolled-up CUR spend for one period."""
+    start: date
+    end: date
+    cube: pa.Table       # day, service, region, account, cost
+    resources: pa.Table  # resource_id, usage_type, service, cost (net amortized), gross (amortized)
+    tags: pa.Table       # account, service, tag_<key>..., cost
+    line_items: int = 0
+
+    def _rollup(self, key: str) -> list[tuple]:
+        table = self.cube.group_by([key]).aggregate([("cost", "sum")])
+        return list(zip(table[key].to_pylist(), table["cost_sum"].to_pylist()))
+
+    def daily(self) -> list[dict]:
+        """Daily totals in ``CostAnalyzer`` shape, oldest first."""
+        return [
+            {"date": str(day), "amount": round(amount, 2)}
+            for day, amount in sorted(self._rollup("day"))
+        ]
+
+    def by_service(self) -> list[dict]:
+        return [{"service": k or "Unknown", "amount": round(v, 2)} for k, v in self._rollup("service")]
+
+    def by_region(self) -> list[dict]:
+        rows = sorted(self._rollup("region"), key=lambda x: -x[1])
+        return [{"region": k or "global", "amount": round(v, 2)} for k, v in rows]
+
+    def by_account(self) -> list[dict]:
+        rows = sorted(self._rollup("account"), key=lambda x: -x[1])
+        return [{"account": k or "", "amount": round(v, 2)} for k, v in rows]
+
+    def service_day_matrix(self) -> tuple[list[str], list[date], np.ndarray]:
+        """Services × days spend matrix covering every day of the period."""
+        table = self.cube.group_by(["service", "day"]).aggregate([("cost", "sum")])
+        services = sorted({s or "Unknown" for s in table["service"].to_pylist()})
+        days = [self.start + timedelta(days=i) for i in range((self.end - self.start).days)]
+        row = {s: i for i, s in enumerate(services)}
+        matrix = np.zeros((len(services), len(days)))
+        day_index = np.array([(d - self.start).days for d in table["day"].to_pylist()], dtype=np.int64)
+        svc_index = np.array([row[s or "Unknown"] for s in table["service"].to_pylist()], dtype=np.int64)
+        np.add.at(matrix, (svc_index, day_index), table["cost_sum"].to_numpy(zero_copy_only=False))
+        return services, days, matrix
+
+
+class CurReader:
+    """Column-projected, streaming reader over CUR Parquet files."""
+
+    def __init__(self, paths: str | list[str], tag_keys: Iterable[str] = (), batch_size: int = 131_072) -> None:
+        self.dataset = ds.dataset(paths, format="parquet")
+        self.tag_keys = list(tag_keys)
+        self.batch_size = batch_size
+        names = set(self.dataset.schema.names)
+        self.columns = {
+            field: next((c for c in candidates if c in names), None)
+            for field, candidates in CUR_COLUMNS.items()
+        }
+        missing = [f for f in REQUIRED_FIELDS if self.columns[f] is None]
+        if missing:
+            raise ValueError(f"CUR files are missing required columns for: {', '.join(missing)}")
+        # Legacy CUR flattens tags into resource_tags_user_<key>; CUR 2.0 uses a map column
+        self._tag_map = "resource_tags" if "resource_tags" in names else None
+        self._tag_columns = {
+            key: f"resource_tags_user_{key}" for key in self.tag_keys if f"resource_tags_user_{key}" in names
+        }
+
+    def latest_day(self) -> Optional[date]:
+        """Last usage day in the files (scans only the start-date column)."""
+        latest = None
+        scanner = self.dataset.scanner(columns=[self.columns["start"]], batch_size=self.batch_size)
+        for batch in scanner.to_batches():
+            value = pc.max(batch.column(0)).as_py()
+            if value is not None and (latest is None or value > latest):
+                latest = value
+        return latest.date() if latest is not None else None
+
+    def aggregate(self, start: date, end: date) -> CurAggregates:
+        """Roll up line items with ``start <= usage day < end``."""
+        projected = {c for c in self.columns.values() if c} | set(self._tag_columns.values())
+        if self._tag_map:
+            projected.add(self._tag_map)
+        scanner = self.dataset.scanner(
+            columns=sorted(projected), filter=self._window(start, end), batch_size=self.batch_size
+        )
+
+        tag_names = [f"tag_{k}" for k in self.tag_keys]
+        cubes: list[pa.Table] = []
+        resources: list[pa.Table] = []
+        tags: list[pa.Table] = []
+        line_items = 0
+        for batch in scanner.to_batches():
+            if batch.num_rows == 0:
+                continue
+            line_items += batch.num_rows
+            cols = self._normalize(batch)
+            cubes.append(_sum_by(cols, CUBE_KEYS))
+            if self.columns["resource_id"]:
+                resources.append(_sum_by(
+                    cols, RESOURCE_KEYS, pc.not_equal(cols["resource_id"], ""), values={"cost": "net", "gross": "gross"}
+                ))
+            if tag_names:
+                tags.append(_sum_by(cols, ["account", "service", *tag_names]))
+            cubes = _compact(cubes, CUBE_KEYS)
+            resources = _compact(resources, RESOURCE_KEYS)
+            tags = _compact(tags, ["account", "service", *tag_names])
+
+        logger.info(f"Aggregated {line_items:,} CUR line items from {start} to {end}")
+        return CurAggregates(
+            start=start,
+            end=end,
+            cube=_finish(cubes, CUBE_KEYS),
+            resources=_finish(resources, RESOURCE_KEYS, values=("cost", "gross")),
+            tags=_finish(tags, ["account", "service", *tag_names]),
+            line_items=line_items,
+        )
+
+    def hourly_on_demand(self, start: date, end: date) -> pa.Table:
+        """On-Demand EC2 instance spend per hour, instance family and region.
+
+        Only ``Usage`` lines count: usage an RI or Savings Plan already
+        covers is billed under other line types. The family is read from
+        the usage type. Columns: hour, family, region, cost (unblended).
+        """
+        if self.columns["usage_type"] is None:
+            raise ValueError("CUR files are missing the usage type column needed for instance families")
+        fields = ("start", "usage_type", "region", "cost", "line_type")
+        projected = sorted({self.columns[f] for f in fields if self.columns[f]})
+        scanner = self.dataset.scanner(columns=projected, filter=self._window(start, end), batch_size=self.batch_size)
+
+        parts: list[pa.Table] = []
+        for batch in scanner.to_batches():
+            if batch.num_rows == 0:
+                continue
+            family = pc.struct_field(pc.extract_regex(batch.column(self.columns["usage_type"]), INSTANCE_USAGE), [0])
+            mask = pc.is_valid(family)
+            if self.columns["line_type"]:
+                mask = pc.and_(mask, pc.equal(batch.column(self.columns["line_type"]), "Usage"))
+            region = batch.column(self.columns["region"]) if self.columns["region"] else pa.nulls(batch.num_rows)
+            cols = {
+                "hour": pc.floor_temporal(batch.column(self.columns["start"]), unit="hour"),
+                "family": family,
+                "region": pc.fill_null(pc.cast(region, pa.string()), ""),
+                "cost": pc.cast(batch.column(self.columns["cost"]), pa.float64()),
+            }
+            parts = _compact([*parts, _sum_by(cols, HOURLY_KEYS, mask)], HOURLY_KEYS)
+        return _finish(parts, HOURLY_KEYS)
+
+    def _window(self, start: date, end: date) -> ds.Expression:
+        """Usage-day filter, pushed down to Parquet row-group statistics so other months are skipped unread."""
+        start_col = self.columns["start"]
+        ts_type = self.dataset.schema.field(start_col).type
+        return (ds.field(start_col) >= pa.scalar(datetime.combine(start, time.min), type=ts_type)) & (
+            ds.field(start_col) < pa.scalar(datetime.combine(end, time.min), type=ts_type)
+        )
+
+    def _normalize(self, batch: pa.RecordBatch) -> dict[str, pa.Array]:
+        """Map a batch's CUR columns onto CostPilot's logical field names."""
+        n = batch.num_rows
+        empty = pa.nulls(n, pa.string())
+
+        def column(field: str) -> pa.Array:
+            name = self.columns[field]
+            return batch.column(name) if name else empty
+
+        cols = {
+            "day": pc.cast(column("start"), pa.date32()),
+            "service": column("service"),
+            "region": column("region"),
+            "account": column("account"),
+            "resource_id": pc.fill_null(column("resource_id"), ""),
+            "usage_type": column("usage_type"),
+            "cost": pc.cast(column("cost"), pa.float64()),
+        }
+        if self.columns["resource_id"]:
+            cols["net"], cols["gross"] = self._amortized(column, cols["cost"])
+        for key in self.tag_keys:
+            if key in self._tag_columns:
+                values = batch.column(self._tag_columns[key])
+            elif self._tag_map:
+                values = pc.map_lookup(batch.column(self._tag_map), key, "first")
+            else:
+                values = empty
+            # Empty tag values count as untagged
+            cols[f"tag_{key}"] = pc.if_else(pc.equal(values, ""), pa.scalar(None, pa.string()), values)
+        return cols
+
+    def _amortized(self, column: Callable[[str], pa.Array], unblended: pa.Array) -> tuple[pa.Array, pa.Array]:
+        """Net and gross amortized cost per line item.
+
+        RI- and Savings Plan-covered usage is priced at its effective
+        rate, and the fees and negations those rates already include
+        count as zero, so a resource's sum is what it costs under its
+        commitments. "Net" also applies negotiated discounts when the
+        CUR has ``net_*`` columns; without them it equals gross.
+        """
+        if self.columns["line_type"] is None:
+            return unblended, unblended
+        line_type = column("line_type")
+        zero = pa.scalar(0.0, pa.float64())
+
+        def amortize(base: pa.Array, ri: str, sp: str) -> pa.Array:
+            for line, field in (("DiscountedUsage", ri), ("SavingsPlanCoveredUsage", sp)):
+                if self.columns[field]:
+                    effective = pc.fill_null(pc.cast(column(field), pa.float64()), 0.0)
+                    base = pc.if_else(pc.equal(line_type, line), effective, base)
+            return pc.if_else(pc.is_in(line_type, pa.array(AMORTIZED_LINE_TYPES)), zero, base)
+
+        gross = amortize(unblended, "ri_gross", "sp_gross")
+        if not self.columns["net_cost"]:
+            return amortize(unblended, "ri_cost", "sp_cost"), gross
+        net = pc.fill_null(pc.cast(column("net_cost"), pa.float64()), unblended)
+        return amortize(net, "ri_cost", "sp_cost"), gross
+
+
+def _sum_by(
+    cols: dict[str, pa.Array], keys: list[str], mask: Optional[pa.Array] = None,
+    values: Optional[dict[str, str]] = None,
+) -> pa.Table:
+    """Sum ``values`` (output column → input field, default ``cost``) grouped by ``keys``."""
+    values = values or {"cost": "cost"}
+    table = pa.table({k: cols[k] for k in keys} | {name: cols[field] for name, field in values.items()})
+    if mask is not None:
+        table = table.filter(mask)
+    return _group_sum(table, keys)
+
+
+def _group_sum(table: pa.Table, keys: list[str]) -> pa.Table:
+    values = [name for name in table.column_names if name not in keys]
+    result = table.group_by(keys).aggregate([(name, "sum") for name in values])
+    return result.select([*keys, *(f"{name}_sum" for name in values)]).rename_columns([*keys, *values])
+
+
+def _compact(parts: list[pa.Table], keys: list[str]) -> list[pa.Table]:
+    """Re-aggregate accumulated partials once they grow past ``COMPACT_ROWS``.
+
+    The threshold doubles with the compacted size, so high-cardinality
+    keys (resource IDs) are not re-aggregated on every batch.
+    """
+    if len(parts) < 2 or sum(p.num_rows for p in parts) < max(COMPACT_ROWS, 2 * parts[0].num_rows):
+        return parts
+    return [_finish(parts, keys)]
+
+
+def _finish(parts: list[pa.Table], keys: list[str], values: tuple[str, ...] = ("cost",)) -> pa.Table:
+    if not parts:
+        return pa.table({k: pa.array([], pa.date32() if k == "day" else pa.string()) for k in keys}
+                        | {v: pa.array([], pa.float64()) for v in values})
+    return _group_sum(pa.concat_tables(parts), keys)
@@ -0,0 +1,129 @@
+"""CostPilot — Spend Forecasting.
+
+Fits a weekday-profile regression (level + linear trend + day-of-week
+offsets) to every daily cost series at once. All series share one
+design matrix, so fitting thousands of them is a pair of matrix
+products. Forecasts come with OLS prediction intervals for the summed
+horizon.
+
+The daily cost matrix can be cached to disk after an analysis, so
+forecasts can be rerun offline.
+"""
+
+import calendar
+import logging
+from datetime import date
+from pathlib import Path
+from statistics import NormalDist
+from typing import Optional, Sequence
+
+import numpy as np
+
+from .models import CostForecast
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = Path.home() / ".costpilot" / "daily-costs.npz"
+
+# Trend and weekday terms need two full weeks to be estimated sensibly
+SEASONAL_MIN_DAYS = 14
+
+
+class Forecaster:
+    """Vectorized weekday-seasonal regression over a series × days matrix."""
+
+    def __init__(self, fit_days: int = 56, confidence: float = 0.8, horizon: int = 30) -> None:
+        self.fit_days = fit_days
+        self.horizon = horizon
+        self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    def forecast(self, series: Sequence[str], days: Sequence[date], matrix: np.ndarray) -> list[CostForecast]:
+        """End-of-month and next-``horizon``-day forecasts for each row of ``matrix``.
+
+        ``days`` must be consecutive; the month being forecast is the one
+        containing the last day.
+        """
+        spend = np.asarray(matrix, dtype=np.float64)
+        if spend.ndim != 2 or spend.shape[1] == 0:
+            return []
+        last = days[-1]
+        remaining = calendar.monthrange(last.year, last.month)[1] - last.day
+        in_month = np.array([d.year == last.year and d.month == last.month for d in days])
+        month_to_date = spend[:, in_month].sum(axis=1)
+
+        fit = spend[:, -self.fit_days:]
+        fit_start = days[-fit.shape[1]]
+        X = self._design(fit_start, 0, fit.shape[1], fit.shape[1])
+        XtX_inv = np.linalg.pinv(X.T @ X)
+        coef = fit @ X @ XtX_inv
+        residuals = fit - coef @ X.T
+        dof = max(fit.shape[1] - np.linalg.matrix_rank(X), 1)
+        sigma2 = (residuals ** 2).sum(axis=1) / dof
+
+        steps = max(self.horizon, remaining)
+        F = self._design(fit_start, fit.shape[1], steps, fit.shape[1])
+        daily = np.maximum(coef @ F.T, 0.0)
+
+        eom, eom_half = self._total(daily, sigma2, F, XtX_inv, remaining)
+        nxt, nxt_half = self._total(daily, sigma2, F, XtX_inv, self.horizon)
+        eom += month_to_date
+
+        return [
+            CostForecast(
+                series=series[i],
+                month_to_date=round(float(month_to_date[i]), 2),
+                end_of_month=round(float(eom[i]), 2),
+                end_of_month_low=round(float(max(eom[i] - eom_half[i], month_to_date[i])), 2),
+                end_of_month_high=round(float(eom[i] + eom_half[i]), 2),
+                next_30_days=round(float(nxt[i]), 2),
+                next_30_days_low=round(float(max(nxt[i] - nxt_half[i], 0.0)), 2),
+                next_30_days_high=round(float(nxt[i] + nxt_half[i]), 2),
+            )
+            for i in range(len(series))
+        ]
+
+    def _total(
+        self, daily: np.ndarray, sigma2: np.ndarray, F: np.ndarray, XtX_inv: np.ndarray, steps: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Summed forecast of the first ``steps`` days and its interval half-width."""
+        if steps == 0:
+            return np.zeros(len(daily)), np.zeros(len(daily))
+        g = F[:steps].sum(axis=0)
+        variance = sigma2 * (steps + g @ XtX_inv @ g)
+        return daily[:, :steps].sum(axis=1), self.z * np.sqrt(variance)
+
+    @staticmethod
+    def _design(fit_start: date, offset: int, count: int, fit_length: int) -> np.ndarray:
+        """Design rows for days ``offset .. offset+count`` after ``fit_start``.
+
+        Short histories fall back to a level-only model, since a trend
+        fitted on a few days extrapolates wildly.
+        """
+        t = np.arange(offset, offset + count, dtype=np.float64)
+        columns = [np.ones(count)]
+        if fit_length >= SEASONAL_MIN_DAYS:
+            columns.append(t)
+            weekday = (fit_start.weekday() + t.astype(np.int64)) % 7
+            columns.extend((weekday == d).astype(np.float64) for d in range(1, 7))
+        return np.column_stack(columns)
+
+
+def save_daily_costs(path: str | Path, series: Sequence[str], days: Sequence[date], matrix: np.ndarray) -> None:
+    """Cache a series × days cost matrix for offline forecasting."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(
+        path,
+        series=np.array(list(series), dtype=str),
+        days=np.array([d.isoformat() for d in days], dtype=str),
+        matrix=np.asarray(matrix, dtype=np.float64),
+    )
+    logger.info(f"Cached {len(series)} daily cost series to {path}")
+
+
+def load_daily_costs(path: Optional[str | Path] = None) -> tuple[list[str], list[date], np.ndarray]:
+    """Load a matrix written by :func:`save_daily_costs`."""
+    with np.load(path or DEFAULT_CACHE_PATH) as data:
+        days = [date.fromisoformat(d) for d in data["days"]]
+        return data["series"].tolist(), days, data["matrix"]
+
@@ -0,0 +1,247 @@
+"""CostPilot — Scan History.
+
+Keeps past scan results and the inputs that can be reused between scans
+in a local SQLite store, so repeat runs only fetch what changed:
+
+- **Snapshots** — each scan's ``CostReport``, for diffing against the
+  next one (new waste, resolved waste, savings delta).
+- **Finalized daily costs** — Cost Explorer days no longer flagged
+  ``Estimated``. They are not re-queried.
+- **Metric series** — CloudWatch series on a fixed grid. Later runs only
+  request the periods after the cached data ends. A series is refetched
+  in full when its resource's fingerprint changes, e.g. an instance
+  changes type.
+- **Stop times** — when stopped instances were stopped, as found in
+  CloudTrail. Kept until the instance is launched again.
+"""
+
+import logging
+import sqlite3
+import threading
+import zlib
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Iterable, NamedTuple, Optional
+
+import numpy as np
+
+from .models import CostReport, RightsizeRecommendation, ScanDiff, UnusedResource
+from .serialize import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_PATH = Path.home() / ".costpilot" / "history.db"
+KEEP_SNAPSHOTS = 30
+
+# Series name under which a finalized day's account total is stored
+DAY_TOTAL = ""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, taken_at REAL, savings REAL, report BLOB
+);
+CREATE TABLE IF NOT EXISTS daily_costs (
+    day TEXT, series TEXT, amount REAL,
+    PRIMARY KEY (day, series)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS metric_series (
+    key TEXT PRIMARY KEY, fingerprint TEXT, start REAL, period INTEGER, data BLOB
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS stop_times (
+    instance_id TEXT PRIMARY KEY, launched TEXT, stopped_at REAL
+) WITHOUT ROWID;
+"""
+
+
+class Snapshot(NamedTuple):
+    """A stored scan result."""
+    id: int
+    taken_at: datetime
+    report: CostReport
+
+
+class CachedSeries(NamedTuple):
+    """A metric series on a fixed grid starting at ``start``; missing periods are NaN."""
+    fingerprint: str
+    start: datetime
+    period: int
+    values: np.ndarray
+
+
+class ScanHistory:
+    """SQLite store of scan snapshots, finalized costs, metric series and stop times."""
+
+    def __init__(self, path: Optional[str | Path] = None) -> None:
+        self.path = Path(path) if path else DEFAULT_HISTORY_PATH
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Pipeline stages share the store from their own threads
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "ScanHistory":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+
+    def save_snapshot(self, report: CostReport) -> int:
+        """Store a report and prune all but the newest ``KEEP_SNAPSHOTS``."""
+        blob = zlib.compress(dumps(report))
+        with self._lock:
+            cursor = self.conn.execute(
+                "INSERT INTO snapshots (taken_at, savings, report) VALUES (?, ?, ?)",
+                (report.generated_at.timestamp(), report.total_potential_savings, blob),
+            )
+            self.conn.execute(
+                "DELETE FROM snapshots WHERE id NOT IN (SELECT id FROM snapshots ORDER BY id DESC LIMIT ?)",
+                (KEEP_SNAPSHOTS,),
+            )
+            self.conn.commit()
+        return cursor.lastrowid
+
+    def latest_snapshot(self, before: Optional[int] = None) -> Optional[Snapshot]:
+        """The newest snapshot, or the newest one older than snapshot ``before``."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT id, taken_at, report FROM snapshots WHERE id < ? ORDER BY id DESC LIMIT 1",
+                (before if before is not None else 2 ** 62,),
+            ).fetchone()
+        if row is None:
+            return None
+        snapshot_id, taken_at, blob = row
+        return Snapshot(snapshot_id, datetime.fromtimestamp(taken_at, timezone.utc), loads(zlib.decompress(blob)))
+
+    # ------------------------------------------------------------------
+    # Cost Explorer
+    # ------------------------------------------------------------------
+
+    def finalized_costs(self, start: date, end: date) -> dict[date, dict[str, float]]:
+        """Cached per-series spend for finalized days in ``[start, end)``.
+
+        The day total is stored under :data:`DAY_TOTAL`.
+        """
+        days: dict[date, dict[str, float]] = {}
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT day, series, amount FROM daily_costs WHERE day >= ? AND day < ?",
+                (start.isoformat(), end.isoformat()),
+            ).fetchall()
+        for day, series, amount in rows:
+            days.setdefault(date.fromisoformat(day), {})[series] = amount
+        return days
+
+    def store_finalized_costs(self, days: dict[date, dict[str, float]]) -> None:
+        """Cache the spend of days Cost Explorer no longer marks as estimated."""
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO daily_costs VALUES (?, ?, ?)",
+                ((day.isoformat(), series, amount) for day, costs in days.items() for series, amount in costs.items()),
+            )
+            self.conn.commit()
+
+    # ------------------------------------------------------------------
+    # Metric series
+    # ------------------------------------------------------------------
+
+    def load_series(self, keys: Iterable[str]) -> dict[str, CachedSeries]:
+        """Cached metric series for whichever of ``keys`` are stored."""
+        keys = list(keys)
+        cached: dict[str, CachedSeries] = {}
+        # Stay under SQLite's bound-parameter limit
+        for offset in range(0, len(keys), 500):
+            batch = keys[offset:offset + 500]
+            with self._lock:
+                rows = self.conn.execute(
+                    f"SELECT key, fingerprint, start, period, data FROM metric_series "
+                    f"WHERE key IN ({', '.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+            for key, fingerprint, start, period, data in rows:
+                cached[key] = CachedSeries(
+                    fingerprint,
+                    datetime.fromtimestamp(start, timezone.utc),
+                    period,
+                    np.frombuffer(data, dtype=np.float32).astype(np.float64),
+                )
+        return cached
+
+    def store_series(self, series: dict[str, CachedSeries]) -> None:
+        # float32 halves the store; utilization and byte counts don't need more precision
+        rows = [
+            (key, s.fingerprint, s.start.timestamp(), s.period, s.values.astype(np.float32).tobytes())
+            for key, s in series.items()
+        ]
+        with self._lock:
+            self.conn.executemany("INSERT OR REPLACE INTO metric_series VALUES (?, ?, ?, ?, ?)", rows)
+            self.conn.commit()
+
+    # ------------------------------------------------------------------
+    # Stop times
+    # ------------------------------------------------------------------
+
+    def stop_times(self, launches: dict[str, str]) -> dict[str, datetime]:
+        """Cached stop times of instances whose launch time still matches.
+
+        ``launches`` maps instance ID → launch time; a different launch
+        time means the instance ran again since, so its entry is stale.
+        """
+        ids = list(launches)
+        found: dict[str, datetime] = {}
+        for offset in range(0, len(ids), 500):
+            batch = ids[offset:offset + 500]
+            with self._lock:
+                rows = self.conn.execute(
+                    f"SELECT instance_id, launched, stopped_at FROM stop_times "
+                    f"WHERE instance_id IN ({', '.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+            for instance_id, launched, stopped_at in rows:
+                if launches[instance_id] == launched:
+                    found[instance_id] = datetime.fromtimestamp(stopped_at, timezone.utc)
+        return found
+
+    def store_stop_times(self, stops: dict[str, tuple[str, datetime]]) -> None:
+        """Cache instance ID → (launch time, stop time)."""
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO stop_times VALUES (?, ?, ?)",
+                ((instance_id, launched, stopped_at.timestamp()) for instance_id, (launched, stopped_at) in stops.items()),
+            )
+            self.conn.commit()
+
+
+def diff_reports(previous: CostReport, current: CostReport) -> ScanDiff:
+    """Findings that appeared or disappeared between two scans, and the savings change.
+
+    Waste is matched by resource type and ID. A rightsizing
+    recommendation counts as new when the resource or its recommended
+    type changed.
+    """
+    def waste_key(r: UnusedResource) -> tuple[str, str]:
+        return r.resource_type.value, r.resource_id
+
+    def sizing_key(r: RightsizeRecommendation) -> tuple[str, str]:
+        return r.resource_id, r.recommended_type
+
+    before_waste = {waste_key(r) for r in previous.unused_resources}
+    after_waste = {waste_key(r) for r in current.unused_resources}
+    before_sizing = {sizing_key(r) for r in previous.rightsizing}
+    after_sizing = {sizing_key(r) for r in current.rightsizing}
+    return ScanDiff(
+        previous_at=previous.generated_at,
+        current_at=current.generated_at,
+        new_waste=[r for r in current.unused_resources if waste_key(r) not in before_waste],
+        resolved_waste=[r for r in previous.unused_resources if waste_key(r) not in after_waste],
+        new_rightsizing=[r for r in current.rightsizing if sizing_key(r) not in before_sizing],
+        resolved_rightsizing=[r for r in previous.rightsizing if sizing_key(r) not in after_sizing],
+        savings_before=round(previous.calculate_savings(), 2),
+        savings_after=round(current.calculate_savings(), 2),
+    )
@@ -0,0 +1,204 @@
+"""CostPilot — EBS Snapshot Lineage.
+
+Joins snapshots to the volumes they were taken from, the AMIs they back
+and the AWS Backup recovery points that manage them, so the unused
+detector can tell deletable snapshots from ones still in use:
+
+- **AMI** — referenced by a registered AMI's block device mappings.
+  It can't be deleted until the AMI is deregistered.
+- **Backup** — an AWS Backup recovery point. Its backup plan's
+  lifecycle deletes it.
+- **Chain** — the source volume still exists. The snapshot is one link
+  in that volume's incremental chain.
+- **Orphaned** — none of the above.
+
+EBS snapshots are incremental. A volume's first snapshot stores all of
+its data, and each later one stores only the blocks changed since the
+one before. Deleting a snapshot frees roughly its own increment, so
+that increment, not the volume size, is what a snapshot costs. The
+first snapshot's blocks move to the next one when it is deleted, so
+only those overwritten before the next snapshot are freed; a chain's
+first snapshot counts at full size only when it is the only one.
+
+Every join is a dict lookup, so 200k snapshots index in seconds.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Iterable, NamedTuple, Optional
+
+from .models import SnapshotRole
+
+logger = logging.getLogger(__name__)
+
+GIB = 1024 ** 3
+# Share of a volume's blocks rewritten per day, for sizing increments
+# when AWS doesn't report them
+DAILY_CHANGE_RATE = 0.02
+# Placeholder VolumeId of snapshots copied or created from an AMI
+NO_VOLUME = "vol-ffffffff"
+
+
+class SnapshotLink(NamedTuple):
+    """One snapshot's place in the lineage."""
+    snapshot_id: str
+    role: SnapshotRole
+    volume_id: str       # source volume; "" if unknown
+    image_id: str        # AMI it backs; "" if none
+    chain_index: int     # 0 for the oldest snapshot of its volume
+    chain_length: int
+    size_gb: float       # full size of the data the snapshot restores
+    incremental_gb: float
+
+
+class SnapshotLineage:
+    """Hash index of snapshot ID → :class:`SnapshotLink`."""
+
+    def __init__(
+        self,
+        snapshots: Iterable[dict],
+        volume_ids: Iterable[str] = (),
+        image_snapshots: Optional[dict[str, str]] = None,
+        backup_snapshots: Iterable[str] = (),
+    ) -> None:
+        """``image_snapshots`` maps snapshot ID → AMI ID; ``backup_snapshots``
+        holds the snapshot IDs of AWS Backup recovery points.
+        """
+        volumes = set(volume_ids)
+        images = image_snapshots or {}
+        backups = set(backup_snapshots)
+        self.snapshots: dict[str, dict] = {}
+        chains: dict[str, list[dict]] = {}
+        for snap in snapshots:
+            self.snapshots[snap["SnapshotId"]] = snap
+            volume_id = snap.get("VolumeId") or NO_VOLUME
+            # Snapshots without a real source volume each form their own chain
+            key = volume_id if volume_id != NO_VOLUME else snap["SnapshotId"]
+            chains.setdefault(key, []).append(snap)
+
+        self._links: dict[str, SnapshotLink] = {}
+        for chain in chains.values():
+            chain.sort(key=lambda s: s["StartTime"])
+            previous: Optional[datetime] = None
+            for index, snap in enumerate(chain):
+                snapshot_id = snap["SnapshotId"]
+                volume_id = snap.get("VolumeId") or ""
+                if volume_id == NO_VOLUME:
+                    volume_id = ""
+                size = _size_gb(snap)
+                if previous is not None:
+                    incremental = _changed_gb(size, snap["StartTime"] - previous)
+                elif len(chain) > 1:
+                    # Blocks the next snapshot still references survive deleting the base
+                    incremental = _changed_gb(size, chain[1]["StartTime"] - snap["StartTime"])
+                else:
+                    incremental = size
+                previous = snap["StartTime"]
+
+                if snapshot_id in images:
+                    role = SnapshotRole.AMI
+                elif snapshot_id in backups or _backup_tagged(snap):
+                    role = SnapshotRole.BACKUP
+                elif volume_id in volumes:
+                    role = SnapshotRole.CHAIN
+                else:
+                    role = SnapshotRole.ORPHANED
+                self._links[snapshot_id] = SnapshotLink(
+                    snapshot_id, role, volume_id, images.get(snapshot_id, ""),
+                    index, len(chain), size, round(incremental, 2),
+                )
+
+    @classmethod
+    def fetch(
+        cls,
+        ec2: Any,
+        backup: Any = None,
+        volume_ids: Optional[Iterable[str]] = None,
+    ) -> "SnapshotLineage":
+        """Build from the account's own snapshots, volumes, AMIs and backup vaults.
+
+        Pass ``volume_ids`` when the caller already listed the volumes.
+        Without Backup permissions, recovery points are recognised by
+        their ``aws:backup:*`` tags only.
+        """
+        snapshots = []
+        for page in ec2.get_paginator("describe_snapshots").paginate(
+            OwnerIds=["self"], PaginationConfig={"PageSize": 1000}
+        ):
+            snapshots.extend(page.get("Snapshots", []))
+        if volume_ids is None:
+            volume_ids = [
+                vol["VolumeId"]
+                for page in ec2.get_paginator("describe_volumes").paginate(PaginationConfig={"PageSize": 1000})
+                for vol in page.get("Volumes", [])
+            ]
+        return cls(snapshots, volume_ids, image_snapshot_ids(ec2), backup_snapshot_ids(backup) if backup else ())
+
+    def __contains__(self, snapshot_id: str) -> bool:
+        return snapshot_id in self._links
+
+    def __len__(self) -> int:
+        return len(self._links)
+
+    def get(self, snapshot_id: str) -> Optional[SnapshotLink]:
+        return self._links.get(snapshot_id)
+
+    def links(self) -> Iterable[SnapshotLink]:
+        return self._links.values()
+
+    def counts(self) -> dict[SnapshotRole, int]:
+        """Number of snapshots per role."""
+        counts = {role: 0 for role in SnapshotRole}
+        for link in self._links.values():
+            counts[link.role] += 1
+        return counts
+
+
+def image_snapshot_ids(ec2: Any) -> dict[str, str]:
+    """Snapshot ID → ID of the account's AMI it backs."""
+    snapshots: dict[str, str] = {}
+    try:
+        for page in ec2.get_paginator("describe_images").paginate(Owners=["self"]):
+            for image in page.get("Images", []):
+                for mapping in image.get("BlockDeviceMappings", []):
+                    snapshot_id = mapping.get("Ebs", {}).get("SnapshotId")
+                    if snapshot_id:
+                        snapshots[snapshot_id] = image["ImageId"]
+    except Exception as e:
+        logger.warning(f"Could not list AMIs, treating no snapshots as AMI-backing: {e}")
+    return snapshots
+
+
+def backup_snapshot_ids(backup: Any) -> set[str]:
+    """Snapshot IDs of the EBS recovery points in every backup vault."""
+    snapshots: set[str] = set()
+    try:
+        for page in backup.get_paginator("list_backup_vaults").paginate():
+            for vault in page.get("BackupVaultList", []):
+                points = backup.get_paginator("list_recovery_points_by_backup_vault").paginate(
+                    BackupVaultName=vault["BackupVaultName"], ByResourceType="EBS"
+                )
+                for point_page in points:
+                    for point in point_page.get("RecoveryPoints", []):
+                        # arn:aws:ec2:<region>::snapshot/snap-...
+                        arn = point.get("RecoveryPointArn", "")
+                        if ":snapshot/" in arn:
+                            snapshots.add(arn.rsplit("/", 1)[1])
+    except Exception as e:
+        logger.warning(f"Could not list AWS Backup recovery points: {e}")
+    return snapshots
+
+
+def _size_gb(snap: dict) -> float:
+    full = snap.get("FullSnapshotSizeInBytes")
+    return full / GIB if full else float(snap.get("VolumeSize", 0))
+
+
+def _changed_gb(size: float, interval: timedelta) -> float:
+    """Data rewritten over ``interval`` (at least a day), capped at the full size."""
+    days = max(interval.total_seconds() / 86400, 1.0)
+    return min(size, size * DAILY_CHANGE_RATE * days)
+
+
+def _backup_tagged(snap: dict) -> bool:
+    return any(tag["Key"].startswith("aws:backup:") for tag in snap.get("Tags", ()))
@@ -0,0 +1,242 @@
+"""CostPilot — Batched CloudWatch Metric Fetcher.
+
+Collects metrics for many resources with a handful of GetMetricData
+calls instead of one GetMetricStatistics call per resource.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Optional
+
+import numpy as np
+
+from .history import CachedSeries, ScanHistory
+
+logger = logging.getLogger(__name__)
+
+# GetMetricData accepts at most 500 queries per request
+MAX_QUERIES_PER_REQUEST = 500
+
+# CloudWatch agent metrics, under the agent's default namespace
+AGENT_NAMESPACE = "CWAgent"
+AGENT_MEMORY_METRICS = ("mem_used_percent", "Memory % Committed Bytes In Use")  # Linux, Windows
+AGENT_DISK_METRIC = "disk_used_percent"
+
+
+@dataclass(frozen=True)
+class MetricQuery:
+    """A single metric series to fetch, keyed by a caller-chosen name."""
+    key: str
+    namespace: str
+    metric_name: str
+    dimensions: tuple[tuple[str, str], ...]
+    stat: str = "Average"
+    period: int = 3600
+
+
+@dataclass(frozen=True)
+class IdleSignal:
+    """The metric that proves a resource is in use."""
+    namespace: str
+    metric_name: str
+    dimension: str
+    stat: str = "Sum"
+
+
+# Activity metric per resource kind — a zero total over the window means idle
+IDLE_SIGNALS = {
+    "application": IdleSignal("AWS/ApplicationELB", "RequestCount", "LoadBalancer"),
+    "network": IdleSignal("AWS/NetworkELB", "NewFlowCount", "LoadBalancer"),
+    "gateway": IdleSignal("AWS/GatewayELB", "NewFlowCount", "LoadBalancer"),
+    "rds": IdleSignal("AWS/RDS", "DatabaseConnections", "DBInstanceIdentifier", "Maximum"),
+    "nat_gateway": IdleSignal("AWS/NATGateway", "ActiveConnectionCount", "NatGatewayId", "Maximum"),
+    "ebs_volume": IdleSignal("AWS/EBS", "VolumeWriteOps", "VolumeId"),
+}
+
+
+def idle_query(kind: str, key: str, dimension_value: str, period: int = 86400) -> MetricQuery:
+    """Build the activity query for a resource of the given kind."""
+    signal = IDLE_SIGNALS[kind]
+    return MetricQuery(
+        key=key,
+        namespace=signal.namespace,
+        metric_name=signal.metric_name,
+        dimensions=((signal.dimension, dimension_value),),
+        stat=signal.stat,
+        period=period,
+    )
+
+
+def series_matrix(
+    series: dict[str, list[tuple[datetime, float]]], keys: list[str], start: datetime, hours: int, period: int = 3600
+) -> np.ndarray:
+    """Place each key's datapoints on a fixed grid of ``period`` seconds; missing periods are NaN."""
+    matrix = np.full((len(keys), hours), np.nan)
+    for row, key in enumerate(keys):
+        points = series.get(key)
+        if not points:
+            continue
+        slots = np.fromiter(((t - start).total_seconds() // period for t, _ in points), dtype=np.int64, count=len(points))
+        values = np.fromiter((v for _, v in points), dtype=np.float64, count=len(points))
+        in_window = (slots >= 0) & (slots < hours)
+        matrix[row, slots[in_window]] = values[in_window]
+    return matrix
+
+
+class MetricFetcher:
+    """Fetch many CloudWatch series with batched, paginated GetMetricData."""
+
+    def __init__(self, cloudwatch: Any, history: Optional[ScanHistory] = None) -> None:
+        self.cw = cloudwatch
+        # Scan history to reuse previously fetched periods from (see grid())
+        self.history = history
+
+    def fetch(
+        self, queries: Iterable[MetricQuery], start: datetime, end: datetime
+    ) -> dict[str, list[tuple[datetime, float]]]:
+        """Return each query's datapoints, oldest first, keyed by ``query.key``.
+
+        Queries whose key is absent from the result could not be fetched;
+        an empty list means CloudWatch returned no datapoints.
+        """
+        queries = list(queries)
+        results: dict[str, list[tuple[datetime, float]]] = {}
+        for offset in range(0, len(queries), MAX_QUERIES_PER_REQUEST):
+            batch = queries[offset:offset + MAX_QUERIES_PER_REQUEST]
+            try:
+                results.update(self._fetch_batch(batch, start, end))
+            except Exception as e:
+                logger.warning(f"GetMetricData batch of {len(batch)} queries failed: {e}")
+        return results
+
+    def dimension_sets(
+        self, namespace: str, metric_name: str, key: str, values: Optional[Iterable[str]] = None
+    ) -> dict[str, list[tuple[tuple[str, str], ...]]]:
+        """Every dimension set ``metric_name`` is published with, grouped by its ``key`` dimension.
+
+        GetMetricData needs a series' exact dimensions, and agent metrics
+        carry whatever their config appends (path, device, ImageId, ...),
+        so they are listed rather than guessed. ``values`` limits the
+        result to those ``key`` values.
+        """
+        wanted = set(values) if values is not None else None
+        sets: dict[str, list[tuple[tuple[str, str], ...]]] = {}
+        try:
+            for page in self.cw.get_paginator("list_metrics").paginate(Namespace=namespace, MetricName=metric_name):
+                for metric in page.get("Metrics", []):
+                    dims = tuple((d["Name"], d["Value"]) for d in metric.get("Dimensions", []))
+                    value = dict(dims).get(key)
+                    if value is not None and (wanted is None or value in wanted):
+                        sets.setdefault(value, []).append(dims)
+        except Exception as e:
+            logger.warning(f"ListMetrics for {namespace} {metric_name} failed: {e}")
+        return sets
+
+    def totals(self, queries: Iterable[MetricQuery], start: datetime, end: datetime) -> dict[str, float]:
+        """Sum each series over the window."""
+        return {key: sum(v for _, v in points) for key, points in self.fetch(queries, start, end).items()}
+
+    def grid(
+        self,
+        queries: Iterable[MetricQuery],
+        start: datetime,
+        end: datetime,
+        fingerprints: Optional[dict[str, str]] = None,
+    ) -> tuple[np.ndarray, set[str]]:
+        """Every query's datapoints on a ``period`` grid from ``start`` (queries × periods).
+
+        Also returns the keys that could not be fetched this run.
+
+        With a scan history, periods already cached for a query are reused
+        and only the rest are requested. The last cached period is always
+        refetched, since it may have been incomplete. A cached series is
+        discarded when its fingerprint differs from ``fingerprints[key]``.
+        All queries must share one period.
+        """
+        queries = list(queries)
+        if not queries:
+            return np.empty((0, 0)), set()
+        period = queries[0].period
+        slots = int((end - start).total_seconds() // period)
+        keys = [q.key for q in queries]
+        if self.history is None:
+            series = self.fetch(queries, start, end)
+            return series_matrix(series, keys, start, slots, period), set(keys) - series.keys()
+
+        fingerprints = fingerprints or {}
+        cached = self.history.load_series(keys)
+        matrix = np.full((len(queries), slots), np.nan)
+        # Queries grouped by the first slot that still has to be fetched
+        pending: dict[int, list[int]] = {}
+        for row, q in enumerate(queries):
+            first = 0
+            hit = cached.get(q.key)
+            if hit is not None and hit.period == period and hit.fingerprint == fingerprints.get(q.key, ""):
+                offset = int((start - hit.start).total_seconds() // period)
+                if offset >= 0 and (start - hit.start).total_seconds() % period == 0:
+                    reuse = hit.values[offset:offset + slots]
+                    matrix[row, :len(reuse)] = reuse
+                    first = max(len(reuse) - 1, 0)
+            pending.setdefault(first, []).append(row)
+
+        fetched = set()
+        for first, rows in pending.items():
+            batch = [queries[row] for row in rows]
+            series = self.fetch(batch, start + timedelta(seconds=first * period), end)
+            fetched.update(series)
+            matrix[rows, first:] = series_matrix(series, [q.key for q in batch], start, slots, period)[:, first:]
+        reused = len(queries) * slots - sum((slots - first) * len(rows) for first, rows in pending.items())
+        logger.info(f"Reused {reused:,} of {len(queries) * slots:,} cached metric periods")
+
+        self.history.store_series({
+            q.key: CachedSeries(fingerprints.get(q.key, ""), start, period, matrix[row])
+            for row, q in enumerate(queries)
+            if q.key in fetched
+        })
+        return matrix, set(keys) - fetched
+
+    def _fetch_batch(
+        self, batch: list[MetricQuery], start: datetime, end: datetime
+    ) -> dict[str, list[tuple[datetime, float]]]:
+        # GetMetricData ids must be unique and match ^[a-z][a-zA-Z0-9_]*$
+        ids = {f"m{i}": q.key for i, q in enumerate(batch)}
+        request = [
+            {
+                "Id": f"m{i}",
+                "MetricStat": {
+                    "Metric": {
+                        "Namespace": q.namespace,
+                        "MetricName": q.metric_name,
+                        "Dimensions": [{"Name": n, "Value": v} for n, v in q.dimensions],
+                    },
+                    "Period": q.period,
+                    "Stat": q.stat,
+                },
+                "ReturnData": True,
+            }
+            for i, q in enumerate(batch)
+        ]
+
+        points: dict[str, list[tuple[datetime, float]]] = {key: [] for key in ids.values()}
+        kwargs: dict[str, Any] = {
+            "MetricDataQueries": request,
+            "StartTime": start,
+            "EndTime": end,
+            "ScanBy": "TimestampAscending",
+        }
+        while True:
+            response = self.cw.get_metric_data(**kwargs)
+            for result in response.get("MetricDataResults", []):
+                key = ids.get(result.get("Id"))
+                if key is None:
+                    continue
+                points[key].extend(zip(result.get("Timestamps", []), result.get("Values", [])))
+            token = response.get("NextToken")
+            if not token:
+                break
+            kwargs["NextToken"] = token
+
+        for series in points.values():
+            series.sort(key=lambda p: p[0])
+        return points
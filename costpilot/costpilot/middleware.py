@@ -0,0 +1,243 @@
+"""CostPilot — AWS API Call Middleware.
+
+botocore event hooks installed on the shared session by
+``Config.get_session()``, so every engine's clients go through them:
+
+- **Accounting** — calls, latency, retries, throttles and errors per
+  ``service:Operation``, plus the request charges of paid APIs (Cost
+  Explorer, CloudWatch GetMetricData, ...). Calls are also attributed
+  to the pipeline stage running on the calling thread.
+- **Rate limiting** — a token bucket per API, shared by all threads.
+  A throttling error halves the bucket's rate, and each successful
+  call recovers it gradually. botocore's standard retry mode retries
+  throttled calls with jittered exponential backoff.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Iterator, Optional
+
+from .ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Sustained requests per second, per "service:Operation" or whole service,
+# kept under AWS's published throttling limits
+RATE_LIMITS = {
+    "ce": 5.0,
+    "cloudwatch:GetMetricData": 40.0,
+    "cloudwatch": 20.0,
+    "ec2": 20.0,
+    "elbv2": 10.0,
+    "cloudtrail:LookupEvents": 2.0,
+    "budgets": 5.0,
+    "pricing": 5.0,
+}
+
+# USD per request for APIs that bill per call
+REQUEST_PRICES = {
+    "ce": 0.01,
+    "cloudwatch:GetMetricStatistics": 0.00001,
+    "cloudwatch:ListMetrics": 0.00001,
+    "s3:ListObjectsV2": 0.000005,
+    "s3:GetObject": 0.0000004,
+}
+# USD per metric requested — GetMetricData bills by metric, not by request
+METRIC_PRICE = 0.00001
+
+THROTTLE_CODES = {
+    "Throttling", "ThrottlingException", "ThrottledException", "RequestThrottled",
+    "RequestThrottledException", "TooManyRequestsException", "RequestLimitExceeded",
+    "SlowDown", "LimitExceededException",
+}
+
+# Floor for a throttled bucket, as a fraction of its configured rate
+MIN_RATE_FRACTION = 0.1
+
+
+@dataclass(slots=True)
+class OperationStats:
+    """Accumulated usage of one ``service:Operation``."""
+    calls: int = 0
+    retries: int = 0
+    throttles: int = 0
+    errors: int = 0
+    latency: float = 0.0   # seconds, summed over calls (including retries)
+    waited: float = 0.0    # seconds spent waiting for the rate limiter
+    metrics: int = 0       # GetMetricData queries requested
+    cost: float = 0.0      # USD
+
+    @property
+    def avg_latency_ms(self) -> float:
+        return self.latency / self.calls * 1000 if self.calls else 0.0
+
+
+class ApiMiddleware:
+    """Per-API accounting and rate limiting for a boto3 session."""
+
+    def __init__(self, limits: Optional[dict[str, float]] = None) -> None:
+        self.limits = RATE_LIMITS if limits is None else limits
+        self._buckets: dict[str, TokenBucket] = {}
+        self._stats: dict[str, OperationStats] = {}
+        self._stages: dict[str, dict[str, int]] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def install(self, session: Any) -> None:
+        """Register the hooks; clients copy session hooks, so do this before creating any."""
+        events = session.events
+        events.register("before-parameter-build", self._before_parameter_build)
+        events.register("before-call", self._before_call)
+        events.register("after-call", self._after_call)
+        events.register("after-call-error", self._after_call_error)
+        events.register("needs-retry", self._needs_retry)
+
+    # ------------------------------------------------------------------
+    # Stages
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Attribute calls made on this thread to pipeline stage ``name``."""
+        self._local.stage = name
+        try:
+            yield
+        finally:
+            self._local.stage = None
+
+    def take(self, stage: str) -> dict[str, int]:
+        """Calls per ``service:Operation`` recorded for a stage, resetting its count."""
+        with self._lock:
+            return self._stages.pop(stage, {})
+
+    # ------------------------------------------------------------------
+    # Results
+    # ------------------------------------------------------------------
+
+    def stats(self) -> dict[str, OperationStats]:
+        """Usage per ``service:Operation`` since the last :meth:`reset`, most calls first."""
+        with self._lock:
+            items = sorted(self._stats.items(), key=lambda x: -x[1].calls)
+        return dict(items)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._stages.clear()
+
+    @property
+    def total_calls(self) -> int:
+        return sum(s.calls for s in self.stats().values())
+
+    @property
+    def total_cost(self) -> float:
+        return sum(s.cost for s in self.stats().values())
+
+    # ------------------------------------------------------------------
+    # Rate limiting
+    # ------------------------------------------------------------------
+
+    def bucket(self, service: str, operation: str) -> Optional[TokenBucket]:
+        """The token bucket governing an API, or ``None`` if it isn't limited."""
+        for key in (f"{service}:{operation}", service):
+            rate = self.limits.get(key)
+            if rate is not None:
+                with self._lock:
+                    if key not in self._buckets:
+                        self._buckets[key] = TokenBucket(rate)
+                    return self._buckets[key]
+        return None
+
+    def throttled(self, service: str, operation: str) -> None:
+        """Halve the API's rate after a throttling error."""
+        bucket = self.bucket(service, operation)
+        if bucket is not None:
+            floor = self._base_rate(service, operation) * MIN_RATE_FRACTION
+            bucket.rate = max(bucket.rate / 2, floor)
+            logger.debug(f"{service}:{operation} throttled, limiting to {bucket.rate:.1f} req/s")
+
+    def _recovered(self, service: str, operation: str) -> None:
+        bucket = self.bucket(service, operation)
+        if bucket is not None:
+            base = self._base_rate(service, operation)
+            if bucket.rate < base:
+                bucket.rate = min(base, bucket.rate + base * 0.05)
+
+    def _base_rate(self, service: str, operation: str) -> float:
+        return self.limits.get(f"{service}:{operation}", self.limits.get(service, 0.0))
+
+    # ------------------------------------------------------------------
+    # Event handlers
+    # ------------------------------------------------------------------
+
+    def _entry(self, key: str) -> OperationStats:
+        # Caller holds the lock
+        entry = self._stats.get(key)
+        if entry is None:
+            entry = self._stats[key] = OperationStats()
+        return entry
+
+    def _before_parameter_build(self, params: dict, model: Any, context: dict, **kwargs: Any) -> None:
+        # Request parameters are serialized by before-call; count metrics while they're readable
+        if "MetricDataQueries" in params:
+            context["costpilot_metrics"] = len(params["MetricDataQueries"])
+
+    def _before_call(self, model: Any, context: dict, **kwargs: Any) -> None:
+        service, operation = model.service_model.service_name, model.name
+        key = f"{service}:{operation}"
+        bucket = self.bucket(service, operation)
+        waited = bucket.acquire() if bucket is not None else 0.0
+
+        metrics = context.get("costpilot_metrics", 0)
+        cost = REQUEST_PRICES.get(key, REQUEST_PRICES.get(service, 0.0)) + metrics * METRIC_PRICE
+        stage = getattr(self._local, "stage", None)
+        with self._lock:
+            entry = self._entry(key)
+            entry.calls += 1
+            entry.waited += waited
+            entry.metrics += metrics
+            entry.cost += cost
+            if stage is not None:
+                counts = self._stages.setdefault(stage, {})
+                counts[key] = counts.get(key, 0) + 1
+        context["costpilot_key"] = key
+        context["costpilot_started"] = time.monotonic()
+
+    def _after_call(self, http_response: Any, parsed: dict, model: Any, context: dict, **kwargs: Any) -> None:
+        service, operation = model.service_model.service_name, model.name
+        latency = time.monotonic() - context.get("costpilot_started", time.monotonic())
+        retries = parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+        failed = getattr(http_response, "status_code", 200) >= 300
+        with self._lock:
+            entry = self._entry(f"{service}:{operation}")
+            entry.latency += latency
+            entry.retries += retries
+            entry.errors += failed
+        if not failed:
+            self._recovered(service, operation)
+
+    def _after_call_error(self, exception: Exception, context: dict, **kwargs: Any) -> None:
+        # Connection-level failures; the operation isn't passed, so it comes from the context
+        key = context.get("costpilot_key")
+        if key is None:
+            return
+        latency = time.monotonic() - context.get("costpilot_started", time.monotonic())
+        with self._lock:
+            entry = self._entry(key)
+            entry.latency += latency
+            entry.errors += 1
+
+    def _needs_retry(self, response: Any, operation: Any, attempts: int, **kwargs: Any) -> None:
+        """Count throttles and slow the API down; botocore's retry handler decides whether to retry."""
+        if response is None:
+            return None
+        code = response[1].get("Error", {}).get("Code", "")
+        if code in THROTTLE_CODES:
+            service, name = operation.service_model.service_name, operation.name
+            with self._lock:
+                self._entry(f"{service}:{name}").throttles += 1
+            self.throttled(service, name)
+        return None
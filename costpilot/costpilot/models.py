@@ -1,4 +1,9 @@
-"""Data models for CostPilot analysis results."""
+"""Data models for CostPilot analysis results.
+
+Models are slotted dataclasses holding only scalars, enums and lists of
+other models, so large scans stay compact in memory and serialize
+column-wise (see ``serialize.py``).
+"""
 
 from __future__ import annotations
 
@@ -21,12 +26,36 @@ class ResourceType(str, Enum):
     EBS_VOLUME = "ebs_volume"
     ELASTIC_IP = "elastic_ip"
     ALB = "alb"
+    NLB = "nlb"
+    GWLB = "gwlb"
     S3_BUCKET = "s3_bucket"
     EC2_INSTANCE = "ec2_instance"
     SNAPSHOT = "snapshot"
 
 
-@dataclass
+class Confidence(str, Enum):
+    """How much a recommendation's utilization data can be trusted."""
+    LOW = "low"
+    MEDIUM = "medium"
+    HIGH = "high"
+
+
+class SnapshotRole(str, Enum):
+    """Why an EBS snapshot exists, from its lineage."""
+    ORPHANED = "orphaned"  # source volume gone, no AMI or backup uses it
+    AMI = "ami"            # backs a registered AMI
+    BACKUP = "backup"      # an AWS Backup recovery point
+    CHAIN = "chain"        # part of a live volume's incremental chain
+
+
+class CostSource(str, Enum):
+    """Where a finding's monthly cost came from."""
+    ESTIMATE = "estimate"            # list price
+    CUR = "cur"                      # net amortized spend from the Cost and Usage Report
+    COST_EXPLORER = "cost_explorer"  # net amortized spend from Cost Explorer resource-level data
+
+
+@dataclass(slots=True)
 class ServiceCost:
     """Cost breakdown for a single AWS service."""
     service_name: str
@@ -36,7 +65,14 @@ class ServiceCost:
     change_pct: Optional[float] = None
 
 
-@dataclass
+@dataclass(slots=True)
+class RegionCost:
+    """Cost for a single AWS region."""
+    region: str
+    cost: float
+
+
+@dataclass(slots=True)
 class DailyCost:
     """Cost data for a single day."""
     date: date
@@ -44,7 +80,7 @@ class DailyCost:
     services: list[ServiceCost] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class CostSpike:
     """Detected cost anomaly."""
     date: date
@@ -53,25 +89,46 @@ class CostSpike:
     average_cost: float
     deviation_pct: float
     severity: Severity = Severity.MEDIUM
+    score: float = 0.0  # robust z-score against the trailing baseline
 
 
-@dataclass
+@dataclass(slots=True)
+class CostForecast:
+    """Projected spend for one series, with prediction intervals."""
+    series: str
+    month_to_date: float
+    end_of_month: float
+    end_of_month_low: float
+    end_of_month_high: float
+    next_30_days: float
+    next_30_days_low: float
+    next_30_days_high: float
+
+
+@dataclass(slots=True)
 class CostAnalysis:
     """Complete cost analysis result."""
     start_date: date
     end_date: date
     total_cost: float
     projected_monthly: float
-    mom_change_pct: float
+    mom_change_pct: float = 0.0
     daily_costs: list[DailyCost] = field(default_factory=list)
     service_breakdown: list[ServiceCost] = field(default_factory=list)
     spikes: list[CostSpike] = field(default_factory=list)
     currency: str = "USD"
+    avg_daily: float = 0.0
+    region_breakdown: list[RegionCost] = field(default_factory=list)
+    forecasts: list[CostForecast] = field(default_factory=list)  # per service; account total last
+    estimated_savings: float = 0.0  # heuristic, not backed by findings
 
 
-@dataclass
+@dataclass(slots=True)
 class RightsizeRecommendation:
-    """EC2/RDS rightsizing recommendation."""
+    """EC2, RDS, ElastiCache or EBS rightsizing recommendation.
+
+    For EBS volumes the CPU fields hold IOPS utilization.
+    """
     resource_id: str
     resource_type: str
     region: str
@@ -83,10 +140,16 @@ class RightsizeRecommendation:
     current_monthly_cost: float
     projected_monthly_cost: float
     monthly_savings: float
-    confidence: str = "high"
+    confidence: Confidence = Confidence.HIGH
+    p95_cpu_pct: float = 0.0
+    name: str = ""
+    cost_source: CostSource = CostSource.ESTIMATE
+    avg_memory_pct: Optional[float] = None  # None without memory data (no CloudWatch agent)
+    max_memory_pct: Optional[float] = None
+    max_disk_pct: Optional[float] = None    # fullest agent-reported filesystem
 
 
-@dataclass
+@dataclass(slots=True)
 class UnusedResource:
     """Detected unused or idle resource."""
     resource_id: str
@@ -96,10 +159,24 @@ class UnusedResource:
     reason: str = ""
     monthly_cost: float = 0.0
     last_used: Optional[datetime] = None
-    metadata: dict = field(default_factory=dict)
+    subtype: str = ""       # volume type, instance type, load balancer type or snapshot role
+    secondary_id: str = ""  # EIP allocation ID, load balancer ARN, snapshot source volume
+    size_gb: float = 0.0
+    created: Optional[datetime] = None
+    cost_source: CostSource = CostSource.ESTIMATE
+
+
+@dataclass(slots=True)
+class OwnerCost:
+    """Spend charged back to one owner (team, cost center)."""
+    owner: str
+    direct: float       # tagged, or untagged in an account the owner has
+    shared: float       # the owner's share of shared and unattributed spend
+    total: float
+    share_pct: float = 0.0
 
 
-@dataclass
+@dataclass(slots=True)
 class ReservationAnalysis:
     """RI or Savings Plans analysis."""
     plan_type: str  # "RI" or "Savings Plan"
@@ -111,7 +188,7 @@ class ReservationAnalysis:
     recommendations: list[ReservationRecommendation] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class ReservationRecommendation:
     """Recommendation for RI or Savings Plan purchase."""
     service: str
@@ -126,7 +203,7 @@ class ReservationRecommendation:
     upfront_cost: float = 0.0
 
 
-@dataclass
+@dataclass(slots=True)
 class CostReport:
     """Full cost optimization report."""
     generated_at: datetime
@@ -135,6 +212,8 @@ class CostReport:
     unused_resources: list[UnusedResource] = field(default_factory=list)
     reservations: Optional[ReservationAnalysis] = None
     total_potential_savings: float = 0.0
+    # Findings that cost nothing by themselves (S3 buckets without lifecycle rules); not counted as savings
+    advisories: list[UnusedResource] = field(default_factory=list)
 
     def calculate_savings(self) -> float:
         """Calculate total potential monthly savings."""
@@ -144,3 +223,21 @@ class CostReport:
             savings += sum(r.monthly_savings for r in self.reservations.recommendations)
         self.total_potential_savings = savings
         return savings
+
+
+@dataclass(slots=True)
+class ScanDiff:
+    """What changed between two scans."""
+    previous_at: datetime
+    current_at: datetime
+    new_waste: list[UnusedResource] = field(default_factory=list)
+    resolved_waste: list[UnusedResource] = field(default_factory=list)
+    new_rightsizing: list[RightsizeRecommendation] = field(default_factory=list)
+    resolved_rightsizing: list[RightsizeRecommendation] = field(default_factory=list)
+    savings_before: float = 0.0
+    savings_after: float = 0.0
+
+    @property
+    def savings_delta(self) -> float:
+        """Change in potential monthly savings; positive means more waste found."""
+        return round(self.savings_after - self.savings_before, 2)
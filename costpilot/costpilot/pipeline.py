@@ -0,0 +1,127 @@
+"""CostPilot — Concurrent Pipeline Runner.
+
+Runs independent, I/O-bound analysis stages (cost analysis, rightsizing,
+unused resources) at the same time, each in its own thread. Engines
+are built up front on the calling thread from one shared session, since
+creating boto3 clients is not thread-safe but using them is.
+
+A stage that fails or overruns its timeout is reported and left out of
+the results; the other stages still complete.
+"""
+
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, NamedTuple, Optional
+
+from .middleware import ApiMiddleware
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STAGE_TIMEOUT = 900.0
+
+
+class Stage(NamedTuple):
+    """A named unit of work; ``timeout`` (seconds) overrides the runner default."""
+    name: str
+    run: Callable[[], Any]
+    timeout: Optional[float] = None
+
+
+@dataclass(slots=True)
+class StageResult:
+    """Outcome of one stage."""
+    name: str
+    value: Any = None
+    error: Optional[str] = None
+    seconds: float = 0.0
+    api_calls: dict[str, int] = field(default_factory=dict)  # service:operation → count
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.api_calls.values())
+
+
+class PipelineRunner:
+    """Run stages concurrently with per-stage timeouts."""
+
+    def __init__(
+        self,
+        api: Optional[ApiMiddleware] = None,
+        timeout: float = DEFAULT_STAGE_TIMEOUT,
+        on_start: Optional[Callable[[str], None]] = None,
+        on_finish: Optional[Callable[[StageResult], None]] = None,
+    ) -> None:
+        """``api`` is the session middleware stage call counts are read from.
+
+        ``on_start``/``on_finish`` are called from the runner's thread as
+        stages progress.
+        """
+        self.api = api or ApiMiddleware()
+        self.timeout = timeout
+        self.on_start = on_start
+        self.on_finish = on_finish
+
+    def run(self, stages: list[Stage]) -> dict[str, StageResult]:
+        """Run every stage and return its result by name, in stage order.
+
+        Stages that time out are abandoned: their threads are daemonic and
+        their results are discarded if they finish later.
+        """
+        done: queue.Queue[StageResult] = queue.Queue()
+        started = time.monotonic()
+        deadlines = {}
+        for stage in stages:
+            deadlines[stage.name] = started + (stage.timeout if stage.timeout is not None else self.timeout)
+            if self.on_start:
+                self.on_start(stage.name)
+            threading.Thread(
+                target=self._run_stage, args=(stage, done), name=f"costpilot-{stage.name}", daemon=True
+            ).start()
+
+        results: dict[str, StageResult] = {}
+        while len(results) < len(stages):
+            pending = {name: deadline for name, deadline in deadlines.items() if name not in results}
+            wait = min(pending.values()) - time.monotonic()
+            try:
+                result = done.get(timeout=max(wait, 0))
+            except queue.Empty:
+                now = time.monotonic()
+                for name, deadline in pending.items():
+                    if deadline <= now:
+                        result = StageResult(
+                            name,
+                            error=f"timed out after {deadline - started:.0f}s",
+                            seconds=round(now - started, 2),
+                            api_calls=self.api.take(name),
+                        )
+                        logger.warning(f"Stage {name} {result.error}")
+                        self._finish(result, results)
+                continue
+            if result.name not in results:
+                self._finish(result, results)
+        return {stage.name: results[stage.name] for stage in stages}
+
+    def _run_stage(self, stage: Stage, done: "queue.Queue[StageResult]") -> None:
+        started = time.monotonic()
+        value, error = None, None
+        with self.api.stage(stage.name):
+            try:
+                value = stage.run()
+            except Exception as e:
+                logger.warning(f"Stage {stage.name} failed: {e}")
+                error = f"{type(e).__name__}: {e}"
+        done.put(StageResult(
+            stage.name, value, error, round(time.monotonic() - started, 2), self.api.take(stage.name)
+        ))
+
+    def _finish(self, result: StageResult, results: dict[str, StageResult]) -> None:
+        results[result.name] = result
+        if self.on_finish:
+            self.on_finish(result)
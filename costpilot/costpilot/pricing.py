@@ -0,0 +1,469 @@
+"""CostPilot — Price Catalog.
+
+Ingests AWS Pricing bulk offer files (JSON or CSV) into a compact
+SQLite store and serves O(1) on-demand price lookups plus per-family
+size ladders for downsizing. CSV offers are streamed row by row; JSON
+offers are parsed whole, so large ones (the multi-GB EC2 offer) must be
+imported as CSV.
+"""
+
+import csv
+import json
+import logging
+import re
+import sqlite3
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOG_PATH = Path.home() / ".costpilot" / "pricing.db"
+DEFAULT_REGION = "us-east-1"
+HOURS_PER_MONTH = 730
+# JSON offers are parsed whole, at roughly 10× their size in memory; larger
+# ones (EC2 and RDS) are imported from the streamed CSV form instead
+MAX_JSON_OFFER_BYTES = 64 * 2 ** 20
+
+# Product families that carry an hourly instance price, and the attribute
+# that plays the role of "operating system" in each (EC2 OS, RDS engine, ...)
+INSTANCE_FAMILIES = {
+    "computeinstance": "operatingsystem",
+    "databaseinstance": "databaseengine",
+    "cacheinstance": "cacheengine",
+}
+
+# EBS price dimensions, keyed by (product family, group)
+VOLUME_DIMENSIONS = {
+    ("storage", ""): "storage",
+    ("storagesnapshot", ""): "storage",
+    ("systemoperation", "EBS IOPS"): "iops",
+    ("provisionedthroughput", "EBS Throughput"): "throughput",
+}
+
+SIZE_NAMES = {"nano": 0, "micro": 1, "small": 2, "medium": 3, "large": 4, "xlarge": 5}
+
+# us-east-1 On-Demand seed used when no catalog has been imported
+SEED_INSTANCES = {
+    # type: (hourly, vcpu, memory_gib, baseline network_gbps)
+    "t3.nano": (0.0052, 2, 0.5, 0.032), "t3.micro": (0.0104, 2, 1, 0.064), "t3.small": (0.0208, 2, 2, 0.128),
+    "t3.medium": (0.0416, 2, 4, 0.256), "t3.large": (0.0832, 2, 8, 0.512), "t3.xlarge": (0.1664, 4, 16, 1.024),
+    "m5.large": (0.096, 2, 8, 0.75), "m5.xlarge": (0.192, 4, 16, 1.25), "m5.2xlarge": (0.384, 8, 32, 2.5),
+    "m6i.large": (0.096, 2, 8, 0.781), "m6i.xlarge": (0.192, 4, 16, 1.562), "m6i.2xlarge": (0.384, 8, 32, 3.125),
+    "c5.large": (0.085, 2, 4, 0.75), "c5.xlarge": (0.170, 4, 8, 1.25), "c5.2xlarge": (0.340, 8, 16, 2.5),
+    "r5.large": (0.126, 2, 16, 0.75), "r5.xlarge": (0.252, 4, 32, 1.25), "r5.2xlarge": (0.504, 8, 64, 2.5),
+}
+
+# RDS Single-AZ seed per engine (Multi-AZ bills twice the hourly rate)
+SEED_DB_INSTANCES = {
+    # type: (MySQL/MariaDB hourly, PostgreSQL hourly, vcpu, memory_gib)
+    "db.t3.micro": (0.017, 0.018, 2, 1), "db.t3.small": (0.034, 0.036, 2, 2), "db.t3.medium": (0.068, 0.072, 2, 4),
+    "db.t3.large": (0.136, 0.145, 2, 8), "db.m5.large": (0.171, 0.178, 2, 8), "db.m5.xlarge": (0.342, 0.356, 4, 16),
+    "db.m5.2xlarge": (0.684, 0.712, 8, 32), "db.r5.large": (0.25, 0.26, 2, 16), "db.r5.xlarge": (0.50, 0.52, 4, 32),
+    "db.r5.2xlarge": (1.00, 1.04, 8, 64),
+}
+
+# ElastiCache seed; Redis, Valkey and Memcached nodes share these rates
+SEED_CACHE_NODES = {
+    # type: (hourly, vcpu, memory_gib)
+    "cache.t3.micro": (0.017, 2, 0.5), "cache.t3.small": (0.034, 2, 1.37), "cache.t3.medium": (0.068, 2, 3.09),
+    "cache.m5.large": (0.156, 2, 6.38), "cache.m5.xlarge": (0.311, 4, 12.93), "cache.m5.2xlarge": (0.623, 8, 26.04),
+    "cache.r5.large": (0.216, 2, 13.07), "cache.r5.xlarge": (0.431, 4, 26.32), "cache.r5.2xlarge": (0.862, 8, 52.82),
+}
+
+SEED_VOLUMES = {
+    # (volume type, dimension): monthly price per GB / IOPS / MiBps
+    ("gp3", "storage"): 0.08, ("gp2", "storage"): 0.10,
+    ("io1", "storage"): 0.125, ("io2", "storage"): 0.125,
+    ("st1", "storage"): 0.045, ("sc1", "storage"): 0.015,
+    ("standard", "storage"): 0.05, ("snapshot", "storage"): 0.05,
+    ("gp3", "iops"): 0.005, ("io1", "iops"): 0.065, ("io2", "iops"): 0.065,
+    ("gp3", "throughput"): 0.04,
+}
+
+PLATFORM_TO_OS = {
+    "Linux/UNIX": "Linux",
+    "Windows": "Windows",
+    "Red Hat Enterprise Linux": "RHEL",
+    "SUSE Linux": "SUSE",
+    "Ubuntu Pro": "Ubuntu Pro",
+}
+
+PLACEMENT_TENANCY = {"default": "Shared", "dedicated": "Dedicated", "host": "Host"}
+
+# RDS and ElastiCache API engine names → the offer files' databaseEngine / cacheEngine
+DB_ENGINES = {
+    "mysql": "MySQL", "mariadb": "MariaDB", "postgres": "PostgreSQL",
+    "aurora-mysql": "Aurora MySQL", "aurora-postgresql": "Aurora PostgreSQL",
+}
+CACHE_ENGINES = {"redis": "Redis", "valkey": "Valkey", "memcached": "Memcached"}
+
+# gp3 includes 3,000 IOPS and 125 MiB/s; io1/io2 bill every provisioned IOPS
+GP3_BASELINE_IOPS = 3000
+GP3_BASELINE_THROUGHPUT = 125
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS instance_prices (
+    region TEXT, instance_type TEXT, os TEXT, tenancy TEXT, hourly REAL,
+    PRIMARY KEY (region, instance_type, os, tenancy)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS instance_specs (
+    instance_type TEXT PRIMARY KEY, vcpu REAL, memory_gib REAL, network_gbps REAL DEFAULT 0
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS volume_prices (
+    region TEXT, volume_type TEXT, dimension TEXT, monthly REAL,
+    PRIMARY KEY (region, volume_type, dimension)
+) WITHOUT ROWID;
+"""
+
+
+@dataclass(frozen=True)
+class InstanceSpec:
+    """Capacity of an instance type."""
+    vcpu: float
+    memory_gib: float
+    network_gbps: float = 0.0  # sustained bandwidth; 0 when only an "Up to" burst figure is known
+
+
+def split_type(instance_type: str) -> tuple[str, str]:
+    """Split ``m5.2xlarge`` into family ``m5`` and size ``2xlarge``.
+
+    RDS and ElastiCache prefixes are kept on the family (``db.r5``).
+    """
+    family, _, size = instance_type.rpartition(".")
+    return family, size
+
+
+def size_rank(size: str) -> Optional[int]:
+    """Order instance sizes; ``None`` for sizes that are not on a ladder (metal)."""
+    if size in SIZE_NAMES:
+        return SIZE_NAMES[size]
+    match = re.fullmatch(r"(\d+)xlarge", size)
+    return SIZE_NAMES["large"] + int(match.group(1)) if match else None
+
+
+def instance_os(instance: dict) -> str:
+    """Map an EC2 instance's PlatformDetails to the catalog's operating system."""
+    return PLATFORM_TO_OS.get(instance.get("PlatformDetails", "Linux/UNIX"), "Linux")
+
+
+def instance_tenancy(instance: dict) -> str:
+    """Map an EC2 instance's placement tenancy to the catalog's tenancy."""
+    return PLACEMENT_TENANCY.get(instance.get("Placement", {}).get("Tenancy", "default"), "Shared")
+
+
+def db_engine(db: dict) -> str:
+    """Map an RDS instance's engine to the catalog's database engine."""
+    return DB_ENGINES.get(db.get("Engine", ""), db.get("Engine", ""))
+
+
+def db_deployment(db: dict) -> str:
+    """The catalog's deployment option (its tenancy) for an RDS instance."""
+    return "Multi-AZ" if db.get("MultiAZ") and not db.get("Engine", "").startswith("aurora") else "Single-AZ"
+
+
+def cache_engine(cluster: dict) -> str:
+    """Map an ElastiCache cluster's engine to the catalog's cache engine."""
+    return CACHE_ENGINES.get(cluster.get("Engine", ""), cluster.get("Engine", ""))
+
+
+def _norm(name: str) -> str:
+    """Normalize a JSON attribute or CSV column name (``Instance Type`` → ``instancetype``)."""
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+def _parse_number(text: str) -> float:
+    """Parse offer-file quantities like ``"16 GiB"`` or ``"2"``."""
+    match = re.match(r"[\d.,]+", text or "")
+    return float(match.group(0).replace(",", "")) if match else 0.0
+
+
+class PriceCatalog:
+    """On-demand prices and instance specs with O(1) dictionary lookups."""
+
+    def __init__(self) -> None:
+        self._instances: dict[tuple[str, str, str, str], float] = {}
+        self._volumes: dict[tuple[str, str, str], float] = {}
+        self._specs: dict[str, InstanceSpec] = {}
+        self._ladders: dict[tuple[str, str, str, str], list[str]] = {}
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "PriceCatalog":
+        """Open the imported catalog, or fall back to the built-in seed."""
+        db_path = Path(path) if path else DEFAULT_CATALOG_PATH
+        if db_path.exists():
+            try:
+                return cls.open(db_path)
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to open price catalog {db_path}: {e}")
+        return cls.builtin()
+
+    @classmethod
+    def builtin(cls) -> "PriceCatalog":
+        """Catalog holding the us-east-1 seed prices."""
+        catalog = cls()
+        for instance_type, (hourly, vcpu, memory, network) in SEED_INSTANCES.items():
+            catalog._instances[(DEFAULT_REGION, instance_type, "Linux", "Shared")] = hourly
+            catalog._specs[instance_type] = InstanceSpec(vcpu, memory, network)
+        for db_type, (mysql, postgres, vcpu, memory) in SEED_DB_INSTANCES.items():
+            for engine, hourly in (("MySQL", mysql), ("MariaDB", mysql), ("PostgreSQL", postgres)):
+                catalog._instances[(DEFAULT_REGION, db_type, engine, "Single-AZ")] = hourly
+                catalog._instances[(DEFAULT_REGION, db_type, engine, "Multi-AZ")] = hourly * 2
+            catalog._specs[db_type] = InstanceSpec(vcpu, memory)
+        for node_type, (hourly, vcpu, memory) in SEED_CACHE_NODES.items():
+            for engine in CACHE_ENGINES.values():
+                catalog._instances[(DEFAULT_REGION, node_type, engine, "Shared")] = hourly
+            catalog._specs[node_type] = InstanceSpec(vcpu, memory)
+        for (volume_type, dimension), monthly in SEED_VOLUMES.items():
+            catalog._volumes[(DEFAULT_REGION, volume_type, dimension)] = monthly
+        return catalog
+
+    @classmethod
+    def open(cls, path: str | Path) -> "PriceCatalog":
+        """Load an imported catalog from its SQLite store."""
+        catalog = cls()
+        intern = sys.intern
+        conn = sqlite3.connect(str(path))
+        try:
+            for region, itype, os_name, tenancy, hourly in conn.execute(
+                "SELECT region, instance_type, os, tenancy, hourly FROM instance_prices"
+            ):
+                catalog._instances[(intern(region), intern(itype), intern(os_name), intern(tenancy))] = hourly
+            # Stores imported before network_gbps existed have three columns
+            for itype, *spec in conn.execute("SELECT * FROM instance_specs"):
+                catalog._specs[intern(itype)] = InstanceSpec(*(value or 0.0 for value in spec))
+            for region, vtype, dimension, monthly in conn.execute(
+                "SELECT region, volume_type, dimension, monthly FROM volume_prices"
+            ):
+                catalog._volumes[(intern(region), intern(vtype), intern(dimension))] = monthly
+        finally:
+            conn.close()
+        logger.info(f"Loaded {len(catalog._instances)} instance prices from {path}")
+        return catalog
+
+    @classmethod
+    def build(cls, offer_files: Iterable[str | Path], path: Optional[str | Path] = None) -> dict[str, int]:
+        """Ingest bulk offer files into the SQLite store at ``path``.
+
+        Returns the number of rows written per table. Raises ``ValueError``
+        before writing anything if a JSON offer is too large to load.
+        """
+        offer_files = [Path(offer_file) for offer_file in offer_files]
+        for offer_file in offer_files:
+            _check_offer(offer_file)
+        db_path = Path(path) if path else DEFAULT_CATALOG_PATH
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        counts = {"instance_prices": 0, "instance_specs": 0, "volume_prices": 0}
+        conn = sqlite3.connect(str(db_path))
+        try:
+            conn.executescript(_SCHEMA)
+            if "network_gbps" not in {row[1] for row in conn.execute("PRAGMA table_info(instance_specs)")}:
+                conn.execute("ALTER TABLE instance_specs ADD COLUMN network_gbps REAL DEFAULT 0")
+            for offer_file in offer_files:
+                instances, specs, volumes = [], {}, []
+                for record in _iter_offer(offer_file):
+                    kind = record[0]
+                    if kind == "instance":
+                        _, region, itype, os_name, tenancy, hourly, vcpu, memory, network = record
+                        instances.append((region, itype, os_name, tenancy, hourly))
+                        if vcpu:
+                            specs[itype] = (itype, vcpu, memory, network)
+                    else:
+                        volumes.append(record[1:])
+                conn.executemany("INSERT OR REPLACE INTO instance_prices VALUES (?, ?, ?, ?, ?)", instances)
+                conn.executemany("INSERT OR REPLACE INTO instance_specs VALUES (?, ?, ?, ?)", specs.values())
+                conn.executemany("INSERT OR REPLACE INTO volume_prices VALUES (?, ?, ?, ?)", volumes)
+                conn.commit()
+                counts["instance_prices"] += len(instances)
+                counts["instance_specs"] += len(specs)
+                counts["volume_prices"] += len(volumes)
+                logger.info(f"Imported {offer_file}: {len(instances)} instance prices, {len(volumes)} volume prices")
+        finally:
+            conn.close()
+        return counts
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def instance_price(
+        self, instance_type: str, region: str = DEFAULT_REGION, os: str = "Linux", tenancy: str = "Shared"
+    ) -> Optional[float]:
+        """Hourly on-demand price, or ``None`` when the catalog has no price."""
+        return self._instances.get((region, instance_type, os, tenancy))
+
+    def monthly_instance_cost(
+        self, instance_type: str, region: str = DEFAULT_REGION, os: str = "Linux", tenancy: str = "Shared"
+    ) -> Optional[float]:
+        """Monthly on-demand cost (730 hours)."""
+        hourly = self.instance_price(instance_type, region, os, tenancy)
+        return hourly * HOURS_PER_MONTH if hourly is not None else None
+
+    def volume_price(self, volume_type: str, region: str = DEFAULT_REGION, dimension: str = "storage") -> Optional[float]:
+        """Monthly price per GB (or per IOPS / MiBps for those dimensions)."""
+        return self._volumes.get((region, volume_type, dimension))
+
+    def monthly_volume_cost(
+        self, volume_type: str, size_gb: float, region: str = DEFAULT_REGION, iops: int = 0, throughput: int = 0
+    ) -> Optional[float]:
+        """Monthly storage plus provisioned IOPS/throughput cost, or ``None`` without a storage price."""
+        per_gb = self.volume_price(volume_type, region)
+        if per_gb is None:
+            return None
+        cost = size_gb * per_gb
+        free_iops = GP3_BASELINE_IOPS if volume_type == "gp3" else 0
+        iops_price = self.volume_price(volume_type, region, "iops")
+        if iops_price and iops:
+            cost += max(iops - free_iops, 0) * iops_price
+        throughput_price = self.volume_price(volume_type, region, "throughput")
+        if throughput_price and throughput:
+            cost += max(throughput - GP3_BASELINE_THROUGHPUT, 0) * throughput_price
+        return cost
+
+    def spec(self, instance_type: str) -> Optional[InstanceSpec]:
+        """vCPU, memory and network bandwidth of an instance type, if known."""
+        return self._specs.get(instance_type)
+
+    def ladder(self, family: str, region: str = DEFAULT_REGION, os: str = "Linux", tenancy: str = "Shared") -> list[str]:
+        """Sizes of a family priced in a region, smallest first."""
+        if not self._ladders and self._instances:
+            self._build_ladders()
+        return self._ladders.get((region, family, os, tenancy), [])
+
+    def downsize(
+        self, instance_type: str, region: str = DEFAULT_REGION, os: str = "Linux", tenancy: str = "Shared", steps: int = 1
+    ) -> Optional[str]:
+        """The type ``steps`` sizes below ``instance_type``, or ``None`` at the bottom of the ladder."""
+        family, _ = split_type(instance_type)
+        ladder = self.ladder(family, region, os, tenancy)
+        if instance_type not in ladder:
+            return None
+        index = ladder.index(instance_type) - steps
+        return ladder[index] if index >= 0 else None
+
+    def _build_ladders(self) -> None:
+        """Group every priced type by (region, family, os, tenancy) in one pass."""
+        ranked: dict[tuple[str, str, str, str], list[tuple[int, str]]] = {}
+        for region, itype, os_name, tenancy in self._instances:
+            family, size = split_type(itype)
+            rank = size_rank(size)
+            if rank is not None:
+                ranked.setdefault((region, family, os_name, tenancy), []).append((rank, itype))
+        self._ladders = {key: [itype for _, itype in sorted(sizes)] for key, sizes in ranked.items()}
+
+    def __len__(self) -> int:
+        return len(self._instances) + len(self._volumes)
+
+
+# ----------------------------------------------------------------------
+# Offer-file parsing
+# ----------------------------------------------------------------------
+
+def _check_offer(path: Path) -> None:
+    """Reject JSON offers too large to parse in memory."""
+    size = path.stat().st_size
+    if path.suffix.lower() != ".csv" and size > MAX_JSON_OFFER_BYTES:
+        raise ValueError(
+            f"{path} is a {size / 2 ** 20:,.0f} MiB JSON offer; JSON offers over "
+            f"{MAX_JSON_OFFER_BYTES // 2 ** 20} MiB must be imported in their CSV form (index.csv), which is streamed"
+        )
+
+
+def _iter_offer(path: Path) -> Iterator[tuple]:
+    """Yield catalog records from a JSON or CSV bulk offer file."""
+    if path.suffix.lower() == ".csv":
+        yield from _iter_csv_offer(path)
+    else:
+        yield from _iter_json_offer(path)
+
+
+def _iter_json_offer(path: Path) -> Iterator[tuple]:
+    with open(path) as f:
+        offer = json.load(f)
+    products = offer.get("products", {})
+    for sku, terms in offer.get("terms", {}).get("OnDemand", {}).items():
+        product = products.get(sku)
+        if not product:
+            continue
+        attrs = {_norm(k): v for k, v in product.get("attributes", {}).items()}
+        attrs["productfamily"] = product.get("productFamily", "")
+        for term in terms.values():
+            for dim in term.get("priceDimensions", {}).values():
+                price = float(dim.get("pricePerUnit", {}).get("USD", 0))
+                record = _to_record(attrs, dim.get("unit", ""), price)
+                if record:
+                    yield record
+                    break
+
+
+def _iter_csv_offer(path: Path) -> Iterator[tuple]:
+    # Streamed row by row — the CSV form of the EC2 offer is several GB
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = None
+        for row in reader:
+            if row and row[0] == "SKU":
+                header = [_norm(col) for col in row]
+                break
+        if header is None:
+            logger.warning(f"No header row found in {path}")
+            return
+        term_col = header.index("termtype")
+        for row in reader:
+            if row[term_col] != "OnDemand":
+                continue
+            attrs = dict(zip(header, row))
+            record = _to_record(attrs, attrs.get("unit", ""), _parse_number(attrs.get("priceperunit", "")))
+            if record:
+                yield record
+
+
+def _network_gbps(text: str) -> float:
+    """Sustained bandwidth from ``networkPerformance`` (``"25 Gigabit"``).
+
+    ``"Up to 10 Gigabit"`` is a burst ceiling and ``"Moderate"`` no
+    figure at all; both map to 0 (unknown).
+    """
+    if not text or text.lower().startswith("up to") or "gigabit" not in text.lower():
+        return 0.0
+    return _parse_number(text)
+
+
+def _to_record(attrs: dict[str, str], unit: str, price: float) -> Optional[tuple]:
+    """Turn one normalized product/price row into a catalog record."""
+    region = attrs.get("regioncode")
+    if not region or price <= 0:
+        return None
+    family = _norm(attrs.get("productfamily", ""))
+
+    os_attr = INSTANCE_FAMILIES.get(family)
+    if os_attr:
+        if unit != "Hrs":
+            return None
+        if attrs.get("capacitystatus", "Used") != "Used" or attrs.get("preinstalledsw", "NA") != "NA":
+            return None
+        if attrs.get("licensemodel") == "Bring your own license":
+            return None
+        tenancy = attrs.get("tenancy") or attrs.get("deploymentoption") or "Shared"
+        return (
+            "instance", region, attrs.get("instancetype", ""), attrs.get(os_attr, ""), tenancy, price,
+            _parse_number(attrs.get("vcpu", "")), _parse_number(attrs.get("memory", "")),
+            _network_gbps(attrs.get("networkperformance", "")),
+        )
+
+    group = attrs.get("group", "") if family in ("systemoperation", "provisionedthroughput") else ""
+    dimension = VOLUME_DIMENSIONS.get((family, group))
+    if dimension:
+        if family == "storagesnapshot":
+            if "SnapshotUsage" not in attrs.get("usagetype", "") or "Archive" in attrs.get("usagetype", ""):
+                return None
+            return ("volume", region, "snapshot", dimension, price)
+        volume_type = attrs.get("volumeapiname")
+        if volume_type:
+            return ("volume", region, volume_type, dimension, price)
+    return None
@@ -0,0 +1,214 @@
+"""CostPilot — Recorded and Synthetic AWS Responses.
+
+Runs the engines against canned AWS data instead of a live account:
+
+- **Recording** — :class:`Recorder` writes every parsed response a
+  session's clients receive to a gzip-compressed JSON lines fixture.
+- **Replay** — :class:`Replayer` answers calls from a response source
+  before they reach the network: a recorded fixture
+  (:class:`FixtureSource`) or a generator such as
+  :class:`~costpilot.synthetic.SyntheticAccount`.
+
+Replay hooks in at botocore's ``before-call`` event, so the real
+clients, paginators, parameter validation and API middleware still run;
+only the HTTP round trip is replaced.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import re
+import threading
+from collections import deque
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Optional, Protocol
+
+from botocore.awsrequest import AWSResponse
+
+logger = logging.getLogger(__name__)
+
+# Request parameters that move with the clock; left out when matching a
+# replayed call to its recording
+VOLATILE_PARAMS = {"StartTime", "EndTime", "TimePeriod"}
+
+_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+class ReplayMiss(LookupError):
+    """No canned response for a call."""
+
+
+class ResponseSource(Protocol):
+    """Anything that can answer an API call with ``(status code, parsed response)``."""
+
+    def respond(self, service: str, operation: str, params: dict) -> Optional[tuple[int, dict]]:
+        ...
+
+
+def request_key(service: str, operation: str, params: dict) -> str:
+    """Digest identifying a call by its operation and non-volatile parameters."""
+    stable = {k: v for k, v in params.items() if k not in VOLATILE_PARAMS}
+    body = json.dumps(stable, sort_keys=True, default=str)
+    return hashlib.sha1(f"{service}:{operation}:{body}".encode()).hexdigest()
+
+
+# ----------------------------------------------------------------------
+# Fixture encoding
+# ----------------------------------------------------------------------
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    raise TypeError(f"{type(value).__name__} is not recordable")
+
+
+def _decode(obj: dict) -> Any:
+    if obj.keys() == {"$dt"}:
+        return datetime.fromisoformat(obj["$dt"])
+    return obj
+
+
+def _shift(value: Any, days: int) -> Any:
+    """Move every timestamp and ISO date in a response forward by ``days``."""
+    if isinstance(value, dict):
+        return {k: _shift(v, days) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_shift(v, days) for v in value]
+    if isinstance(value, datetime):
+        return value + timedelta(days=days)
+    if isinstance(value, str) and _DATE.match(value):
+        return str(date.fromisoformat(value) + timedelta(days=days))
+    return value
+
+
+# ----------------------------------------------------------------------
+# Recording
+# ----------------------------------------------------------------------
+
+class Recorder:
+    """Record parsed responses to a ``.jsonl.gz`` fixture."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.recorded = 0
+        self._file: Optional[Any] = None
+        self._lock = threading.Lock()
+
+    def install(self, session: Any) -> None:
+        """Register the hooks; clients copy session hooks, so do this before creating any."""
+        session.events.register("before-parameter-build", self._before_parameter_build)
+        session.events.register("after-call", self._after_call)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                logger.info(f"Recorded {self.recorded} responses to {self.path}")
+
+    def __enter__(self) -> "Recorder":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _before_parameter_build(self, params: dict, model: Any, context: dict, **kwargs: Any) -> None:
+        # Keyed now, before botocore fills in defaults such as idempotency tokens
+        context["costpilot_request"] = request_key(model.service_model.service_name, model.name, params)
+
+    def _after_call(self, http_response: Any, parsed: dict, model: Any, context: dict, **kwargs: Any) -> None:
+        response = {k: v for k, v in parsed.items() if k != "ResponseMetadata"}
+        record = {
+            "service": model.service_model.service_name,
+            "operation": model.name,
+            "key": context.get("costpilot_request", ""),
+            "status": getattr(http_response, "status_code", 200),
+            "response": response,
+        }
+        try:
+            line = json.dumps(record, default=_encode)
+        except TypeError as e:
+            # Streaming bodies (S3 GetObject, ...) can't be replayed from a fixture
+            logger.warning(f"Not recording {record['service']}:{record['operation']}: {e}")
+            return
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = gzip.open(self.path, "wt", encoding="utf-8")
+                self._file.write(json.dumps({"recorded_at": datetime.now(timezone.utc).isoformat()}) + "\n")
+            self._file.write(line + "\n")
+            self.recorded += 1
+
+
+# ----------------------------------------------------------------------
+# Replay
+# ----------------------------------------------------------------------
+
+class FixtureSource:
+    """Responses from a recorded fixture.
+
+    A call is answered with the recording of the same request, matched on
+    everything but its time window, or failing that with the next
+    recording of the same operation. Repeated requests cycle through
+    their recordings, so a fixture can be replayed any number of times.
+
+    With ``shift`` (the default), timestamps and dates are moved forward
+    by the whole days since recording, so windows computed from "now"
+    still cover the recorded data.
+    """
+
+    def __init__(self, path: str | Path, shift: bool = True) -> None:
+        self.path = Path(path)
+        self._exact: dict[tuple[str, str, str], deque] = {}
+        self._any: dict[tuple[str, str], deque] = {}
+        self._lock = threading.Lock()
+        days = 0
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline() or "{}")
+            if shift and "recorded_at" in header:
+                recorded = datetime.fromisoformat(header["recorded_at"]).date()
+                days = (datetime.now(timezone.utc).date() - recorded).days
+            for line in f:
+                record = json.loads(line, object_hook=_decode)
+                entry = (record["status"], _shift(record["response"], days) if days else record["response"])
+                service, operation = record["service"], record["operation"]
+                self._exact.setdefault((service, operation, record["key"]), deque()).append(entry)
+                self._any.setdefault((service, operation), deque()).append(entry)
+        self.records = sum(len(q) for q in self._any.values())
+
+    def respond(self, service: str, operation: str, params: dict) -> Optional[tuple[int, dict]]:
+        queue = self._exact.get((service, operation, request_key(service, operation, params)))
+        if queue is None:
+            queue = self._any.get((service, operation))
+        if not queue:
+            return None
+        with self._lock:
+            entry = queue[0]
+            queue.rotate(-1)
+        return entry
+
+
+class Replayer:
+    """Answer a session's API calls from a :class:`ResponseSource`."""
+
+    def __init__(self, source: ResponseSource) -> None:
+        self.source = source
+
+    def install(self, session: Any) -> None:
+        """Register the hooks; clients copy session hooks, so do this before creating any."""
+        session.events.register("before-parameter-build", self._before_parameter_build)
+        session.events.register("before-call", self._before_call)
+
+    def _before_parameter_build(self, params: dict, context: dict, **kwargs: Any) -> None:
+        context["costpilot_params"] = dict(params)
+
+    def _before_call(self, model: Any, context: dict, **kwargs: Any) -> tuple[AWSResponse, dict]:
+        service, operation = model.service_model.service_name, model.name
+        answer = self.source.respond(service, operation, context.get("costpilot_params", {}))
+        if answer is None:
+            raise ReplayMiss(f"No canned response for {service}:{operation}")
+        status, parsed = answer
+        # Returning a response from before-call skips the HTTP request entirely
+        return AWSResponse(None, status, {}, None), parsed
@@ -1,93 +1,349 @@
-"""CostPilot — Report Generator (Markdown + HTML)."""
+"""CostPilot — Report Generator (Markdown + HTML).
 
-import os
+Renders a ``CostReport`` straight to disk: each section is written as
+soon as it is produced and table rows are streamed from the models, so
+full inventories of 100k+ findings never exist as one in-memory
+document. The HTML report is a single self-contained file (inline CSS
+and a few lines of JS for sortable tables). Findings can also be
+exported as CSV or Parquet (the latter needs ``pyarrow``).
+"""
+
+import csv
+import html
 import logging
-from typing import Any
-from datetime import datetime, timezone
+import os
+from dataclasses import dataclass
+from itertools import groupby, islice
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional, TextIO
+
+from .models import CostReport, ResourceType, UnusedResource
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_REPORT_CACHE = Path.home() / ".costpilot" / "last-report.json"
+
+FORMATS = ("md", "html")
+EXPORT_FORMATS = ("csv", "parquet")
+
+# Rows per Parquet row group / streamed write
+EXPORT_BATCH_ROWS = 50_000
+
+UNUSED_SECTIONS = {
+    ResourceType.EBS_VOLUME: "EBS Volumes",
+    ResourceType.ELASTIC_IP: "Elastic IPs",
+    ResourceType.ALB: "Load Balancers",
+    ResourceType.NLB: "Load Balancers",
+    ResourceType.GWLB: "Load Balancers",
+    ResourceType.EC2_INSTANCE: "Stopped Instances",
+    ResourceType.SNAPSHOT: "Old Snapshots",
+    ResourceType.S3_BUCKET: "S3 Buckets",
+}
+
+RIGHTSIZING_TYPES = {"ec2": "EC2", "rds": "RDS", "elasticache": "ElastiCache", "ebs": "EBS"}
+
+FINDING_COLUMNS = [
+    "finding", "resource_id", "resource_type", "region", "name", "detail",
+    "monthly_cost", "monthly_savings", "cost_source", "action",
+]
+
+
+@dataclass(frozen=True)
+class Column:
+    """A table column; ``numeric`` columns right-align and sort by value in HTML."""
+    title: str
+    numeric: bool = False
+
+
+class _MarkdownWriter:
+    def __init__(self, f: TextIO) -> None:
+        self.f = f
+
+    def start(self, title: str) -> None:
+        self.f.write(f"# {title}\n")
+
+    def heading(self, text: str, level: int = 2) -> None:
+        self.f.write(f"\n{'#' * level} {text}\n\n")
+
+    def paragraph(self, text: str) -> None:
+        self.f.write(f"{text}\n\n")
+
+    def table(self, columns: list[Column], rows: Iterable[tuple]) -> None:
+        self.f.write("| " + " | ".join(c.title for c in columns) + " |\n")
+        self.f.write("|" + "|".join("---:" if c.numeric else "---" for c in columns) + "|\n")
+        while True:
+            chunk = list(islice(rows, 1000))
+            if not chunk:
+                break
+            self.f.writelines(
+                "| " + " | ".join(_md_cell(v) for v in row) + " |\n" for row in chunk
+            )
+        self.f.write("\n")
+
+    def end(self, footer: str) -> None:
+        self.f.write(f"---\n*{footer}*\n")
+
+
+class _HtmlWriter:
+    def __init__(self, f: TextIO) -> None:
+        self.f = f
+
+    def start(self, title: str) -> None:
+        self.f.write(
+            "<!DOCTYPE html>\n<html lang=\"en\"><head><meta charset=\"utf-8\">"
+            f"<title>{html.escape(title)}</title><style>{_CSS}</style></head><body>\n"
+            f"<h1>{html.escape(title)}</h1>\n"
+        )
+
+    def heading(self, text: str, level: int = 2) -> None:
+        self.f.write(f"<h{level}>{html.escape(text)}</h{level}>\n")
+
+    def paragraph(self, text: str) -> None:
+        self.f.write(f"<p>{_md_inline(text)}</p>\n")
+
+    def table(self, columns: list[Column], rows: Iterable[tuple]) -> None:
+        head = "".join(
+            f'<th class="num">{html.escape(c.title)}</th>' if c.numeric else f"<th>{html.escape(c.title)}</th>"
+            for c in columns
+        )
+        self.f.write(f'<table class="sortable"><thead><tr>{head}</tr></thead><tbody>\n')
+        numeric = [c.numeric for c in columns]
+        while True:
+            chunk = list(islice(rows, 1000))
+            if not chunk:
+                break
+            self.f.writelines(
+                "<tr>" + "".join(_html_cell(v, n) for v, n in zip(row, numeric)) + "</tr>\n" for row in chunk
+            )
+        self.f.write("</tbody></table>\n")
+
+    def end(self, footer: str) -> None:
+        self.f.write(f"<footer>{html.escape(footer)}</footer>\n<script>{_SORT_JS}</script></body></html>\n")
+
 
 class ReportGenerator:
     def __init__(self, config: Any) -> None:
         self.config = config
 
-    def generate(self, costs: dict, sizing: dict, unused: dict, output_dir: str = "report") -> None:
+    def generate(
+        self, report: CostReport, output_dir: str = "report", formats: Iterable[str] = FORMATS
+    ) -> list[str]:
+        """Write the report in each format; returns the files written."""
         os.makedirs(output_dir, exist_ok=True)
-        md = self._build_markdown(costs, sizing, unused)
-        with open(os.path.join(output_dir, "cost-report.md"), "w") as f:
-            f.write(md)
-        logger.info(f"Report written to {output_dir}/cost-report.md")
-
-    def generate_from_cache(self, output_dir: str = "report") -> None:
-        logger.info("Generating from cached data (not implemented — run analyze first)")
-
-    def _build_markdown(self, costs: dict, sizing: dict, unused: dict) -> str:
-        now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
-        total_savings = costs.get("potential_savings", 0) + sizing.get("potential_savings", 0) + unused.get("potential_savings", 0)
-
-        lines = [
-            "# ☁️ CostPilot — AWS Cost Optimization Report",
-            f"**Generated:** {now}",
-            f"**Period:** {costs.get('period', {}).get('start', 'N/A')} to {costs.get('period', {}).get('end', 'N/A')}",
-            "",
-            "## Executive Summary",
-            "",
-            f"| Metric | Value |",
-            f"|--------|-------|",
-            f"| Total Spend (period) | **${costs.get('total_spend', 0):,.2f}** |",
-            f"| Average Daily | ${costs.get('avg_daily', 0):,.2f} |",
-            f"| Projected Monthly | ${costs.get('projected_monthly', 0):,.2f} |",
-            f"| Cost Spikes Detected | {len(costs.get('cost_spikes', []))} |",
-            f"| **Total Potential Savings** | **${total_savings:,.2f}/month** |",
-            "",
-            "## Top Services by Spend",
-            "",
-            "| Service | Monthly Cost |",
-            "|---------|-------------|",
-        ]
-
-        for svc in costs.get("top_services", []):
-            lines.append(f"| {svc['service']} | ${svc['amount']:,.2f} |")
-
-        lines.extend([
-            "",
-            "## EC2 Rightsizing Recommendations",
-            "",
-            f"Analyzed {sizing.get('instances_analyzed', 0)} instances (threshold: {sizing.get('cpu_threshold', 30)}% avg CPU)",
-            "",
-        ])
-
-        recs = sizing.get("recommendations", [])
-        if recs:
-            lines.extend([
-                "| Instance | Current | Recommended | Avg CPU | Monthly Savings |",
-                "|----------|---------|-------------|---------|----------------|",
-            ])
-            for r in recs:
-                lines.append(f"| {r['instance_id']} ({r.get('name', '')}) | {r['current_type']} | {r['recommended_type']} | {r['avg_cpu_percent']}% | ${r['monthly_savings']:,.2f} |")
+        if not report.total_potential_savings:
+            report.calculate_savings()
+        written = []
+        for fmt in formats:
+            if fmt not in FORMATS:
+                raise ValueError(f"Unknown report format {fmt!r}, expected one of {', '.join(FORMATS)}")
+            path = os.path.join(output_dir, f"cost-report.{fmt}")
+            with open(path, "w", encoding="utf-8", buffering=1 << 20) as f:
+                writer = _MarkdownWriter(f) if fmt == "md" else _HtmlWriter(f)
+                self._render(writer, report)
+            written.append(path)
+            logger.info(f"Report written to {path}")
+        return written
+
+    def generate_from_cache(self, output_dir: str = "report", path: Optional[str] = None) -> list[str]:
+        """Re-render the report saved by the last ``costpilot analyze``."""
+        from .serialize import load
+
+        return self.generate(load(path or DEFAULT_REPORT_CACHE), output_dir)
+
+    def export_findings(self, report: CostReport, path: str) -> int:
+        """Stream every finding to ``.csv`` or ``.parquet``; returns the row count."""
+        suffix = Path(path).suffix.lstrip(".")
+        if suffix not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format {suffix!r}, expected one of {', '.join(EXPORT_FORMATS)}")
+        rows = _finding_rows(report)
+        count = _write_parquet(path, rows) if suffix == "parquet" else _write_csv(path, rows)
+        logger.info(f"Exported {count:,} findings to {path}")
+        return count
+
+    def _render(self, w: Any, report: CostReport) -> None:
+        analysis = report.analysis
+        w.start("☁️ CostPilot — AWS Cost Optimization Report")
+        w.paragraph(f"**Generated:** {report.generated_at.strftime('%Y-%m-%d %H:%M UTC')}")
+        if analysis:
+            w.paragraph(f"**Period:** {analysis.start_date} to {analysis.end_date}")
+
+        w.heading("Executive Summary")
+        summary = []
+        if analysis:
+            summary += [
+                ("Total Spend (period)", f"**${analysis.total_cost:,.2f}**"),
+                ("Average Daily", f"${analysis.avg_daily:,.2f}"),
+                ("Projected Monthly", f"${analysis.projected_monthly:,.2f}"),
+                ("Cost Spikes Detected", len(analysis.spikes)),
+            ]
+        summary.append(("**Total Potential Savings**", f"**${report.total_potential_savings:,.2f}/month**"))
+        w.table([Column("Metric"), Column("Value")], iter(summary))
+
+        if analysis:
+            w.heading("Top Services by Spend")
+            top = sorted(analysis.service_breakdown, key=lambda s: -s.cost)[:5]
+            w.table(
+                [Column("Service"), Column("Cost", numeric=True)],
+                ((s.service_name, f"${s.cost:,.2f}") for s in top),
+            )
+            if analysis.forecasts:
+                total = analysis.forecasts[-1]
+                w.heading("Forecast")
+                w.table([Column("Horizon"), Column("Forecast", True), Column("Low", True), Column("High", True)], iter([
+                    ("End of month", *(f"${v:,.2f}" for v in (
+                        total.end_of_month, total.end_of_month_low, total.end_of_month_high))),
+                    ("Next 30 days", *(f"${v:,.2f}" for v in (
+                        total.next_30_days, total.next_30_days_low, total.next_30_days_high))),
+                ]))
+            if analysis.spikes:
+                w.heading("Cost Spikes")
+                w.table(
+                    [Column("Date"), Column("Service"), Column("Actual", True), Column("Expected", True),
+                     Column("Deviation", True), Column("Severity")],
+                    ((str(s.date), s.service, f"${s.actual_cost:,.2f}", f"${s.average_cost:,.2f}",
+                      f"{s.deviation_pct:+.0f}%", s.severity.value) for s in analysis.spikes),
+                )
+
+        w.heading("Rightsizing Recommendations")
+        if report.rightsizing:
+            savings = sum(r.monthly_savings for r in report.rightsizing)
+            w.paragraph(f"**{len(report.rightsizing):,}** recommendations saving **${savings:,.2f}/month**")
+            # EBS rows report IOPS utilization in the CPU columns
+            w.table(
+                [Column("Resource"), Column("Type"), Column("Name"), Column("Current"), Column("Recommended"),
+                 Column("Avg Util", True), Column("P95 Util", True), Column("Peak Mem", True),
+                 Column("Monthly Savings", True), Column("Confidence")],
+                ((r.resource_id, RIGHTSIZING_TYPES.get(r.resource_type, r.resource_type), r.name, r.current_type,
+                  r.recommended_type, f"{r.avg_cpu_pct}%", f"{r.p95_cpu_pct}%",
+                  "—" if r.max_memory_pct is None else f"{r.max_memory_pct}%", f"${r.monthly_savings:,.2f}",
+                  r.confidence.value) for r in report.rightsizing),
+            )
         else:
-            lines.append("✅ No rightsizing recommendations — instances are properly sized.")
-
-        lines.extend([
-            "",
-            "## Unused Resources",
-            "",
-            f"Found **{unused.get('total_unused', 0)}** unused resources wasting **${unused.get('potential_savings', 0):,.2f}/month**",
-            "",
-        ])
-
-        for category, items in unused.get("resources", {}).items():
-            if items:
-                lines.append(f"### {category.replace('_', ' ').title()}")
-                lines.append("")
-                for item in items[:10]:
-                    lines.append(f"- **{item['id']}** ({item['type']}) — ${item.get('monthly_cost', 0):,.2f}/mo — {item.get('action', '')}")
-                lines.append("")
-
-        lines.extend([
-            "---",
-            "*Generated by CostPilot — AWS Cloud Cost Optimization Engine*",
-        ])
-
-        return "\n".join(lines)
+            w.paragraph("✅ No rightsizing recommendations — resources are properly sized.")
+
+        w.heading("Unused Resources")
+        waste = sum(u.monthly_cost for u in report.unused_resources)
+        w.paragraph(
+            f"Found **{len(report.unused_resources):,}** unused resources wasting **${waste:,.2f}/month**"
+        )
+        # Findings arrive grouped by type from the detector; group consecutive runs per section
+        for section, items in groupby(report.unused_resources, key=lambda u: UNUSED_SECTIONS[u.resource_type]):
+            w.heading(section, 3)
+            w.table(
+                [Column("Resource"), Column("Name"), Column("Detail"), Column("Monthly Cost", True),
+                 Column("Cost Source"), Column("Action")],
+                ((u.resource_id, u.name, _unused_detail(u), f"${u.monthly_cost:,.2f}", u.cost_source.value, u.reason)
+                 for u in items),
+            )
+
+        if report.advisories:
+            w.heading("Advisories")
+            w.paragraph(f"**{len(report.advisories):,}** findings with no cost of their own, not counted as savings")
+            w.table(
+                [Column("Resource"), Column("Detail"), Column("Action")],
+                ((u.resource_id, _unused_detail(u), u.reason) for u in report.advisories),
+            )
+
+        if report.reservations and report.reservations.recommendations:
+            w.heading("Reservation Recommendations")
+            w.table(
+                [Column("Service"), Column("Family"), Column("Term"), Column("Payment"),
+                 Column("Monthly Savings", True), Column("Break-even (months)", True)],
+                ((r.service, r.instance_family, f"{r.term_months} mo", r.payment_option,
+                  f"${r.monthly_savings:,.2f}", r.break_even_months) for r in report.reservations.recommendations),
+            )
+
+        w.end("Generated by CostPilot — AWS Cloud Cost Optimization Engine")
+
+
+def _unused_detail(u: UnusedResource) -> str:
+    if u.size_gb:
+        return f"{u.subtype} {u.size_gb:g} GB".strip()
+    return u.subtype or u.secondary_id
+
+
+def _finding_rows(report: CostReport) -> Iterator[tuple]:
+    for r in report.rightsizing:
+        yield (
+            "rightsizing", r.resource_id, r.resource_type, r.region, r.name,
+            f"{r.current_type} -> {r.recommended_type}", r.current_monthly_cost, r.monthly_savings,
+            r.cost_source.value, f"{'Modify' if r.resource_type == 'ebs' else 'Resize'} to {r.recommended_type}",
+        )
+    for u in report.unused_resources:
+        yield (
+            "unused", u.resource_id, u.resource_type.value, u.region, u.name, _unused_detail(u),
+            u.monthly_cost, u.monthly_cost, u.cost_source.value, u.reason,
+        )
+    for u in report.advisories:
+        yield (
+            "advisory", u.resource_id, u.resource_type.value, u.region, u.name, _unused_detail(u),
+            0.0, 0.0, u.cost_source.value, u.reason,
+        )
+
+
+def _write_csv(path: str, rows: Iterator[tuple]) -> int:
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(FINDING_COLUMNS)
+        while True:
+            chunk = list(islice(rows, EXPORT_BATCH_ROWS))
+            if not chunk:
+                return count
+            writer.writerows(chunk)
+            count += len(chunk)
+
+
+def _write_parquet(path: str, rows: Iterator[tuple]) -> int:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        (name, pa.float64() if name in ("monthly_cost", "monthly_savings") else pa.string())
+        for name in FINDING_COLUMNS
+    ])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        while True:
+            chunk = list(islice(rows, EXPORT_BATCH_ROWS))
+            if not chunk:
+                return count
+            columns = list(zip(*chunk))
+            writer.write_batch(pa.record_batch([pa.array(c, f.type) for c, f in zip(columns, schema)], schema=schema))
+            count += len(chunk)
+
+
+def _md_cell(value: Any) -> str:
+    return str(value).replace("|", "\\|").replace("\n", " ")
+
+
+def _md_inline(text: str) -> str:
+    """Escape text for HTML, keeping the report's **bold** markers."""
+    parts = html.escape(text).split("**")
+    return "".join(f"<strong>{p}</strong>" if i % 2 else p for i, p in enumerate(parts))
+
+
+def _html_cell(value: Any, numeric: bool) -> str:
+    text = _md_inline(str(value))
+    return f'<td class="num">{text}</td>' if numeric else f"<td>{text}</td>"
+
+
+_CSS = (
+    "body{font-family:-apple-system,Segoe UI,Helvetica,Arial,sans-serif;margin:2em;color:#222}"
+    "table{border-collapse:collapse;margin:0 0 1.5em;font-size:14px}"
+    "th,td{border:1px solid #ddd;padding:4px 8px}th{background:#f4f6f8;cursor:pointer;user-select:none}"
+    "th.asc::after{content:' \\25B2'}th.desc::after{content:' \\25BC'}"
+    ".num{text-align:right;font-variant-numeric:tabular-nums}tbody tr:nth-child(even){background:#fafafa}"
+    "footer{margin-top:2em;color:#777;font-style:italic}"
+)
+
+# Click a header to sort; numeric columns compare by value ignoring $, %, commas
+_SORT_JS = (
+    "document.querySelectorAll('table.sortable th').forEach(function(th,i){th.addEventListener('click',function(){"
+    "var t=th.closest('table'),b=t.tBodies[0],num=th.classList.contains('num'),asc=!th.classList.contains('asc');"
+    "t.querySelectorAll('th').forEach(function(h){h.classList.remove('asc','desc')});th.classList.add(asc?'asc':'desc');"
+    "var key=function(r){var s=r.cells[i].textContent;return num?parseFloat(s.replace(/[^0-9.+-]/g,''))||0:s.toLowerCase()};"
+    "var rows=Array.prototype.map.call(b.rows,function(r){return [key(r),r]});"
+    "rows.sort(function(a,c){return (a[0]<c[0]?-1:a[0]>c[0]?1:0)*(asc?1:-1)});"
+    "var f=document.createDocumentFragment();rows.forEach(function(r){f.appendChild(r[1])});b.appendChild(f)})});"
+)
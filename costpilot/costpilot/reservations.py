@@ -1,105 +1,232 @@
 """CostPilot — Reserved Instance & Savings Plans Analyzer."""
 
 import logging
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional
 import boto3
+from .attribution import ResourceCostIndex
 from .config import Config
+from .models import ReservationAnalysis, ReservationRecommendation
+from .ratelimit import TokenBucket
 
 logger = logging.getLogger(__name__)
 
+# Cost Explorer service names for reservation recommendations, and the
+# InstanceDetails key / family attribute each one reports
+RESERVABLE_SERVICES = {
+    "Amazon Elastic Compute Cloud - Compute": ("EC2InstanceDetails", "Family"),
+    "Amazon Relational Database Service": ("RDSInstanceDetails", "Family"),
+    "Amazon ElastiCache": ("ElastiCacheInstanceDetails", "Family"),
+    "Amazon OpenSearch Service": ("ESInstanceDetails", "InstanceClass"),
+    "Amazon Redshift": ("RedshiftInstanceDetails", "Family"),
+}
+TERMS = {"ONE_YEAR": 12, "THREE_YEARS": 36}
+PAYMENT_OPTIONS = ["NO_UPFRONT", "PARTIAL_UPFRONT", "ALL_UPFRONT"]
+
 
 class ReservationAnalyzer:
     """Analyze RI and Savings Plans utilization and coverage."""
 
-    def __init__(self, config: Config) -> None:
+    def __init__(
+        self,
+        config: Config,
+        max_workers: int = 8,
+        requests_per_second: Optional[float] = None,
+        rates: Optional[ResourceCostIndex] = None,
+    ) -> None:
         self.session = config.get_session()
         self.ce = self.session.client("ce")
+        self.max_workers = max_workers
+        # Cost Explorer is rate limited session-wide by the API middleware; this adds a tighter local limit
+        self.limiter = TokenBucket(requests_per_second) if requests_per_second else None
+        self.options: list[ReservationRecommendation] = []
+        # Purchase recommendations are quoted at public rates; negotiated discounts shrink them alike
+        self.discount = rates.discount if rates is not None else 1.0
 
     def analyze(self) -> dict[str, Any]:
         """Full RI/SP analysis with recommendations."""
-        ri_utilization = self._get_ri_utilization()
-        ri_coverage = self._get_ri_coverage()
-        sp_utilization = self._get_sp_utilization()
-        recommendations = self._get_recommendations()
-
+        ri, sp = self.fetch()
         return {
             "reserved_instances": {
-                "utilization_percent": ri_utilization,
-                "coverage_percent": ri_coverage,
+                "utilization_percent": ri.utilization_pct,
+                "coverage_percent": ri.coverage_pct,
+                "total_commitment": ri.total_commitment,
+                "wasted_spend": ri.wasted_spend,
             },
             "savings_plans": {
-                "utilization_percent": sp_utilization,
+                "utilization_percent": sp.utilization_pct,
+                "coverage_percent": sp.coverage_pct,
+                "total_commitment": sp.total_commitment,
+                "wasted_spend": sp.wasted_spend,
             },
-            "recommendations": recommendations,
+            "recommendations": [asdict(r) for r in ri.recommendations],
+            "options": [asdict(r) for r in self.options],
         }
 
-    def _get_ri_utilization(self) -> float:
-        """Get RI utilization percentage."""
-        try:
-            from datetime import datetime, timedelta, timezone
-            end = datetime.now(timezone.utc).date()
-            start = end - timedelta(days=30)
-            resp = self.ce.get_reservation_utilization(
-                TimePeriod={"Start": str(start), "End": str(end)},
+    def fetch(self) -> tuple[ReservationAnalysis, ReservationAnalysis]:
+        """Fetch utilization, coverage and the full recommendation matrix concurrently.
+
+        The RI analysis carries the best option per family; every
+        service/term/payment option is kept on ``self.options``.
+        """
+        end = datetime.now(timezone.utc).date()
+        period = {"Start": str(end - timedelta(days=30)), "End": str(end)}
+        matrix = [
+            (service, term, payment)
+            for service in RESERVABLE_SERVICES
+            for term in TERMS
+            for payment in PAYMENT_OPTIONS
+        ]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            ri_util = pool.submit(self._get_ri_utilization, period)
+            ri_cov = pool.submit(self._get_ri_coverage, period)
+            sp_util = pool.submit(self._get_sp_utilization, period)
+            sp_cov = pool.submit(self._get_sp_coverage, period)
+            rec_futures = [pool.submit(self._get_recommendations, *combo) for combo in matrix]
+
+            ri_total = ri_util.result()
+            sp_total = sp_util.result()
+            self.options = sorted((rec for f in rec_futures for rec in f.result()), key=lambda r: -r.monthly_savings)
+
+            ri_commitment = float(ri_total.get("TotalAmortizedFee", 0))
+            ri_pct = float(ri_total.get("UtilizationPercentage", 0))
+            ri = ReservationAnalysis(
+                plan_type="RI",
+                utilization_pct=ri_pct,
+                coverage_pct=ri_cov.result(),
+                total_commitment=round(ri_commitment, 2),
+                used_commitment=round(ri_commitment * ri_pct / 100, 2),
+                wasted_spend=round(ri_commitment * (1 - ri_pct / 100), 2),
+                recommendations=self.best_by_family(self.options),
+            )
+            sp_utilization = sp_total.get("Utilization", {})
+            sp = ReservationAnalysis(
+                plan_type="Savings Plan",
+                utilization_pct=float(sp_utilization.get("UtilizationPercentage", 0)),
+                coverage_pct=sp_cov.result(),
+                total_commitment=round(float(sp_utilization.get("TotalCommitment", 0)), 2),
+                used_commitment=round(float(sp_utilization.get("UsedCommitment", 0)), 2),
+                wasted_spend=round(float(sp_utilization.get("UnusedCommitment", 0)), 2),
             )
-            total = resp.get("Total", {})
-            return float(total.get("UtilizationPercentage", 0))
+        return ri, sp
+
+    @staticmethod
+    def best_by_family(recommendations: list[ReservationRecommendation]) -> list[ReservationRecommendation]:
+        """Per (service, family, region), the option with the highest savings that pays back within its term."""
+        best: dict[tuple[str, str, str], ReservationRecommendation] = {}
+        for rec in recommendations:
+            if rec.monthly_savings <= 0 or rec.break_even_months > rec.term_months:
+                continue
+            key = (rec.service, rec.instance_family, rec.region)
+            current = best.get(key)
+            if current is None or (rec.monthly_savings, -rec.break_even_months) > (
+                current.monthly_savings, -current.break_even_months
+            ):
+                best[key] = rec
+        return sorted(best.values(), key=lambda r: -r.monthly_savings)
+
+    def _call(self, fn: Callable[..., dict], **kwargs: Any) -> dict:
+        """Call a Cost Explorer operation, under the local rate limit if one is set."""
+        if self.limiter is not None:
+            self.limiter.acquire()
+        return fn(**kwargs)
+
+    def _get_ri_utilization(self, period: dict[str, str]) -> dict:
+        """Get the RI utilization totals (percentage and amortized fees)."""
+        try:
+            resp = self._call(self.ce.get_reservation_utilization, TimePeriod=period)
+            return resp.get("Total", {})
         except Exception as e:
             logger.warning(f"RI utilization query failed: {e}")
-            return 0.0
+            return {}
 
-    def _get_ri_coverage(self) -> float:
+    def _get_ri_coverage(self, period: dict[str, str]) -> float:
         """Get RI coverage percentage."""
         try:
-            from datetime import datetime, timedelta, timezone
-            end = datetime.now(timezone.utc).date()
-            start = end - timedelta(days=30)
-            resp = self.ce.get_reservation_coverage(
-                TimePeriod={"Start": str(start), "End": str(end)},
-            )
+            resp = self._call(self.ce.get_reservation_coverage, TimePeriod=period)
             total = resp.get("Total", {}).get("CoverageHours", {})
             return float(total.get("CoverageHoursPercentage", 0))
         except Exception as e:
             logger.warning(f"RI coverage query failed: {e}")
             return 0.0
 
-    def _get_sp_utilization(self) -> float:
-        """Get Savings Plans utilization."""
+    def _get_sp_utilization(self, period: dict[str, str]) -> dict:
+        """Get the Savings Plans utilization totals."""
         try:
-            from datetime import datetime, timedelta, timezone
-            end = datetime.now(timezone.utc).date()
-            start = end - timedelta(days=30)
-            resp = self.ce.get_savings_plans_utilization(
-                TimePeriod={"Start": str(start), "End": str(end)},
-            )
-            total = resp.get("Total", {})
-            return float(total.get("Utilization", {}).get("UtilizationPercentage", 0))
+            resp = self._call(self.ce.get_savings_plans_utilization, TimePeriod=period)
+            return resp.get("Total", {})
         except Exception as e:
             logger.warning(f"SP utilization query failed: {e}")
+            return {}
+
+    def _get_sp_coverage(self, period: dict[str, str]) -> float:
+        """Get Savings Plans coverage percentage over the whole period."""
+        try:
+            covered = on_demand = 0.0
+            kwargs: dict[str, Any] = {"TimePeriod": period, "Granularity": "MONTHLY"}
+            while True:
+                resp = self._call(self.ce.get_savings_plans_coverage, **kwargs)
+                for item in resp.get("SavingsPlansCoverages", []):
+                    coverage = item.get("Coverage", {})
+                    covered += float(coverage.get("SpendCoveredBySavingsPlans", 0))
+                    on_demand += float(coverage.get("OnDemandCost", 0))
+                if not resp.get("NextToken"):
+                    break
+                kwargs["NextToken"] = resp["NextToken"]
+            total = covered + on_demand
+            return round(covered / total * 100, 2) if total else 0.0
+        except Exception as e:
+            logger.warning(f"SP coverage query failed: {e}")
             return 0.0
 
-    def _get_recommendations(self) -> list[dict]:
-        """Get RI purchase recommendations from Cost Explorer."""
+    def _get_recommendations(self, service: str, term: str, payment: str) -> list[ReservationRecommendation]:
+        """Get RI purchase recommendations for one service/term/payment combination."""
+        details_key, family_key = RESERVABLE_SERVICES[service]
+        term_months = TERMS[term]
+        recs = []
+        kwargs: dict[str, Any] = {
+            "Service": service,
+            "TermInYears": term,
+            "PaymentOption": payment,
+            "LookbackPeriodInDays": "THIRTY_DAYS",
+        }
         try:
-            resp = self.ce.get_reservation_purchase_recommendation(
-                Service="Amazon Elastic Compute Cloud - Compute",
-                TermInYears="ONE_YEAR",
-                PaymentOption="NO_UPFRONT",
-                LookbackPeriodInDays="THIRTY_DAYS",
-            )
-            recs = []
-            for rec in resp.get("Recommendations", []):
-                for detail in rec.get("RecommendationDetails", []):
-                    savings = float(detail.get("EstimatedMonthlySavingsAmount", 0))
-                    if savings > 0:
-                        recs.append({
-                            "instance_type": detail.get("InstanceDetails", {}).get("EC2InstanceDetails", {}).get("InstanceType", "unknown"),
-                            "recommended_count": int(detail.get("RecommendedNumberOfInstancesToPurchase", 0)),
-                            "monthly_savings": round(savings, 2),
-                            "upfront_cost": float(detail.get("UpfrontCost", 0)),
-                            "break_even_months": round(float(detail.get("UpfrontCost", 0)) / max(savings, 0.01), 1),
-                        })
-            return sorted(recs, key=lambda x: -x["monthly_savings"])
+            while True:
+                resp = self._call(self.ce.get_reservation_purchase_recommendation, **kwargs)
+                for rec in resp.get("Recommendations", []):
+                    for detail in rec.get("RecommendationDetails", []):
+                        savings = float(detail.get("EstimatedMonthlySavingsAmount", 0)) * self.discount
+                        if savings <= 0:
+                            continue
+                        instance = detail.get("InstanceDetails", {}).get(details_key, {})
+                        upfront = float(detail.get("UpfrontCost", 0)) * self.discount
+                        monthly_reserved = (
+                            float(detail.get("RecurringStandardMonthlyCost", 0)) * self.discount + upfront / term_months
+                        )
+                        break_even = detail.get("EstimatedBreakEvenInMonths")
+                        recs.append(ReservationRecommendation(
+                            service=service,
+                            instance_family=instance.get(family_key, "unknown"),
+                            region=instance.get("Region", ""),
+                            term_months=term_months,
+                            payment_option=payment.lower(),
+                            monthly_on_demand=round(
+                                float(detail.get("EstimatedMonthlyOnDemandCost", 0)) * self.discount, 2
+                            ),
+                            monthly_reserved=round(monthly_reserved, 2),
+                            monthly_savings=round(savings, 2),
+                            break_even_months=round(
+                                float(break_even) if break_even is not None else upfront / savings, 1
+                            ),
+                            upfront_cost=round(upfront, 2),
+                        ))
+                token = resp.get("NextPageToken")
+                if not token:
+                    break
+                kwargs["NextPageToken"] = token
         except Exception as e:
-            logger.warning(f"RI recommendations failed: {e}")
-            return []
+            logger.warning(f"RI recommendations failed for {service} {term} {payment}: {e}")
+        return recs
@@ -1,81 +1,111 @@
-"""CostPilot — EC2 & RDS Rightsizing Recommendations.
+"""CostPilot — EC2, RDS, ElastiCache & EBS Rightsizing Recommendations.
 
 Analyzes CloudWatch CPU/memory metrics and recommends
-downsizing underutilized instances.
+downsizing underutilized instances, database instances and cache
+nodes, and moving EBS volumes to gp3 or fewer provisioned IOPS.
+Every engine fetches its metrics in one batched GetMetricData sweep.
 """
 
 import logging
+import warnings
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, Optional
 
 import boto3
+import numpy as np
+
+from .attribution import ResourceCostIndex
 from .config import Config
+from .history import ScanHistory
+from .metrics import AGENT_DISK_METRIC, AGENT_MEMORY_METRICS, AGENT_NAMESPACE, MetricFetcher, MetricQuery
+from .models import RightsizeRecommendation
+from .pricing import PriceCatalog, cache_engine, db_deployment, db_engine
+from .sizing import BYTES_PER_HOUR_TO_MBPS, SizingEngine
 
 logger = logging.getLogger(__name__)
 
-# EC2 instance pricing (us-east-1 On-Demand, approximate)
-EC2_PRICING = {
-    "t3.nano": 0.0052, "t3.micro": 0.0104, "t3.small": 0.0208,
-    "t3.medium": 0.0416, "t3.large": 0.0832, "t3.xlarge": 0.1664,
-    "m5.large": 0.096, "m5.xlarge": 0.192, "m5.2xlarge": 0.384,
-    "m6i.large": 0.096, "m6i.xlarge": 0.192, "m6i.2xlarge": 0.384,
-    "c5.large": 0.085, "c5.xlarge": 0.170, "c5.2xlarge": 0.340,
-    "r5.large": 0.126, "r5.xlarge": 0.252, "r5.2xlarge": 0.504,
-}
-
-DOWNSIZE_MAP = {
-    "t3.xlarge": "t3.large", "t3.large": "t3.medium", "t3.medium": "t3.small",
-    "m5.2xlarge": "m5.xlarge", "m5.xlarge": "m5.large",
-    "m6i.2xlarge": "m6i.xlarge", "m6i.xlarge": "m6i.large",
-    "c5.2xlarge": "c5.xlarge", "c5.xlarge": "c5.large",
-    "r5.2xlarge": "r5.xlarge", "r5.xlarge": "r5.large",
-}
+# Memory each connection claims under the default max_connections formula, per database engine
+CONNECTION_BYTES = {"PostgreSQL": 9_531_392, "Aurora PostgreSQL": 9_531_392}
+DEFAULT_CONNECTION_BYTES = 12_582_880  # MySQL, MariaDB, Aurora MySQL
+# Buffer cache the default parameter group sizes from instance memory
+# (innodb_buffer_pool_size, shared_buffers); it stays allocated however idle
+CACHE_MEMORY_SHARE = {"MySQL": 0.75, "MariaDB": 0.75, "Aurora MySQL": 0.75, "PostgreSQL": 0.25}
+GIB = 2 ** 30
 
 
 class RightSizer:
-    """Analyze EC2 instances and recommend rightsizing."""
+    """Analyze EC2 instances by CPU, network and (with the CloudWatch agent) memory, and recommend rightsizing."""
 
-    def __init__(self, config: Config) -> None:
+    def __init__(
+        self,
+        config: Config,
+        catalog: PriceCatalog | None = None,
+        costs: Optional[ResourceCostIndex] = None,
+        history: Optional[ScanHistory] = None,
+    ) -> None:
         self.session = config.get_session()
+        self.region = self.session.region_name or "us-east-1"
         self.ec2 = self.session.client("ec2")
         self.cw = self.session.client("cloudwatch")
+        self.metrics = MetricFetcher(self.cw, history)
+        self.catalog = catalog or PriceCatalog.load()
+        self.engine = SizingEngine(self.catalog)
+        self.costs = costs
+        self.instances_analyzed = 0
 
-    def analyze(self, cpu_threshold: float = 30.0, days: int = 14) -> dict[str, Any]:
-        """Analyze all running EC2 instances for rightsizing."""
+    def fetch(self, cpu_threshold: float = 30.0, days: int = 14) -> list[RightsizeRecommendation]:
+        """Rightsizing recommendations for all running EC2 instances, largest savings first."""
         instances = self._get_running_instances()
+        self.instances_analyzed = len(instances)
         logger.info(f"Analyzing {len(instances)} running instances")
+        if not instances:
+            return []
 
-        recommendations = []
-        total_savings = 0.0
+        start, end = _window(days)
+        cpu, network, memory, disk = self._get_utilization(instances, start, end)
+        names = {inst["InstanceId"]: self._get_name_tag(inst) for inst in instances}
+        disks = {inst["InstanceId"]: pct for inst, pct in zip(instances, disk.tolist()) if not np.isnan(pct)}
 
-        for inst in instances:
-            instance_id = inst["InstanceId"]
-            instance_type = inst["InstanceType"]
-            avg_cpu = self._get_avg_cpu(instance_id, days)
-
-            if avg_cpu is not None and avg_cpu < cpu_threshold:
-                recommended = DOWNSIZE_MAP.get(instance_type)
-                if recommended:
-                    current_cost = EC2_PRICING.get(instance_type, 0) * 730  # Monthly
-                    new_cost = EC2_PRICING.get(recommended, 0) * 730
-                    savings = current_cost - new_cost
-
-                    recommendations.append({
-                        "instance_id": instance_id,
-                        "name": self._get_name_tag(inst),
-                        "current_type": instance_type,
-                        "recommended_type": recommended,
-                        "avg_cpu_percent": round(avg_cpu, 1),
-                        "current_monthly_cost": round(current_cost, 2),
-                        "recommended_monthly_cost": round(new_cost, 2),
-                        "monthly_savings": round(savings, 2),
-                    })
-                    total_savings += savings
+        recommendations = self.engine.recommend(
+            instances, cpu, self.region, network_mbps=network, memory=memory, cpu_threshold=cpu_threshold,
+            costs=self.costs,
+        )
+        for rec in recommendations:
+            rec.name = names.get(rec.resource_id, "")
+            if rec.resource_id in disks:
+                rec.max_disk_pct = round(disks[rec.resource_id], 1)
+        return recommendations
+
+    def analyze(self, cpu_threshold: float = 30.0, days: int = 14) -> dict[str, Any]:
+        """Analyze all running EC2 instances for rightsizing."""
+        return self.summarize(self.fetch(cpu_threshold, days), cpu_threshold)
 
+    def summarize(self, recommendations: list[RightsizeRecommendation], cpu_threshold: float) -> dict[str, Any]:
+        """Dict view of :meth:`fetch` results."""
+        rows = [
+            {
+                "instance_id": rec.resource_id,
+                "name": rec.name,
+                "current_type": rec.current_type,
+                "recommended_type": rec.recommended_type,
+                "avg_cpu_percent": rec.avg_cpu_pct,
+                "p95_cpu_percent": rec.p95_cpu_pct,
+                "max_cpu_percent": rec.max_cpu_pct,
+                "avg_network_mbps": rec.avg_network_mbps,
+                "max_memory_percent": rec.max_memory_pct,
+                "max_disk_percent": rec.max_disk_pct,
+                "current_monthly_cost": rec.current_monthly_cost,
+                "recommended_monthly_cost": rec.projected_monthly_cost,
+                "monthly_savings": rec.monthly_savings,
+                "confidence": rec.confidence.value,
+                "cost_source": rec.cost_source.value,
+            }
+            for rec in recommendations
+        ]
         return {
-            "instances_analyzed": len(instances),
-            "recommendations": recommendations,
-            "potential_savings": round(total_savings, 2),
+            "instances_analyzed": self.instances_analyzed,
+            "recommendations": rows,
+            "potential_savings": round(sum(r["monthly_savings"] for r in rows), 2),
             "cpu_threshold": cpu_threshold,
         }
 
@@ -88,30 +118,291 @@ class RightSizer:
                 instances.extend(res["Instances"])
         return instances
 
-    def _get_avg_cpu(self, instance_id: str, days: int) -> float | None:
-        """Get average CPU utilization over the period."""
-        end = datetime.now(timezone.utc)
-        start = end - timedelta(days=days)
-        try:
-            response = self.cw.get_metric_statistics(
-                Namespace="AWS/EC2",
-                MetricName="CPUUtilization",
-                Dimensions=[{"Name": "InstanceId", "Value": instance_id}],
-                StartTime=start, EndTime=end,
-                Period=3600, Statistics=["Average"],
-            )
-            points = response.get("Datapoints", [])
-            if not points:
-                return None
-            return sum(p["Average"] for p in points) / len(points)
-        except Exception as e:
-            logger.warning(f"Failed to get CPU for {instance_id}: {e}")
-            return None
+    def _get_utilization(
+        self, instances: list[dict], start: datetime, end: datetime
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Fetch hourly CPU %, network Mbps and memory % for every instance in one batched sweep.
+
+        Memory and disk come from the CloudWatch agent; their series are
+        found with ListMetrics and joined by instance ID. Instances
+        without the agent get an all-NaN memory row. The fourth array is
+        each instance's fullest disk, in percent (NaN without the agent).
+
+        With a scan history only the hours since the last run are fetched.
+        """
+        ids = [inst["InstanceId"] for inst in instances]
+        memory_dims: dict[str, tuple[str, tuple[tuple[str, str], ...]]] = {}
+        for metric in AGENT_MEMORY_METRICS:
+            for instance_id, sets in self.metrics.dimension_sets(AGENT_NAMESPACE, metric, "InstanceId", ids).items():
+                memory_dims.setdefault(instance_id, (metric, sets[0]))
+        disk_dims = self.metrics.dimension_sets(AGENT_NAMESPACE, AGENT_DISK_METRIC, "InstanceId", ids)
+
+        queries, memory_queries, disk_queries, memory_rows, disk_rows = [], [], [], [], []
+        for row, inst in enumerate(instances):
+            instance_id = inst["InstanceId"]
+            dims = (("InstanceId", instance_id),)
+            queries.append(MetricQuery(f"{instance_id}:cpu", "AWS/EC2", "CPUUtilization", dims, "Average"))
+            queries.append(MetricQuery(f"{instance_id}:in", "AWS/EC2", "NetworkIn", dims, "Sum"))
+            queries.append(MetricQuery(f"{instance_id}:out", "AWS/EC2", "NetworkOut", dims, "Sum"))
+            if instance_id in memory_dims:
+                metric, agent_dims = memory_dims[instance_id]
+                memory_rows.append(row)
+                memory_queries.append(MetricQuery(f"{instance_id}:mem", AGENT_NAMESPACE, metric, agent_dims, "Maximum"))
+            for n, agent_dims in enumerate(disk_dims.get(instance_id, [])):
+                disk_rows.append(row)
+                disk_queries.append(
+                    MetricQuery(f"{instance_id}:disk{n}", AGENT_NAMESPACE, AGENT_DISK_METRIC, agent_dims, "Maximum")
+                )
+        queries += memory_queries + disk_queries
+        # Keys start with the instance ID; cached hours are dropped when its type changes
+        types = {inst["InstanceId"]: inst["InstanceType"] for inst in instances}
+        fingerprints = {q.key: types[q.key.split(":", 1)[0]] for q in queries}
+        grid, _ = self.metrics.grid(queries, start, end, fingerprints)
+        n = len(instances)
+        cpu, net_in, net_out = grid[0:3 * n:3], grid[1:3 * n:3], grid[2:3 * n:3]
+        network = _hourly_total(net_in, net_out) * BYTES_PER_HOUR_TO_MBPS
+
+        memory = np.full(cpu.shape, np.nan)
+        memory[memory_rows] = grid[3 * n:3 * n + len(memory_rows)]
+        disk = np.full(n, np.nan)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            # Fullest filesystem per instance; fmax skips filesystems that didn't report
+            np.fmax.at(disk, disk_rows, np.nanmax(grid[3 * n + len(memory_rows):], axis=1) if disk_rows else [])
+        return cpu, network, memory, disk
 
     @staticmethod
     def _get_name_tag(instance: dict) -> str:
         """Extract Name tag from instance."""
-        for tag in instance.get("Tags", []):
-            if tag["Key"] == "Name":
-                return tag["Value"]
-        return ""
+        return _name_tag(instance.get("Tags", []))
+
+
+class DatabaseRightSizer:
+    """Analyze RDS instances by CPU, connections and freeable memory."""
+
+    def __init__(
+        self,
+        config: Config,
+        catalog: PriceCatalog | None = None,
+        costs: Optional[ResourceCostIndex] = None,
+        history: Optional[ScanHistory] = None,
+    ) -> None:
+        self.session = config.get_session()
+        self.region = self.session.region_name or "us-east-1"
+        self.rds = self.session.client("rds")
+        self.metrics = MetricFetcher(self.session.client("cloudwatch"), history)
+        self.catalog = catalog or PriceCatalog.load()
+        self.engine = SizingEngine(self.catalog)
+        self.costs = costs
+        self.instances_analyzed = 0
+
+    def fetch(self, cpu_threshold: float = 30.0, days: int = 14) -> list[RightsizeRecommendation]:
+        """Rightsizing recommendations for all available RDS instances, largest savings first.
+
+        Memory demand is what FreeableMemory leaves in use at its lowest,
+        less the engine's default buffer cache, which is sized from the
+        instance class and shrinks with it. A target must also keep
+        enough memory for the busiest hour's connections under the
+        engine's default ``max_connections``.
+        """
+        databases = [
+            db
+            for page in self.rds.get_paginator("describe_db_instances").paginate()
+            for db in page.get("DBInstances", [])
+            if db.get("DBInstanceStatus") == "available"
+        ]
+        self.instances_analyzed = len(databases)
+        logger.info(f"Analyzing {len(databases)} RDS instances")
+        if not databases:
+            return []
+
+        start, end = _window(days)
+        queries, fingerprints = [], {}
+        for db in databases:
+            db_id = db["DBInstanceIdentifier"]
+            dims = (("DBInstanceIdentifier", db_id),)
+            queries.append(MetricQuery(f"rds:{db_id}:cpu", "AWS/RDS", "CPUUtilization", dims, "Average"))
+            queries.append(MetricQuery(f"rds:{db_id}:connections", "AWS/RDS", "DatabaseConnections", dims, "Maximum"))
+            queries.append(MetricQuery(f"rds:{db_id}:free", "AWS/RDS", "FreeableMemory", dims, "Minimum"))
+            for q in queries[-3:]:
+                fingerprints[q.key] = db["DBInstanceClass"]
+        grid, _ = self.metrics.grid(queries, start, end, fingerprints)
+        cpu, connections, free = grid[0::3], grid[1::3], grid[2::3]
+
+        types = [db["DBInstanceClass"] for db in databases]
+        engines = [db_engine(db) for db in databases]
+        memory_gib = np.array([spec.memory_gib if (spec := self.catalog.spec(t)) else np.nan for t in types])
+        memory = np.clip(100 * (1 - free / (memory_gib[:, None] * GIB)), 0, 100)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            peak_connections = np.nanmax(connections, axis=1)
+        connection_bytes = np.array([CONNECTION_BYTES.get(e, DEFAULT_CONNECTION_BYTES) for e in engines])
+        min_memory = peak_connections / (1 - self.engine.headroom) * connection_bytes / GIB
+
+        recommendations = self.engine.size(
+            "rds",
+            [db["DBInstanceIdentifier"] for db in databases],
+            types,
+            [(engine, db_deployment(db)) for engine, db in zip(engines, databases)],
+            cpu,
+            self.region,
+            memory=memory,
+            cpu_threshold=cpu_threshold,
+            costs=self.costs,
+            min_memory_gib=min_memory,
+            cache_memory_share=np.array([CACHE_MEMORY_SHARE.get(e, 0.0) for e in engines]),
+        )
+        names = {db["DBInstanceIdentifier"]: _name_tag(db.get("TagList", [])) for db in databases}
+        for rec in recommendations:
+            rec.name = names.get(rec.resource_id, "")
+        return recommendations
+
+
+class CacheRightSizer:
+    """Analyze ElastiCache clusters by node CPU and freeable memory."""
+
+    def __init__(
+        self,
+        config: Config,
+        catalog: PriceCatalog | None = None,
+        costs: Optional[ResourceCostIndex] = None,
+        history: Optional[ScanHistory] = None,
+    ) -> None:
+        self.session = config.get_session()
+        self.region = self.session.region_name or "us-east-1"
+        self.elasticache = self.session.client("elasticache")
+        self.metrics = MetricFetcher(self.session.client("cloudwatch"), history)
+        self.catalog = catalog or PriceCatalog.load()
+        self.engine = SizingEngine(self.catalog)
+        self.costs = costs
+        self.clusters_analyzed = 0
+
+    def fetch(self, cpu_threshold: float = 30.0, days: int = 14) -> list[RightsizeRecommendation]:
+        """Node type recommendations for all available cache clusters, largest savings first.
+
+        A cluster is sized by its busiest node each hour, and priced for
+        all of its nodes.
+        """
+        clusters = [
+            cluster
+            for page in self.elasticache.get_paginator("describe_cache_clusters").paginate(ShowCacheNodeInfo=True)
+            for cluster in page.get("CacheClusters", [])
+            if cluster.get("CacheClusterStatus") == "available"
+        ]
+        self.clusters_analyzed = len(clusters)
+        logger.info(f"Analyzing {len(clusters)} ElastiCache clusters")
+        if not clusters:
+            return []
+
+        start, end = _window(days)
+        queries, fingerprints, bounds = [], {}, [0]
+        for cluster in clusters:
+            cluster_id = cluster["CacheClusterId"]
+            for node in cluster.get("CacheNodes") or [{"CacheNodeId": "0001"}]:
+                dims = (("CacheClusterId", cluster_id), ("CacheNodeId", node["CacheNodeId"]))
+                key = f"elasticache:{cluster_id}:{node['CacheNodeId']}"
+                queries.append(MetricQuery(f"{key}:cpu", "AWS/ElastiCache", "CPUUtilization", dims, "Average"))
+                queries.append(MetricQuery(f"{key}:free", "AWS/ElastiCache", "FreeableMemory", dims, "Minimum"))
+                for q in queries[-2:]:
+                    fingerprints[q.key] = cluster["CacheNodeType"]
+            bounds.append(len(queries) // 2)
+        grid, _ = self.metrics.grid(queries, start, end, fingerprints)
+        node_cpu, node_free = grid[0::2], grid[1::2]
+        # Busiest node per cluster and hour; fmax/fmin skip nodes that didn't report
+        cpu = np.stack([np.fmax.reduce(node_cpu[a:b]) for a, b in zip(bounds, bounds[1:])])
+        free = np.stack([np.fmin.reduce(node_free[a:b]) for a, b in zip(bounds, bounds[1:])])
+
+        types = [cluster["CacheNodeType"] for cluster in clusters]
+        memory_gib = np.array([spec.memory_gib if (spec := self.catalog.spec(t)) else np.nan for t in types])
+        memory = np.clip(100 * (1 - free / (memory_gib[:, None] * GIB)), 0, 100)
+
+        return self.engine.size(
+            "elasticache",
+            [cluster["CacheClusterId"] for cluster in clusters],
+            types,
+            [(cache_engine(cluster), "Shared") for cluster in clusters],
+            cpu,
+            self.region,
+            memory=memory,
+            cpu_threshold=cpu_threshold,
+            costs=self.costs,
+            units=[cluster.get("NumCacheNodes", 1) for cluster in clusters],
+        )
+
+
+class VolumeRightSizer:
+    """Analyze in-use gp2 and provisioned-IOPS EBS volumes by I/O rate and throughput."""
+
+    VOLUME_TYPES = ["gp2", "io1", "io2"]
+
+    def __init__(
+        self,
+        config: Config,
+        catalog: PriceCatalog | None = None,
+        costs: Optional[ResourceCostIndex] = None,
+        history: Optional[ScanHistory] = None,
+    ) -> None:
+        self.session = config.get_session()
+        self.region = self.session.region_name or "us-east-1"
+        self.ec2 = self.session.client("ec2")
+        self.metrics = MetricFetcher(self.session.client("cloudwatch"), history)
+        self.catalog = catalog or PriceCatalog.load()
+        self.engine = SizingEngine(self.catalog)
+        self.costs = costs
+        self.volumes_analyzed = 0
+
+    def fetch(self, days: int = 14) -> list[RightsizeRecommendation]:
+        """gp3 and provisioned-IOPS recommendations for attached volumes, largest savings first."""
+        volumes = [
+            vol
+            for page in self.ec2.get_paginator("describe_volumes").paginate(
+                Filters=[
+                    {"Name": "status", "Values": ["in-use"]},
+                    {"Name": "volume-type", "Values": self.VOLUME_TYPES},
+                ],
+                PaginationConfig={"PageSize": 1000},
+            )
+            for vol in page.get("Volumes", [])
+        ]
+        self.volumes_analyzed = len(volumes)
+        logger.info(f"Analyzing {len(volumes)} gp2/io1/io2 volumes")
+        if not volumes:
+            return []
+
+        start, end = _window(days)
+        metric_names = ("VolumeReadOps", "VolumeWriteOps", "VolumeReadBytes", "VolumeWriteBytes")
+        queries, fingerprints = [], {}
+        for vol in volumes:
+            dims = (("VolumeId", vol["VolumeId"]),)
+            for metric in metric_names:
+                query = MetricQuery(f"{vol['VolumeId']}:{metric}", "AWS/EBS", metric, dims, "Sum")
+                queries.append(query)
+                fingerprints[query.key] = f"{vol['VolumeType']}:{vol.get('Iops', 0)}"
+        grid, _ = self.metrics.grid(queries, start, end, fingerprints)
+        iops = _hourly_total(grid[0::4], grid[1::4]) / 3600
+        mibps = _hourly_total(grid[2::4], grid[3::4]) / 3600 / 2 ** 20
+
+        recommendations = self.engine.recommend_volumes(volumes, iops, mibps, self.region, costs=self.costs)
+        names = {vol["VolumeId"]: _name_tag(vol.get("Tags", [])) for vol in volumes}
+        for rec in recommendations:
+            rec.name = names.get(rec.resource_id, "")
+        return recommendations
+
+
+def _window(days: int) -> tuple[datetime, datetime]:
+    """The ``days`` before the current hour."""
+    end = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return end - timedelta(days=days), end
+
+
+def _hourly_total(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """``a + b`` per hour; an hour counts as observed if either series reported."""
+    return np.where(np.isnan(a) & np.isnan(b), np.nan, np.nan_to_num(a) + np.nan_to_num(b))
+
+
+def _name_tag(tags: list[dict]) -> str:
+    """Value of the ``Name`` tag, or an empty string."""
+    for tag in tags:
+        if tag["Key"] == "Name":
+            return tag["Value"]
+    return ""
@@ -0,0 +1,413 @@
+"""CostPilot — S3 Storage Waste Analyzer.
+
+Finds S3 spend that lifecycle configuration would remove:
+
+- **Incomplete multipart uploads** — parts of uploads started over a
+  week ago and never completed or aborted, billed as Standard storage
+- **Noncurrent-version bloat** — old versions making up a large share
+  of a versioned bucket, with no rule expiring them
+- **Tiering candidates** — Standard objects old enough for
+  Intelligent-Tiering (30+ days) or Glacier Instant Retrieval (180+ days)
+
+Buckets with no lifecycle rules at all are reported as advisories: the
+missing configuration costs nothing by itself, and what it lets
+accumulate is priced by the findings above, so they stay out of the
+savings totals.
+
+Version and object-age findings need S3 Inventory reports,
+which are streamed batch by batch (CSV or Parquet, local or ``s3://``)
+and reduced to per-bucket counters, so memory doesn't grow with the
+number of rows.
+
+Inventory reading requires the optional ``pyarrow`` dependency
+(``pip install costpilot[cur]``).
+"""
+
+import json
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+import numpy as np
+
+from .config import Config
+from .models import ResourceType, UnusedResource
+
+logger = logging.getLogger(__name__)
+
+GB = 1024 ** 3
+
+# us-east-1 storage price per GB-month by storage class; classes not
+# listed are priced as Standard
+S3_PRICES = {
+    "STANDARD": 0.023,
+    "REDUCED_REDUNDANCY": 0.024,
+    "STANDARD_IA": 0.0125,
+    "ONEZONE_IA": 0.01,
+    "INTELLIGENT_TIERING": 0.023,  # the inventory doesn't say which tier; frequent access
+    "INTELLIGENT_TIERING_IA": 0.0125,
+    "GLACIER_IR": 0.004,
+    "GLACIER": 0.0036,
+    "DEEP_ARCHIVE": 0.00099,
+}
+# Intelligent-Tiering monitoring fee per 1,000 objects a month
+IT_MONITORING_PER_1000 = 0.0025
+
+STALE_UPLOAD_DAYS = 7
+IT_MIN_AGE_DAYS = 30
+GLACIER_MIN_AGE_DAYS = 180
+# Objects under 128 KiB aren't tiered by Intelligent-Tiering and are billed
+# as 128 KiB in Glacier Instant Retrieval
+MIN_TIERING_SIZE = 128 * 1024
+# Noncurrent versions above this share of current data count as bloat
+NONCURRENT_BLOAT_SHARE = 0.2
+# Uploads whose parts are listed to size stale uploads; the rest are extrapolated
+MAX_SIZED_UPLOADS = 20
+
+INVENTORY_COLUMNS = ["Bucket", "IsLatest", "IsDeleteMarker", "Size", "LastModifiedDate", "StorageClass"]
+INVENTORY_BATCH_BYTES = 16 << 20
+
+
+@dataclass(slots=True)
+class InventoryStats:
+    """Per-bucket counters reduced from S3 Inventory rows."""
+    bucket: str
+    rows: int = 0
+    current_objects: int = 0
+    current_bytes: int = 0
+    noncurrent_objects: int = 0
+    noncurrent_bytes: int = 0
+    noncurrent_class_bytes: dict[str, int] = field(default_factory=dict)  # storage class → bytes
+    delete_markers: int = 0
+    it_objects: int = 0       # Standard, 30–180 days old, 128 KiB or more
+    it_bytes: int = 0
+    glacier_objects: int = 0  # Standard or Standard-IA, 180+ days old, 128 KiB or more
+    glacier_bytes: int = 0
+    glacier_standard_bytes: int = 0  # the Standard share of glacier_bytes
+
+
+@dataclass(slots=True)
+class BucketState:
+    """A bucket's lifecycle configuration and stale uploads, as fetched from S3."""
+    name: str
+    rules: Optional[list[dict]] = None  # None when the configuration couldn't be read
+    stale_uploads: int = 0
+    stale_upload_bytes: float = 0.0
+
+
+class InventoryManifest:
+    """An S3 Inventory ``manifest.json`` and the data files it lists."""
+
+    def __init__(self, location: str, data: dict) -> None:
+        self.location = location
+        self.source_bucket = data["sourceBucket"]
+        self.destination_bucket = data.get("destinationBucket", "").rsplit(":", 1)[-1]
+        self.file_format = data.get("fileFormat", "CSV").upper()
+        self.schema = [c.strip() for c in data.get("fileSchema", "").split(",") if c.strip()]
+        self.files = [f["key"] for f in data.get("files", [])]
+
+    @classmethod
+    def load(cls, location: str, s3: Any = None) -> "InventoryManifest":
+        """Read a manifest from a local path or ``s3://bucket/key``."""
+        if location.startswith("s3://"):
+            bucket, key = location[5:].split("/", 1)
+            body = s3.get_object(Bucket=bucket, Key=key)["Body"].read()
+            return cls(location, json.loads(body))
+        return cls(location, json.loads(Path(location).read_text()))
+
+
+class InventoryReader:
+    """Stream S3 Inventory data files into per-bucket :class:`InventoryStats`."""
+
+    def __init__(self, s3: Any = None, now: Optional[datetime] = None) -> None:
+        self.s3 = s3
+        self.now = now or datetime.now(timezone.utc)
+
+    def read(self, manifest: InventoryManifest) -> InventoryStats:
+        """Reduce every data file of an inventory. Unreadable files are skipped with a warning."""
+        stats = InventoryStats(manifest.source_bucket)
+        for key in manifest.files:
+            try:
+                for batch in self._batches(manifest, key):
+                    self._add(stats, batch)
+            except Exception as e:
+                logger.warning(f"Skipping inventory file {key}: {e}")
+        logger.info(f"Read {stats.rows:,} inventory rows for s3://{stats.bucket}")
+        return stats
+
+    def _batches(self, manifest: InventoryManifest, key: str) -> Iterator[Any]:
+        import pyarrow as pa
+        import pyarrow.csv as csv
+        import pyarrow.parquet as pq
+
+        columns = [c for c in INVENTORY_COLUMNS if c in manifest.schema]
+        if manifest.file_format == "CSV":
+            types = {
+                "Size": pa.int64(),
+                "LastModifiedDate": pa.timestamp("ms", "UTC"),
+                "IsLatest": pa.bool_(),
+                "IsDeleteMarker": pa.bool_(),
+            }
+            # Inventory CSVs are gzipped and headerless; fileSchema names the columns
+            with self._open(manifest, key) as raw:
+                stream = pa.CompressedInputStream(pa.PythonFile(raw, mode="r"), "gzip")
+                reader = csv.open_csv(
+                    stream,
+                    read_options=csv.ReadOptions(column_names=manifest.schema, block_size=INVENTORY_BATCH_BYTES),
+                    convert_options=csv.ConvertOptions(
+                        column_types={k: v for k, v in types.items() if k in columns}, include_columns=columns
+                    ),
+                )
+                yield from reader
+        elif manifest.file_format == "PARQUET":
+            # Parquet needs random access; S3 files go through a temporary file
+            with self._open(manifest, key, seekable=True) as raw:
+                yield from pq.ParquetFile(raw).iter_batches(batch_size=131_072, columns=columns)
+        else:
+            raise ValueError(f"unsupported inventory format {manifest.file_format}")
+
+    def _open(self, manifest: InventoryManifest, key: str, seekable: bool = False) -> Any:
+        if manifest.location.startswith("s3://"):
+            if seekable:
+                tmp = tempfile.TemporaryFile()
+                self.s3.download_fileobj(manifest.destination_bucket, key, tmp)
+                tmp.seek(0)
+                return tmp
+            return _Closing(self.s3.get_object(Bucket=manifest.destination_bucket, Key=key)["Body"])
+        # A downloaded inventory: data files next to the manifest, or in its data/ directory
+        base = Path(manifest.location).parent
+        name = key.rsplit("/", 1)[-1]
+        for path in (base / key, base / "data" / name, base / name):
+            if path.exists():
+                return open(path, "rb")
+        raise FileNotFoundError(key)
+
+    def _add(self, stats: InventoryStats, batch: Any) -> None:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        n = batch.num_rows
+        if n == 0:
+            return
+        names = batch.schema.names
+
+        def column(name: str, default: Any) -> np.ndarray:
+            if name not in names:
+                return np.full(n, default)
+            values = batch.column(name)
+            return values.fill_null(default).to_numpy(zero_copy_only=False)
+
+        size = column("Size", 0).astype(np.int64)
+        latest = column("IsLatest", True).astype(bool)
+        marker = column("IsDeleteMarker", False).astype(bool)
+        if "StorageClass" in names:
+            storage = batch.column("StorageClass").cast(pa.string()).fill_null("STANDARD")
+            standard = pc.equal(storage, "STANDARD").to_numpy(zero_copy_only=False)
+            infrequent = pc.equal(storage, "STANDARD_IA").to_numpy(zero_copy_only=False)
+        else:
+            storage = pa.repeat("STANDARD", n)
+            standard, infrequent = np.ones(n, dtype=bool), np.zeros(n, dtype=bool)
+        if "LastModifiedDate" in names:
+            modified = batch.column("LastModifiedDate").cast(pa.timestamp("ms", "UTC")).cast(pa.int64())
+            modified = modified.fill_null(0).to_numpy(zero_copy_only=False)
+        else:
+            modified = np.zeros(n, dtype=np.int64)
+        age_ms = int(self.now.timestamp() * 1000) - modified
+
+        current = latest & ~marker
+        noncurrent = ~latest & ~marker
+        big = current & (size >= MIN_TIERING_SIZE)
+        glacier = big & (standard | infrequent) & (age_ms >= GLACIER_MIN_AGE_DAYS * 86_400_000)
+        tiering = big & standard & ~glacier & (age_ms >= IT_MIN_AGE_DAYS * 86_400_000)
+
+        stats.rows += n
+        stats.current_objects += int(current.sum())
+        stats.current_bytes += int(size[current].sum())
+        stats.noncurrent_objects += int(noncurrent.sum())
+        stats.noncurrent_bytes += int(size[noncurrent].sum())
+        if noncurrent.any():
+            by_class = pa.table({"storage": storage, "size": size}).filter(pa.array(noncurrent)) \
+                .group_by("storage").aggregate([("size", "sum")])
+            for storage_class, total in zip(by_class["storage"].to_pylist(), by_class["size_sum"].to_pylist()):
+                stats.noncurrent_class_bytes[storage_class] = stats.noncurrent_class_bytes.get(storage_class, 0) + total
+        stats.delete_markers += int(marker.sum())
+        stats.it_objects += int(tiering.sum())
+        stats.it_bytes += int(size[tiering].sum())
+        stats.glacier_objects += int(glacier.sum())
+        stats.glacier_bytes += int(size[glacier].sum())
+        stats.glacier_standard_bytes += int(size[glacier & standard].sum())
+
+
+class _Closing:
+    """Context manager around a streaming body that has ``read`` but no ``__enter__``."""
+
+    def __init__(self, body: Any) -> None:
+        self.body = body
+
+    def __enter__(self) -> Any:
+        return self.body
+
+    def __exit__(self, *exc) -> None:
+        self.body.close()
+
+
+class S3Analyzer:
+    """Find S3 storage that lifecycle rules, cleanup or tiering would save."""
+
+    def __init__(self, config: Config, max_workers: int = 8) -> None:
+        self.session = config.get_session()
+        self.region = self.session.region_name or "us-east-1"
+        self.s3 = self.session.client("s3")
+        self.max_workers = max_workers
+        self.buckets: dict[str, BucketState] = {}
+        # Buckets without lifecycle rules, from the last fetch; kept out of the savings totals
+        self.advisories: list[UnusedResource] = []
+
+    def fetch(self, inventories: tuple[str, ...] | list[str] = ()) -> list[UnusedResource]:
+        """Findings for every bucket in the region, largest savings first.
+
+        ``inventories`` are S3 Inventory manifest locations; buckets
+        without one only get configuration and multipart findings.
+        """
+        names = self._list_buckets()
+        logger.info(f"Checking {len(names)} S3 buckets in {self.region}")
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            states = list(pool.map(self._bucket_state, names))
+        self.buckets = {state.name: state for state in states}
+
+        stats: dict[str, InventoryStats] = {}
+        reader = InventoryReader(self.s3)
+        for location in inventories:
+            try:
+                manifest = InventoryManifest.load(location, self.s3)
+            except Exception as e:
+                logger.warning(f"Could not read inventory manifest {location}: {e}")
+                continue
+            stats[manifest.source_bucket] = reader.read(manifest)
+
+        findings = []
+        for state in states:
+            findings.extend(self.findings(state, stats.get(state.name)))
+        self.advisories = [
+            self.no_lifecycle(state, stats.get(state.name)) for state in states if state.rules == []
+        ]
+        if self.advisories:
+            logger.info(f"{len(self.advisories)} S3 buckets have no lifecycle rules")
+        return sorted(findings, key=lambda f: -f.monthly_cost)
+
+    def no_lifecycle(self, state: BucketState, inventory: Optional[InventoryStats] = None) -> UnusedResource:
+        """Zero-cost advisory for a bucket without lifecycle rules, sized from its inventory when read."""
+        size = inventory.current_bytes + inventory.noncurrent_bytes if inventory else 0
+        return UnusedResource(
+            resource_id=state.name,
+            resource_type=ResourceType.S3_BUCKET,
+            region=self.region,
+            reason="Add lifecycle rules to expire old versions, abort stale uploads and tier old data",
+            subtype="no_lifecycle",
+            size_gb=round(size / GB, 2),
+        )
+
+    def findings(self, state: BucketState, inventory: Optional[InventoryStats] = None) -> list[UnusedResource]:
+        """Findings for one bucket from its configuration and inventory."""
+        rules = [r for r in (state.rules or []) if r.get("Status") == "Enabled"]
+        standard = S3_PRICES["STANDARD"]
+        results = []
+
+        def finding(kind: str, reason: str, monthly: float, gb: float) -> None:
+            results.append(UnusedResource(
+                resource_id=state.name,
+                resource_type=ResourceType.S3_BUCKET,
+                region=self.region,
+                reason=reason,
+                monthly_cost=round(max(monthly, 0.0), 2),
+                subtype=kind,
+                size_gb=round(gb, 2),
+            ))
+
+        if state.stale_uploads and not any("AbortIncompleteMultipartUpload" in r for r in rules):
+            gb = state.stale_upload_bytes / GB
+            finding("multipart", f"Abort {state.stale_uploads} incomplete multipart uploads older than "
+                    f"{STALE_UPLOAD_DAYS} days and add an AbortIncompleteMultipartUpload rule", gb * standard, gb)
+
+        if inventory is None:
+            return results
+
+        expires_noncurrent = any("NoncurrentVersionExpiration" in r for r in rules)
+        if (inventory.noncurrent_bytes > NONCURRENT_BLOAT_SHARE * inventory.current_bytes
+                and inventory.noncurrent_bytes and not expires_noncurrent):
+            gb = inventory.noncurrent_bytes / GB
+            share = inventory.noncurrent_bytes / max(inventory.current_bytes, 1) * 100
+            by_class = inventory.noncurrent_class_bytes or {"STANDARD": inventory.noncurrent_bytes}
+            monthly = sum(b / GB * S3_PRICES.get(c, standard) for c, b in by_class.items())
+            finding("noncurrent", f"Expire noncurrent versions ({inventory.noncurrent_objects:,} versions, "
+                    f"{share:.0f}% of current data)", monthly, gb)
+
+        # Buckets that already transition data are left to their rules
+        if any(r.get("Transitions") for r in rules):
+            return results
+        if inventory.it_bytes:
+            gb = inventory.it_bytes / GB
+            monthly = gb * (standard - S3_PRICES["INTELLIGENT_TIERING_IA"]) \
+                - inventory.it_objects / 1000 * IT_MONITORING_PER_1000
+            if monthly > 0:
+                finding("intelligent_tiering", f"Move {inventory.it_objects:,} objects not modified in "
+                        f"{IT_MIN_AGE_DAYS}+ days to Intelligent-Tiering", monthly, gb)
+        if inventory.glacier_bytes:
+            gb = inventory.glacier_bytes / GB
+            standard_gb = inventory.glacier_standard_bytes / GB
+            monthly = standard_gb * standard + (gb - standard_gb) * S3_PRICES["STANDARD_IA"] \
+                - gb * S3_PRICES["GLACIER_IR"]
+            finding("glacier", f"Transition {inventory.glacier_objects:,} objects not modified in "
+                    f"{GLACIER_MIN_AGE_DAYS}+ days to Glacier Instant Retrieval", monthly, gb)
+        return results
+
+    # ------------------------------------------------------------------
+    # S3
+    # ------------------------------------------------------------------
+
+    def _list_buckets(self) -> list[str]:
+        names = []
+        for page in self.s3.get_paginator("list_buckets").paginate(BucketRegion=self.region):
+            names.extend(b["Name"] for b in page.get("Buckets", []))
+        return names
+
+    def _bucket_state(self, name: str) -> BucketState:
+        from botocore.exceptions import ClientError
+
+        state = BucketState(name)
+        try:
+            state.rules = self.s3.get_bucket_lifecycle_configuration(Bucket=name).get("Rules", [])
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "NoSuchLifecycleConfiguration":
+                state.rules = []
+            else:
+                logger.warning(f"Could not read lifecycle rules of {name}: {e}")
+        except Exception as e:
+            logger.warning(f"Could not read lifecycle rules of {name}: {e}")
+        try:
+            self._stale_uploads(state)
+        except Exception as e:
+            logger.warning(f"Could not list multipart uploads of {name}: {e}")
+        return state
+
+    def _stale_uploads(self, state: BucketState) -> None:
+        """Count uploads older than a week and size them from a sample of their parts."""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=STALE_UPLOAD_DAYS)
+        stale = []
+        for page in self.s3.get_paginator("list_multipart_uploads").paginate(Bucket=state.name):
+            stale.extend(u for u in page.get("Uploads", []) if u["Initiated"] < cutoff)
+        if not stale:
+            return
+        sized = stale[:MAX_SIZED_UPLOADS]
+        total = 0
+        for upload in sized:
+            for page in self.s3.get_paginator("list_parts").paginate(
+                Bucket=state.name, Key=upload["Key"], UploadId=upload["UploadId"]
+            ):
+                total += sum(p.get("Size", 0) for p in page.get("Parts", []))
+        state.stale_uploads = len(stale)
+        state.stale_upload_bytes = total / len(sized) * len(stale)
@@ -0,0 +1,160 @@
+"""CostPilot — Report Serialization.
+
+Encodes a ``CostReport`` as JSON or msgpack. Lists of models are stored
+column-wise (``{"fields": [...], "columns": [[...], ...]}``), so field
+names are written once per list rather than once per finding and most
+columns go straight to the encoder without per-item conversion.
+Datetimes are stored as epoch seconds, dates as ISO strings.
+
+msgpack output requires the optional ``msgpack`` dependency
+(``pip install costpilot[msgpack]``).
+"""
+
+import json
+import logging
+from dataclasses import fields, is_dataclass
+from datetime import date, datetime, timezone
+from enum import Enum
+from functools import lru_cache
+from pathlib import Path
+from types import UnionType
+from typing import Any, Callable, Optional, Union, get_args, get_origin, get_type_hints
+
+from .models import CostReport
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+FORMATS = ("json", "msgpack")
+
+Codec = tuple[Optional[Callable[[Any], Any]], Optional[Callable[[Any], Any]]]
+
+
+def dumps(report: CostReport, format: str = "json") -> bytes:
+    """Serialize a report to ``json`` or ``msgpack`` bytes."""
+    doc = to_document(report)
+    if format == "msgpack":
+        return _msgpack().packb(doc)
+    if format == "json":
+        return json.dumps(doc, separators=(",", ":")).encode()
+    raise ValueError(f"Unknown format {format!r}, expected one of {', '.join(FORMATS)}")
+
+
+def loads(data: bytes, format: str = "json") -> CostReport:
+    """Inverse of :func:`dumps`."""
+    if format == "msgpack":
+        doc = _msgpack().unpackb(data)
+    elif format == "json":
+        doc = json.loads(data)
+    else:
+        raise ValueError(f"Unknown format {format!r}, expected one of {', '.join(FORMATS)}")
+    return from_document(doc)
+
+
+def dump(report: CostReport, path: str | Path) -> None:
+    """Write a report; ``.msgpack``/``.mpk`` files use msgpack, anything else JSON."""
+    path = Path(path)
+    path.write_bytes(dumps(report, _format_for(path)))
+    logger.info(f"Saved report to {path}")
+
+
+def load(path: str | Path) -> CostReport:
+    path = Path(path)
+    return loads(path.read_bytes(), _format_for(path))
+
+
+def to_document(report: CostReport) -> dict:
+    """Plain JSON/msgpack-compatible structure for a report."""
+    return {"version": FORMAT_VERSION, "report": _encode_one(CostReport, report)}
+
+
+def from_document(doc: dict) -> CostReport:
+    if doc.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported report format version {doc.get('version')}")
+    return _decode_one(CostReport, doc["report"])
+
+
+def _format_for(path: Path) -> str:
+    return "msgpack" if path.suffix in (".msgpack", ".mpk") else "json"
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise ImportError("msgpack output requires the msgpack package (pip install costpilot[msgpack])") from None
+    return msgpack
+
+
+@lru_cache(maxsize=None)
+def _codecs(cls: type) -> tuple[tuple[str, Optional[Callable], Optional[Callable]], ...]:
+    """(field name, encoder, decoder) per field of a model; ``None`` means pass through."""
+    hints = get_type_hints(cls)
+    return tuple((f.name, *_codec(hints[f.name])) for f in fields(cls))
+
+
+def _codec(tp: Any) -> Codec:
+    origin = get_origin(tp)
+    if origin in (Union, UnionType):
+        args = [a for a in get_args(tp) if a is not type(None)]
+        if len(args) != 1:
+            return None, None
+        encode, decode = _codec(args[0])
+        return (
+            (lambda v: None if v is None else encode(v)) if encode else None,
+            (lambda v: None if v is None else decode(v)) if decode else None,
+        )
+    if origin is list:
+        (item,) = get_args(tp)
+        if is_dataclass(item):
+            return (lambda v: _encode_table(item, v)), (lambda v: _decode_table(item, v))
+        return None, None
+    if is_dataclass(tp):
+        return (lambda v: _encode_one(tp, v)), (lambda v: _decode_one(tp, v))
+    if tp is datetime:
+        # Epoch seconds encode ~5x faster than ISO strings; datetimes come back in UTC
+        return datetime.timestamp, lambda v: datetime.fromtimestamp(v, timezone.utc)
+    if tp is date:
+        return date.isoformat, date.fromisoformat
+    if isinstance(tp, type) and issubclass(tp, Enum):
+        # Model enums subclass str, which both encoders write as-is; decode by dict lookup
+        return None, {member.value: member for member in tp}.__getitem__
+    return None, None
+
+
+def _encode_one(cls: type, obj: Any) -> dict:
+    return {
+        name: encode(getattr(obj, name)) if encode else getattr(obj, name)
+        for name, encode, _ in _codecs(cls)
+    }
+
+
+def _decode_one(cls: type, data: dict) -> Any:
+    known = {name: decode for name, _, decode in _codecs(cls)}
+    return cls(**{
+        name: known[name](value) if known[name] else value
+        for name, value in data.items()
+        if name in known
+    })
+
+
+def _encode_table(cls: type, items: list) -> dict:
+    columns = []
+    for name, encode, _ in _codecs(cls):
+        column = [getattr(item, name) for item in items]
+        columns.append(list(map(encode, column)) if encode else column)
+    return {"fields": [name for name, _, _ in _codecs(cls)], "columns": columns}
+
+
+def _decode_table(cls: type, table: dict) -> list:
+    known = {name: decode for name, _, decode in _codecs(cls)}
+    names, columns = [], []
+    for name, column in zip(table["fields"], table["columns"]):
+        if name not in known:
+            continue
+        names.append(name)
+        columns.append(list(map(known[name], column)) if known[name] else column)
+    if names == [name for name, _, _ in _codecs(cls)]:
+        return [cls(*row) for row in zip(*columns)]
+    # Written by a different model version: match fields by name
+    return [cls(**dict(zip(names, row))) for row in zip(*columns)]
@@ -0,0 +1,92 @@
+"""CostPilot — Pooled AWS Sessions.
+
+``Config.get_session()`` hands every engine the same :class:`PooledSession`
+per account. Its ``client()`` creates each (region, service) client once
+and returns it to every later caller, so engines running in the same
+scan share one client per service. A shared client keeps its HTTP
+connection pool, and so its TLS connections, for the whole run.
+
+Sessions for other accounts assume a role in that account. The
+credentials are botocore refreshable credentials: they are fetched on
+first use and re-fetched shortly before they expire, from whichever
+thread notices first, so long multi-account scans never see an expired
+token and never re-assume a role that is still valid.
+"""
+
+import logging
+import threading
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+ROLE_SESSION_NAME = "costpilot"
+
+
+class PooledSession:
+    """A boto3 session whose clients are created once and shared.
+
+    Clients are thread-safe to use but not to create, so creation is
+    serialized here. ``client()`` calls with extra arguments (custom
+    endpoint, credentials, client config) bypass the pool. Everything
+    else is delegated to the wrapped boto3 session.
+    """
+
+    def __init__(self, session: Any, account: Optional[str] = None) -> None:
+        self.session = session
+        self.account = account
+        self._clients: dict[tuple[str, str], Any] = {}
+        self._lock = threading.Lock()
+
+    def client(self, service_name: str, region_name: Optional[str] = None, **kwargs: Any) -> Any:
+        if kwargs:
+            return self.session.client(service_name, region_name=region_name, **kwargs)
+        key = (region_name or self.session.region_name, service_name)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = self.session.client(service_name, region_name=key[0])
+            return client
+
+    @property
+    def clients(self) -> int:
+        """Number of pooled clients."""
+        return len(self._clients)
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "session":
+            raise AttributeError(name)
+        return getattr(self.session, name)
+
+
+def assumed_role_credentials(source: Any, role_arn: str, external_id: Optional[str] = None) -> Any:
+    """Auto-refreshing credentials for ``role_arn``, assumed with ``source``'s credentials.
+
+    ``source`` is a botocore session. AssumeRole calls go through an STS
+    client it creates, so they pass through its middleware hooks.
+    """
+    from botocore.credentials import AssumeRoleCredentialFetcher, DeferredRefreshableCredentials
+
+    extra_args = {"RoleSessionName": ROLE_SESSION_NAME}
+    if external_id:
+        extra_args["ExternalId"] = external_id
+    fetcher = AssumeRoleCredentialFetcher(
+        client_creator=source.create_client,
+        source_credentials=source.get_credentials(),
+        role_arn=role_arn,
+        extra_args=extra_args,
+    )
+    logger.info(f"Credentials for {role_arn} will be assumed on first use")
+    return DeferredRefreshableCredentials(refresh_using=fetcher.fetch_credentials, method="assume-role")
+
+
+def use_credentials(core: Any, credentials: Any) -> None:
+    """Make botocore session ``core`` resolve to ``credentials``."""
+    from botocore.credentials import CredentialProvider, CredentialResolver
+
+    class _Fixed(CredentialProvider):
+        METHOD = "costpilot-assume-role"
+
+        def load(self) -> Any:
+            return credentials
+
+    core.register_component("credential_provider", CredentialResolver(providers=[_Fixed()]))
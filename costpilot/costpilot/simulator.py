@@ -0,0 +1,188 @@
+"""CostPilot — Savings Plans / RI Purchase Simulator.
+
+Answers what-if questions ("what would a $12/hr Compute Savings Plan
+save?") over hourly on-demand usage, and searches for the commitment
+that maximizes net savings.
+
+Each hour, a Savings Plan covers usage in order of highest discount
+first, so covered on-demand spend is a sum of linear ramps in the
+commitment. The simulator sorts those ramps once; after that, any
+number of commitment levels are evaluated with a binary search each.
+"""
+
+import csv
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Typical 1-year, no-upfront Compute Savings Plan discount off On-Demand
+DEFAULT_SP_DISCOUNT = 0.28
+HOURS_PER_MONTH = 730
+# Days of CUR usage simulated by default
+CUR_WINDOW_DAYS = 30
+
+
+@dataclass
+class HourlyUsage:
+    """On-demand spend per (family, region) group and hour."""
+    groups: list[tuple[str, str]]
+    start: datetime
+    matrix: np.ndarray  # groups × hours, USD
+
+    @classmethod
+    def from_records(cls, records: Iterable[tuple[datetime, str, str, float]]) -> "HourlyUsage":
+        """Build from ``(hour, family, region, on_demand_cost)`` rows, e.g. CUR line items."""
+        rows = list(records)
+        if not rows:
+            return cls([], datetime.now(timezone.utc), np.zeros((0, 0)))
+        start = min(r[0] for r in rows)
+        hour = np.array([(r[0] - start).total_seconds() // 3600 for r in rows], dtype=np.int64)
+        index: dict[tuple[str, str], int] = {}
+        group = np.array([index.setdefault((r[1], r[2]), len(index)) for r in rows], dtype=np.int64)
+        matrix = np.zeros((len(index), int(hour.max()) + 1))
+        np.add.at(matrix, (group, hour), np.array([r[3] for r in rows], dtype=np.float64))
+        return cls(list(index), start, matrix)
+
+    @classmethod
+    def from_csv(cls, path: str) -> "HourlyUsage":
+        """Load a ``hour,family,region,cost`` CSV (hour in ISO 8601)."""
+        with open(path, newline="") as f:
+            return cls.from_records(
+                (datetime.fromisoformat(r["hour"]), r["family"], r["region"], float(r["cost"]))
+                for r in csv.DictReader(f)
+            )
+
+    @classmethod
+    def from_cur(cls, paths: str | list[str], days: int = CUR_WINDOW_DAYS) -> "HourlyUsage":
+        """Build from the last ``days`` days of On-Demand EC2 usage in CUR Parquet files.
+
+        Needs the optional ``pyarrow`` dependency.
+        """
+        from .cur import CurReader
+
+        reader = CurReader(paths)
+        latest = reader.latest_day()
+        if latest is None:
+            return cls.from_records([])
+        end = latest + timedelta(days=1)
+        table = reader.hourly_on_demand(end - timedelta(days=days), end)
+        hours = [h if h.tzinfo else h.replace(tzinfo=timezone.utc) for h in table["hour"].to_pylist()]
+        usage = cls.from_records(
+            zip(hours, table["family"].to_pylist(), table["region"].to_pylist(), table["cost"].to_pylist())
+        )
+        logger.info(f"Loaded {usage.hours} hours of On-Demand usage for {len(usage.groups)} families from the CUR")
+        return usage
+
+    @property
+    def hours(self) -> int:
+        return self.matrix.shape[1]
+
+
+@dataclass
+class Scenario:
+    """Outcome of one commitment level over the simulated window."""
+    commitment_hourly: float
+    on_demand_cost: float
+    covered_on_demand: float
+    commitment_cost: float
+    net_savings: float
+    utilization_pct: float
+    coverage_pct: float
+    monthly_savings: float
+
+
+class _RampSum:
+    """Σ slope · clip(c − lo, 0, hi − lo) over many ramps, for any array of c."""
+
+    def __init__(self, lo: np.ndarray, hi: np.ndarray, slope: np.ndarray) -> None:
+        x = np.concatenate([lo.ravel(), hi.ravel()])
+        w = np.concatenate([slope.ravel(), -slope.ravel()])
+        order = np.argsort(x, kind="stable")
+        self.x = x[order]
+        w = w[order]
+        self.w_cum = np.cumsum(w)
+        self.wx_cum = np.cumsum(w * self.x)
+
+    def __call__(self, c: np.ndarray) -> np.ndarray:
+        idx = np.searchsorted(self.x, c, side="right")
+        has = idx > 0
+        w = np.where(has, self.w_cum[np.maximum(idx - 1, 0)], 0.0)
+        wx = np.where(has, self.wx_cum[np.maximum(idx - 1, 0)], 0.0)
+        return c * w - wx
+
+
+class CommitmentSimulator:
+    """Vectorized Savings Plan / RI what-if evaluation over an hourly usage matrix."""
+
+    def __init__(self, usage: HourlyUsage, discounts: dict[str, float] | float = DEFAULT_SP_DISCOUNT) -> None:
+        self.usage = usage
+        if isinstance(discounts, dict):
+            rates = [discounts.get(family, discounts.get("*", DEFAULT_SP_DISCOUNT)) for family, _ in usage.groups]
+        else:
+            rates = [discounts] * len(usage.groups)
+        self.discounts = np.array(rates, dtype=np.float64)
+        if ((self.discounts < 0) | (self.discounts >= 1)).any():
+            raise ValueError("Discounts must be fractions in [0, 1)")
+
+        # Plans apply to the most-discounted usage first each hour
+        order = np.argsort(-self.discounts, kind="stable")
+        sp_rate = 1.0 - self.discounts[order]
+        sp_cost = usage.matrix[order] * sp_rate[:, None]
+        upper = np.cumsum(sp_cost, axis=0)
+        lower = upper - sp_cost
+        slope = np.broadcast_to((1.0 / sp_rate)[:, None], sp_cost.shape)
+        self._covered = _RampSum(lower, upper, slope)
+        total_sp_cost = upper[-1] if len(order) else np.zeros(usage.hours)
+        self._used = _RampSum(np.zeros_like(total_sp_cost), total_sp_cost, np.ones_like(total_sp_cost))
+        self.on_demand_cost = float(usage.matrix.sum())
+
+    def evaluate(self, commitments: Sequence[float]) -> list[Scenario]:
+        """Simulate each hourly commitment level."""
+        return self._scenarios(np.asarray(commitments, dtype=np.float64))
+
+    def optimize(self, max_commitment: Optional[float] = None) -> Scenario:
+        """The commitment with the highest net savings.
+
+        Net savings are piecewise linear and concave in the commitment,
+        so the optimum is at one of the ramp breakpoints.
+        """
+        candidates = np.unique(np.concatenate([[0.0], self._covered.x]))
+        if max_commitment is not None:
+            candidates = candidates[candidates <= max_commitment]
+        net = self._covered(candidates) - candidates * self.usage.hours
+        return self._scenarios(candidates[[int(np.argmax(net))]])[0]
+
+    def _scenarios(self, c: np.ndarray) -> list[Scenario]:
+        hours = self.usage.hours
+        covered = self._covered(c)
+        used = self._used(c)
+        cost = c * hours
+        net = covered - cost
+        scale = HOURS_PER_MONTH / hours if hours else 0.0
+        return [
+            Scenario(
+                commitment_hourly=round(float(c[i]), 4),
+                on_demand_cost=round(self.on_demand_cost, 2),
+                covered_on_demand=round(float(covered[i]), 2),
+                commitment_cost=round(float(cost[i]), 2),
+                net_savings=round(float(net[i]), 2),
+                utilization_pct=round(float(used[i] / cost[i] * 100), 1) if cost[i] else 0.0,
+                coverage_pct=round(float(covered[i] / self.on_demand_cost * 100), 1) if self.on_demand_cost else 0.0,
+                monthly_savings=round(float(net[i]) * scale, 2),
+            )
+            for i in range(len(c))
+        ]
+
+    def reserved(self, family: str, region: str, commitments: Sequence[float], discount: float) -> list[Scenario]:
+        """Simulate RI purchases for one (family, region) group.
+
+        ``commitments`` are hourly RI spend levels; RIs only cover their own group.
+        """
+        row = self.usage.groups.index((family, region))
+        usage = HourlyUsage([(family, region)], self.usage.start, self.usage.matrix[row:row + 1])
+        return CommitmentSimulator(usage, discount).evaluate(commitments)
@@ -0,0 +1,366 @@
+"""CostPilot — Vectorized Rightsizing Engine.
+
+Holds the fleet's hourly utilization as 2D NumPy arrays (instances ×
+hours), profiles every instance in one pass, and picks the smallest
+instance type whose capacity covers p95 demand with headroom.
+"""
+
+import logging
+import warnings
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from .attribution import ResourceCostIndex
+from .models import Confidence, CostSource, RightsizeRecommendation
+from .pricing import (
+    GP3_BASELINE_IOPS, GP3_BASELINE_THROUGHPUT, PriceCatalog, instance_os, instance_tenancy, split_type,
+)
+
+logger = logging.getLogger(__name__)
+
+# Hourly byte counts → average megabits per second
+BYTES_PER_HOUR_TO_MBPS = 8 / 3600 / 1_000_000
+MIB_TO_MEGABITS = 8 * 2 ** 20 / 1_000_000
+
+# gp3 ceilings, and the least an io1/io2 volume can provision
+GP3_MAX_IOPS = 16_000
+GP3_MAX_THROUGHPUT = 1_000
+MIN_PROVISIONED_IOPS = 100
+
+
+def gp2_baseline_iops(size_gb: int) -> int:
+    """gp2 earns 3 IOPS per GiB, between 100 and 16,000."""
+    return min(max(3 * size_gb, 100), 16_000)
+
+
+def gp3_target(size_gb: int, iops: float, mibps: float) -> tuple[str, int, int]:
+    """The gp3 configuration closest to serving ``iops`` and ``mibps``, within gp3's limits.
+
+    gp3 allows 500 IOPS per GiB (never below the 3,000 baseline) and
+    0.25 MiB/s per provisioned IOPS.
+    """
+    max_iops = max(min(500 * size_gb, GP3_MAX_IOPS), GP3_BASELINE_IOPS)
+    throughput = int(min(max(mibps, GP3_BASELINE_THROUGHPUT), GP3_MAX_THROUGHPUT, max_iops / 4))
+    return "gp3", int(min(max(iops, 4 * throughput, GP3_BASELINE_IOPS), max_iops)), throughput
+
+
+def volume_label(volume_type: str, iops: int = 0, throughput: int = 0) -> str:
+    """``gp2``, ``io1 10,000 IOPS`` or ``gp3 4,000 IOPS 250 MiB/s`` — throughput only above gp3's baseline."""
+    label = volume_type
+    if iops:
+        label += f" {iops:,} IOPS"
+    if throughput > GP3_BASELINE_THROUGHPUT:
+        label += f" {throughput:,} MiB/s"
+    return label
+
+
+@dataclass
+class FleetProfile:
+    """Per-instance utilization statistics — element ``i`` describes matrix row ``i``."""
+    mean: np.ndarray
+    p95: np.ndarray
+    p99: np.ndarray
+    peak: np.ndarray
+    peak_to_mean: np.ndarray
+    busy_hours: np.ndarray
+    longest_busy_run: np.ndarray
+    coverage: np.ndarray
+
+
+def longest_runs(mask: np.ndarray) -> np.ndarray:
+    """Length of the longest run of consecutive ``True`` values in each row."""
+    rows = mask.shape[0]
+    padded = np.zeros((rows, mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    start_rows, start_cols = np.nonzero(edges == 1)
+    _, end_cols = np.nonzero(edges == -1)
+    runs = np.zeros(rows, dtype=np.int64)
+    # Starts and ends come out in the same row-major order, so they pair up
+    np.maximum.at(runs, start_rows, end_cols - start_cols)
+    return runs
+
+
+def profile(matrix: np.ndarray, busy_pct: float = 80.0) -> FleetProfile:
+    """Compute utilization statistics for every row of ``matrix`` at once."""
+    observed = ~np.isnan(matrix)
+    busy = np.where(observed, matrix, -np.inf) >= busy_pct
+    with warnings.catch_warnings():
+        # Rows without any datapoints produce NaN statistics
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mean = np.nanmean(matrix, axis=1)
+        p95, p99 = np.nanpercentile(matrix, [95, 99], axis=1)
+        peak = np.nanmax(matrix, axis=1)
+        peak_to_mean = np.where(mean > 0, peak / mean, np.where(peak > 0, np.inf, 1.0))
+    return FleetProfile(
+        mean=mean,
+        p95=p95,
+        p99=p99,
+        peak=peak,
+        peak_to_mean=peak_to_mean,
+        busy_hours=busy.sum(axis=1),
+        longest_busy_run=longest_runs(busy),
+        coverage=observed.mean(axis=1) if matrix.shape[1] else np.zeros(matrix.shape[0]),
+    )
+
+
+class SizingEngine:
+    """Choose target instance types for a whole fleet from its utilization matrices."""
+
+    def __init__(
+        self,
+        catalog: PriceCatalog,
+        headroom: float = 0.2,
+        busy_pct: float = 80.0,
+        sustained_hours: int = 4,
+        min_memory_ratio: float = 0.5,
+        bursty_ratio: float = 3.0,
+    ) -> None:
+        self.catalog = catalog
+        self.headroom = headroom
+        self.busy_pct = busy_pct
+        self.sustained_hours = sustained_hours
+        self.min_memory_ratio = min_memory_ratio
+        self.bursty_ratio = bursty_ratio
+
+    def recommend(
+        self,
+        instances: list[dict],
+        cpu: np.ndarray,
+        region: str,
+        network_mbps: Optional[np.ndarray] = None,
+        memory: Optional[np.ndarray] = None,
+        cpu_threshold: float = 100.0,
+        costs: Optional[ResourceCostIndex] = None,
+    ) -> list[RightsizeRecommendation]:
+        """Recommend a smaller type for each EC2 instance whose demand allows it.
+
+        ``cpu`` and ``memory`` hold utilization percent, ``network_mbps``
+        throughput; row ``i`` of every matrix belongs to ``instances[i]``.
+        Instances averaging ``cpu_threshold`` percent CPU or more are left alone.
+        A target must cover CPU demand, peak memory and p95 network
+        throughput, each with ``headroom`` to spare; instances without
+        memory data (no CloudWatch agent) are only ever low confidence.
+        When ``costs`` has an instance's net amortized cost, that replaces
+        the list price and the projection scales it by the price ratio, so
+        RI/Savings Plan and negotiated rates carry over to the recommended
+        type and savings (and their ranking) are net of commitments.
+        """
+        return self.size(
+            "ec2",
+            [inst["InstanceId"] for inst in instances],
+            [inst["InstanceType"] for inst in instances],
+            [(instance_os(inst), instance_tenancy(inst)) for inst in instances],
+            cpu,
+            region,
+            network_mbps=network_mbps,
+            memory=memory,
+            cpu_threshold=cpu_threshold,
+            costs=costs,
+        )
+
+    def size(
+        self,
+        resource_type: str,
+        ids: list[str],
+        types: list[str],
+        platforms: list[tuple[str, str]],
+        cpu: np.ndarray,
+        region: str,
+        network_mbps: Optional[np.ndarray] = None,
+        memory: Optional[np.ndarray] = None,
+        cpu_threshold: float = 100.0,
+        costs: Optional[ResourceCostIndex] = None,
+        min_memory_gib: Optional[np.ndarray] = None,
+        units: Optional[list[int]] = None,
+        cache_memory_share: Optional[np.ndarray] = None,
+    ) -> list[RightsizeRecommendation]:
+        """:meth:`recommend` for any resource priced by type — EC2, RDS or ElastiCache.
+
+        ``platforms`` holds each resource's catalog (os, tenancy) — the
+        database or cache engine and deployment option for RDS and
+        ElastiCache. ``min_memory_gib`` floors the memory a target must
+        have (RDS connection limits scale with memory), and ``units``
+        multiplies list prices for resources billed per node.
+        ``cache_memory_share`` is the share of memory a resource fills
+        in proportion to its size (an InnoDB buffer pool); that part of
+        ``memory`` shrinks with the target, so only the rest is demand.
+        """
+        if not ids:
+            return []
+        cpu_profile = profile(cpu, self.busy_pct)
+        n = len(ids)
+        specs = [self.catalog.spec(t) for t in types]
+        current_vcpu = np.array([s.vcpu if s else np.nan for s in specs])
+        current_mem = np.array([s.memory_gib if s else np.nan for s in specs])
+
+        # Instances with sustained busy periods must keep room for their peak
+        sustained = cpu_profile.longest_busy_run >= self.sustained_hours
+        demand = np.where(sustained, cpu_profile.peak, cpu_profile.p95)
+        target = 100.0 * (1 - self.headroom)
+        need_vcpu = demand * current_vcpu / target
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            mem_avg = np.nanmean(memory, axis=1) if memory is not None else np.full(n, np.nan)
+            mem_peak = np.nanmax(memory, axis=1) if memory is not None else np.full(n, np.nan)
+            avg_net = np.nanmean(network_mbps, axis=1) if network_mbps is not None else np.full(n, np.nan)
+            p95_net = np.nanpercentile(network_mbps, 95, axis=1) if network_mbps is not None else np.full(n, np.nan)
+        # Memory can't be throttled like CPU, so its peak must fit; without
+        # memory data, never shrink memory by more than min_memory_ratio
+        mem_demand = mem_peak
+        if cache_memory_share is not None:
+            share = np.nan_to_num(cache_memory_share)
+            mem_demand = np.clip((mem_peak - 100 * share) / (1 - share), 0, 100)
+        need_mem = np.where(np.isnan(mem_peak), current_mem * self.min_memory_ratio, mem_demand * current_mem / target)
+        if min_memory_gib is not None:
+            need_mem = np.maximum(need_mem, np.nan_to_num(min_memory_gib))
+        need_gbps = np.nan_to_num(p95_net) / 1000 / (1 - self.headroom)
+
+        eligible = (cpu_profile.mean < cpu_threshold) & np.isfinite(need_vcpu) & np.isfinite(need_mem)
+        # A guess at memory is never better than a low-confidence recommendation
+        confidence = np.where(np.isnan(mem_peak), "low", self._confidence(cpu_profile))
+
+        groups: dict[tuple[str, str, str], list[int]] = {}
+        for i in np.flatnonzero(eligible):
+            family, _ = split_type(types[i])
+            groups.setdefault((family, *platforms[i]), []).append(i)
+
+        recommendations = []
+        for (family, os_name, tenancy), rows in groups.items():
+            ladder = self.catalog.ladder(family, region, os_name, tenancy)
+            if not ladder:
+                continue
+            ladder_specs = [self.catalog.spec(t) for t in ladder]
+            # Unknown specs can never satisfy demand, unknown bandwidth is assumed to;
+            # accumulate so searchsorted sees sorted input
+            vcpus = np.maximum.accumulate([s.vcpu if s else np.inf for s in ladder_specs])
+            mems = np.maximum.accumulate([s.memory_gib if s else np.inf for s in ladder_specs])
+            nets = np.maximum.accumulate([(s.network_gbps or np.inf) if s else np.inf for s in ladder_specs])
+            idx = np.array(rows)
+            picks = np.maximum.reduce([
+                np.searchsorted(vcpus, need_vcpu[idx], side="left"),
+                np.searchsorted(mems, need_mem[idx], side="left"),
+                np.searchsorted(nets, need_gbps[idx], side="left"),
+            ])
+            for i, pick in zip(rows, picks):
+                if types[i] not in ladder or pick >= ladder.index(types[i]):
+                    continue
+                recommended = ladder[pick]
+                current_cost = self.catalog.monthly_instance_cost(types[i], region, os_name, tenancy)
+                new_cost = self.catalog.monthly_instance_cost(recommended, region, os_name, tenancy)
+                if current_cost is None or new_cost is None or new_cost >= current_cost:
+                    continue
+                if units is not None:
+                    current_cost *= units[i]
+                    new_cost *= units[i]
+                actual = costs.get(ids[i]) if costs is not None else None
+                source = CostSource.ESTIMATE
+                if actual is not None:
+                    new_cost *= actual.monthly_cost / current_cost
+                    current_cost = actual.monthly_cost
+                    source = costs.source
+                recommendations.append(RightsizeRecommendation(
+                    resource_id=ids[i],
+                    resource_type=resource_type,
+                    region=region,
+                    current_type=types[i],
+                    recommended_type=recommended,
+                    avg_cpu_pct=round(float(cpu_profile.mean[i]), 1),
+                    max_cpu_pct=round(float(cpu_profile.peak[i]), 1),
+                    avg_network_mbps=round(float(np.nan_to_num(avg_net[i])), 3),
+                    current_monthly_cost=round(current_cost, 2),
+                    projected_monthly_cost=round(new_cost, 2),
+                    monthly_savings=round(current_cost - new_cost, 2),
+                    confidence=Confidence(str(confidence[i])),
+                    p95_cpu_pct=round(float(cpu_profile.p95[i]), 1),
+                    cost_source=source,
+                    avg_memory_pct=None if np.isnan(mem_avg[i]) else round(float(mem_avg[i]), 1),
+                    max_memory_pct=None if np.isnan(mem_peak[i]) else round(float(mem_peak[i]), 1),
+                ))
+        return sorted(recommendations, key=lambda r: -r.monthly_savings)
+
+    def recommend_volumes(
+        self,
+        volumes: list[dict],
+        iops: np.ndarray,
+        mibps: np.ndarray,
+        region: str,
+        costs: Optional[ResourceCostIndex] = None,
+    ) -> list[RightsizeRecommendation]:
+        """Recommend gp3 for gp2 and io1 volumes, and fewer provisioned IOPS where gp3 can't serve.
+
+        ``iops`` and ``mibps`` hold each volume's hourly average I/O rate
+        and throughput. Hourly averages hide bursts, so targets keep
+        ``headroom`` over the busiest hour, gp3 never drops below its
+        3,000 IOPS baseline, and cutting io1/io2 IOPS is never rated
+        high confidence. The CPU fields of the recommendations carry
+        IOPS as a percent of what the volume serves today, and
+        ``avg_network_mbps`` its throughput.
+        """
+        if not volumes:
+            return []
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            iops_profile = profile(iops, np.inf)
+            peak_mibps = np.nanmax(mibps, axis=1)
+            avg_mibps = np.nanmean(mibps, axis=1)
+        need_iops = np.ceil(iops_profile.peak / (1 - self.headroom))
+        need_mibps = np.ceil(np.nan_to_num(peak_mibps) / (1 - self.headroom))
+        coverage = iops_profile.coverage
+
+        recommendations = []
+        for i in np.flatnonzero(np.isfinite(need_iops)):
+            vol = volumes[i]
+            volume_type, size = vol["VolumeType"], vol["Size"]
+            current_iops = vol.get("Iops") or gp2_baseline_iops(size)
+            current = (volume_type, int(vol.get("Iops") or 0), int(vol.get("Throughput") or 0))
+            gp3 = gp3_target(size, need_iops[i], need_mibps[i])
+            if volume_type == "gp2" or (volume_type == "io1" and gp3[1] >= need_iops[i] and gp3[2] >= need_mibps[i]):
+                # gp3 at its ceilings still out-serves any gp2 volume
+                target = gp3
+            elif volume_type in ("io1", "io2") and need_iops[i] < current[1]:
+                target = (volume_type, int(max(need_iops[i], MIN_PROVISIONED_IOPS)), 0)
+            else:
+                continue
+            current_cost = self.catalog.monthly_volume_cost(current[0], size, region, current[1], current[2])
+            new_cost = self.catalog.monthly_volume_cost(target[0], size, region, target[1], target[2])
+            if current_cost is None or new_cost is None or new_cost >= current_cost:
+                continue
+            actual = costs.get(vol["VolumeId"]) if costs is not None else None
+            source = CostSource.ESTIMATE
+            if actual is not None:
+                new_cost *= actual.monthly_cost / current_cost
+                current_cost = actual.monthly_cost
+                source = costs.source
+            confidence = "low" if coverage[i] < 0.5 else "high" if coverage[i] >= 0.9 else "medium"
+            if target[0] == volume_type and confidence == "high":
+                confidence = "medium"
+            recommendations.append(RightsizeRecommendation(
+                resource_id=vol["VolumeId"],
+                resource_type="ebs",
+                region=region,
+                current_type=volume_label(*current),
+                recommended_type=volume_label(*target),
+                avg_cpu_pct=round(float(100 * iops_profile.mean[i] / current_iops), 1),
+                max_cpu_pct=round(float(100 * iops_profile.peak[i] / current_iops), 1),
+                avg_network_mbps=round(float(np.nan_to_num(avg_mibps[i]) * MIB_TO_MEGABITS), 3),
+                current_monthly_cost=round(current_cost, 2),
+                projected_monthly_cost=round(new_cost, 2),
+                monthly_savings=round(current_cost - new_cost, 2),
+                confidence=Confidence(confidence),
+                p95_cpu_pct=round(float(100 * iops_profile.p95[i] / current_iops), 1),
+                cost_source=source,
+            ))
+        return sorted(recommendations, key=lambda r: -r.monthly_savings)
+
+    def _confidence(self, cpu_profile: FleetProfile) -> np.ndarray:
+        """High with ≥90% hourly coverage and steady load; low below 50% coverage."""
+        steady = (cpu_profile.peak_to_mean < self.bursty_ratio) & (cpu_profile.longest_busy_run == 0)
+        return np.select(
+            [cpu_profile.coverage < 0.5, (cpu_profile.coverage >= 0.9) & steady],
+            ["low", "high"],
+            default="medium",
+        )
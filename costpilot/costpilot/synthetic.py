@@ -0,0 +1,569 @@
+"""CostPilot — Synthetic AWS Account.
+
+Generates AWS API responses for an account of any size — tens of
+thousands of instances, hundreds of thousands of snapshots — to replay
+through the real engines with :class:`~costpilot.replay.Replayer`, for
+benchmarks and scale tests.
+
+Inventory is built once, up front, and served by reference; metric and
+cost data are generated per request over whatever window the engine
+asks for, so responses always line up with "now". Every resource's
+metric levels derive from its ID, so repeat runs see the same account.
+"""
+
+import logging
+import zlib
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Optional
+
+import numpy as np
+
+from .reservations import RESERVABLE_SERVICES
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_ID = "123456789012"
+
+# Instance type mix, weighted towards the sizes real fleets run most
+INSTANCE_TYPES = {
+    "t3.medium": 0.15, "t3.large": 0.10, "t3.xlarge": 0.05,
+    "m5.large": 0.12, "m5.xlarge": 0.10, "m5.2xlarge": 0.05,
+    "m6i.large": 0.08, "m6i.xlarge": 0.07, "m6i.2xlarge": 0.03,
+    "c5.large": 0.06, "c5.xlarge": 0.05, "c5.2xlarge": 0.03,
+    "r5.large": 0.05, "r5.xlarge": 0.04, "r5.2xlarge": 0.02,
+}
+VOLUME_TYPES = {"gp3": 0.6, "gp2": 0.3, "io1": 0.05, "st1": 0.05}
+DB_INSTANCE_CLASSES = {
+    "db.t3.medium": 0.2, "db.m5.large": 0.25, "db.m5.xlarge": 0.2,
+    "db.r5.large": 0.15, "db.r5.xlarge": 0.15, "db.r5.2xlarge": 0.05,
+}
+DB_ENGINES = ("mysql", "postgres")
+CACHE_NODE_TYPES = {"cache.t3.medium": 0.3, "cache.m5.large": 0.3, "cache.r5.large": 0.25, "cache.r5.xlarge": 0.15}
+REGIONS = {
+    "us-east-1": 0.45, "us-west-2": 0.2, "eu-west-1": 0.15,
+    "eu-central-1": 0.1, "ap-southeast-2": 0.06, "ap-northeast-1": 0.04,
+}
+
+# Cost Explorer leaves the last few days estimated
+ESTIMATED_DAYS = 2
+# Groups per GetCostAndUsageWithResources page
+RESOURCE_PAGE_SIZE = 5_000
+# Rough on-demand $/hour by size, and the share of instances under RIs / Savings Plans at their rates
+SIZE_HOURLY = {"medium": 0.045, "large": 0.1, "xlarge": 0.2, "2xlarge": 0.4}
+COMMITMENTS = ((0.4, 0.6), (0.6, 0.72))  # (cumulative fleet share, effective rate)
+NEGOTIATED_DISCOUNT = 0.05
+# GetMetricData returns at most this many datapoints per page
+MAX_DATAPOINTS = 100_800
+# Shared noise that per-series values are sliced from
+NOISE_SIZE = 1 << 16
+
+
+def _crc(value: str) -> int:
+    return zlib.crc32(value.encode())
+
+
+class SyntheticAccount:
+    """A generated account that answers the API calls the engines make.
+
+    Pass it to :class:`~costpilot.replay.Replayer` (or ``Config(replay=...)``).
+    Unsupported operations answer ``None``, which the replayer reports as
+    a miss.
+    """
+
+    def __init__(
+        self,
+        instances: int = 50_000,
+        stopped_fraction: float = 0.05,
+        volumes: int = 5_000,
+        snapshots: int = 200_000,
+        addresses: int = 500,
+        load_balancers: int = 2_000,
+        databases: int = 500,
+        cache_clusters: int = 200,
+        services: int = 60,
+        daily_spend: float = 50_000.0,
+        region: str = "us-east-1",
+        seed: int = 0,
+    ) -> None:
+        self.region = region
+        self.daily_spend = daily_spend
+        rng = np.random.default_rng(seed)
+        self.now = datetime.now(timezone.utc)
+        self._noise = rng.standard_normal(NOISE_SIZE)
+        self._timestamps: dict[tuple[datetime, datetime, int], list[datetime]] = {}
+
+        self.instances = self._make_instances(rng, instances, stopped_fraction)
+        self._by_state = {
+            state: [i for i in self.instances if i["State"]["Name"] == state] for state in ("running", "stopped")
+        }
+        self.volumes = self._make_volumes(rng, volumes)
+        self.root_volumes = [self._root_volume(f"vol-{i:017x}") for i in range(instances)]
+        self.snapshots = self._make_snapshots(rng, snapshots)
+        self.addresses = [
+            {
+                "PublicIp": f"203.0.{i // 256 % 256}.{i % 256}",
+                "AllocationId": f"eipalloc-{i:017x}",
+                **({"AssociationId": f"eipassoc-{i:017x}"} if i % 3 else {}),
+            }
+            for i in range(addresses)
+        ]
+        self.load_balancers = self._make_load_balancers(rng, load_balancers)
+
+        weights = rng.pareto(1.2, services) + 0.01
+        self.service_share = weights / weights.sum()
+        self.service_names = ["Amazon Elastic Compute Cloud - Compute", *(f"Service {i:02d}" for i in range(1, services))]
+        self.databases = self._make_databases(rng, databases)
+        self.cache_clusters = self._make_cache_clusters(rng, cache_clusters)
+
+    # ------------------------------------------------------------------
+    # Inventory
+    # ------------------------------------------------------------------
+
+    def _make_instances(self, rng: np.random.Generator, n: int, stopped_fraction: float) -> list[dict]:
+        types = rng.choice(list(INSTANCE_TYPES), n, p=np.array(list(INSTANCE_TYPES.values())))
+        stopped = rng.random(n) < stopped_fraction
+        age_days = rng.integers(1, 720, n)
+        stopped_days = rng.integers(1, 90, n)
+        zones = [f"{self.region}{z}" for z in "abc"]
+        instances = []
+        for i in range(n):
+            instance_id = f"i-{i:017x}"
+            inst = {
+                "InstanceId": instance_id,
+                "InstanceType": str(types[i]),
+                "State": {"Name": "stopped" if stopped[i] else "running"},
+                "LaunchTime": self.now - timedelta(days=int(age_days[i])),
+                "Placement": {"AvailabilityZone": zones[i % 3], "Tenancy": "default"},
+                "PlatformDetails": "Linux/UNIX",
+                "BlockDeviceMappings": [{"DeviceName": "/dev/xvda", "Ebs": {"VolumeId": f"vol-{i:017x}"}}],
+                "Tags": [{"Key": "Name", "Value": f"node-{i}"}, {"Key": "team", "Value": f"team-{i % 40}"}],
+                "StateTransitionReason": "",
+            }
+            if stopped[i]:
+                stopped_at = self.now - timedelta(days=int(stopped_days[i]))
+                inst["StateTransitionReason"] = f"User initiated ({stopped_at:%Y-%m-%d %H:%M:%S} GMT)"
+            instances.append(inst)
+        return instances
+
+    def _make_volumes(self, rng: np.random.Generator, n: int) -> list[dict]:
+        types = rng.choice(list(VOLUME_TYPES), n, p=np.array(list(VOLUME_TYPES.values())))
+        sizes = rng.choice([8, 20, 50, 100, 200, 500, 1000], n)
+        ages = rng.integers(1, 720, n)
+        return [
+            self._volume(f"vol-u{i:016x}", str(types[i]), int(sizes[i]), int(ages[i]), "available")
+            for i in range(n)
+        ]
+
+    def _volume(self, volume_id: str, volume_type: str, size: int, age_days: int, state: str) -> dict:
+        volume = {
+            "VolumeId": volume_id,
+            "VolumeType": volume_type,
+            "Size": size,
+            "State": state,
+            "CreateTime": self.now - timedelta(days=age_days),
+            "AvailabilityZone": f"{self.region}a",
+        }
+        if volume_type == "gp3":
+            volume.update(Iops=3000, Throughput=125)
+        elif volume_type == "io1":
+            volume["Iops"] = size * 10
+        return volume
+
+    def _root_volume(self, volume_id: str) -> dict:
+        # Root volumes derive from their ID, so lookups by ID needn't store them
+        crc = _crc(volume_id)
+        return self._volume(volume_id, "gp3" if crc % 3 else "gp2", 8 + crc % 8 * 16, 100, "in-use")
+
+    def _make_snapshots(self, rng: np.random.Generator, n: int) -> list[dict]:
+        """Snapshots of instance root volumes, four or so per volume.
+
+        One in seven comes from a deleted volume, one in twenty backs an
+        AMI and one in ten is an AWS Backup recovery point.
+        """
+        ages = rng.integers(0, 1000, n)
+        instances = max(len(self.instances), 1)
+        snapshots = []
+        for i in range(n):
+            snapshot_id = f"snap-{i:017x}"
+            volume_id = f"vol-d{i:016x}" if i % 7 == 0 else f"vol-{i % instances:017x}"
+            snap = {
+                "SnapshotId": snapshot_id,
+                "VolumeId": volume_id,
+                "VolumeSize": 8 + _crc(volume_id) % 8 * 16,
+                "StartTime": self.now - timedelta(days=int(ages[i])),
+                "State": "completed",
+                "OwnerId": ACCOUNT_ID,
+                "Description": f"Created by CreateImage for ami-{i:017x}" if i % 20 == 1 else "",
+            }
+            if i % 10 == 3:
+                snap["Tags"] = [{"Key": "aws:backup:source-resource", "Value": volume_id}]
+            snapshots.append(snap)
+        return snapshots
+
+    def _make_load_balancers(self, rng: np.random.Generator, n: int) -> list[dict]:
+        kinds = rng.choice(["application", "network"], n, p=[0.8, 0.2])
+        lbs = []
+        for i in range(n):
+            kind = str(kinds[i])
+            name = f"lb-{i}"
+            lbs.append({
+                "LoadBalancerName": name,
+                "LoadBalancerArn": (
+                    f"arn:aws:elasticloadbalancing:{self.region}:{ACCOUNT_ID}:loadbalancer/"
+                    f"{'app' if kind == 'application' else 'net'}/{name}/{i:016x}"
+                ),
+                "Type": kind,
+                "CreatedTime": self.now - timedelta(days=30 + i % 300),
+            })
+        return lbs
+
+    # ------------------------------------------------------------------
+    # Dispatch
+    # ------------------------------------------------------------------
+
+    def _make_databases(self, rng: np.random.Generator, n: int) -> list[dict]:
+        classes = rng.choice(list(DB_INSTANCE_CLASSES), n, p=np.array(list(DB_INSTANCE_CLASSES.values())))
+        return [
+            {
+                "DBInstanceIdentifier": f"db-{i:06d}",
+                "DBInstanceClass": str(classes[i]),
+                "Engine": DB_ENGINES[i % 2],
+                "DBInstanceStatus": "available",
+                "MultiAZ": i % 4 == 0,
+                "TagList": [{"Key": "Name", "Value": f"db-{i}"}],
+            }
+            for i in range(n)
+        ]
+
+    def _make_cache_clusters(self, rng: np.random.Generator, n: int) -> list[dict]:
+        types = rng.choice(list(CACHE_NODE_TYPES), n, p=np.array(list(CACHE_NODE_TYPES.values())))
+        clusters = []
+        for i in range(n):
+            # Memcached clusters run several nodes; Redis cache clusters one each
+            nodes = 1 + i % 3 if i % 5 == 0 else 1
+            clusters.append({
+                "CacheClusterId": f"cache-{i:06d}",
+                "CacheNodeType": str(types[i]),
+                "Engine": "memcached" if i % 5 == 0 else "redis",
+                "CacheClusterStatus": "available",
+                "NumCacheNodes": nodes,
+                "CacheNodes": [{"CacheNodeId": f"{node:04d}"} for node in range(1, nodes + 1)],
+            })
+        return clusters
+
+    def respond(self, service: str, operation: str, params: dict) -> Optional[tuple[int, dict]]:
+        handler = getattr(self, f"_{service}_{operation}", None)
+        if handler is None:
+            return None
+        return 200, handler(params)
+
+    @staticmethod
+    def _page(items: list, params: dict, token_param: str = "NextToken", size_param: str = "MaxResults",
+              result_token: str = "NextToken") -> tuple[list, dict]:
+        """Slice one page; without a page size everything is returned at once, as EC2 does."""
+        size = params.get(size_param)
+        if not size:
+            return items, {}
+        offset = int(params.get(token_param) or 0)
+        page = items[offset:offset + size]
+        more = {result_token: str(offset + size)} if offset + size < len(items) else {}
+        return page, more
+
+    @staticmethod
+    def _filter(params: dict, name: str) -> Optional[list[str]]:
+        for f in params.get("Filters", []):
+            if f["Name"] == name:
+                return f["Values"]
+        return None
+
+    # ------------------------------------------------------------------
+    # EC2 / ELB
+    # ------------------------------------------------------------------
+
+    def _ec2_DescribeInstances(self, params: dict) -> dict:
+        states = self._filter(params, "instance-state-name")
+        if states is None:
+            instances = self.instances
+        else:
+            instances = [i for state in states for i in self._by_state.get(state, [])]
+        page, more = self._page(instances, params)
+        # Launches group instances into reservations; 20 per reservation is typical of ASGs
+        reservations = [{"Instances": page[i:i + 20]} for i in range(0, len(page), 20)]
+        return {"Reservations": reservations, **more}
+
+    def _ec2_DescribeVolumes(self, params: dict) -> dict:
+        if params.get("VolumeIds"):
+            return {"Volumes": [self._root_volume(volume_id) for volume_id in params["VolumeIds"]]}
+        statuses = self._filter(params, "status")
+        volumes = []
+        if statuses is None or "in-use" in statuses:
+            volumes += self.root_volumes
+        if statuses is None or "available" in statuses:
+            volumes += self.volumes
+        types = self._filter(params, "volume-type")
+        if types is not None:
+            volumes = [v for v in volumes if v["VolumeType"] in types]
+        page, more = self._page(volumes, params)
+        return {"Volumes": page, **more}
+
+    def _ec2_DescribeAddresses(self, params: dict) -> dict:
+        return {"Addresses": self.addresses}
+
+    def _ec2_DescribeSnapshots(self, params: dict) -> dict:
+        page, more = self._page(self.snapshots, params)
+        return {"Snapshots": page, **more}
+
+    def _ec2_DescribeImages(self, params: dict) -> dict:
+        images = [
+            {
+                "ImageId": f"ami-{i:017x}",
+                "State": "available",
+                "BlockDeviceMappings": [{"DeviceName": "/dev/xvda", "Ebs": {"SnapshotId": snap["SnapshotId"]}}],
+            }
+            for i, snap in enumerate(self.snapshots) if i % 20 == 1
+        ]
+        page, more = self._page(images, params)
+        return {"Images": page, **more}
+
+    def _elbv2_DescribeLoadBalancers(self, params: dict) -> dict:
+        # The real API pages at 400 by default
+        page, more = self._page(
+            self.load_balancers, {"PageSize": 400, **params}, "Marker", "PageSize", "NextMarker"
+        )
+        return {"LoadBalancers": page, **more}
+
+    def _backup_ListBackupVaults(self, params: dict) -> dict:
+        return {"BackupVaultList": [{"BackupVaultName": "Default"}]}
+
+    def _backup_ListRecoveryPointsByBackupVault(self, params: dict) -> dict:
+        points = [
+            {
+                "RecoveryPointArn": f"arn:aws:ec2:{self.region}::snapshot/{snap['SnapshotId']}",
+                "ResourceType": "EBS",
+                "BackupVaultName": params["BackupVaultName"],
+            }
+            for i, snap in enumerate(self.snapshots) if i % 10 == 3
+        ]
+        page, more = self._page(points, params)
+        return {"RecoveryPoints": page, **more}
+
+    def _rds_DescribeDBInstances(self, params: dict) -> dict:
+        page, more = self._page(self.databases, params, "Marker", "MaxRecords", "Marker")
+        return {"DBInstances": page, **more}
+
+    def _elasticache_DescribeCacheClusters(self, params: dict) -> dict:
+        page, more = self._page(self.cache_clusters, params, "Marker", "MaxRecords", "Marker")
+        return {"CacheClusters": page, **more}
+
+    def _s3_ListBuckets(self, params: dict) -> dict:
+        # Buckets aren't generated; the S3 stage finds nothing to check
+        return {"Buckets": []}
+
+    # ------------------------------------------------------------------
+    # CloudWatch
+    # ------------------------------------------------------------------
+
+    def _cloudwatch_ListMetrics(self, params: dict) -> dict:
+        # Three in four running instances run the CloudWatch agent
+        if params.get("Namespace") != "CWAgent":
+            return {"Metrics": []}
+        name = params.get("MetricName")
+        extra = [{"Name": "path", "Value": "/"}, {"Name": "device", "Value": "nvme0n1p1"},
+                 {"Name": "fstype", "Value": "xfs"}] if name == "disk_used_percent" else []
+        metrics = [
+            {"Namespace": "CWAgent", "MetricName": name,
+             "Dimensions": [{"Name": "InstanceId", "Value": inst["InstanceId"]}, *extra]}
+            for inst in self._by_state["running"]
+            if name in ("mem_used_percent", "disk_used_percent") and _crc(inst["InstanceId"]) % 4
+        ]
+        page, more = self._page(metrics, {"MaxResults": 500, **params})
+        return {"Metrics": page, **more}
+
+    def _cloudwatch_GetMetricData(self, params: dict) -> dict:
+        queries = params["MetricDataQueries"]
+        start, end = params["StartTime"], params["EndTime"]
+        offset = int(params.get("NextToken") or 0)
+        results = []
+        points = 0
+        index = offset
+        for index in range(offset, len(queries)):
+            query = queries[index]["MetricStat"]
+            timestamps = self._grid(start, end, query["Period"])
+            if results and points + len(timestamps) > MAX_DATAPOINTS:
+                break
+            points += len(timestamps)
+            metric = query["Metric"]
+            values = self._series(metric["MetricName"], metric["Dimensions"][0]["Value"], len(timestamps))
+            results.append({
+                "Id": queries[index]["Id"],
+                "Label": metric["MetricName"],
+                "Timestamps": timestamps,
+                "Values": values,
+                "StatusCode": "Complete",
+            })
+        else:
+            return {"MetricDataResults": results}
+        return {"MetricDataResults": results, "NextToken": str(index)}
+
+    def _grid(self, start: datetime, end: datetime, period: int) -> list[datetime]:
+        """Period-aligned timestamps in ``[start, end)``, shared by every series of a request."""
+        key = (start, end, period)
+        timestamps = self._timestamps.get(key)
+        if timestamps is None:
+            first = datetime.fromtimestamp(-(-start.timestamp() // period) * period, timezone.utc)
+            count = max(int((end - first).total_seconds() // period), 0)
+            timestamps = [first + timedelta(seconds=period * i) for i in range(count)]
+            self._timestamps[key] = timestamps
+        return timestamps
+
+    def _series(self, metric: str, resource: str, n: int) -> list[float]:
+        crc = _crc(resource)
+        offset = crc % (NOISE_SIZE - n) if n < NOISE_SIZE else 0
+        noise = self._noise[offset:offset + n]
+        if metric == "CPUUtilization":
+            # Most instances idle along at a few percent; a third do real work
+            base = 2 + crc % 18 if crc % 3 else 30 + crc % 60
+            values = np.clip(base * (1 + 0.3 * noise), 0, 100)
+        elif metric in ("NetworkIn", "NetworkOut"):
+            values = np.abs(10 ** (6 + crc % 4) * (1 + 0.5 * noise))
+        elif metric in ("mem_used_percent", "disk_used_percent"):
+            values = np.clip((15 + crc % 70) * (1 + 0.05 * noise), 0, 100)
+        elif metric == "FreeableMemory":
+            # Databases and caches leave 0.5–30.5 GiB free
+            values = np.clip((0.5 + crc % 16 * 2) * (1 + 0.1 * noise), 0.1, None) * 2 ** 30
+        elif metric == "DatabaseConnections":
+            values = np.round(np.abs((1 + crc % 200) * (1 + 0.2 * noise)))
+        elif crc % 10 == 0:
+            # One in ten load balancers sees no traffic at all
+            values = np.zeros(n)
+        else:
+            values = np.abs(1000 * (1 + noise))
+        return values.tolist()
+
+    # ------------------------------------------------------------------
+    # Cost Explorer
+    # ------------------------------------------------------------------
+
+    def _ce_GetCostAndUsage(self, params: dict) -> dict:
+        start = date.fromisoformat(params["TimePeriod"]["Start"])
+        end = date.fromisoformat(params["TimePeriod"]["End"])
+        group = params.get("GroupBy", [{}])[0].get("Key")
+        if group == "REGION":
+            keys, shares = list(REGIONS), np.array(list(REGIONS.values()))
+        else:
+            keys, shares = self.service_names, self.service_share
+        days = [start + timedelta(days=i) for i in range((end - start).days)]
+        daily = np.array([self._day_spend(day) for day in days])
+
+        if params.get("Granularity") == "DAILY":
+            results = []
+            estimated_from = self.now.date() - timedelta(days=ESTIMATED_DAYS)
+            for day, spend in zip(days, daily):
+                amounts = spend * shares
+                # A one-day spike in the top service, for the anomaly detector
+                if day == self.now.date() - timedelta(days=5):
+                    amounts[0] *= 3
+                results.append(self._result(day, day + timedelta(days=1), keys, amounts, day >= estimated_from))
+            return {"ResultsByTime": results}
+        return {"ResultsByTime": [self._result(start, end, keys, daily.sum() * shares, False)]}
+
+    def _ce_GetCostAndUsageWithResources(self, params: dict) -> dict:
+        start = date.fromisoformat(params["TimePeriod"]["Start"])
+        end = date.fromisoformat(params["TimePeriod"]["End"])
+        running = self._by_state["running"]
+        # Daily results, paged across days: only the page's day × instance rows are built
+        total = (end - start).days * len(running)
+        offset = int(params.get("NextPageToken") or 0)
+        results: dict[date, list] = {}
+        for i in range(offset, min(offset + RESOURCE_PAGE_SIZE, total)):
+            day, inst = start + timedelta(days=i // len(running)), running[i % len(running)]
+            instance_id = inst["InstanceId"]
+            gross = SIZE_HOURLY[inst["InstanceType"].split(".")[1]] * 24
+            share = _crc(instance_id) % 100 / 100
+            gross *= next((rate for cutoff, rate in COMMITMENTS if share < cutoff), 1.0)
+            results.setdefault(day, []).append({"Keys": [instance_id, f"BoxUsage:{inst['InstanceType']}"], "Metrics": {
+                "AmortizedCost": {"Amount": f"{gross:.4f}", "Unit": "USD"},
+                "NetAmortizedCost": {"Amount": f"{gross * (1 - NEGOTIATED_DISCOUNT):.4f}", "Unit": "USD"},
+            }})
+        more = {"NextPageToken": str(offset + RESOURCE_PAGE_SIZE)} if offset + RESOURCE_PAGE_SIZE < total else {}
+        return {"ResultsByTime": [
+            {"TimePeriod": {"Start": str(day), "End": str(day + timedelta(days=1))}, "Groups": groups}
+            for day, groups in results.items()
+        ], **more}
+
+    def _day_spend(self, day: date) -> float:
+        # Weekends run lighter, and spend grows about 1% a week
+        weekly = 0.8 if day.weekday() >= 5 else 1.0
+        trend = 1 + (day - self.now.date()).days / 700
+        return self.daily_spend * weekly * trend
+
+    @staticmethod
+    def _result(start: date, end: date, keys: list[str], amounts: np.ndarray, estimated: bool) -> dict:
+        return {
+            "TimePeriod": {"Start": str(start), "End": str(end)},
+            "Total": {},
+            "Groups": [
+                {"Keys": [key], "Metrics": {"UnblendedCost": {"Amount": f"{amount:.4f}", "Unit": "USD"}}}
+                for key, amount in zip(keys, amounts)
+            ],
+            "Estimated": estimated,
+        }
+
+    def _ce_GetReservationUtilization(self, params: dict) -> dict:
+        fees = self.daily_spend * 30 * 0.12
+        return {"UtilizationsByTime": [], "Total": {
+            "UtilizationPercentage": "87.5", "TotalAmortizedFee": f"{fees:.2f}",
+        }}
+
+    def _ce_GetReservationCoverage(self, params: dict) -> dict:
+        return {"CoveragesByTime": [], "Total": {"CoverageHours": {"CoverageHoursPercentage": "41.2"}}}
+
+    def _ce_GetSavingsPlansUtilization(self, params: dict) -> dict:
+        commitment = self.daily_spend * 30 * 0.2
+        return {"SavingsPlansUtilizationsByTime": [], "Total": {"Utilization": {
+            "TotalCommitment": f"{commitment:.2f}",
+            "UsedCommitment": f"{commitment * 0.93:.2f}",
+            "UnusedCommitment": f"{commitment * 0.07:.2f}",
+            "UtilizationPercentage": "93.0",
+        }}}
+
+    def _ce_GetSavingsPlansCoverage(self, params: dict) -> dict:
+        spend = self.daily_spend * 30
+        return {"SavingsPlansCoverages": [{"Coverage": {
+            "SpendCoveredBySavingsPlans": f"{spend * 0.2:.2f}",
+            "OnDemandCost": f"{spend * 0.55:.2f}",
+        }}]}
+
+    def _ce_GetReservationPurchaseRecommendation(self, params: dict) -> dict:
+        details_key, family_key = RESERVABLE_SERVICES[params["Service"]]
+        discount = (0.3 if params["TermInYears"] == "ONE_YEAR" else 0.5) + {
+            "NO_UPFRONT": 0.0, "PARTIAL_UPFRONT": 0.03, "ALL_UPFRONT": 0.05,
+        }[params["PaymentOption"]]
+        upfront_share = {"NO_UPFRONT": 0.0, "PARTIAL_UPFRONT": 0.5, "ALL_UPFRONT": 1.0}[params["PaymentOption"]]
+        months = 12 if params["TermInYears"] == "ONE_YEAR" else 36
+        details = []
+        for family in ("m5", "m6i", "c5", "r5", "t3"):
+            on_demand = self.daily_spend * 30 * 0.02 * (1 + _crc(family) % 5)
+            reserved = on_demand * (1 - discount)
+            upfront = reserved * months * upfront_share
+            details.append({
+                "InstanceDetails": {details_key: {family_key: family, "Region": self.region}},
+                "EstimatedMonthlyOnDemandCost": f"{on_demand:.2f}",
+                "EstimatedMonthlySavingsAmount": f"{on_demand - reserved:.2f}",
+                "UpfrontCost": f"{upfront:.2f}",
+                "RecurringStandardMonthlyCost": f"{reserved * (1 - upfront_share):.2f}",
+            })
+        return {"Recommendations": [{"RecommendationDetails": details}]}
+
+    def summary(self) -> dict[str, Any]:
+        """Inventory counts, for logging and benchmark labels."""
+        return {
+            "instances": len(self.instances),
+            "running": len(self._by_state["running"]),
+            "volumes": len(self.volumes) + len(self.root_volumes),
+            "snapshots": len(self.snapshots),
+            "addresses": len(self.addresses),
+            "load_balancers": len(self.load_balancers),
+            "databases": len(self.databases),
+            "cache_clusters": len(self.cache_clusters),
+        }
@@ -5,163 +5,464 @@ that are wasting money.
 """
 
 import logging
+import re
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, Optional
 
 import boto3
+import numpy as np
+
+from .attribution import ResourceCostIndex
 from .config import Config
+from .history import ScanHistory
+from .lineage import SnapshotLineage
+from .metrics import IDLE_SIGNALS, MetricFetcher, idle_query
+from .models import CostSource, ResourceType, SnapshotRole, UnusedResource
+from .pricing import PriceCatalog
 
 logger = logging.getLogger(__name__)
 
+# Display name, hourly base price (us-east-1) and resource type per load balancer type
+LOAD_BALANCER_TYPES = {
+    "application": ("Application Load Balancer", 0.0225, ResourceType.ALB),
+    "network": ("Network Load Balancer", 0.0225, ResourceType.NLB),
+    "gateway": ("Gateway Load Balancer", 0.0125, ResourceType.GWLB),
+}
+LB_IDLE_DAYS = 7
+# Elastic IPs bill $0.005/hr unless attached to a running instance
+EIP_MONTHLY = 3.60
+# How far back CloudTrail's event history goes
+CLOUDTRAIL_LOOKBACK_DAYS = 90
+
+# "User initiated (2026-01-05 17:27:34 GMT)"
+_STOP_TIME = re.compile(r"\((\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) GMT\)")
+
+# Result category per resource type, in scan order
+CATEGORIES = {
+    ResourceType.EBS_VOLUME: "ebs_volumes",
+    ResourceType.ELASTIC_IP: "elastic_ips",
+    ResourceType.ALB: "load_balancers",
+    ResourceType.NLB: "load_balancers",
+    ResourceType.GWLB: "load_balancers",
+    ResourceType.EC2_INSTANCE: "stopped_instances",
+    ResourceType.SNAPSHOT: "old_snapshots",
+    ResourceType.S3_BUCKET: "s3_buckets",
+}
+
 
 class UnusedDetector:
     """Detect unused AWS resources and estimate waste."""
 
-    def __init__(self, config: Config) -> None:
+    def __init__(
+        self,
+        config: Config,
+        catalog: PriceCatalog | None = None,
+        costs: Optional[ResourceCostIndex] = None,
+        history: Optional[ScanHistory] = None,
+    ) -> None:
         self.session = config.get_session()
+        self.region = self.session.region_name or "us-east-1"
         self.ec2 = self.session.client("ec2")
         self.elb = self.session.client("elbv2")
         self.s3 = self.session.client("s3")
         self.cw = self.session.client("cloudwatch")
+        self.backup = self.session.client("backup")
+        self.cloudtrail = self.session.client("cloudtrail")
+        self.metrics = MetricFetcher(self.cw, history)
+        self.history = history
+        self.stopped_days = config.stopped_ec2_days
+        self.catalog = catalog or PriceCatalog.load()
+        # Net amortized per-resource cost (CUR or Cost Explorer); list-price estimates are the fallback
+        self.costs = costs
+        # Snapshot lineage from the last scan, for callers that want the full classification
+        self.lineage: Optional[SnapshotLineage] = None
+        # Listings shared by the checks of one scan
+        self._volumes: Optional[dict[str, dict]] = None
+        self._addresses: Optional[list[dict]] = None
+        # CloudTrail stop times by (instance ID, launch time), when there's no history to keep them;
+        # None when the stop predates CloudTrail's window
+        self._stop_cache: dict[tuple[str, str], Optional[datetime]] = {}
+
+    def fetch(self) -> list[UnusedResource]:
+        """Find unused resources of every supported type."""
+        self._volumes = self._addresses = None
+        return [
+            *self._find_unattached_ebs(),
+            *self._find_unassociated_eips(),
+            *self._find_idle_load_balancers(),
+            *self._find_stopped_instances(),
+            *self._find_old_snapshots(),
+        ]
 
     def scan(self) -> dict[str, Any]:
         """Scan all resource types for unused items."""
-        results = {
-            "ebs_volumes": self._find_unattached_ebs(),
-            "elastic_ips": self._find_unassociated_eips(),
-            "load_balancers": self._find_idle_load_balancers(),
-            "stopped_instances": self._find_stopped_instances(),
-            "old_snapshots": self._find_old_snapshots(),
-        }
+        return self.summarize(self.fetch())
 
-        total = sum(len(v) for v in results.values())
-        savings = sum(item.get("monthly_cost", 0) for items in results.values() for item in items)
+    def summarize(self, resources: list[UnusedResource]) -> dict[str, Any]:
+        """Dict view of :meth:`fetch` results, grouped by category."""
+        results: dict[str, list[dict]] = {category: [] for category in CATEGORIES.values()}
+        now = datetime.now(timezone.utc)
+        for res in resources:
+            results[CATEGORIES[res.resource_type]].append(self._as_dict(res, now))
 
+        savings = sum(res.monthly_cost for res in resources)
         return {
-            "total_unused": total,
+            "total_unused": len(resources),
             "potential_savings": round(savings, 2),
             "resources": results,
         }
 
-    def _find_unattached_ebs(self) -> list[dict]:
-        """Find EBS volumes not attached to any instance."""
-        volumes = self.ec2.describe_volumes(Filters=[{"Name": "status", "Values": ["available"]}])
+    def _as_dict(self, res: UnusedResource, now: datetime) -> dict:
+        """Legacy per-category dict shape for one finding."""
+        item = {"id": res.resource_id}
+        kind = res.resource_type
+        if kind == ResourceType.EBS_VOLUME:
+            item.update(type="EBS Volume", size_gb=int(res.size_gb), volume_type=res.subtype,
+                        created=res.created.isoformat())
+        elif kind == ResourceType.ELASTIC_IP:
+            item.update(type="Elastic IP", allocation_id=res.secondary_id)
+        elif kind == ResourceType.EC2_INSTANCE:
+            item.update(type="Stopped EC2", name=res.name, instance_type=res.subtype,
+                        stopped_days=(now - res.last_used).days if res.last_used else None)
+        elif kind == ResourceType.SNAPSHOT:
+            item.update(type="EBS Snapshot", size_gb=int(res.size_gb), role=res.subtype, volume_id=res.secondary_id,
+                        age_days=(now - res.created.replace(tzinfo=timezone.utc)).days)
+        elif kind == ResourceType.S3_BUCKET:
+            item.update(type="S3 Bucket", finding=res.subtype, size_gb=res.size_gb)
+        else:
+            item.update(type=LOAD_BALANCER_TYPES[res.subtype][0], arn=res.secondary_id)
+        item.update(monthly_cost=res.monthly_cost, cost_source=res.cost_source.value)
+        if kind in (ResourceType.ALB, ResourceType.NLB, ResourceType.GWLB):
+            item.update(idle_metric=IDLE_SIGNALS[res.subtype].metric_name, idle_days=LB_IDLE_DAYS)
+        item["action"] = res.reason
+        return item
+
+    def _find_unattached_ebs(self) -> list[UnusedResource]:
+        """Find EBS volumes not attached to any instance, from the scan's volume listing."""
         results = []
-        for vol in volumes.get("Volumes", []):
-            size_gb = vol["Size"]
-            # gp3: $0.08/GB/month
-            monthly = size_gb * 0.08
-            results.append({
-                "id": vol["VolumeId"],
-                "type": "EBS Volume",
-                "size_gb": size_gb,
-                "volume_type": vol["VolumeType"],
-                "created": vol["CreateTime"].isoformat(),
-                "monthly_cost": round(monthly, 2),
-                "action": "Delete or snapshot and delete",
-            })
+        for vol in self._volume_index().values():
+            if vol.get("State") != "available":
+                continue
+            monthly, source = self._attributed(self._volume_monthly_cost(vol), vol["VolumeId"])
+            results.append(UnusedResource(
+                resource_id=vol["VolumeId"],
+                resource_type=ResourceType.EBS_VOLUME,
+                region=self.region,
+                reason="Delete or snapshot and delete",
+                monthly_cost=round(monthly, 2),
+                subtype=vol["VolumeType"],
+                size_gb=vol["Size"],
+                created=vol["CreateTime"],
+                cost_source=source,
+            ))
         return results
 
-    def _find_unassociated_eips(self) -> list[dict]:
+    def _find_unassociated_eips(self) -> list[UnusedResource]:
         """Find Elastic IPs not associated with any resource."""
-        addresses = self.ec2.describe_addresses()
         results = []
-        for addr in addresses.get("Addresses", []):
+        for addr in self._address_list():
             if "AssociationId" not in addr:
-                results.append({
-                    "id": addr["PublicIp"],
-                    "type": "Elastic IP",
-                    "allocation_id": addr["AllocationId"],
-                    "monthly_cost": 3.60,  # $0.005/hr unused
-                    "action": "Release if not needed",
-                })
+                monthly, source = self._attributed(EIP_MONTHLY, addr["AllocationId"], addr["PublicIp"])
+                results.append(UnusedResource(
+                    resource_id=addr["PublicIp"],
+                    resource_type=ResourceType.ELASTIC_IP,
+                    region=self.region,
+                    reason="Release if not needed",
+                    monthly_cost=round(monthly, 2),
+                    secondary_id=addr["AllocationId"],
+                    cost_source=source,
+                ))
         return results
 
-    def _find_idle_load_balancers(self) -> list[dict]:
-        """Find ALBs with zero requests in last 7 days."""
-        lbs = self.elb.describe_load_balancers()
-        results = []
-        end = datetime.now(timezone.utc)
-        start = end - timedelta(days=7)
+    def _find_idle_load_balancers(self, days: int = LB_IDLE_DAYS) -> list[UnusedResource]:
+        """Find ALBs, NLBs and GWLBs with no traffic in the last N days.
+
+        All load balancers are checked with a single batched GetMetricData
+        sweep of daily totals, using the activity metric that matches each
+        LB type. The window is the last N whole days plus today, so cached
+        days line up between runs.
+        """
+        lbs = []
+        paginator = self.elb.get_paginator("describe_load_balancers")
+        for page in paginator.paginate():
+            lbs.extend(page.get("LoadBalancers", []))
+        if not lbs:
+            return []
 
-        for lb in lbs.get("LoadBalancers", []):
+        today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        start = today - timedelta(days=days)
+        end = today + timedelta(days=1)
+        queries = [
+            idle_query(
+                lb.get("Type", "application"),
+                lb["LoadBalancerArn"],
+                "/".join(lb["LoadBalancerArn"].split("/")[-3:]),
+            )
+            for lb in lbs
+        ]
+        daily, missing = self.metrics.grid(queries, start, end)
+        totals = dict(zip((q.key for q in queries), np.nansum(daily, axis=1)))
+
+        results = []
+        for lb in lbs:
             arn = lb["LoadBalancerArn"]
-            arn_suffix = "/".join(arn.split("/")[-3:])
-            try:
-                metrics = self.cw.get_metric_statistics(
-                    Namespace="AWS/ApplicationELB",
-                    MetricName="RequestCount",
-                    Dimensions=[{"Name": "LoadBalancer", "Value": arn_suffix}],
-                    StartTime=start, EndTime=end,
-                    Period=86400, Statistics=["Sum"],
-                )
-                total_requests = sum(p["Sum"] for p in metrics.get("Datapoints", []))
-                if total_requests == 0:
-                    results.append({
-                        "id": lb["LoadBalancerName"],
-                        "type": "Application Load Balancer",
-                        "arn": arn,
-                        "monthly_cost": 16.20,  # ~$0.0225/hr
-                        "requests_7d": 0,
-                        "action": "Delete if no longer needed",
-                    })
-            except Exception as e:
-                logger.warning(f"Failed to check ALB {lb['LoadBalancerName']}: {e}")
+            if arn in missing:
+                logger.warning(f"No metric data for load balancer {lb['LoadBalancerName']}")
+                continue
+            if totals[arn] == 0:
+                lb_type = lb.get("Type", "application")
+                _, hourly, resource_type = LOAD_BALANCER_TYPES[lb_type]
+                monthly, source = self._attributed(hourly * 720, arn)
+                results.append(UnusedResource(
+                    resource_id=lb["LoadBalancerName"],
+                    resource_type=resource_type,
+                    region=self.region,
+                    reason="Delete if no longer needed",
+                    monthly_cost=round(monthly, 2),
+                    subtype=lb_type,
+                    secondary_id=arn,
+                    created=lb.get("CreatedTime"),
+                    cost_source=source,
+                ))
         return results
 
-    def _find_stopped_instances(self, days: int = 7) -> list[dict]:
-        """Find EC2 instances stopped for more than N days."""
-        instances = self.ec2.describe_instances(
-            Filters=[{"Name": "instance-state-name", "Values": ["stopped"]}]
-        )
+    def _find_stopped_instances(self, days: Optional[int] = None) -> list[UnusedResource]:
+        """Find EC2 instances stopped for at least N days (``stopped_ec2_days`` by default).
+
+        The stop time is the timestamp in ``StateTransitionReason``, or
+        failing that the instance's last CloudTrail ``StopInstances``
+        event. With no event in CloudTrail's window, the instance is only
+        known to have been stopped longer than that. Stopped instances
+        still pay for their EBS volumes and Elastic IPs, which are priced
+        from one listing of each.
+        """
+        days = self.stopped_days if days is None else days
+        instances = [
+            inst
+            for page in self.ec2.get_paginator("describe_instances").paginate(
+                Filters=[{"Name": "instance-state-name", "Values": ["stopped"]}]
+            )
+            for res in page.get("Reservations", [])
+            for inst in res["Instances"]
+        ]
+        if not instances:
+            return []
+
+        now = datetime.now(timezone.utc)
+        cutoff = now - timedelta(days=days)
+        stop_times, before_lookback = self._stop_times(instances, now)
+        volumes = self._volume_index()
+        addresses: dict[str, list[dict]] = {}
+        for addr in self._address_list():
+            if addr.get("InstanceId"):
+                addresses.setdefault(addr["InstanceId"], []).append(addr)
+
         results = []
-        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+        for inst in instances:
+            instance_id = inst["InstanceId"]
+            stopped_at = stop_times.get(instance_id)
+            if stopped_at is not None:
+                if stopped_at > cutoff:
+                    continue
+                action = f"Terminate or start (stopped {(now - stopped_at).days} days)"
+            elif instance_id in before_lookback and days <= CLOUDTRAIL_LOOKBACK_DAYS:
+                action = f"Terminate or start (stopped {CLOUDTRAIL_LOOKBACK_DAYS}+ days)"
+            else:
+                # The stop can't predate the last launch
+                launched = inst.get("LaunchTime")
+                if launched is not None and launched.replace(tzinfo=timezone.utc) > cutoff:
+                    continue
+                action = "Terminate or start (stop time unknown)"
 
-        for res in instances.get("Reservations", []):
-            for inst in res["Instances"]:
-                stop_time = inst.get("StateTransitionReason", "")
-                # EBS costs still apply for stopped instances
-                ebs_cost = sum(
-                    self._estimate_ebs_cost(m.get("Ebs", {}).get("VolumeId", ""))
-                    for m in inst.get("BlockDeviceMappings", [])
-                )
-                name = next((t["Value"] for t in inst.get("Tags", []) if t["Key"] == "Name"), "")
-                results.append({
-                    "id": inst["InstanceId"],
-                    "type": "Stopped EC2",
-                    "name": name,
-                    "instance_type": inst["InstanceType"],
-                    "monthly_cost": round(ebs_cost, 2),
-                    "action": f"Terminate or start (stopped {days}+ days)",
-                })
+            monthly, attributed = 0.0, False
+            for mapping in inst.get("BlockDeviceMappings", []):
+                volume_id = mapping.get("Ebs", {}).get("VolumeId", "")
+                if self.costs is not None and volume_id in self.costs:
+                    monthly += self.costs.monthly_cost(volume_id, 0.0)
+                    attributed = True
+                elif volume_id in volumes:
+                    monthly += self._volume_monthly_cost(volumes[volume_id])
+            for addr in addresses.get(instance_id, []):
+                cost, source = self._attributed(EIP_MONTHLY, addr["AllocationId"], addr["PublicIp"])
+                monthly += cost
+                attributed = attributed or source != CostSource.ESTIMATE
+
+            name = next((t["Value"] for t in inst.get("Tags", []) if t["Key"] == "Name"), "")
+            results.append(UnusedResource(
+                resource_id=instance_id,
+                resource_type=ResourceType.EC2_INSTANCE,
+                region=self.region,
+                name=name,
+                reason=action,
+                monthly_cost=round(monthly, 2),
+                last_used=stopped_at,
+                subtype=inst["InstanceType"],
+                created=inst.get("LaunchTime"),
+                cost_source=self.costs.source if attributed else CostSource.ESTIMATE,
+            ))
         return results
 
-    def _find_old_snapshots(self, days: int = 30) -> list[dict]:
-        """Find EBS snapshots older than N days."""
+    def _stop_times(self, instances: list[dict], now: datetime) -> tuple[dict[str, datetime], set[str]]:
+        """When each stopped instance was stopped, where it can be found.
+
+        Returns the known stop times, and the IDs of instances with no
+        stop event in CloudTrail's 90-day window, which were stopped
+        before it. Stop times looked up in CloudTrail are memoized in the
+        scan history, keyed by launch time; the lower bounds are only
+        kept for this detector's lifetime, never stored as times.
+        """
+        stop_times: dict[str, datetime] = {}
+        before_lookback: set[str] = set()
+        launches: dict[str, str] = {}
+        for inst in instances:
+            stopped_at = parse_stop_time(inst.get("StateTransitionReason", ""))
+            if stopped_at is not None:
+                stop_times[inst["InstanceId"]] = stopped_at
+            else:
+                launched = inst.get("LaunchTime")
+                launches[inst["InstanceId"]] = launched.isoformat() if launched else ""
+        for instance_id, launched in list(launches.items()):
+            if (instance_id, launched) in self._stop_cache:
+                cached = self._stop_cache[instance_id, launched]
+                if cached is None:
+                    before_lookback.add(instance_id)
+                else:
+                    stop_times[instance_id] = cached
+                del launches[instance_id]
+        if self.history is not None and launches:
+            for instance_id, stopped_at in self.history.stop_times(launches).items():
+                stop_times[instance_id] = stopped_at
+                del launches[instance_id]
+        if not launches:
+            return stop_times, before_lookback
+
+        since = now - timedelta(days=CLOUDTRAIL_LOOKBACK_DAYS)
+        try:
+            found = self._cloudtrail_stop_times(set(launches), since)
+        except Exception as e:
+            logger.warning(f"Could not look up stop times in CloudTrail, {len(launches)} "
+                           f"stopped instances have no known stop time: {e}")
+            return stop_times, before_lookback
+        for instance_id, launched in launches.items():
+            stopped_at = found.get(instance_id)
+            self._stop_cache[instance_id, launched] = stopped_at
+            if stopped_at is None:
+                before_lookback.add(instance_id)
+            else:
+                stop_times[instance_id] = stopped_at
+        if self.history is not None and found:
+            self.history.store_stop_times({i: (launches[i], stopped_at) for i, stopped_at in found.items()})
+        return stop_times, before_lookback
+
+    def _cloudtrail_stop_times(self, instance_ids: set[str], since: datetime) -> dict[str, datetime]:
+        """Most recent ``StopInstances`` time since ``since`` of each instance that has one.
+
+        One paginated lookup of the region's ``StopInstances`` events,
+        matched against ``instance_ids``; paging stops once all are found.
+        """
+        found: dict[str, datetime] = {}
+        paginator = self.cloudtrail.get_paginator("lookup_events")
+        for page in paginator.paginate(
+            LookupAttributes=[{"AttributeKey": "EventName", "AttributeValue": "StopInstances"}],
+            StartTime=since,
+        ):
+            # Events come newest first; one call can stop several instances
+            for event in page.get("Events", []):
+                for resource in event.get("Resources", []):
+                    instance_id = resource.get("ResourceName")
+                    if instance_id in instance_ids and instance_id not in found:
+                        found[instance_id] = event["EventTime"].replace(tzinfo=timezone.utc)
+            if len(found) == len(instance_ids):
+                break
+        return found
+
+    def _find_old_snapshots(self, days: int = 30) -> list[UnusedResource]:
+        """Find EBS snapshots older than N days that nothing needs.
+
+        Snapshots backing an AMI or managed by AWS Backup are skipped, as
+        is the newest snapshot of each live volume. Orphaned snapshots and
+        older links of a live volume's chain are reported at the cost of
+        their estimated increment, which is what deleting them frees.
+        """
         cutoff = datetime.now(timezone.utc) - timedelta(days=days)
-        snapshots = self.ec2.describe_snapshots(OwnerIds=["self"])
+        lineage = self.lineage = SnapshotLineage.fetch(self.ec2, self.backup, self._volume_index().keys())
+        counts = lineage.counts()
+        logger.info(
+            f"Indexed {len(lineage)} snapshots: "
+            + ", ".join(f"{count} {role.value}" for role, count in counts.items())
+        )
+        per_gb = self.catalog.volume_price("snapshot", self.region) or 0.05
         results = []
 
-        for snap in snapshots.get("Snapshots", []):
-            if snap["StartTime"].replace(tzinfo=timezone.utc) < cutoff:
-                size_gb = snap["VolumeSize"]
-                monthly = size_gb * 0.05  # $0.05/GB/month for snapshots
-                results.append({
-                    "id": snap["SnapshotId"],
-                    "type": "EBS Snapshot",
-                    "size_gb": size_gb,
-                    "age_days": (datetime.now(timezone.utc) - snap["StartTime"].replace(tzinfo=timezone.utc)).days,
-                    "monthly_cost": round(monthly, 2),
-                    "action": "Delete if no longer needed for recovery",
-                })
-        return sorted(results, key=lambda x: -x["monthly_cost"])
-
-    def _estimate_ebs_cost(self, volume_id: str) -> float:
-        """Estimate monthly cost for an EBS volume."""
-        if not volume_id:
-            return 0
-        try:
-            vol = self.ec2.describe_volumes(VolumeIds=[volume_id])["Volumes"][0]
-            return vol["Size"] * 0.08  # gp3 pricing
-        except Exception:
-            return 2.0  # Assume small volume
+        for link in lineage.links():
+            if link.role in (SnapshotRole.AMI, SnapshotRole.BACKUP):
+                continue
+            if link.role == SnapshotRole.CHAIN and link.chain_index == link.chain_length - 1:
+                continue
+            snap = lineage.snapshots[link.snapshot_id]
+            if snap["StartTime"].replace(tzinfo=timezone.utc) >= cutoff:
+                continue
+            monthly, source = self._attributed(link.incremental_gb * per_gb, link.snapshot_id)
+            if link.role == SnapshotRole.ORPHANED:
+                reason = "Delete — source volume is gone and no AMI or backup uses it"
+            else:
+                reason = f"Prune — older snapshot of live volume {link.volume_id}"
+            results.append(UnusedResource(
+                resource_id=link.snapshot_id,
+                resource_type=ResourceType.SNAPSHOT,
+                region=self.region,
+                reason=reason,
+                monthly_cost=round(monthly, 2),
+                subtype=link.role.value,
+                secondary_id=link.volume_id,
+                size_gb=snap["VolumeSize"],
+                created=snap["StartTime"],
+                cost_source=source,
+            ))
+        return sorted(results, key=lambda x: -x.monthly_cost)
+
+    def _volume_index(self) -> dict[str, dict]:
+        """Every volume in the region by ID, listed once per scan."""
+        if self._volumes is None:
+            self._volumes = {
+                vol["VolumeId"]: vol
+                for page in self.ec2.get_paginator("describe_volumes").paginate(
+                    PaginationConfig={"PageSize": 1000}
+                )
+                for vol in page.get("Volumes", [])
+            }
+        return self._volumes
+
+    def _address_list(self) -> list[dict]:
+        """Every Elastic IP in the region, listed once per scan."""
+        if self._addresses is None:
+            self._addresses = self.ec2.describe_addresses().get("Addresses", [])
+        return self._addresses
+
+    def _attributed(self, estimate: float, *resource_ids: str) -> tuple[float, CostSource]:
+        """Actual (net amortized) cost for the first ID the index knows, else the estimate."""
+        if self.costs is not None:
+            for resource_id in resource_ids:
+                cost = self.costs.get(resource_id)
+                if cost is not None:
+                    return cost.monthly_cost, self.costs.source
+        return estimate, CostSource.ESTIMATE
+
+    def _volume_monthly_cost(self, vol: dict) -> float:
+        """Monthly storage + provisioned IOPS/throughput cost for an EBS volume."""
+        volume_type = vol.get("VolumeType", "gp3")
+        cost = self.catalog.monthly_volume_cost(
+            volume_type, vol["Size"], self.region, vol.get("Iops", 0), vol.get("Throughput", 0)
+        )
+        if cost is None:
+            logger.warning(f"No price for {volume_type} in {self.region}, assuming gp3 rate")
+            cost = self.catalog.monthly_volume_cost("gp3", vol["Size"], self.region) or vol["Size"] * 0.08
+        return cost
+
+
+def parse_stop_time(reason: str) -> Optional[datetime]:
+    """Stop time from an instance's ``StateTransitionReason``, if it has one."""
+    match = _STOP_TIME.search(reason or "")
+    if match is None:
+        return None
+    return datetime.strptime(match.group(1), "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
@@ -6,7 +6,12 @@ setup(
     description="AWS Cloud Cost Optimization Engine",
     author="Hunter Spence",
     packages=find_packages(),
-    install_requires=["boto3>=1.28.0", "click>=8.0", "jinja2>=3.0"],
+    install_requires=["boto3>=1.28.0", "click>=8.0", "jinja2>=3.0", "numpy>=1.24"],
+    extras_require={
+        "cur": ["pyarrow>=14.0"],
+        "msgpack": ["msgpack>=1.0"],
+        "bench": ["pytest-benchmark>=4.0"],
+    },
     entry_points={"console_scripts": ["costpilot=costpilot.cli:main"]},
     python_requires=">=3.10",
 )
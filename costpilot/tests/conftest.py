@@ -2,17 +2,24 @@
 
 from __future__ import annotations
 
+from dataclasses import MISSING, fields
 from datetime import datetime, timezone
 from unittest.mock import MagicMock, patch
 
 import pytest
 
+from costpilot.config import CostPilotConfig
+
 
 @pytest.fixture
 def mock_config():
     """Create a mock Config object with a mock boto3 session."""
     config = MagicMock()
+    # Real defaults for settings, so engines can compare and compute with them
+    for f in fields(CostPilotConfig):
+        setattr(config, f.name, f.default if f.default is not MISSING else f.default_factory())
     session = MagicMock()
+    session.region_name = "us-east-1"
     config.get_session.return_value = session
     return config
 
@@ -132,12 +139,14 @@ def sample_ebs_volumes():
                 "VolumeId": "vol-0aaa111",
                 "Size": 100,
                 "VolumeType": "gp3",
+                "State": "available",
                 "CreateTime": datetime(2025, 6, 1, tzinfo=timezone.utc),
             },
             {
                 "VolumeId": "vol-0bbb222",
                 "Size": 50,
                 "VolumeType": "gp2",
+                "State": "available",
                 "CreateTime": datetime(2025, 9, 15, tzinfo=timezone.utc),
             },
         ]
@@ -0,0 +1,195 @@
+"""Unit tests for budget reconciliation."""
+
+from unittest.mock import MagicMock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from costpilot.alerts import WATCH_BUDGET, AlertManager, BudgetSpec, load_budgets
+
+
+def _budget(name: str, amount: float = 100.0, **filters) -> dict:
+    budget = {"BudgetName": name, "BudgetLimit": {"Amount": str(amount), "Unit": "USD"}, "TimeUnit": "MONTHLY"}
+    if filters:
+        budget["CostFilters"] = filters
+    return budget
+
+
+def _notification(threshold: float, kind: str = "ACTUAL") -> dict:
+    return {"NotificationType": kind, "ComparisonOperator": "GREATER_THAN",
+            "Threshold": threshold, "ThresholdType": "PERCENTAGE"}
+
+
+class FakeBudgets:
+    """Serves describe_* pages from ``budgets`` and ``notifications``."""
+
+    def __init__(self, client: MagicMock, budgets: list[dict],
+                 notifications: dict[str, dict[float, list[str]]]) -> None:
+        self.budgets = budgets
+        self.notifications = notifications
+        client.get_caller_identity.return_value = {"Account": "123456789012"}
+        client.get_paginator.side_effect = self.paginator
+
+    def paginator(self, name: str) -> MagicMock:
+        return MagicMock(paginate=MagicMock(side_effect=getattr(self, name)))
+
+    def describe_budgets(self, **kwargs) -> list[dict]:
+        return [{"Budgets": self.budgets[:1]}, {"Budgets": self.budgets[1:]}]
+
+    def describe_notifications_for_budget(self, BudgetName: str, **kwargs) -> list[dict]:
+        thresholds = self.notifications.get(BudgetName, {})
+        return [{"Notifications": [_notification(t) for t in thresholds]}]
+
+    def describe_subscribers_for_notification(self, BudgetName: str, Notification: dict, **kwargs) -> list[dict]:
+        addresses = self.notifications[BudgetName][Notification["Threshold"]]
+        return [{"Subscribers": [{"SubscriptionType": "EMAIL", "Address": a} for a in addresses]}]
+
+
+def _spec(name: str = "web", amount: float = 100.0, **kwargs) -> BudgetSpec:
+    kwargs.setdefault("thresholds", [80, 100])
+    kwargs.setdefault("subscribers", ["a@example.com"])
+    return BudgetSpec(name=name, amount=amount, **kwargs)
+
+
+class TestBudgetReconciliation:
+    """Tests for AlertManager.plan/apply."""
+
+    def _manager(self, mock_config, budgets=(), notifications=None) -> tuple[AlertManager, MagicMock]:
+        client = mock_config.get_session.return_value.client.return_value
+        FakeBudgets(client, list(budgets), notifications or {})
+        return AlertManager(mock_config, max_workers=2), client
+
+    def test_creates_new_budget(self, mock_config):
+        manager, client = self._manager(mock_config)
+
+        plan = manager.apply([_spec(accounts=["111"], tags={"team": "web"})])
+
+        assert [s.name for s in plan.creates] == ["CostPilot-web"]
+        kwargs = client.create_budget.call_args.kwargs
+        assert kwargs["AccountId"] == "123456789012"
+        assert kwargs["Budget"]["CostFilters"] == {"LinkedAccount": ["111"], "TagKeyValue": ["user:team$web"]}
+        assert [n["Notification"]["Threshold"] for n in kwargs["NotificationsWithSubscribers"]] == [80.0, 100.0]
+        assert kwargs["NotificationsWithSubscribers"][0]["Subscribers"] == [
+            {"SubscriptionType": "EMAIL", "Address": "a@example.com"}
+        ]
+
+    def test_second_run_is_a_no_op(self, mock_config):
+        manager, client = self._manager(
+            mock_config,
+            [_budget("CostPilot-web", LinkedAccount=["111"])],
+            {"CostPilot-web": {80.0: ["a@example.com"], 100.0: ["a@example.com"]}},
+        )
+
+        plan = manager.apply([_spec(accounts=["111"])])
+
+        assert plan.changes == 0 and plan.unchanged == 1
+        for call in ("create_budget", "update_budget", "delete_budget", "create_notification", "create_subscriber"):
+            getattr(client, call).assert_not_called()
+
+    def test_updates_only_what_changed(self, mock_config):
+        manager, client = self._manager(
+            mock_config,
+            [_budget("CostPilot-web", 100.0)],
+            {"CostPilot-web": {50.0: ["a@example.com"], 100.0: ["old@example.com"]}},
+        )
+
+        plan = manager.apply([_spec(amount=150.0)])
+
+        change = plan.updates[0]
+        assert change.budget
+        assert change.add_notifications == [("ACTUAL", "GREATER_THAN", 80.0, "PERCENTAGE")]
+        assert change.remove_notifications == [("ACTUAL", "GREATER_THAN", 50.0, "PERCENTAGE")]
+        assert client.update_budget.call_args.kwargs["NewBudget"]["BudgetLimit"]["Amount"] == "150.00"
+        assert client.delete_notification.call_args.kwargs["Notification"]["Threshold"] == 50.0
+        assert client.create_subscriber.call_args.kwargs["Subscriber"]["Address"] == "a@example.com"
+        assert client.delete_subscriber.call_args.kwargs["Subscriber"]["Address"] == "old@example.com"
+
+    def test_prunes_only_managed_budgets(self, mock_config):
+        manager, client = self._manager(
+            mock_config, [_budget("CostPilot-gone"), _budget("hand-made")], {"CostPilot-gone": {}}
+        )
+
+        plan = manager.apply([], prune=True, allow_empty=True)
+        assert plan.deletes == ["CostPilot-gone"]
+        client.delete_budget.assert_called_once_with(AccountId="123456789012", BudgetName="CostPilot-gone")
+
+        client.delete_budget.reset_mock()
+        assert manager.apply([], prune=False).changes == 0
+        client.delete_budget.assert_not_called()
+
+    def test_empty_declaration_needs_confirmation_to_prune(self, mock_config):
+        manager, client = self._manager(mock_config, [_budget("CostPilot-gone")])
+
+        with pytest.raises(ValueError, match="No budgets declared"):
+            manager.apply([])
+        client.delete_budget.assert_not_called()
+
+    def test_watch_budget_is_never_pruned(self, mock_config):
+        manager, client = self._manager(
+            mock_config,
+            [_budget(WATCH_BUDGET), _budget("CostPilot-web")],
+            {"CostPilot-web": {80.0: ["a@example.com"], 100.0: ["a@example.com"]}},
+        )
+
+        assert manager.apply([_spec()]).deletes == []
+        assert manager.apply([], allow_empty=True).deletes == ["CostPilot-web"]
+
+    def test_dry_run_makes_no_changes(self, mock_config):
+        manager, client = self._manager(mock_config, [_budget("CostPilot-gone")])
+
+        plan = manager.apply([_spec()], dry_run=True)
+
+        assert plan.changes == 2
+        client.create_budget.assert_not_called()
+        client.delete_budget.assert_not_called()
+
+    def test_plan_leaves_callers_specs_unprefixed(self, mock_config):
+        manager, client = self._manager(mock_config)
+        specs = [_spec()]
+
+        manager.plan(specs)
+        plan = manager.apply(specs, prefix="Team-")
+
+        assert specs[0].name == "web"
+        assert [s.name for s in plan.creates] == ["Team-web"]
+        assert client.create_budget.call_args.kwargs["Budget"]["BudgetName"] == "Team-web"
+
+    def test_failures_are_collected(self, mock_config):
+        manager, client = self._manager(mock_config, [_budget("CostPilot-gone")])
+        client.create_budget.side_effect = ClientError({"Error": {"Code": "AccessDeniedException"}}, "CreateBudget")
+        client.delete_budget.side_effect = ClientError({"Error": {"Code": "NotFoundException"}}, "DeleteBudget")
+
+        plan = manager.apply([_spec()])
+
+        assert len(plan.errors) == 1 and plan.errors[0].startswith("CostPilot-web:")
+
+
+class TestLoadBudgets:
+    """Tests for reading budget declarations."""
+
+    def test_defaults_apply_to_every_budget(self, tmp_path):
+        path = tmp_path / "budgets.yaml"
+        path.write_text(
+            "defaults:\n  subscribers: [finops@example.com]\n  thresholds: [90]\n"
+            "budgets:\n  - {name: web, amount: 500}\n  - {name: data, amount: 800, thresholds: [50, 100]}\n"
+        )
+
+        specs = load_budgets(path)
+
+        assert [(s.name, s.amount, s.thresholds) for s in specs] == [("web", 500.0, [90]), ("data", 800.0, [50, 100])]
+        assert specs[1].subscribers == ["finops@example.com"]
+
+    def test_duplicate_names_rejected(self, tmp_path):
+        path = tmp_path / "budgets.yaml"
+        path.write_text("- {name: web, amount: 1}\n- {name: web, amount: 2}\n")
+        with pytest.raises(ValueError, match="web"):
+            load_budgets(path)
+
+    def test_thresholds_without_subscribers_rejected(self, tmp_path):
+        path = tmp_path / "budgets.yaml"
+        path.write_text(
+            "budgets:\n  - {name: web, amount: 1, subscribers: [a@example.com]}\n"
+            "  - {name: data, amount: 2}\n  - {name: quiet, amount: 3, thresholds: []}\n"
+        )
+        with pytest.raises(ValueError, match="no subscribers: data$"):
+            load_budgets(path)
@@ -0,0 +1,138 @@
+"""Unit tests for tag-based cost allocation."""
+
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from costpilot.allocation import UNALLOCATED, UNTAGGED, AllocationRules, CostAllocator, CostTable
+
+START, END = date(2026, 3, 1), date(2026, 4, 1)
+
+ROWS = [
+    {"account": "111", "service": "EC2", "team": None, "env": "prod", "cost": 10.0},
+    {"account": "222", "service": "EC2", "team": "Web", "env": "prod", "cost": 30.0},
+    {"account": "222", "service": "S3", "team": "web", "env": None, "cost": 10.0},
+    {"account": "222", "service": "Support", "team": None, "env": None, "cost": 20.0},
+    {"account": "222", "service": "EC2", "team": "platform", "env": None, "cost": 5.0},
+    {"account": "333", "service": "EC2", "team": None, "env": None, "cost": 15.0},
+]
+
+
+def _allocate(mock_config, rows=ROWS, **rules):
+    allocator = CostAllocator(mock_config, AllocationRules.from_dict(rules))
+    return allocator.allocate(CostTable.from_rows(rows, ["team", "env"]), START, END)
+
+
+class TestAllocationRules:
+    """Tests for rule evaluation and the proportional split."""
+
+    def test_tags_accounts_and_shared_split(self, mock_config):
+        result = _allocate(
+            mock_config, accounts={111: "payments"}, aliases={"Web": "web"},
+            shared_services=["Support"], shared_owners=["platform"],
+        )
+
+        owners = {o.owner: o for o in result.owners}
+        assert set(owners) == {"web", "payments"}
+        # Direct 40 vs 10; the pool is Support 20 + platform 5 + untagged 15
+        assert result.shared_pool == 40.0
+        assert owners["web"].direct == 40.0
+        assert owners["web"].shared == 32.0
+        assert owners["payments"].total == 18.0
+        assert owners["web"].share_pct == 80.0
+        assert result.total == 90.0
+        assert result.owners[0].owner == "web"
+
+    def test_service_table_includes_shared_services(self, mock_config):
+        result = _allocate(mock_config, accounts={"111": "payments"}, shared_services=["Support"])
+
+        rows = {(r["owner"], r["service"]): r["cost"] for r in result.service_rows()}
+        # Without aliases, "Web" and "platform" are owners too
+        assert {owner for owner, _ in rows} == {"web", "Web", "platform", "payments"}
+        assert sum(cost for (_, service), cost in rows.items() if service == "Support") == pytest.approx(20.0, abs=0.02)
+        assert sum(rows.values()) == pytest.approx(90.0, abs=0.05)
+
+    def test_untagged_kept_when_not_split(self, mock_config):
+        result = _allocate(mock_config, split_untagged=False)
+
+        owners = {o.owner: o for o in result.owners}
+        assert owners[UNTAGGED].direct == 45.0
+        assert result.shared_pool == 0.0
+
+    def test_pool_unallocated_without_owners(self, mock_config):
+        rows = [{"account": "1", "service": "EC2", "team": None, "env": None, "cost": 7.0}]
+        result = _allocate(mock_config, rows)
+
+        assert [o.owner for o in result.owners] == [UNALLOCATED]
+        assert result.unallocated == 7.0
+
+    def test_breakdown_by_tag(self, mock_config):
+        result = _allocate(mock_config, accounts={"111": "payments"}, breakdown_tags=["env"])
+
+        assert result.breakdown[0] == {"owner": "Web", "env": "prod", "cost": 30.0}
+        assert {"owner": "web", "env": UNTAGGED, "cost": 10.0} in result.breakdown
+        assert {"owner": "payments", "env": "prod", "cost": 10.0} in result.breakdown
+
+    def test_rules_from_config(self, mock_config):
+        mock_config.allocation = {"owner_tag": "cost-center", "unknown": 1}
+        assert CostAllocator(mock_config).rules.owner_tag == "cost-center"
+
+
+class TestSources:
+    """Tests for reading costs from Cost Explorer and the CUR."""
+
+    def test_cost_explorer_tag_groups(self, mock_config):
+        ce = mock_config.get_session().client("ce")
+
+        def get_cost_and_usage(**kwargs):
+            if kwargs["GroupBy"][0]["Type"] == "TAG":
+                groups = [
+                    {"Keys": ["team$web", "EC2"], "Metrics": {"UnblendedCost": {"Amount": "30"}}},
+                    {"Keys": ["team$", "EC2"], "Metrics": {"UnblendedCost": {"Amount": "25"}}},
+                ]
+                if "NextPageToken" not in kwargs:
+                    return {"ResultsByTime": [{"Groups": groups[:1]}], "NextPageToken": "p2"}
+                return {"ResultsByTime": [{"Groups": groups[1:]}]}
+            assert kwargs["Filter"] == {"Tags": {"Key": "team", "MatchOptions": ["ABSENT"]}}
+            return {"ResultsByTime": [{"Groups": [
+                {"Keys": ["111", "EC2"], "Metrics": {"UnblendedCost": {"Amount": "10"}}},
+                {"Keys": ["333", "EC2"], "Metrics": {"UnblendedCost": {"Amount": "15"}}},
+            ]}]}
+
+        ce.get_cost_and_usage.side_effect = get_cost_and_usage
+        mock_config.allocation = {"accounts": {"111": "payments"}}
+
+        result = CostAllocator(mock_config).fetch(days=30, end=END)
+
+        owners = {o.owner: o for o in result.owners}
+        assert owners["web"].direct == 30.0
+        assert owners["payments"].direct == 10.0
+        assert result.shared_pool == 15.0
+        assert ce.get_cost_and_usage.call_count == 3
+
+    def test_cur_resource_tags(self, mock_config, tmp_path):
+        pa = pytest.importorskip("pyarrow")
+        import pyarrow.parquet as pq
+
+        start = datetime(2026, 3, 1, tzinfo=timezone.utc)
+        n = 48
+        pq.write_table(pa.table({
+            "line_item_usage_start_date": pa.array([start + timedelta(hours=h) for h in range(n)],
+                                                   pa.timestamp("ms", tz="UTC")),
+            "product_product_name": ["EC2", "S3", "Support", "EC2"] * (n // 4),
+            "line_item_usage_account_id": ["111", "111", "111", "222"] * (n // 4),
+            "line_item_unblended_cost": [1.0, 0.5, 0.25, 2.0] * (n // 4),
+            "resource_tags_user_team": ["web", "data", "", ""] * (n // 4),
+            "resource_tags_user_env": ["prod", "dev", "", ""] * (n // 4),
+        }), tmp_path / "cur.parquet")
+        mock_config.allocation = {"accounts": {"222": "payments"}, "shared_services": ["Support"]}
+
+        result = CostAllocator(mock_config).fetch_cur(str(tmp_path / "cur.parquet"), days=2)
+
+        owners = {o.owner: o for o in result.owners}
+        assert owners["payments"].direct == 24.0
+        assert owners["web"].direct == 12.0
+        assert owners["data"].direct == 6.0
+        assert result.shared_pool == 3.0
+        assert result.total == pytest.approx(45.0)
+        assert result.end == date(2026, 3, 3)
@@ -1,6 +1,7 @@
 """Unit tests for CostPilot cost analyzer."""
 
-from unittest.mock import MagicMock, call
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, call, patch
 
 import pytest
 
@@ -69,22 +70,36 @@ class TestCostAnalyzer:
         assert result["daily_costs"][0]["date"] == "2026-01-01"
         assert result["daily_costs"][0]["amount"] == 12.50
 
-    def test_cost_spikes_detected(
-        self, mock_config, sample_cost_explorer_response, sample_service_response, sample_region_response
-    ):
+    def test_cost_spikes_detected(self, mock_config, sample_service_response, sample_region_response):
+        # 21 days of steady EC2 and S3 spend; EC2 jumps on the last day
+        days = []
+        for i in range(21):
+            ec2 = 45.0 if i == 20 else 10.0 + (i % 3) * 0.5
+            days.append({
+                "TimePeriod": {"Start": f"2026-01-{i + 1:02d}", "End": f"2026-01-{i + 2:02d}"},
+                "Total": {},
+                "Groups": [
+                    {"Keys": ["Amazon EC2"], "Metrics": {"UnblendedCost": {"Amount": str(ec2)}}},
+                    {"Keys": ["Amazon S3"], "Metrics": {"UnblendedCost": {"Amount": "2.0"}}},
+                ],
+            })
         ce = mock_config.get_session().client("ce")
         ce.get_cost_and_usage.side_effect = [
-            sample_cost_explorer_response,
+            {"ResultsByTime": days},
             sample_service_response,
             sample_region_response,
         ]
 
         analyzer = self._make_analyzer(mock_config)
-        result = analyzer.analyze(days=3)
+        with patch("costpilot.analyzer.datetime") as mock_dt:
+            mock_dt.now.return_value = datetime(2026, 1, 22, tzinfo=timezone.utc)
+            result = analyzer.analyze(days=21)
 
-        # avg = 65.50/3 ≈ 21.83, spike threshold = 43.67 → 45.00 is a spike
-        assert len(result["cost_spikes"]) == 1
-        assert result["cost_spikes"][0]["amount"] == 45.00
+        spikes = {s["service"]: s for s in result["cost_spikes"]}
+        assert set(spikes) == {"Amazon EC2", "Total"}
+        assert spikes["Amazon EC2"]["date"] == "2026-01-21"
+        assert spikes["Amazon EC2"]["amount"] == 45.00
+        assert spikes["Amazon EC2"]["severity"] == "critical"
 
     def test_top_services_sorted(
         self, mock_config, sample_cost_explorer_response, sample_service_response, sample_region_response
@@ -133,3 +148,24 @@ class TestCostAnalyzer:
 
         assert len(result["by_region"]) == 2
         assert result["by_region"][0]["region"] == "us-east-1"
+
+    def test_forecast_and_cache(
+        self, mock_config, tmp_path, sample_cost_explorer_response, sample_service_response, sample_region_response
+    ):
+        ce = mock_config.get_session().client("ce")
+        ce.get_cost_and_usage.side_effect = [
+            sample_cost_explorer_response,
+            sample_service_response,
+            sample_region_response,
+        ]
+
+        analyzer = CostAnalyzer(mock_config, cache_path=tmp_path / "daily.npz")
+        with patch("costpilot.analyzer.datetime") as mock_dt:
+            mock_dt.now.return_value = datetime(2026, 1, 4, tzinfo=timezone.utc)
+            result = analyzer.analyze(days=3)
+
+        total = result["forecast"]["total"]
+        assert total["series"] == "Total"
+        assert result["projected_monthly"] == total["next_30_days"]
+        assert total["month_to_date"] == 65.50
+        assert (tmp_path / "daily.npz").exists()
@@ -0,0 +1,80 @@
+"""Unit tests for CostPilot spike detection."""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from costpilot.anomaly import SpikeDetector
+from costpilot.models import Severity
+
+START = date(2026, 3, 2)  # a Monday
+
+
+def _days(n):
+    return [START + timedelta(days=i) for i in range(n)]
+
+
+class TestSpikeDetector:
+    """Tests for SpikeDetector."""
+
+    def test_flags_jump_against_rolling_baseline(self):
+        rng = np.random.default_rng(0)
+        matrix = 100 + rng.normal(0, 2, size=(1, 30))
+        matrix[0, 25] = 160
+
+        spikes = SpikeDetector().detect(["EC2"], _days(30), matrix)
+
+        assert [(s.service, s.date) for s in spikes] == [("EC2", START + timedelta(days=25))]
+        assert spikes[0].deviation_pct == pytest.approx(60, abs=5)
+        assert spikes[0].severity == Severity.CRITICAL
+
+    def test_weekday_seasonality_is_not_a_spike(self):
+        # Weekends cost 3x — expected, so nothing is flagged
+        matrix = np.array([[300.0 if d.weekday() >= 5 else 100.0 for d in _days(42)]])
+
+        assert SpikeDetector().detect(["Batch"], _days(42), matrix) == []
+
+    def test_weekday_spike_relative_to_seasonal_baseline(self):
+        days = _days(42)
+        matrix = np.array([[300.0 if d.weekday() >= 5 else 100.0 for d in days]])
+        # A Wednesday at weekend levels is anomalous
+        matrix[0, 37] = 300.0
+
+        spikes = SpikeDetector().detect(["Batch"], days, matrix)
+
+        assert [s.date for s in spikes] == [days[37]]
+        assert spikes[0].average_cost == pytest.approx(100.0, rel=0.2)
+
+    def test_small_absolute_changes_ignored(self):
+        matrix = np.full((1, 30), 0.10)
+        matrix[0, 20] = 0.90
+
+        assert SpikeDetector(min_increase=1.0).detect(["Tiny"], _days(30), matrix) == []
+
+    def test_needs_minimum_history(self):
+        matrix = np.array([[10.0, 10.0, 10.0, 90.0]])
+
+        assert SpikeDetector(min_history=7).detect(["EC2"], _days(4), matrix) == []
+
+    def test_threshold_follows_std_devs(self):
+        rng = np.random.default_rng(1)
+        matrix = 100 + rng.normal(0, 5, size=(1, 30))
+        matrix[0, 25] = 118
+
+        assert SpikeDetector(std_devs=2.0).detect(["EC2"], _days(30), matrix)
+        assert SpikeDetector(std_devs=6.0).detect(["EC2"], _days(30), matrix) == []
+
+    def test_thousands_of_series_vectorized(self):
+        import time
+
+        rng = np.random.default_rng(2)
+        matrix = 50 + rng.normal(0, 1, size=(5000, 90))
+        matrix[::500, 80] += 40
+
+        t0 = time.perf_counter()
+        spikes = SpikeDetector(std_devs=4.0).detect([f"s{i}" for i in range(5000)], _days(90), matrix)
+        elapsed = time.perf_counter() - t0
+
+        assert {s.service for s in spikes if s.date == START + timedelta(days=80)} >= {f"s{i}" for i in range(0, 5000, 500)}
+        assert elapsed < 5.0
@@ -0,0 +1,215 @@
+"""Unit tests for CostPilot resource-level cost attribution."""
+
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+from botocore.exceptions import ClientError
+
+from costpilot.attribution import ResourceCostIndex
+from costpilot.models import CostSource
+from costpilot.pricing import PriceCatalog
+from costpilot.sizing import SizingEngine
+from costpilot.unused import UnusedDetector
+
+
+class TestResourceCostIndex:
+    """Tests for ResourceCostIndex."""
+
+    def test_sums_rows_and_keeps_dominant_usage_type(self):
+        index = ResourceCostIndex([
+            ("vol-1", "EBS:VolumeUsage.gp3", "Amazon Elastic Compute Cloud", 6.0),
+            ("vol-1", "EBS:VolumeP-IOPS.gp3", "Amazon Elastic Compute Cloud", 2.5),
+        ])
+
+        cost = index.get("vol-1")
+        assert cost.monthly_cost == 8.5
+        assert cost.usage_type == "EBS:VolumeUsage.gp3"
+        assert len(index) == 1
+
+    def test_arn_resources_indexed_by_bare_id(self):
+        arn = "arn:aws:ec2:us-east-1:111:snapshot/snap-0abc"
+        index = ResourceCostIndex([(arn, "EBS:SnapshotUsage", "Amazon Elastic Compute Cloud", 1.25)])
+
+        assert "snap-0abc" in index
+        assert index.monthly_cost("snap-0abc", 0.0) == 1.25
+        assert index.monthly_cost(arn, 0.0) == 1.25
+
+    def test_missing_resource_falls_back_to_estimate(self):
+        assert ResourceCostIndex().monthly_cost("vol-x", 4.0) == 4.0
+
+    def test_from_cur_scales_to_month(self, tmp_path):
+        pytest.importorskip("pyarrow")
+        from tests.test_cur import _write_cur
+
+        path = _write_cur(tmp_path / "cur.parquet", days=10, start=date(2026, 3, 1))
+        index = ResourceCostIndex.from_cur(str(path), days=10)
+
+        # 10 days of $0.096/hr, scaled to 30 days
+        assert index.monthly_cost("i-0abc", 0.0) == pytest.approx(30 * 24 * 0.096, abs=0.01)
+
+    def test_from_cur_uses_net_amortized_cost(self, tmp_path):
+        pa = pytest.importorskip("pyarrow")
+        import pyarrow.parquet as pq
+
+        # (resource, line type, unblended, net unblended, RI effective, SP effective, net SP effective)
+        lines = [
+            ("i-od", "Usage", 0.10, 0.095, None, None, None),
+            ("i-ri", "DiscountedUsage", 0.0, 0.0, 0.06, None, None),
+            ("i-sp", "SavingsPlanCoveredUsage", 0.10, 0.095, None, 0.07, 0.0665),
+            ("i-sp", "SavingsPlanNegation", -0.10, -0.095, None, None, None),
+            ("arn:aws:ec2:us-east-1:111:reserved-instances/ri-1", "RIFee", 5.0, 5.0, None, None, None),
+        ]
+        start = datetime(2026, 3, 1, tzinfo=timezone.utc)
+        hours = 24 * 10
+        rows = [(start + timedelta(hours=h), *line) for h in range(hours) for line in lines]
+        columns = list(zip(*rows))
+        pq.write_table(pa.table({
+            "line_item_usage_start_date": pa.array(columns[0], pa.timestamp("ms", tz="UTC")),
+            "product_product_name": ["Amazon Elastic Compute Cloud"] * len(rows),
+            "line_item_usage_type": ["BoxUsage:m5.large"] * len(rows),
+            "line_item_resource_id": columns[1],
+            "line_item_line_item_type": columns[2],
+            "line_item_unblended_cost": columns[3],
+            "line_item_net_unblended_cost": columns[4],
+            "reservation_effective_cost": pa.array(columns[5], pa.float64()),
+            "savings_plan_savings_plan_effective_cost": pa.array(columns[6], pa.float64()),
+            "savings_plan_net_savings_plan_effective_cost": pa.array(columns[7], pa.float64()),
+        }), tmp_path / "cur.parquet")
+
+        index = ResourceCostIndex.from_cur(str(tmp_path / "cur.parquet"), days=10)
+
+        month = 30 * 24
+        assert index.monthly_cost("i-od", 0.0) == pytest.approx(month * 0.095, abs=0.01)
+        # No net column for RIs: the gross effective cost is the net one
+        assert index.monthly_cost("i-ri", 0.0) == pytest.approx(month * 0.06, abs=0.01)
+        assert index.monthly_cost("i-sp", 0.0) == pytest.approx(month * 0.0665, abs=0.01)
+        assert index.monthly_cost("ri-1", -1.0) == 0.0
+        assert index.discount == pytest.approx((0.095 + 0.06 + 0.0665) / (0.10 + 0.06 + 0.07), abs=1e-4)
+
+    def test_from_cost_explorer_pages(self, mock_config):
+        ce = mock_config.get_session().client("ce")
+
+        def group(resource_id, net, gross):
+            return {"Keys": [resource_id, "BoxUsage:m5.large"], "Metrics": {
+                "NetAmortizedCost": {"Amount": str(net)}, "AmortizedCost": {"Amount": str(gross)},
+            }}
+
+        def day(start, *groups):
+            return {"TimePeriod": {"Start": start}, "Groups": list(groups)}
+
+        ce.get_cost_and_usage_with_resources.side_effect = [
+            {"ResultsByTime": [day("2026-03-13", group("i-1", 1.0, 1.0))], "NextPageToken": "p2"},
+            {"ResultsByTime": [day("2026-03-14", group("i-1", 1.0, 1.0), group("i-2", 0.5, 3.5),
+                                   group("NoResourceId", 9.0, 9.0))]},
+        ]
+
+        index = ResourceCostIndex.from_cost_explorer(mock_config, end=date(2026, 3, 15))
+
+        assert index.source == CostSource.COST_EXPLORER
+        assert index.monthly_cost("i-1", 0.0) == 30.0
+        # Launched on the window's last day: its daily rate, not a share of the window
+        assert index.monthly_cost("i-2", 0.0) == 15.0
+        assert len(index) == 2
+        assert index.discount == pytest.approx(11.5 / 14.5, abs=1e-4)
+        assert index.get("i-1").usage_type == "BoxUsage:m5.large"
+        first, second = (c.kwargs for c in ce.get_cost_and_usage_with_resources.call_args_list)
+        # The API only accepts a filter on EC2 compute
+        assert first == {
+            "TimePeriod": {"Start": "2026-03-03", "End": "2026-03-15"},
+            "Granularity": "DAILY",
+            "Metrics": ["NetAmortizedCost", "AmortizedCost"],
+            "GroupBy": [{"Type": "DIMENSION", "Key": "RESOURCE_ID"}, {"Type": "DIMENSION", "Key": "USAGE_TYPE"}],
+            "Filter": {"Dimensions": {"Key": "SERVICE", "Values": ["Amazon Elastic Compute Cloud - Compute"]}},
+        }
+        assert second == {**first, "NextPageToken": "p2"}
+
+    def test_cost_explorer_window_ends_at_last_complete_day(self, mock_config):
+        ce = mock_config.get_session().client("ce")
+        ce.get_cost_and_usage_with_resources.return_value = {"ResultsByTime": []}
+
+        ResourceCostIndex.from_cost_explorer(mock_config)
+
+        period = ce.get_cost_and_usage_with_resources.call_args.kwargs["TimePeriod"]
+        today = datetime.now(timezone.utc).date()
+        assert period == {"Start": str(today - timedelta(days=14)), "End": str(today - timedelta(days=2))}
+
+    def test_cost_explorer_unavailable_falls_back(self, mock_config):
+        ce = mock_config.get_session().client("ce")
+        ce.get_cost_and_usage_with_resources.side_effect = ClientError(
+            {"Error": {"Code": "DataUnavailableException"}}, "GetCostAndUsageWithResources"
+        )
+
+        index = ResourceCostIndex.from_cost_explorer(mock_config)
+
+        assert len(index) == 0 and index.discount == 1.0
+        assert index.monthly_cost("i-1", 12.5) == 12.5
+
+    def test_cost_explorer_request_errors_surface(self, mock_config):
+        ce = mock_config.get_session().client("ce")
+        ce.get_cost_and_usage_with_resources.side_effect = ClientError(
+            {"Error": {"Code": "ValidationException"}}, "GetCostAndUsageWithResources"
+        )
+
+        with pytest.raises(ClientError):
+            ResourceCostIndex.from_cost_explorer(mock_config)
+
+    def test_lookup_is_constant_time_at_scale(self):
+        rows = [(f"vol-{i:08x}", "EBS:VolumeUsage.gp3", "EC2", 1.0) for i in range(200_000)]
+        index = ResourceCostIndex(rows)
+
+        assert len(index) == 200_000
+        assert index.monthly_cost("vol-0000ffff", 0.0) == 1.0
+
+
+class TestDetectorsUseActualCost:
+    """UnusedDetector and SizingEngine prefer CUR cost over list-price estimates."""
+
+    def test_unused_findings_priced_from_cur(self, mock_config, sample_ebs_volumes):
+        ec2 = mock_config.get_session().client("ec2")
+        ec2.describe_addresses.return_value = {"Addresses": []}
+        # Every listing is paged; only volumes have items
+        ec2.get_paginator.side_effect = lambda name: MagicMock(
+            paginate=MagicMock(return_value=[sample_ebs_volumes] if name == "describe_volumes" else [])
+        )
+        costs = ResourceCostIndex([("vol-0aaa111", "EBS:VolumeUsage.gp3", "EC2", 6.4)])
+
+        ebs = UnusedDetector(mock_config, costs=costs).scan()["resources"]["ebs_volumes"]
+
+        assert (ebs[0]["monthly_cost"], ebs[0]["cost_source"]) == (6.4, "cur")
+        assert (ebs[1]["monthly_cost"], ebs[1]["cost_source"]) == (5.0, "estimate")
+
+    def test_rightsizing_projects_from_actual_cost(self):
+        catalog = PriceCatalog.builtin()
+        instances = [{"InstanceId": "i-1", "InstanceType": "t3.xlarge"}]
+        cpu = np.full((1, 24 * 14), 5.0)
+        list_price = catalog.monthly_instance_cost("t3.xlarge", "us-east-1")
+        # Half of list price, e.g. covered by a Savings Plan
+        costs = ResourceCostIndex([("i-1", "BoxUsage:t3.xlarge", "EC2", list_price / 2)])
+
+        plain = SizingEngine(catalog).recommend(instances, cpu, "us-east-1")[0]
+        actual = SizingEngine(catalog).recommend(instances, cpu, "us-east-1", costs=costs)[0]
+
+        assert actual.current_monthly_cost == pytest.approx(list_price / 2, abs=0.01)
+        assert actual.monthly_savings == pytest.approx(plain.monthly_savings / 2, abs=0.02)
+
+    def test_rightsizing_ranks_by_net_savings(self):
+        catalog = PriceCatalog.builtin()
+        instances = [
+            {"InstanceId": "i-big", "InstanceType": "m5.2xlarge"},
+            {"InstanceId": "i-small", "InstanceType": "m5.xlarge"},
+        ]
+        cpu = np.full((2, 24 * 14), 5.0)
+        # The larger instance is almost entirely covered by a Reserved Instance
+        costs = ResourceCostIndex(
+            [("i-big", "", "EC2", catalog.monthly_instance_cost("m5.2xlarge", "us-east-1") * 0.1)],
+            source=CostSource.COST_EXPLORER,
+        )
+
+        plain = SizingEngine(catalog).recommend(instances, cpu, "us-east-1")
+        net = SizingEngine(catalog).recommend(instances, cpu, "us-east-1", costs=costs)
+
+        assert plain[0].resource_id == "i-big"
+        assert [r.resource_id for r in net] == ["i-small", "i-big"]
+        assert (net[1].cost_source, net[0].cost_source) == (CostSource.COST_EXPLORER, CostSource.ESTIMATE)
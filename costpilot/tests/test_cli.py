@@ -0,0 +1,76 @@
+"""Startup-cost and fallback tests for the CLI."""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from botocore.exceptions import ClientError
+from click.testing import CliRunner
+
+from costpilot.cli import _cost_index, cli
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Cumulative `python -X importtime` budget for importing costpilot.cli (µs)
+IMPORT_BUDGET_US = 100_000
+HEAVY_MODULES = ("boto3", "botocore", "numpy", "yaml", "jinja2", "pyarrow")
+
+
+def _importtime(*args: str, env: dict | None = None) -> tuple[str, dict[str, int]]:
+    """Run ``python -X importtime *args``; returns stdout and cumulative µs per imported module."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True, text=True, cwd=ROOT, env={**os.environ, **(env or {})}, check=True,
+    )
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "cumulative" not in line:
+            _, cumulative, name = line.split("|")
+            modules[name.strip()] = int(cumulative)
+    return proc.stdout, modules
+
+
+class TestStartup:
+    """`costpilot --help` and shell completion must not pay for the engines."""
+
+    def test_import_budget(self):
+        _, modules = _importtime("-c", "import costpilot.cli")
+        assert modules["costpilot.cli"] < IMPORT_BUDGET_US
+        assert not [m for m in HEAVY_MODULES if m in modules]
+
+    def test_help_skips_heavy_imports(self):
+        out, modules = _importtime("-m", "costpilot.cli", "--help")
+        assert "analyze" in out
+        assert not [m for m in HEAVY_MODULES if m in modules]
+
+    def test_completion_skips_heavy_imports(self):
+        out, modules = _importtime(
+            "-m", "costpilot.cli", env={"_COSTPILOT_COMPLETE": "bash_complete", "COMP_WORDS": "costpilot an",
+                                        "COMP_CWORD": "1"},
+        )
+        assert "analyze" in out
+        assert not [m for m in HEAVY_MODULES if m in modules]
+
+    def test_subcommand_help_lists_options(self):
+        result = CliRunner().invoke(cli, ["analyze", "--help"])
+        assert result.exit_code == 0
+        assert "--s3-inventory" in result.output
+
+
+class TestCostIndex:
+    """Resource costs for a scan."""
+
+    def test_cost_explorer_failure_falls_back_to_list_prices(self, mock_config):
+        ce = mock_config.get_session().client("ce")
+        ce.get_cost_and_usage_with_resources.side_effect = ClientError(
+            {"Error": {"Code": "ThrottlingException"}}, "GetCostAndUsageWithResources"
+        )
+
+        assert _cost_index(mock_config, None, False) is None
+
+    def test_list_prices_skip_cost_explorer(self, mock_config):
+        ce = mock_config.get_session().client("ce")
+
+        assert _cost_index(mock_config, None, True) is None
+        ce.get_cost_and_usage_with_resources.assert_not_called()
@@ -0,0 +1,130 @@
+"""Unit tests for CUR Parquet ingestion."""
+
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from costpilot import cur as cur_module  # noqa: E402
+from costpilot.analyzer import CostAnalyzer  # noqa: E402
+from costpilot.cur import CurReader  # noqa: E402
+
+
+def _write_cur(path, days=10, start=date(2026, 3, 1), tag_map=False):
+    """Hourly EC2 + S3 line items for two accounts; EC2 is tagged team=web."""
+    rows = {
+        "line_item_usage_start_date": [], "product_product_name": [], "product_region_code": [],
+        "line_item_usage_account_id": [], "line_item_resource_id": [], "line_item_usage_type": [],
+        "line_item_unblended_cost": [], "line_item_line_item_type": [],
+    }
+    tags = []
+    for d in range(days):
+        for h in range(24):
+            ts = datetime(start.year, start.month, start.day, tzinfo=timezone.utc) + timedelta(days=d, hours=h)
+            for service, region, account, resource, usage, cost, team in [
+                ("Amazon Elastic Compute Cloud", "us-east-1", "111", "i-0abc", "BoxUsage:m5.large", 0.096, "web"),
+                ("Amazon Simple Storage Service", "eu-west-1", "222", "my-bucket", "TimedStorage-ByteHrs", 0.01, ""),
+            ]:
+                rows["line_item_usage_start_date"].append(ts)
+                rows["product_product_name"].append(service)
+                rows["product_region_code"].append(region)
+                rows["line_item_usage_account_id"].append(account)
+                rows["line_item_resource_id"].append(resource)
+                rows["line_item_usage_type"].append(usage)
+                rows["line_item_unblended_cost"].append(cost)
+                rows["line_item_line_item_type"].append("Usage")
+                tags.append(team)
+    if tag_map:
+        rows["resource_tags"] = pa.array(
+            [[("user_team", t)] if t else [] for t in tags], pa.map_(pa.string(), pa.string())
+        )
+    else:
+        rows["resource_tags_user_team"] = tags
+    rows["line_item_usage_start_date"] = pa.array(rows["line_item_usage_start_date"], pa.timestamp("ms", tz="UTC"))
+    pq.write_table(pa.table(rows), path, row_group_size=48)
+    return path
+
+
+class TestCurReader:
+    """Tests for CurReader."""
+
+    def test_aggregates_match_line_items(self, tmp_path):
+        path = _write_cur(tmp_path / "cur.parquet")
+        agg = CurReader(str(path)).aggregate(date(2026, 3, 1), date(2026, 3, 11))
+
+        assert agg.line_items == 480
+        daily = agg.daily()
+        assert len(daily) == 10
+        assert daily[0] == {"date": "2026-03-01", "amount": round(24 * 0.106, 2)}
+        services = {s["service"]: s["amount"] for s in agg.by_service()}
+        assert services["Amazon Elastic Compute Cloud"] == pytest.approx(240 * 0.096, abs=0.01)
+        assert agg.by_region()[0]["region"] == "us-east-1"
+        assert [a["account"] for a in agg.by_account()] == ["111", "222"]
+
+    def test_window_filters_rows(self, tmp_path):
+        path = _write_cur(tmp_path / "cur.parquet")
+        agg = CurReader(str(path)).aggregate(date(2026, 3, 3), date(2026, 3, 5))
+
+        assert agg.line_items == 96
+        assert [d["date"] for d in agg.daily()] == ["2026-03-03", "2026-03-04"]
+
+    def test_resource_and_tag_rollups(self, tmp_path):
+        path = _write_cur(tmp_path / "cur.parquet")
+        agg = CurReader(str(path), tag_keys=["team"]).aggregate(date(2026, 3, 1), date(2026, 3, 11))
+
+        resources = {r["resource_id"]: r for r in agg.resources.to_pylist()}
+        assert resources["i-0abc"]["usage_type"] == "BoxUsage:m5.large"
+        assert resources["i-0abc"]["cost"] == pytest.approx(240 * 0.096)
+        tags = {r["tag_team"]: r["cost"] for r in agg.tags.to_pylist()}
+        # Empty tag values are reported as untagged (None)
+        assert set(tags) == {"web", None}
+
+    def test_cur2_tag_map(self, tmp_path):
+        path = _write_cur(tmp_path / "cur.parquet", tag_map=True)
+        agg = CurReader(str(path), tag_keys=["user_team"]).aggregate(date(2026, 3, 1), date(2026, 3, 11))
+
+        tags = {r["tag_user_team"]: r["cost"] for r in agg.tags.to_pylist()}
+        assert tags["web"] == pytest.approx(240 * 0.096)
+
+    def test_service_day_matrix(self, tmp_path):
+        path = _write_cur(tmp_path / "cur.parquet", days=3)
+        services, days, matrix = CurReader(str(path)).aggregate(date(2026, 3, 1), date(2026, 3, 5)).service_day_matrix()
+
+        assert services == ["Amazon Elastic Compute Cloud", "Amazon Simple Storage Service"]
+        assert len(days) == 4
+        assert matrix.shape == (2, 4)
+        assert matrix[0, 0] == pytest.approx(24 * 0.096)
+        assert matrix[0, 3] == 0.0
+
+    def test_compaction_preserves_totals(self, tmp_path, monkeypatch):
+        path = _write_cur(tmp_path / "cur.parquet")
+        monkeypatch.setattr(cur_module, "COMPACT_ROWS", 4)
+
+        agg = CurReader(str(path), batch_size=16).aggregate(date(2026, 3, 1), date(2026, 3, 11))
+
+        assert agg.cube.num_rows == 20
+        assert sum(d["amount"] for d in agg.daily()) == pytest.approx(240 * 0.106, abs=0.05)
+
+    def test_missing_required_columns(self, tmp_path):
+        path = tmp_path / "bad.parquet"
+        pq.write_table(pa.table({"foo": [1]}), path)
+
+        with pytest.raises(ValueError, match="start"):
+            CurReader(str(path))
+
+
+class TestAnalyzeCur:
+    """Tests for CostAnalyzer.analyze_cur."""
+
+    def test_same_shape_as_cost_explorer_analysis(self, mock_config, tmp_path):
+        path = _write_cur(tmp_path / "cur.parquet")
+
+        result = CostAnalyzer(mock_config).analyze_cur(str(path), days=10)
+
+        assert result["period"] == {"start": "2026-03-01", "end": "2026-03-11", "days": 10}
+        assert result["total_spend"] == pytest.approx(240 * 0.106, abs=0.05)
+        assert result["top_services"][0]["service"] == "Amazon Elastic Compute Cloud"
+        assert {"avg_daily", "projected_monthly", "by_region", "cost_spikes", "potential_savings"} <= set(result)
+        mock_config.get_session().client("ce").get_cost_and_usage.assert_not_called()
@@ -0,0 +1,93 @@
+"""Unit tests for CostPilot spend forecasting."""
+
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from costpilot.forecast import Forecaster, load_daily_costs, save_daily_costs
+
+
+def _days(start, n):
+    return [start + timedelta(days=i) for i in range(n)]
+
+
+class TestForecaster:
+    """Tests for Forecaster."""
+
+    def test_weekday_profile_projected_forward(self):
+        # Weekdays $100, weekends $20, ending Sunday 2026-03-15
+        days = _days(date(2026, 1, 19), 56)
+        matrix = np.array([[20.0 if d.weekday() >= 5 else 100.0 for d in days]])
+
+        f = Forecaster().forecast(["EC2"], days, matrix)[0]
+
+        # Next 30 days from Monday: 4 full weeks + Mon/Tue = 22 weekdays, 8 weekend days
+        assert f.next_30_days == pytest.approx(22 * 100 + 8 * 20, abs=1.0)
+        # Naive avg_daily * 30 would be off by the weekday mix
+        assert f.next_30_days != pytest.approx(matrix.mean() * 30, abs=10.0)
+
+    def test_end_of_month_adds_month_to_date(self):
+        days = _days(date(2026, 2, 1), 43)  # through 2026-03-15
+        matrix = np.full((1, 43), 10.0)
+
+        f = Forecaster().forecast(["S3"], days, matrix)[0]
+
+        assert f.month_to_date == pytest.approx(150.0)
+        assert f.end_of_month == pytest.approx(310.0, abs=0.5)
+        assert f.end_of_month_low <= f.end_of_month <= f.end_of_month_high
+
+    def test_trend_extrapolated(self):
+        days = _days(date(2026, 1, 1), 56)
+        matrix = np.array([[100.0 + i for i in range(56)]])
+
+        f = Forecaster().forecast(["RDS"], days, matrix)[0]
+
+        # Days 56..85 → mean 170.5
+        assert f.next_30_days == pytest.approx(30 * 170.5, rel=0.01)
+
+    def test_intervals_widen_with_noise(self):
+        rng = np.random.default_rng(0)
+        days = _days(date(2026, 1, 1), 56)
+        quiet = 100 + rng.normal(0, 1, 56)
+        noisy = 100 + rng.normal(0, 20, 56)
+
+        steady, volatile = Forecaster().forecast(["a", "b"], days, np.vstack([quiet, noisy]))
+
+        assert (steady.next_30_days_high - steady.next_30_days_low) < (volatile.next_30_days_high - volatile.next_30_days_low)
+        assert volatile.next_30_days_low <= 3000 <= volatile.next_30_days_high
+
+    def test_short_history_uses_level_only(self):
+        days = _days(date(2026, 3, 1), 3)
+        matrix = np.array([[12.5, 8.0, 45.0]])
+
+        f = Forecaster().forecast(["Total"], days, matrix)[0]
+
+        assert f.next_30_days == pytest.approx(65.5 / 3 * 30, abs=0.1)
+
+    def test_thousands_of_series_fit_in_seconds(self):
+        rng = np.random.default_rng(1)
+        days = _days(date(2026, 1, 1), 90)
+        matrix = rng.gamma(2.0, 50.0, size=(10_000, 90))
+
+        t0 = time.perf_counter()
+        forecasts = Forecaster().forecast([f"s{i}" for i in range(10_000)], days, matrix)
+
+        assert len(forecasts) == 10_000
+        assert time.perf_counter() - t0 < 5.0
+
+
+class TestDailyCostCache:
+    """Tests for the offline daily cost cache."""
+
+    def test_round_trip(self, tmp_path):
+        path = tmp_path / "daily.npz"
+        days = _days(date(2026, 3, 1), 3)
+        save_daily_costs(path, ["EC2", "Total"], days, np.array([[1.0, 2.0, 3.0], [1.0, 2.0, 3.0]]))
+
+        series, loaded_days, matrix = load_daily_costs(path)
+
+        assert series == ["EC2", "Total"]
+        assert loaded_days == days
+        assert matrix.shape == (2, 3)
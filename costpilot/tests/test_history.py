@@ -0,0 +1,190 @@
+"""Unit tests for the scan history store and incremental fetching."""
+
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from costpilot.analyzer import CostAnalyzer
+from costpilot.history import DAY_TOTAL, KEEP_SNAPSHOTS, ScanHistory, diff_reports
+from costpilot.metrics import MetricFetcher, MetricQuery
+from costpilot.models import CostReport, ResourceType, RightsizeRecommendation, UnusedResource
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def history(tmp_path):
+    with ScanHistory(tmp_path / "history.db") as h:
+        yield h
+
+
+def _waste(resource_id: str, cost: float) -> UnusedResource:
+    return UnusedResource(resource_id, ResourceType.EBS_VOLUME, "us-east-1", monthly_cost=cost)
+
+
+def _rec(resource_id: str, recommended: str, savings: float) -> RightsizeRecommendation:
+    return RightsizeRecommendation(
+        resource_id, "EC2", "us-east-1", "m5.xlarge", recommended, 5.0, 10.0, 0.1, 140.0, 70.0, savings
+    )
+
+
+def _report(at: datetime, unused=(), rightsizing=()) -> CostReport:
+    report = CostReport(generated_at=at, unused_resources=list(unused), rightsizing=list(rightsizing))
+    report.calculate_savings()
+    return report
+
+
+class TestSnapshots:
+    """Tests for snapshot storage and diffs."""
+
+    def test_latest_snapshot_round_trip(self, history):
+        assert history.latest_snapshot() is None
+        first = history.save_snapshot(_report(START, [_waste("vol-1", 8.0)]))
+        history.save_snapshot(_report(START + timedelta(hours=6), [_waste("vol-2", 4.0)]))
+
+        latest = history.latest_snapshot()
+        assert latest.report.unused_resources[0].resource_id == "vol-2"
+        assert latest.taken_at == START + timedelta(hours=6)
+        assert history.latest_snapshot(before=latest.id).id == first
+
+    def test_old_snapshots_pruned(self, history):
+        for i in range(KEEP_SNAPSHOTS + 5):
+            history.save_snapshot(_report(START + timedelta(hours=i)))
+        count, = history.conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()
+        assert count == KEEP_SNAPSHOTS
+
+    def test_diff_reports_new_resolved_and_delta(self):
+        before = _report(
+            START,
+            [_waste("vol-1", 8.0), _waste("vol-2", 4.0)],
+            [_rec("i-1", "m5.large", 70.0)],
+        )
+        after = _report(
+            START + timedelta(days=1),
+            [_waste("vol-2", 4.0), _waste("vol-3", 20.0)],
+            [_rec("i-1", "t3.large", 80.0)],
+        )
+
+        diff = diff_reports(before, after)
+
+        assert [r.resource_id for r in diff.new_waste] == ["vol-3"]
+        assert [r.resource_id for r in diff.resolved_waste] == ["vol-1"]
+        # A changed recommendation replaces the old one
+        assert [r.recommended_type for r in diff.new_rightsizing] == ["t3.large"]
+        assert [r.recommended_type for r in diff.resolved_rightsizing] == ["m5.large"]
+        assert diff.savings_before == 82.0
+        assert diff.savings_after == 104.0
+        assert diff.savings_delta == 22.0
+
+
+class TestIncrementalCosts:
+    """Tests for reuse of finalized Cost Explorer days."""
+
+    @staticmethod
+    def _day(day: date, amount: float, estimated: bool) -> dict:
+        return {
+            "TimePeriod": {"Start": str(day), "End": str(day + timedelta(days=1))},
+            "Groups": [{"Keys": ["Amazon EC2"], "Metrics": {"UnblendedCost": {"Amount": str(amount)}}}],
+            "Estimated": estimated,
+        }
+
+    def test_only_days_after_finalized_boundary_are_queried(self, mock_config, history):
+        ce = mock_config.get_session().client("ce")
+        first = date(2026, 1, 1)
+        days = [first + timedelta(days=i) for i in range(5)]
+        ce.get_cost_and_usage.return_value = {
+            "ResultsByTime": [self._day(d, 10.0 + i, estimated=i >= 3) for i, d in enumerate(days)]
+        }
+        analyzer = CostAnalyzer(mock_config, history=history)
+
+        daily, services = analyzer._get_daily_costs("2026-01-01", "2026-01-06")
+        assert len(daily) == 5
+        assert history.finalized_costs(first, days[-1])[days[2]] == {"Amazon EC2": 12.0, DAY_TOTAL: 12.0}
+
+        ce.get_cost_and_usage.reset_mock()
+        ce.get_cost_and_usage.return_value = {
+            "ResultsByTime": [self._day(d, 20.0, estimated=False) for d in days[3:]]
+        }
+        daily, services = analyzer._get_daily_costs("2026-01-01", "2026-01-06")
+
+        assert ce.get_cost_and_usage.call_args.kwargs["TimePeriod"]["Start"] == "2026-01-04"
+        assert [d["amount"] for d in daily] == [10.0, 11.0, 12.0, 20.0, 20.0]
+        assert services["Amazon EC2"].tolist() == [10.0, 11.0, 12.0, 20.0, 20.0]
+
+    def test_fully_finalized_window_skips_cost_explorer(self, mock_config, history):
+        ce = mock_config.get_session().client("ce")
+        history.store_finalized_costs({
+            date(2026, 1, 1): {"Amazon S3": 3.0, DAY_TOTAL: 3.0},
+            date(2026, 1, 2): {DAY_TOTAL: 0.0},
+        })
+
+        daily, services = CostAnalyzer(mock_config, history=history)._get_daily_costs("2026-01-01", "2026-01-03")
+
+        ce.get_cost_and_usage.assert_not_called()
+        assert [d["amount"] for d in daily] == [3.0, 0.0]
+        assert services["Amazon S3"].tolist() == [3.0, 0.0]
+
+
+class TestMetricGrid:
+    """Tests for MetricFetcher.grid with and without a scan history."""
+
+    @staticmethod
+    def _query(key: str = "i-1:cpu") -> MetricQuery:
+        return MetricQuery(key, "AWS/EC2", "CPUUtilization", (("InstanceId", "i-1"),))
+
+    @staticmethod
+    def _response(start: datetime, values: list[float]) -> dict:
+        return {"MetricDataResults": [{
+            "Id": "m0",
+            "Timestamps": [start + timedelta(hours=h) for h in range(len(values))],
+            "Values": values,
+        }]}
+
+    def test_without_history_fetches_whole_window(self):
+        cw = MagicMock()
+        cw.get_metric_data.return_value = self._response(START, [1.0, 2.0])
+
+        matrix, missing = MetricFetcher(cw).grid([self._query()], START, START + timedelta(hours=4))
+
+        assert cw.get_metric_data.call_args.kwargs["StartTime"] == START
+        np.testing.assert_array_equal(matrix, [[1.0, 2.0, np.nan, np.nan]])
+        assert missing == set()
+
+    def test_reuses_cached_hours_and_fetches_the_rest(self, history):
+        cw = MagicMock()
+        fetcher = MetricFetcher(cw, history)
+        cw.get_metric_data.return_value = self._response(START, [1.0, 2.0, 3.0, 4.0])
+        fetcher.grid([self._query()], START, START + timedelta(hours=4))
+
+        # Two hours later the window has slid by two hours
+        start = START + timedelta(hours=2)
+        cw.get_metric_data.return_value = self._response(START + timedelta(hours=3), [5.0, 6.0, 7.0])
+        matrix, _ = fetcher.grid([self._query()], start, start + timedelta(hours=4))
+
+        # The last cached hour (03:00) is refetched in case it was partial
+        assert cw.get_metric_data.call_args.kwargs["StartTime"] == START + timedelta(hours=3)
+        np.testing.assert_array_equal(matrix, [[3.0, 5.0, 6.0, 7.0]])
+
+    def test_fingerprint_change_refetches_series(self, history):
+        cw = MagicMock()
+        fetcher = MetricFetcher(cw, history)
+        cw.get_metric_data.return_value = self._response(START, [1.0, 2.0])
+        end = START + timedelta(hours=2)
+        fetcher.grid([self._query()], START, end, {"i-1:cpu": "m5.xlarge"})
+
+        cw.get_metric_data.return_value = self._response(START, [9.0, 9.0])
+        matrix, _ = fetcher.grid([self._query()], START, end, {"i-1:cpu": "m5.large"})
+
+        assert cw.get_metric_data.call_args.kwargs["StartTime"] == START
+        np.testing.assert_array_equal(matrix, [[9.0, 9.0]])
+
+    def test_failed_fetch_reported_missing_and_not_cached(self, history):
+        cw = MagicMock()
+        cw.get_metric_data.side_effect = Exception("throttled")
+
+        _, missing = MetricFetcher(cw, history).grid([self._query()], START, START + timedelta(hours=2))
+
+        assert missing == {"i-1:cpu"}
+        assert history.load_series(["i-1:cpu"]) == {}
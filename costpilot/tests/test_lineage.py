@@ -0,0 +1,143 @@
+"""Unit tests for the EBS snapshot lineage index."""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+from costpilot.lineage import DAILY_CHANGE_RATE, GIB, NO_VOLUME, SnapshotLineage, backup_snapshot_ids
+from costpilot.models import SnapshotRole
+from costpilot.unused import UnusedDetector
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _snap(snapshot_id: str, volume_id: str, day: int, size: int = 100, **extra) -> dict:
+    return {
+        "SnapshotId": snapshot_id, "VolumeId": volume_id, "VolumeSize": size,
+        "StartTime": START + timedelta(days=day), **extra,
+    }
+
+
+def _paginators(client: MagicMock, **pages: list[dict]) -> None:
+    """Serve ``pages[operation]`` from ``client.get_paginator(operation)``."""
+    def paginator(name: str) -> MagicMock:
+        return MagicMock(paginate=MagicMock(return_value=pages.get(name, [])))
+    client.get_paginator.side_effect = paginator
+
+
+class TestSnapshotLineage:
+    """Tests for SnapshotLineage classification and increments."""
+
+    def test_roles(self):
+        lineage = SnapshotLineage(
+            [
+                _snap("snap-ami", "vol-gone", 0),
+                _snap("snap-backup", "vol-live", 1),
+                _snap("snap-tagged", "vol-gone2", 2, Tags=[{"Key": "aws:backup:source-resource", "Value": "x"}]),
+                _snap("snap-chain", "vol-live", 3),
+                _snap("snap-orphan", "vol-gone3", 4),
+                _snap("snap-copy", NO_VOLUME, 5),
+            ],
+            volume_ids=["vol-live"],
+            image_snapshots={"snap-ami": "ami-1"},
+            backup_snapshots={"snap-backup"},
+        )
+
+        roles = {link.snapshot_id: link.role for link in lineage.links()}
+        assert roles == {
+            "snap-ami": SnapshotRole.AMI,
+            "snap-backup": SnapshotRole.BACKUP,
+            "snap-tagged": SnapshotRole.BACKUP,
+            "snap-chain": SnapshotRole.CHAIN,
+            "snap-orphan": SnapshotRole.ORPHANED,
+            "snap-copy": SnapshotRole.ORPHANED,
+        }
+        assert lineage.get("snap-ami").image_id == "ami-1"
+        assert lineage.get("snap-copy").volume_id == ""
+        assert lineage.counts()[SnapshotRole.BACKUP] == 2
+
+    def test_chain_increments(self):
+        lineage = SnapshotLineage([
+            _snap("snap-3", "vol-1", 60),
+            _snap("snap-1", "vol-1", 0),
+            _snap("snap-2", "vol-1", 10),
+        ], volume_ids=["vol-1"])
+
+        first, second, third = (lineage.get(f"snap-{i}") for i in (1, 2, 3))
+        # Deleting the oldest snapshot only frees what changed before the next one;
+        # later ones hold what changed since the one before
+        assert (first.chain_index, first.chain_length, first.incremental_gb) == (0, 3, 20)
+        assert second.incremental_gb == round(100 * DAILY_CHANGE_RATE * 10, 2)
+        # Fifty days of changes would exceed the volume, so the increment is capped at its size
+        assert third.incremental_gb == 100
+
+    def test_reported_full_size_preferred_over_volume_size(self):
+        lineage = SnapshotLineage([_snap("snap-1", "vol-1", 0, size=500, FullSnapshotSizeInBytes=40 * GIB)])
+
+        assert lineage.get("snap-1").size_gb == 40
+        assert lineage.get("snap-1").incremental_gb == 40
+
+    def test_backup_recovery_points_by_vault(self):
+        backup = MagicMock()
+        _paginators(
+            backup,
+            list_backup_vaults=[{"BackupVaultList": [{"BackupVaultName": "default"}]}],
+            list_recovery_points_by_backup_vault=[{"RecoveryPoints": [
+                {"RecoveryPointArn": "arn:aws:ec2:us-east-1::snapshot/snap-1"},
+                {"RecoveryPointArn": "arn:aws:backup:us-east-1:123456789012:recovery-point:abc"},
+            ]}],
+        )
+
+        assert backup_snapshot_ids(backup) == {"snap-1"}
+
+
+class TestOldSnapshots:
+    """Tests for UnusedDetector's lineage-aware snapshot findings."""
+
+    def test_only_unneeded_snapshots_reported_at_incremental_cost(self, mock_config):
+        ec2 = mock_config.get_session().client("ec2")
+        _paginators(
+            ec2,
+            describe_snapshots=[{"Snapshots": [
+                _snap("snap-live-1", "vol-live", 0),
+                _snap("snap-live-2", "vol-live", 10),
+                _snap("snap-live-3", "vol-live", 20),
+                _snap("snap-orphan", "vol-gone", 0, size=200),
+                _snap("snap-ami", "vol-gone", 5),
+                {**_snap("snap-recent", "vol-gone2", 0), "StartTime": datetime.now(timezone.utc)},
+            ]}],
+            describe_volumes=[{"Volumes": [{"VolumeId": "vol-live"}]}],
+            describe_images=[{"Images": [
+                {"ImageId": "ami-1", "BlockDeviceMappings": [{"Ebs": {"SnapshotId": "snap-ami"}}]},
+            ]}],
+        )
+        detector = UnusedDetector(mock_config)
+
+        found = {r.resource_id: r for r in detector._find_old_snapshots()}
+
+        # The live volume's newest snapshot, the AMI's and the recent one are kept
+        assert set(found) == {"snap-orphan", "snap-live-1", "snap-live-2"}
+        # The AMI's later snapshot of vol-gone keeps most of snap-orphan's blocks
+        assert found["snap-orphan"].monthly_cost == 1.0      # 20 GB changed in 5 days at $0.05
+        assert found["snap-live-1"].monthly_cost == 1.0      # 20 GB changed before snap-live-2
+        assert found["snap-live-2"].monthly_cost == 1.0      # 20 GB increment
+        assert found["snap-live-2"].subtype == "chain"
+        assert found["snap-live-2"].secondary_id == "vol-live"
+        assert len(detector.lineage) == 6
+
+    def test_chain_base_not_priced_at_full_volume_size(self, mock_config):
+        ec2 = mock_config.get_session().client("ec2")
+        _paginators(
+            ec2,
+            describe_snapshots=[{"Snapshots": [
+                _snap(f"snap-{i}", "vol-live", 30 * i, size=500) for i in range(3)
+            ]}],
+            describe_volumes=[{"Volumes": [{"VolumeId": "vol-live"}]}],
+        )
+        detector = UnusedDetector(mock_config)
+
+        found = {r.resource_id: r for r in detector._find_old_snapshots()}
+
+        # 500 GB × 2%/day × 30 days at $0.05/GB-month, not the 500 GB the base restores
+        assert found["snap-0"].monthly_cost == 15.0
+        assert found["snap-1"].monthly_cost == 15.0
+        assert "snap-2" not in found
@@ -0,0 +1,77 @@
+"""Unit tests for the batched CloudWatch metric fetcher."""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import pytest
+
+from costpilot.metrics import MAX_QUERIES_PER_REQUEST, MetricFetcher, MetricQuery, idle_query
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+END = START + timedelta(days=7)
+
+
+def _query(i: int) -> MetricQuery:
+    return MetricQuery(
+        key=f"vol-{i}",
+        namespace="AWS/EBS",
+        metric_name="VolumeWriteOps",
+        dimensions=(("VolumeId", f"vol-{i}"),),
+        stat="Sum",
+    )
+
+
+class TestMetricFetcher:
+    """Tests for MetricFetcher."""
+
+    def test_follows_next_token(self):
+        cw = MagicMock()
+        cw.get_metric_data.side_effect = [
+            {
+                "MetricDataResults": [{"Id": "m0", "Timestamps": [START], "Values": [1.0]}],
+                "NextToken": "page-2",
+            },
+            {
+                "MetricDataResults": [
+                    {"Id": "m0", "Timestamps": [START + timedelta(hours=1)], "Values": [2.0]}
+                ],
+            },
+        ]
+
+        result = MetricFetcher(cw).fetch([_query(0)], START, END)
+
+        assert cw.get_metric_data.call_count == 2
+        assert cw.get_metric_data.call_args.kwargs["NextToken"] == "page-2"
+        assert [v for _, v in result["vol-0"]] == [1.0, 2.0]
+
+    def test_splits_into_request_sized_batches(self):
+        cw = MagicMock()
+        cw.get_metric_data.return_value = {"MetricDataResults": []}
+
+        result = MetricFetcher(cw).fetch([_query(i) for i in range(MAX_QUERIES_PER_REQUEST + 1)], START, END)
+
+        assert cw.get_metric_data.call_count == 2
+        assert len(result) == MAX_QUERIES_PER_REQUEST + 1
+        assert all(points == [] for points in result.values())
+
+    def test_failed_batch_is_omitted(self):
+        cw = MagicMock()
+        cw.get_metric_data.side_effect = Exception("Throttling")
+
+        assert MetricFetcher(cw).fetch([_query(0)], START, END) == {}
+
+    def test_totals(self):
+        cw = MagicMock()
+        cw.get_metric_data.return_value = {
+            "MetricDataResults": [{"Id": "m0", "Timestamps": [START, END], "Values": [3.0, 4.5]}]
+        }
+
+        assert MetricFetcher(cw).totals([_query(0)], START, END) == {"vol-0": 7.5}
+
+    def test_idle_query_uses_signal_for_kind(self):
+        query = idle_query("nat_gateway", "nat-1", "nat-0abc")
+        assert query.namespace == "AWS/NATGateway"
+        assert query.dimensions == (("NatGatewayId", "nat-0abc"),)
+
+        with pytest.raises(KeyError):
+            idle_query("unknown", "x", "y")
@@ -0,0 +1,137 @@
+"""Unit tests for the AWS API call middleware."""
+
+from types import SimpleNamespace
+
+import boto3
+import pytest
+from botocore.awsrequest import AWSResponse
+from botocore.config import Config as ClientConfig
+from botocore.exceptions import ClientError
+
+from costpilot.middleware import METRIC_PRICE, ApiMiddleware
+
+
+class _Body:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+
+    def stream(self, **kwargs):
+        yield self.data
+
+
+@pytest.fixture
+def session():
+    return boto3.Session(aws_access_key_id="x", aws_secret_access_key="y", region_name="us-east-1")
+
+
+def _ce_client(session, statuses: list[int]):
+    """Cost Explorer client whose HTTP responses come from ``statuses``, in order; the last one repeats."""
+    ce = session.client("ce", config=ClientConfig(retries={"mode": "standard", "max_attempts": 3}))
+    pending = list(statuses)
+
+    def respond(request, **kwargs):
+        status = pending.pop(0) if pending else statuses[-1]
+        body = b'{"ResultsByTime": []}' if status == 200 else b'{"__type": "ThrottlingException", "message": "slow"}'
+        return AWSResponse(request.url, status, {}, _Body(body))
+
+    ce.meta.events.register("before-send", respond)
+    return ce
+
+
+def _query(ce):
+    return ce.get_cost_and_usage(
+        TimePeriod={"Start": "2026-01-01", "End": "2026-01-02"}, Granularity="DAILY", Metrics=["UnblendedCost"]
+    )
+
+
+def _operation(service: str, name: str) -> SimpleNamespace:
+    return SimpleNamespace(service_model=SimpleNamespace(service_name=service), name=name)
+
+
+class TestApiMiddleware:
+    """Tests for ApiMiddleware."""
+
+    def test_counts_calls_latency_and_request_charges(self, session):
+        api = ApiMiddleware(limits={})
+        api.install(session)
+        ce = _ce_client(session, [200, 200, 200])
+
+        for _ in range(3):
+            _query(ce)
+
+        stats = api.stats()["ce:GetCostAndUsage"]
+        assert stats.calls == 3
+        assert stats.cost == pytest.approx(0.03)
+        assert stats.latency > 0
+        assert api.total_cost == pytest.approx(0.03)
+
+        api.reset()
+        assert api.total_calls == 0
+
+    def test_throttled_retries_counted(self, session, monkeypatch):
+        monkeypatch.setattr("botocore.retries.standard.ExponentialBackoff.delay_amount", lambda self, ctx: 0)
+        api = ApiMiddleware(limits={"ce": 100.0})
+        api.install(session)
+        ce = _ce_client(session, [400, 400, 200])
+
+        _query(ce)
+
+        stats = api.stats()["ce:GetCostAndUsage"]
+        assert (stats.calls, stats.retries, stats.throttles, stats.errors) == (1, 2, 2, 0)
+        # Two throttles halved the rate twice; the success recovered 5% of it
+        assert api.bucket("ce", "GetCostAndUsage").rate == pytest.approx(30.0)
+
+    def test_exhausted_retries_counted_as_error(self, session, monkeypatch):
+        monkeypatch.setattr("botocore.retries.standard.ExponentialBackoff.delay_amount", lambda self, ctx: 0)
+        api = ApiMiddleware(limits={})
+        api.install(session)
+        ce = _ce_client(session, [400, 400, 400])
+
+        with pytest.raises(ClientError):
+            _query(ce)
+
+        assert api.stats()["ce:GetCostAndUsage"].errors == 1
+
+    def test_metric_data_billed_per_metric(self):
+        api = ApiMiddleware(limits={})
+        context = {}
+        api._before_parameter_build(params={"MetricDataQueries": [{}] * 250}, model=None, context=context)
+        api._before_call(model=_operation("cloudwatch", "GetMetricData"), context=context)
+
+        stats = api.stats()["cloudwatch:GetMetricData"]
+        assert stats.metrics == 250
+        assert stats.cost == pytest.approx(250 * METRIC_PRICE)
+
+    def test_rate_limit_shared_per_api(self):
+        api = ApiMiddleware(limits={"ec2": 20.0, "cloudwatch:GetMetricData": 40.0})
+
+        assert api.bucket("ec2", "DescribeVolumes") is api.bucket("ec2", "DescribeInstances")
+        assert api.bucket("cloudwatch", "GetMetricData").rate == 40.0
+        assert api.bucket("cloudwatch", "ListMetrics") is None
+
+    def test_throttle_halves_rate_and_success_recovers(self):
+        api = ApiMiddleware(limits={"ce": 8.0})
+        operation = _operation("ce", "GetCostAndUsage")
+        throttled = (None, {"Error": {"Code": "ThrottlingException"}})
+
+        for _ in range(10):
+            assert api._needs_retry(response=throttled, operation=operation, attempts=1) is None
+
+        bucket = api.bucket("ce", "GetCostAndUsage")
+        # Halved down to the 10% floor
+        assert bucket.rate == pytest.approx(0.8)
+        assert api.stats()["ce:GetCostAndUsage"].throttles == 10
+
+        ok = SimpleNamespace(status_code=200)
+        for _ in range(40):
+            api._after_call(http_response=ok, parsed={}, model=operation, context={})
+        assert bucket.rate == 8.0
+
+    def test_non_throttle_errors_leave_rate_alone(self):
+        api = ApiMiddleware(limits={"ec2": 20.0})
+        api._needs_retry(
+            response=(None, {"Error": {"Code": "InternalError"}}),
+            operation=_operation("ec2", "DescribeVolumes"),
+            attempts=1,
+        )
+        assert api.bucket("ec2", "DescribeVolumes").rate == 20.0
@@ -0,0 +1,171 @@
+"""Unit tests for the concurrent pipeline runner."""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from costpilot.config import Config, CostPilotConfig
+from costpilot.middleware import ApiMiddleware
+from costpilot.pipeline import PipelineRunner, Stage
+
+
+class TestPipelineRunner:
+    """Tests for PipelineRunner."""
+
+    def test_stages_run_concurrently(self):
+        barrier = threading.Barrier(3, timeout=5)
+        stages = [Stage(name, lambda name=name: (barrier.wait(), name)[1]) for name in ("a", "b", "c")]
+
+        results = PipelineRunner().run(stages)
+
+        # Each stage waits for the others, so this only finishes if all three overlap
+        assert [r.value for r in results.values()] == ["a", "b", "c"]
+        assert all(r.ok for r in results.values())
+
+    def test_failed_stage_does_not_block_others(self):
+        def boom():
+            raise RuntimeError("throttled")
+
+        results = PipelineRunner().run([Stage("bad", boom), Stage("good", lambda: 42)])
+
+        assert results["good"].value == 42
+        assert not results["bad"].ok
+        assert results["bad"].error == "RuntimeError: throttled"
+        assert results["bad"].value is None
+
+    def test_stage_timeout_returns_partial_results(self):
+        release = threading.Event()
+        finished = []
+        runner = PipelineRunner(timeout=5, on_finish=finished.append)
+
+        started = time.monotonic()
+        results = runner.run([
+            Stage("slow", lambda: release.wait(10), timeout=0.2),
+            Stage("fast", lambda: "done"),
+        ])
+        release.set()
+
+        assert time.monotonic() - started < 2
+        assert results["fast"].value == "done"
+        assert results["slow"].error.startswith("timed out")
+        assert [r.name for r in finished] == ["fast", "slow"]
+
+    def test_api_calls_attributed_to_calling_stage(self):
+        api = ApiMiddleware(limits={})
+
+        def stage(service: str, operation: str, times: int):
+            model = SimpleNamespace(service_model=SimpleNamespace(service_name=service), name=operation)
+
+            def run():
+                for _ in range(times):
+                    api._before_call(model=model, context={})
+            return run
+
+        results = PipelineRunner(api).run([
+            Stage("costs", stage("ce", "GetCostAndUsage", 3)),
+            Stage("unused", stage("ec2", "DescribeVolumes", 2)),
+        ])
+        # Calls outside a stage still count towards the run, but no stage
+        stage("sts", "GetCallerIdentity", 1)()
+
+        assert results["costs"].api_calls == {"ce:GetCostAndUsage": 3}
+        assert results["unused"].api_calls == {"ec2:DescribeVolumes": 2}
+        assert results["unused"].total_calls == 2
+        assert api.total_calls == 6
+
+
+class TestConfig:
+    """Tests for the runtime Config."""
+
+    def test_settings_readable_on_config(self):
+        config = Config(settings=CostPilotConfig(spike_std_devs=3.0, aws_region="eu-west-1"))
+
+        assert config.spike_std_devs == 3.0
+        assert config.region == "eu-west-1"
+        assert Config(region="us-west-2", settings=CostPilotConfig()).region == "us-west-2"
+        with pytest.raises(AttributeError):
+            config.no_such_setting
+
+    def test_session_shared_with_pooled_clients(self):
+        config = Config(region="us-east-1", settings=CostPilotConfig(), max_pool_connections=64)
+
+        session = config.get_session()
+        client = session.client("ec2", aws_access_key_id="x", aws_secret_access_key="y")
+
+        assert config.get_session() is session
+        assert client.meta.config.max_pool_connections == 64
+
+    def test_clients_pooled_per_region_and_service(self):
+        config = Config(region="us-east-1", settings=CostPilotConfig(), replay=SimpleNamespace())
+
+        ec2 = config.client("ec2")
+
+        assert config.get_session().client("ec2") is ec2
+        assert config.client("ec2", region="eu-west-1") is not ec2
+        assert config.client("cloudwatch") is not ec2
+        assert config.get_session().client("ec2", endpoint_url="http://localhost:1") is not ec2
+        assert config.get_session().clients == 3
+
+
+class TestAssumedRoleSessions:
+    """Tests for sessions in other accounts."""
+
+    EXPIRATION = "2099-01-01T00:00:00Z"
+
+    @pytest.fixture(autouse=True)
+    def credentials(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIDBASE")
+        monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "base")
+        monkeypatch.setenv("AWS_CONFIG_FILE", str(tmp_path / "none"))
+        monkeypatch.setenv("AWS_SHARED_CREDENTIALS_FILE", str(tmp_path / "none"))
+        monkeypatch.delenv("AWS_PROFILE", raising=False)
+
+    def _config(self, expiration: str) -> tuple[Config, list[str]]:
+        from botocore.awsrequest import AWSResponse
+
+        config = Config(region="us-east-1", settings=CostPilotConfig(assume_role_name="CostPilotReadOnly"))
+        requests = []
+
+        def assume_role(request, **kwargs):
+            requests.append(request.body)
+            body = (
+                '<AssumeRoleResponse xmlns="https://sts.amazonaws.com/doc/2011-06-15/"><AssumeRoleResult>'
+                f"<Credentials><AccessKeyId>AKIDROLE{len(requests)}</AccessKeyId><SecretAccessKey>s</SecretAccessKey>"
+                f"<SessionToken>t</SessionToken><Expiration>{expiration}</Expiration></Credentials>"
+                "<AssumedRoleUser><Arn>arn</Arn><AssumedRoleId>id</AssumedRoleId></AssumedRoleUser>"
+                "</AssumeRoleResult></AssumeRoleResponse>"
+            ).encode()
+            return AWSResponse(request.url, 200, {}, SimpleNamespace(stream=lambda **kw: iter([body])))
+
+        config.get_session().events.register("before-send.sts.AssumeRole", assume_role)
+        return config, requests
+
+    def test_role_assumed_once_per_account(self):
+        config, requests = self._config(self.EXPIRATION)
+
+        session = config.get_session("222222222222")
+        assert session.get_credentials().get_frozen_credentials().access_key == "AKIDROLE1"
+        assert session.get_credentials().get_frozen_credentials().access_key == "AKIDROLE1"
+
+        assert config.get_session("222222222222") is session
+        assert config.get_session().get_credentials().access_key == "AKIDBASE"
+        assert len(requests) == 1
+        assert "arn%3Aaws%3Aiam%3A%3A222222222222%3Arole%2FCostPilotReadOnly" in requests[0]
+        assert config.api.stats()["sts:AssumeRole"].calls == 1
+
+    def test_expiring_credentials_refreshed(self):
+        from datetime import datetime, timedelta, timezone
+
+        soon = (datetime.now(timezone.utc) + timedelta(minutes=2)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        config, requests = self._config(soon)
+
+        credentials = config.get_session("222222222222").get_credentials()
+        credentials.get_frozen_credentials()
+        assert credentials.get_frozen_credentials().access_key == "AKIDROLE2"
+        assert len(requests) == 2
+
+    def test_account_without_role_rejected(self):
+        with pytest.raises(ValueError, match="assume_role_name"):
+            Config(region="us-east-1", settings=CostPilotConfig()).get_session("222222222222")
@@ -0,0 +1,216 @@
+"""Unit tests for the CostPilot price catalog."""
+
+import csv
+import json
+import time
+import tracemalloc
+
+import pytest
+
+from costpilot import pricing
+from costpilot.pricing import (
+    PriceCatalog, cache_engine, db_deployment, db_engine, instance_os, instance_tenancy, size_rank, split_type,
+)
+
+CSV_HEADER = [
+    "SKU", "OfferTermCode", "RateCode", "TermType", "PriceDescription", "EffectiveDate",
+    "StartingRange", "EndingRange", "Unit", "PricePerUnit", "Currency", "Product Family",
+    "serviceCode", "Location", "Instance Type", "vCPU", "Memory", "Tenancy", "Operating System",
+    "License Model", "Pre Installed S/W", "Capacity Status", "Region Code", "Volume API Name", "Group",
+    "usageType",
+]
+
+
+def _instance_product(sku, instance_type, region, price, vcpu="2", memory="8 GiB", os="Linux", **attrs):
+    product = {
+        "sku": sku,
+        "productFamily": "Compute Instance",
+        "attributes": {
+            "instanceType": instance_type, "regionCode": region, "operatingSystem": os,
+            "tenancy": "Shared", "capacitystatus": "Used", "preInstalledSw": "NA",
+            "licenseModel": "No License required", "vcpu": vcpu, "memory": memory, **attrs,
+        },
+    }
+    term = {f"{sku}.JRTCKXETXF": {"priceDimensions": {
+        f"{sku}.JRTCKXETXF.6YS6EN2CT7": {"unit": "Hrs", "pricePerUnit": {"USD": str(price)}},
+    }}}
+    return product, term
+
+
+def _write_json_offer(path, rows):
+    products, terms = {}, {}
+    for i, row in enumerate(rows):
+        args, extra = (row[:-1], row[-1]) if isinstance(row[-1], dict) else (row, {})
+        product, term = _instance_product(f"SKU{i}", *args, **extra)
+        products[product["sku"]] = product
+        terms[product["sku"]] = term
+    products["VOL1"] = {
+        "sku": "VOL1", "productFamily": "Storage",
+        "attributes": {"regionCode": "eu-west-1", "volumeApiName": "gp2"},
+    }
+    terms["VOL1"] = {"VOL1.T": {"priceDimensions": {"VOL1.T.R": {"unit": "GB-Mo", "pricePerUnit": {"USD": "0.11"}}}}}
+    path.write_text(json.dumps({"products": products, "terms": {"OnDemand": terms}}))
+    return path
+
+
+def _write_csv_offer(path, n_types):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(["FormatVersion", "v1.0"])
+        writer.writerow(["Disclaimer", "This pricing list is for informational purposes only."])
+        writer.writerow(["Publication Date", "2026-10-01T00:00:00Z"])
+        writer.writerow(["Version", "20261001000000"])
+        writer.writerow(["OfferCode", "AmazonEC2"])
+        writer.writerow(CSV_HEADER)
+        sizes = ["large", "xlarge", "2xlarge", "4xlarge", "8xlarge"]
+        for i in range(n_types):
+            family = f"x{i // len(sizes)}"
+            size = sizes[i % len(sizes)]
+            for region in ("us-east-1", "eu-west-1"):
+                for tenancy in ("Shared", "Dedicated"):
+                    for os_name in ("Linux", "Windows"):
+                        for term in ("OnDemand", "Reserved"):
+                            writer.writerow([
+                                f"S{i}{region}{tenancy}{os_name}", "T", "R", term, "", "", "0", "Inf", "Hrs",
+                                f"{0.05 * (2 ** (i % len(sizes))):.4f}", "USD", "Compute Instance",
+                                "AmazonEC2", "", f"{family}.{size}", "2", "8 GiB", tenancy, os_name,
+                                "No License required", "NA", "Used", region, "", "", "",
+                            ])
+    return path
+
+
+class TestPriceCatalog:
+    """Tests for PriceCatalog."""
+
+    def test_builtin_seed(self):
+        catalog = PriceCatalog.builtin()
+        assert catalog.instance_price("m5.large") == 0.096
+        assert catalog.monthly_instance_cost("t3.medium") == pytest.approx(0.0416 * 730)
+        assert catalog.volume_price("gp2") == 0.10
+        assert catalog.instance_price("m5.large", region="eu-west-1") is None
+        assert catalog.spec("m5.large").network_gbps == 0.75
+
+    def test_builtin_seed_databases_and_caches(self):
+        catalog = PriceCatalog.builtin()
+        assert catalog.instance_price("db.m5.large", os="PostgreSQL", tenancy="Single-AZ") == 0.178
+        assert catalog.instance_price("db.m5.large", os="MySQL", tenancy="Multi-AZ") == 0.342
+        assert catalog.ladder("cache.r5", os="Redis") == ["cache.r5.large", "cache.r5.xlarge", "cache.r5.2xlarge"]
+        assert catalog.spec("cache.t3.micro").memory_gib == 0.5
+
+    def test_monthly_volume_cost(self):
+        catalog = PriceCatalog.builtin()
+        assert catalog.monthly_volume_cost("gp2", 100) == pytest.approx(10.0)
+        # gp3 includes 3,000 IOPS and 125 MiB/s
+        assert catalog.monthly_volume_cost("gp3", 100, iops=4000, throughput=250) == pytest.approx(8 + 5 + 5)
+        assert catalog.monthly_volume_cost("io1", 100, iops=1000) == pytest.approx(12.5 + 65)
+        assert catalog.monthly_volume_cost("gp3", 100, region="eu-west-1") is None
+
+    def test_downsize_follows_family_ladder(self):
+        catalog = PriceCatalog.builtin()
+        assert catalog.ladder("t3") == ["t3.nano", "t3.micro", "t3.small", "t3.medium", "t3.large", "t3.xlarge"]
+        assert catalog.downsize("t3.xlarge") == "t3.large"
+        assert catalog.downsize("t3.xlarge", steps=2) == "t3.medium"
+        assert catalog.downsize("t3.nano") is None
+        assert catalog.downsize("z9.large") is None
+
+    def test_load_falls_back_to_builtin(self, tmp_path):
+        catalog = PriceCatalog.load(str(tmp_path / "missing.db"))
+        assert catalog.instance_price("c5.large") == 0.085
+
+    def test_build_from_json_offer(self, tmp_path):
+        offer = _write_json_offer(tmp_path / "ec2.json", [
+            ("m7g.large", "eu-west-1", 0.0907),
+            ("m7g.xlarge", "eu-west-1", 0.1814, "4", "16 GiB", "Linux", {"networkPerformance": "Up to 12.5 Gigabit"}),
+            ("m7g.metal", "eu-west-1", 2.9, "64", "256 GiB", "Linux", {"networkPerformance": "30 Gigabit"}),
+            ("m7g.large", "eu-west-1", 0.18, "2", "8 GiB", "Windows"),
+            ("m7g.2xlarge", "eu-west-1", 0.5, "8", "32 GiB", "Linux", {"capacitystatus": "UnusedCapacityReservation"}),
+        ])
+        db = tmp_path / "pricing.db"
+
+        counts = PriceCatalog.build([offer], db)
+        catalog = PriceCatalog.open(db)
+
+        assert counts["instance_prices"] == 4
+        assert catalog.instance_price("m7g.xlarge", "eu-west-1") == 0.1814
+        assert catalog.instance_price("m7g.large", "eu-west-1", os="Windows") == 0.18
+        assert catalog.spec("m7g.xlarge").memory_gib == 16
+        # burstable bandwidth is no baseline
+        assert catalog.spec("m7g.xlarge").network_gbps == 0
+        assert catalog.spec("m7g.metal").network_gbps == 30
+        assert catalog.volume_price("gp2", "eu-west-1") == 0.11
+        # metal is priced but never a downsizing target
+        assert catalog.ladder("m7g", "eu-west-1") == ["m7g.large", "m7g.xlarge"]
+        assert catalog.downsize("m7g.xlarge", "eu-west-1") == "m7g.large"
+
+    def test_large_json_offer_rejected_before_import(self, tmp_path, monkeypatch):
+        small = _write_json_offer(tmp_path / "small.json", [("m7g.large", "eu-west-1", 0.0907)])
+        large = _write_json_offer(tmp_path / "ec2.json", [("m7g.large", "eu-west-1", 0.0907)] * 50)
+        monkeypatch.setattr(pricing, "MAX_JSON_OFFER_BYTES", small.stat().st_size)
+        db = tmp_path / "pricing.db"
+
+        with pytest.raises(ValueError, match="CSV"):
+            PriceCatalog.build([small, large], db)
+        # Nothing is imported, not even the files before the rejected one
+        assert not db.exists()
+
+    def test_build_from_csv_offer_skips_reserved_terms(self, tmp_path):
+        offer = _write_csv_offer(tmp_path / "ec2.csv", n_types=5)
+        db = tmp_path / "pricing.db"
+
+        counts = PriceCatalog.build([offer], db)
+        catalog = PriceCatalog.open(db)
+
+        # 5 types x 2 regions x 2 tenancies x 2 OSes, on-demand only
+        assert counts["instance_prices"] == 40
+        assert catalog.instance_price("x0.xlarge", "eu-west-1", tenancy="Dedicated") == 0.1
+        assert catalog.downsize("x0.8xlarge", "us-east-1", os="Windows") == "x0.4xlarge"
+
+    def test_loader_benchmark(self, tmp_path):
+        """50k priced rows must import in seconds and open well inside the memory budget."""
+        offer = _write_csv_offer(tmp_path / "ec2.csv", n_types=6250)
+        db = tmp_path / "pricing.db"
+
+        started = time.perf_counter()
+        counts = PriceCatalog.build([offer], db)
+        build_seconds = time.perf_counter() - started
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        catalog = PriceCatalog.open(db)
+        open_seconds = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        assert counts["instance_prices"] == 50_000
+        assert build_seconds < 10
+        assert open_seconds < 2
+        # Target: < 300 bytes per priced row held in memory
+        assert peak < 300 * counts["instance_prices"]
+        assert catalog.instance_price("x0.large", "us-east-1") == 0.05
+
+
+class TestHelpers:
+    """Tests for instance type helpers."""
+
+    def test_split_type(self):
+        assert split_type("m5.2xlarge") == ("m5", "2xlarge")
+        assert split_type("db.r6g.large") == ("db.r6g", "large")
+
+    def test_size_rank_orders_sizes(self):
+        sizes = ["nano", "micro", "small", "medium", "large", "xlarge", "2xlarge", "12xlarge", "48xlarge"]
+        ranks = [size_rank(s) for s in sizes]
+        assert ranks == sorted(ranks)
+        assert size_rank("metal") is None
+
+    def test_instance_os_and_tenancy(self):
+        instance = {"PlatformDetails": "Windows", "Placement": {"Tenancy": "dedicated"}}
+        assert instance_os(instance) == "Windows"
+        assert instance_tenancy(instance) == "Dedicated"
+        assert instance_os({}) == "Linux"
+        assert instance_tenancy({}) == "Shared"
+
+    def test_database_and_cache_engines(self):
+        assert db_engine({"Engine": "postgres"}) == "PostgreSQL"
+        assert db_deployment({"Engine": "mysql", "MultiAZ": True}) == "Multi-AZ"
+        assert db_deployment({"Engine": "aurora-mysql", "MultiAZ": True}) == "Single-AZ"
+        assert cache_engine({"Engine": "memcached"}) == "Memcached"
@@ -0,0 +1,150 @@
+"""Unit tests for response recording, replay and the synthetic account."""
+
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from botocore.exceptions import ClientError
+
+from costpilot.config import Config, CostPilotConfig
+from costpilot.pricing import PriceCatalog
+from costpilot.replay import FixtureSource, ReplayMiss, request_key
+from costpilot.rightsizer import RightSizer
+from costpilot.synthetic import MAX_DATAPOINTS, SyntheticAccount
+from costpilot.unused import UnusedDetector
+
+
+@pytest.fixture(scope="module")
+def account():
+    return SyntheticAccount(instances=200, volumes=20, snapshots=300, addresses=9, load_balancers=30)
+
+
+def _config(source) -> Config:
+    return Config(region="us-east-1", settings=CostPilotConfig(), replay=source)
+
+
+def _fixture(path, records: list[dict], recorded_at: datetime) -> None:
+    with gzip.open(path, "wt") as f:
+        f.write(json.dumps({"recorded_at": recorded_at.isoformat()}) + "\n")
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+class TestRecordReplay:
+    """Tests for Recorder, FixtureSource and Replayer."""
+
+    def test_recorded_scan_replays_identically(self, account, tmp_path):
+        path = tmp_path / "scan.jsonl.gz"
+        catalog = PriceCatalog.builtin()
+        recording = Config(region="us-east-1", settings=CostPilotConfig(), replay=account, record=path)
+        recorded = UnusedDetector(recording, catalog=catalog).fetch()
+        recording.close()
+
+        replayed = UnusedDetector(_config(FixtureSource(path)), catalog=catalog).fetch()
+
+        assert recording.recorder.recorded > 0
+        assert [(r.resource_id, r.monthly_cost) for r in replayed] == [
+            (r.resource_id, r.monthly_cost) for r in recorded
+        ]
+
+    def test_replay_shifts_dates_by_days_since_recording(self, tmp_path):
+        path = tmp_path / "ce.jsonl.gz"
+        recorded_at = datetime.now(timezone.utc) - timedelta(days=10)
+        day = (recorded_at - timedelta(days=1)).date()
+        _fixture(path, [{
+            "service": "ec2", "operation": "DescribeSnapshots", "key": "", "status": 200,
+            "response": {"Snapshots": [{"SnapshotId": "snap-1", "StartTime": {"$dt": recorded_at.isoformat()}}],
+                         "Note": str(day)},
+        }], recorded_at)
+
+        status, response = FixtureSource(path).respond("ec2", "DescribeSnapshots", {})
+
+        assert status == 200
+        assert response["Snapshots"][0]["StartTime"] == recorded_at + timedelta(days=10)
+        assert response["Note"] == str(day + timedelta(days=10))
+
+    def test_matching_request_preferred_and_repeats_cycle(self, tmp_path):
+        path = tmp_path / "vol.jsonl.gz"
+        key = request_key("ec2", "DescribeVolumes", {"VolumeIds": ["vol-2"]})
+        _fixture(path, [
+            {"service": "ec2", "operation": "DescribeVolumes", "key": "other", "status": 200,
+             "response": {"Volumes": [{"VolumeId": "vol-1"}]}},
+            {"service": "ec2", "operation": "DescribeVolumes", "key": key, "status": 200,
+             "response": {"Volumes": [{"VolumeId": "vol-2"}]}},
+        ], datetime.now(timezone.utc))
+        source = FixtureSource(path)
+
+        # The time window doesn't take part in matching
+        _, exact = source.respond("ec2", "DescribeVolumes", {"VolumeIds": ["vol-2"], "StartTime": "now"})
+        first = source.respond("ec2", "DescribeVolumes", {"VolumeIds": ["vol-9"]})[1]
+        second = source.respond("ec2", "DescribeVolumes", {"VolumeIds": ["vol-9"]})[1]
+
+        assert exact["Volumes"][0]["VolumeId"] == "vol-2"
+        assert {first["Volumes"][0]["VolumeId"], second["Volumes"][0]["VolumeId"]} == {"vol-1", "vol-2"}
+
+    def test_recorded_error_raises_client_error(self, tmp_path):
+        path = tmp_path / "err.jsonl.gz"
+        _fixture(path, [{
+            "service": "ec2", "operation": "DescribeAddresses", "key": "", "status": 403,
+            "response": {"Error": {"Code": "UnauthorizedOperation", "Message": "denied"}},
+        }], datetime.now(timezone.utc))
+        ec2 = _config(FixtureSource(path)).get_session().client("ec2")
+
+        with pytest.raises(ClientError, match="UnauthorizedOperation"):
+            ec2.describe_addresses()
+
+    def test_unanswered_call_is_a_miss(self, account):
+        sts = _config(account).get_session().client("sts")
+
+        with pytest.raises(ReplayMiss, match="sts:GetCallerIdentity"):
+            sts.get_caller_identity()
+
+
+class TestSyntheticAccount:
+    """Tests for the generated account, driven through the real engines."""
+
+    def test_rightsizer_sees_every_running_instance(self, account):
+        config = _config(account)
+        rightsizer = RightSizer(config, catalog=PriceCatalog.builtin())
+
+        recommendations = rightsizer.fetch()
+
+        assert rightsizer.instances_analyzed == account.summary()["running"]
+        assert recommendations
+        # Replayed calls go through the API middleware like real ones: two batches
+        # of CPU, network and agent queries, each paged at the datapoint limit,
+        # after one ListMetrics call per agent metric
+        stats = config.api.stats()
+        assert stats["cloudwatch:GetMetricData"].calls == 4
+        assert stats["cloudwatch:ListMetrics"].calls == 3
+
+    def test_metric_data_paged_at_datapoint_limit(self, account):
+        end = datetime(2026, 1, 15, tzinfo=timezone.utc)
+        queries = [
+            {"Id": f"m{i}", "MetricStat": {
+                "Metric": {"Namespace": "AWS/EC2", "MetricName": "CPUUtilization",
+                           "Dimensions": [{"Name": "InstanceId", "Value": f"i-{i}"}]},
+                "Period": 3600, "Stat": "Average"}}
+            for i in range(500)
+        ]
+        params = {"MetricDataQueries": queries, "StartTime": end - timedelta(days=14), "EndTime": end}
+
+        _, first = account.respond("cloudwatch", "GetMetricData", params)
+        _, rest = account.respond("cloudwatch", "GetMetricData", {**params, "NextToken": first["NextToken"]})
+
+        assert sum(len(r["Values"]) for r in first["MetricDataResults"]) <= MAX_DATAPOINTS
+        assert len(first["MetricDataResults"]) + len(rest["MetricDataResults"]) == 500
+        assert "NextToken" not in rest
+        assert len(rest["MetricDataResults"][0]["Timestamps"]) == 14 * 24
+
+    def test_daily_costs_estimated_only_for_recent_days(self, account):
+        today = account.now.date()
+        _, response = account.respond("ce", "GetCostAndUsage", {
+            "TimePeriod": {"Start": str(today - timedelta(days=5)), "End": str(today)},
+            "Granularity": "DAILY",
+            "GroupBy": [{"Type": "DIMENSION", "Key": "SERVICE"}],
+        })
+
+        assert [r["Estimated"] for r in response["ResultsByTime"]] == [False, False, False, True, True]
+        assert len(response["ResultsByTime"][0]["Groups"]) == len(account.service_names)
@@ -0,0 +1,140 @@
+"""Unit tests for CostPilot report generation."""
+
+import csv
+import os
+import tracemalloc
+from datetime import date, datetime, timezone
+
+import pytest
+
+from costpilot import serialize
+from costpilot.models import (
+    CostAnalysis,
+    CostReport,
+    ResourceType,
+    RightsizeRecommendation,
+    ServiceCost,
+    UnusedResource,
+)
+from costpilot.reporter import ReportGenerator
+
+NOW = datetime(2026, 3, 31, 12, 0, tzinfo=timezone.utc)
+
+
+def _unused(n, name=""):
+    return [
+        UnusedResource(
+            resource_id=f"vol-{i:08x}",
+            resource_type=ResourceType.EBS_VOLUME,
+            region="us-east-1",
+            name=name,
+            reason="Delete or snapshot and delete",
+            monthly_cost=8.0,
+            subtype="gp3",
+            size_gb=100,
+            created=NOW,
+        )
+        for i in range(n)
+    ]
+
+
+def _report(n=3, name=""):
+    return CostReport(
+        generated_at=NOW,
+        analysis=CostAnalysis(
+            start_date=date(2026, 3, 1),
+            end_date=date(2026, 3, 31),
+            total_cost=1234.5,
+            projected_monthly=1300.0,
+            service_breakdown=[ServiceCost("Amazon EC2", 900.0), ServiceCost("Amazon S3", 334.5)],
+        ),
+        rightsizing=[RightsizeRecommendation(
+            "i-1", "ec2", "us-east-1", "t3.xlarge", "t3.large", 5.0, 20.0, 0.1, 121.47, 60.74, 60.73,
+        )],
+        unused_resources=_unused(n, name),
+    )
+
+
+class TestReportGenerator:
+    """Tests for ReportGenerator."""
+
+    def test_markdown_lists_every_finding(self, mock_config, tmp_path):
+        ReportGenerator(mock_config).generate(_report(n=25), str(tmp_path), formats=["md"])
+
+        md = (tmp_path / "cost-report.md").read_text()
+        assert "## Executive Summary" in md
+        # Rightsizing 60.73 + 25 volumes × 8.00, totalled by CostReport.calculate_savings
+        assert "$260.73/month" in md
+        assert md.count("| vol-") == 25
+
+    def test_advisories_listed_but_not_counted(self, mock_config, tmp_path):
+        report = _report(n=2)
+        report.advisories = [UnusedResource(
+            "logs", ResourceType.S3_BUCKET, "us-east-1", reason="Add lifecycle rules", subtype="no_lifecycle",
+        )]
+        report.calculate_savings()
+
+        ReportGenerator(mock_config).generate(report, str(tmp_path), formats=["md"])
+
+        md = (tmp_path / "cost-report.md").read_text()
+        assert "## Advisories" in md and "| logs |" in md
+        assert "Found **2** unused resources wasting **$16.00/month**" in md
+        assert "$76.73/month" in md
+
+    def test_html_is_self_contained_and_sortable(self, mock_config, tmp_path):
+        ReportGenerator(mock_config).generate(_report(name="<b>x</b> | y"), str(tmp_path), formats=["html"])
+
+        page = (tmp_path / "cost-report.html").read_text()
+        assert page.startswith("<!DOCTYPE html>")
+        assert '<table class="sortable">' in page
+        assert "addEventListener('click'" in page
+        assert "<link" not in page and "src=" not in page
+        assert "&lt;b&gt;x&lt;/b&gt;" in page
+
+    def test_streams_100k_rows_without_building_document(self, mock_config, tmp_path):
+        report = _report(n=100_000)
+        report.calculate_savings()
+
+        tracemalloc.start()
+        ReportGenerator(mock_config).generate(report, str(tmp_path))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        size = os.path.getsize(tmp_path / "cost-report.html")
+        assert size > 10_000_000
+        # Peak allocation stays a small fraction of the written document
+        assert peak < size / 4
+
+    def test_csv_export(self, mock_config, tmp_path):
+        path = tmp_path / "findings.csv"
+
+        count = ReportGenerator(mock_config).export_findings(_report(n=5), str(path))
+
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+        assert count == len(rows) == 6
+        assert rows[0]["finding"] == "rightsizing"
+        assert rows[1]["resource_type"] == "ebs_volume"
+        assert float(rows[1]["monthly_savings"]) == 8.0
+
+    def test_parquet_export(self, mock_config, tmp_path):
+        pq = pytest.importorskip("pyarrow.parquet")
+        path = tmp_path / "findings.parquet"
+
+        ReportGenerator(mock_config).export_findings(_report(n=5), str(path))
+
+        table = pq.read_table(path)
+        assert table.num_rows == 6
+        assert table.schema.field("monthly_cost").type == "double"
+
+    def test_unknown_export_format(self, mock_config, tmp_path):
+        with pytest.raises(ValueError, match="export format"):
+            ReportGenerator(mock_config).export_findings(_report(), str(tmp_path / "x.xlsx"))
+
+    def test_generate_from_saved_report(self, mock_config, tmp_path):
+        saved = tmp_path / "report.json"
+        serialize.dump(_report(), saved)
+
+        written = ReportGenerator(mock_config).generate_from_cache(str(tmp_path / "out"), path=str(saved))
+
+        assert sorted(os.path.basename(p) for p in written) == ["cost-report.html", "cost-report.md"]
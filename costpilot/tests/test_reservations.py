@@ -0,0 +1,125 @@
+"""Unit tests for CostPilot reservation analyzer."""
+
+import pytest
+
+from costpilot.reservations import PAYMENT_OPTIONS, RESERVABLE_SERVICES, TERMS, ReservationAnalyzer
+
+EC2 = "Amazon Elastic Compute Cloud - Compute"
+RDS = "Amazon Relational Database Service"
+
+
+def _detail(family, savings, upfront=0.0, recurring=50.0, details_key="EC2InstanceDetails"):
+    return {
+        "InstanceDetails": {details_key: {"Family": family, "Region": "us-east-1"}},
+        "EstimatedMonthlySavingsAmount": str(savings),
+        "EstimatedMonthlyOnDemandCost": "200.0",
+        "UpfrontCost": str(upfront),
+        "RecurringStandardMonthlyCost": str(recurring),
+    }
+
+
+def _recommendations(Service, TermInYears, PaymentOption, NextPageToken=None, **kwargs):
+    """EC2 returns two pages for 1-year no-upfront; RDS one option per payment; others nothing."""
+    if Service == EC2 and TermInYears == "ONE_YEAR" and PaymentOption == "NO_UPFRONT":
+        if NextPageToken is None:
+            return {"Recommendations": [{"RecommendationDetails": [_detail("m5", 40.0)]}], "NextPageToken": "p2"}
+        return {"Recommendations": [{"RecommendationDetails": [_detail("c5", 25.0)]}]}
+    if Service == EC2 and TermInYears == "THREE_YEARS" and PaymentOption == "ALL_UPFRONT":
+        return {"Recommendations": [{"RecommendationDetails": [_detail("m5", 90.0, upfront=2160.0, recurring=0)]}]}
+    if Service == RDS and TermInYears == "ONE_YEAR":
+        savings = {"NO_UPFRONT": 10.0, "PARTIAL_UPFRONT": 14.0, "ALL_UPFRONT": 16.0}[PaymentOption]
+        upfront = {"NO_UPFRONT": 0.0, "PARTIAL_UPFRONT": 60.0, "ALL_UPFRONT": 300.0}[PaymentOption]
+        details = [_detail("db.r5", savings, upfront=upfront, details_key="RDSInstanceDetails")]
+        return {"Recommendations": [{"RecommendationDetails": details}]}
+    return {"Recommendations": []}
+
+
+@pytest.fixture
+def ce(mock_config):
+    ce = mock_config.get_session().client("ce")
+    ce.get_reservation_utilization.return_value = {
+        "Total": {"UtilizationPercentage": "75", "TotalAmortizedFee": "400.0"}
+    }
+    ce.get_reservation_coverage.return_value = {
+        "Total": {"CoverageHours": {"CoverageHoursPercentage": "60"}}
+    }
+    ce.get_savings_plans_utilization.return_value = {
+        "Total": {"Utilization": {
+            "UtilizationPercentage": "90", "TotalCommitment": "1000",
+            "UsedCommitment": "900", "UnusedCommitment": "100",
+        }}
+    }
+    ce.get_savings_plans_coverage.return_value = {
+        "SavingsPlansCoverages": [{"Coverage": {"SpendCoveredBySavingsPlans": "300", "OnDemandCost": "700"}}]
+    }
+    ce.get_reservation_purchase_recommendation.side_effect = _recommendations
+    return ce
+
+
+class TestReservationAnalyzer:
+    """Tests for ReservationAnalyzer."""
+
+    def test_sweeps_full_matrix_with_pagination(self, mock_config, ce):
+        analyzer = ReservationAnalyzer(mock_config, requests_per_second=1000)
+        analyzer.fetch()
+
+        combos = len(RESERVABLE_SERVICES) * len(TERMS) * len(PAYMENT_OPTIONS)
+        # One extra call for the EC2 second page
+        assert ce.get_reservation_purchase_recommendation.call_count == combos + 1
+        families = {(r.service, r.instance_family) for r in analyzer.options}
+        assert (EC2, "c5") in families
+
+    def test_utilization_and_coverage_populate_models(self, mock_config, ce):
+        ri, sp = ReservationAnalyzer(mock_config, requests_per_second=1000).fetch()
+
+        assert ri.utilization_pct == 75.0
+        assert ri.coverage_pct == 60.0
+        assert ri.wasted_spend == 100.0
+        assert sp.utilization_pct == 90.0
+        assert sp.coverage_pct == 30.0
+        assert sp.wasted_spend == 100.0
+
+    def test_best_option_per_family(self, mock_config, ce):
+        ri, _ = ReservationAnalyzer(mock_config, requests_per_second=1000).fetch()
+
+        best = {(r.service, r.instance_family): r for r in ri.recommendations}
+        assert len(best) == 3
+        # 3-year all-upfront saves the most and pays back in 24 months
+        m5 = best[(EC2, "m5")]
+        assert (m5.term_months, m5.payment_option) == (36, "all_upfront")
+        assert m5.break_even_months == 24.0
+        assert m5.monthly_reserved == 60.0
+        # RDS all-upfront: 300 / 16 = 18.8 months, beyond the 12-month term
+        assert best[(RDS, "db.r5")].payment_option == "partial_upfront"
+
+    def test_savings_at_net_rates(self, mock_config, ce):
+        from costpilot.attribution import ResourceCostIndex
+
+        rates = ResourceCostIndex(discount=0.9)
+        ri, _ = ReservationAnalyzer(mock_config, requests_per_second=1000, rates=rates).fetch()
+
+        m5 = next(r for r in ri.recommendations if r.instance_family == "m5")
+        assert m5.monthly_reserved == 54.0
+        assert m5.break_even_months == 24.0
+
+    def test_analyze_returns_dicts(self, mock_config, ce):
+        result = ReservationAnalyzer(mock_config, requests_per_second=1000).analyze()
+
+        assert result["reserved_instances"]["utilization_percent"] == 75.0
+        assert result["savings_plans"]["coverage_percent"] == 30.0
+        assert result["recommendations"][0]["instance_family"] == "m5"
+        assert len(result["options"]) == 6
+
+    def test_failed_queries_degrade_to_zero(self, mock_config):
+        ce = mock_config.get_session().client("ce")
+        ce.get_reservation_utilization.side_effect = Exception("AccessDenied")
+        ce.get_reservation_coverage.side_effect = Exception("AccessDenied")
+        ce.get_savings_plans_utilization.side_effect = Exception("AccessDenied")
+        ce.get_savings_plans_coverage.side_effect = Exception("AccessDenied")
+        ce.get_reservation_purchase_recommendation.side_effect = Exception("AccessDenied")
+
+        ri, sp = ReservationAnalyzer(mock_config, requests_per_second=1000).fetch()
+
+        assert ri.utilization_pct == 0.0
+        assert ri.recommendations == []
+        assert sp.coverage_pct == 0.0
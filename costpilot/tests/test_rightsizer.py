@@ -1,10 +1,59 @@
 """Unit tests for CostPilot rightsizer."""
 
+from datetime import timedelta
 from unittest.mock import MagicMock
 
 import pytest
 
-from costpilot.rightsizer import RightSizer, EC2_PRICING, DOWNSIZE_MAP
+from costpilot.pricing import PriceCatalog
+from costpilot.rightsizer import CacheRightSizer, DatabaseRightSizer, RightSizer, VolumeRightSizer
+
+GIB = 2 ** 30
+
+
+def _metric_data(datapoints):
+    """Serve a GetMetricStatistics-style fixture as hourly CPU through GetMetricData."""
+    values = [p["Average"] for p in datapoints["Datapoints"]]
+
+    def respond(MetricDataQueries, StartTime, **kwargs):
+        results = []
+        for query in MetricDataQueries:
+            if query["MetricStat"]["Metric"]["MetricName"] == "CPUUtilization":
+                timestamps = [StartTime + timedelta(hours=h) for h in range(len(values))]
+                results.append({"Id": query["Id"], "Timestamps": timestamps, "Values": values})
+            else:
+                results.append({"Id": query["Id"], "Timestamps": [], "Values": []})
+        return {"MetricDataResults": results}
+
+    return respond
+
+
+def _levels(levels):
+    """Serve two weeks of hourly datapoints at ``levels[metric]``, or ``levels[metric](dimensions)``.
+
+    A list level is an hourly profile, repeated over the two weeks.
+    """
+    def respond(MetricDataQueries, StartTime, **kwargs):
+        results = []
+        for query in MetricDataQueries:
+            metric = query["MetricStat"]["Metric"]
+            level = levels.get(metric["MetricName"])
+            if callable(level):
+                level = level({d["Name"]: d["Value"] for d in metric["Dimensions"]})
+            timestamps = [StartTime + timedelta(hours=h) for h in range(14 * 24)] if level is not None else []
+            values = [level[h % len(level)] for h in range(len(timestamps))] if isinstance(level, list) \
+                else [level] * len(timestamps)
+            results.append({"Id": query["Id"], "Timestamps": timestamps, "Values": values})
+        return {"MetricDataResults": results}
+
+    return respond
+
+
+def _client(mock_config, pages):
+    """The shared mock client, paginating ``pages`` and answering metrics via ``_levels``."""
+    client = mock_config.get_session().client("rds")
+    client.get_paginator.return_value.paginate.return_value = pages
+    return client
 
 
 class TestRightSizer:
@@ -26,7 +75,7 @@ class TestRightSizer:
         ec2.get_paginator.return_value = paginator
 
         # Low CPU for both instances
-        cw.get_metric_statistics.return_value = sample_cloudwatch_cpu_low
+        cw.get_metric_data.side_effect = _metric_data(sample_cloudwatch_cpu_low)
 
         sizer = self._make_sizer(mock_config)
         result = sizer.analyze(cpu_threshold=30.0, days=14)
@@ -39,6 +88,27 @@ class TestRightSizer:
         assert rec["current_type"] == "t3.xlarge"
         assert rec["recommended_type"] == "t3.large"
         assert rec["monthly_savings"] > 0
+        # Three hourly datapoints out of 14 days is too little to trust
+        assert rec["confidence"] == "low"
+
+    def test_single_batched_metric_sweep(
+        self, mock_config, sample_ec2_instances, sample_cloudwatch_cpu_low
+    ):
+        session = mock_config.get_session()
+        ec2 = session.client("ec2")
+        cw = session.client("cloudwatch")
+
+        paginator = MagicMock()
+        paginator.paginate.return_value = [sample_ec2_instances]
+        ec2.get_paginator.return_value = paginator
+        cw.get_metric_data.side_effect = _metric_data(sample_cloudwatch_cpu_low)
+
+        self._make_sizer(mock_config).analyze()
+
+        # CPU, NetworkIn and NetworkOut for both instances in one request
+        assert cw.get_metric_data.call_count == 1
+        assert len(cw.get_metric_data.call_args.kwargs["MetricDataQueries"]) == 6
+        cw.get_metric_statistics.assert_not_called()
 
     def test_no_recommendation_for_high_cpu(
         self, mock_config, sample_ec2_instances, sample_cloudwatch_cpu_high
@@ -51,7 +121,7 @@ class TestRightSizer:
         paginator.paginate.return_value = [sample_ec2_instances]
         ec2.get_paginator.return_value = paginator
 
-        cw.get_metric_statistics.return_value = sample_cloudwatch_cpu_high
+        cw.get_metric_data.side_effect = _metric_data(sample_cloudwatch_cpu_high)
 
         sizer = self._make_sizer(mock_config)
         result = sizer.analyze(cpu_threshold=30.0, days=14)
@@ -83,7 +153,7 @@ class TestRightSizer:
         paginator.paginate.return_value = [sample_ec2_instances]
         ec2.get_paginator.return_value = paginator
 
-        cw.get_metric_statistics.return_value = {"Datapoints": []}
+        cw.get_metric_data.side_effect = _metric_data({"Datapoints": []})
 
         sizer = self._make_sizer(mock_config)
         result = sizer.analyze()
@@ -108,10 +178,160 @@ class TestRightSizer:
         paginator = MagicMock()
         paginator.paginate.return_value = [sample_ec2_instances]
         ec2.get_paginator.return_value = paginator
-        cw.get_metric_statistics.return_value = sample_cloudwatch_cpu_low
+        cw.get_metric_data.side_effect = _metric_data(sample_cloudwatch_cpu_low)
 
         sizer = self._make_sizer(mock_config)
         result = sizer.analyze(cpu_threshold=30.0)
 
         total = sum(r["monthly_savings"] for r in result["recommendations"])
         assert result["potential_savings"] == round(total, 2)
+
+
+class TestAgentMetrics:
+    """RightSizer with CloudWatch agent memory and disk metrics."""
+
+    def test_memory_joined_by_instance_and_required_to_fit(self, mock_config):
+        instances = [
+            {"InstanceId": "i-web", "InstanceType": "r5.2xlarge"},
+            {"InstanceId": "i-cache", "InstanceType": "r5.2xlarge"},
+            {"InstanceId": "i-bare", "InstanceType": "r5.2xlarge"},
+        ]
+        agent_metrics = {
+            "mem_used_percent": [
+                {"Dimensions": [{"Name": "InstanceId", "Value": "i-web"}, {"Name": "ImageId", "Value": "ami-1"}]},
+                {"Dimensions": [{"Name": "InstanceId", "Value": "i-cache"}]},
+                {"Dimensions": [{"Name": "InstanceId", "Value": "i-gone"}]},
+            ],
+            "disk_used_percent": [
+                {"Dimensions": [{"Name": "InstanceId", "Value": "i-web"}, {"Name": "path", "Value": p}]}
+                for p in ("/", "/data")
+            ],
+        }
+        pages = {
+            "describe_instances": lambda **kw: [{"Reservations": [{"Instances": instances}]}],
+            "list_metrics": lambda MetricName, **kw: [{"Metrics": agent_metrics.get(MetricName, [])}],
+        }
+        client = mock_config.get_session().client("ec2")
+        client.get_paginator.side_effect = lambda name: MagicMock(paginate=MagicMock(side_effect=pages[name]))
+        client.get_metric_data.side_effect = _levels({
+            "CPUUtilization": 4.0,
+            "mem_used_percent": lambda dims: 20.0 if dims["InstanceId"] == "i-web" else 90.0,
+            "disk_used_percent": lambda dims: 70.0 if dims["path"] == "/data" else 30.0,
+        })
+
+        recs = RightSizer(mock_config, catalog=PriceCatalog.builtin()).fetch()
+
+        # i-cache is memory-bound; i-bare has no agent, so memory may only halve, at low confidence
+        assert [(r.resource_id, r.recommended_type, r.confidence) for r in recs] == [
+            ("i-web", "r5.large", "high"), ("i-bare", "r5.xlarge", "low"),
+        ]
+        assert (recs[0].max_memory_pct, recs[0].max_disk_pct) == (20.0, 70.0)
+        assert (recs[1].max_memory_pct, recs[1].max_disk_pct) == (None, None)
+        # 3 instances × CPU/in/out, 2 memory series and 2 filesystems in one request
+        queries = client.get_metric_data.call_args.kwargs["MetricDataQueries"]
+        assert client.get_metric_data.call_count == 1 and len(queries) == 13
+        assert {"Name": "ImageId", "Value": "ami-1"} in queries[9]["MetricStat"]["Metric"]["Dimensions"]
+
+
+class TestDatabaseRightSizer:
+    """Tests for DatabaseRightSizer."""
+
+    def _db(self, db_id="orders", db_class="db.r5.2xlarge", **kwargs):
+        return {"DBInstanceIdentifier": db_id, "DBInstanceClass": db_class, "Engine": "mysql",
+                "DBInstanceStatus": "available", "MultiAZ": False, **kwargs}
+
+    def test_idle_database_downsized(self, mock_config):
+        client = _client(mock_config, [{"DBInstances": [self._db(TagList=[{"Key": "Name", "Value": "orders"}])]}])
+        client.get_metric_data.side_effect = _levels(
+            {"CPUUtilization": 5.0, "DatabaseConnections": 20.0, "FreeableMemory": 58 * GIB}
+        )
+
+        recs = DatabaseRightSizer(mock_config, catalog=PriceCatalog.builtin()).fetch()
+
+        assert [(r.resource_type, r.recommended_type, r.name) for r in recs] == [("rds", "db.r5.large", "orders")]
+        assert recs[0].monthly_savings == pytest.approx((1.00 - 0.25) * 730)
+        # CPU, connections and freeable memory in one request
+        assert len(client.get_metric_data.call_args.kwargs["MetricDataQueries"]) == 3
+
+    def test_connections_keep_memory_for_max_connections(self, mock_config):
+        client = _client(mock_config, [{"DBInstances": [self._db()]}])
+        # 2,000 connections need ~29 GiB under MySQL's default max_connections
+        client.get_metric_data.side_effect = _levels(
+            {"CPUUtilization": 5.0, "DatabaseConnections": 2000.0, "FreeableMemory": 58 * GIB}
+        )
+
+        recs = DatabaseRightSizer(mock_config, catalog=PriceCatalog.builtin()).fetch()
+
+        assert recs[0].recommended_type == "db.r5.xlarge"
+
+    def test_mysql_buffer_pool_is_not_memory_demand(self, mock_config):
+        client = _client(mock_config, [{"DBInstances": [
+            self._db("quiet", "db.r5.xlarge"), self._db("busy", "db.r5.xlarge"),
+        ]}])
+        # 32 GiB with the default 24 GiB buffer pool always allocated: FreeableMemory
+        # dips from 8 GiB to 5 GiB over a day (75–84% used); "busy" also fills the rest
+        daily = [(8 - 3 * abs(12 - h) / 12) * GIB for h in range(24)]
+        client.get_metric_data.side_effect = _levels({
+            "CPUUtilization": 5.0,
+            "DatabaseConnections": 80.0,
+            "FreeableMemory": lambda dims: daily if dims["DBInstanceIdentifier"] == "quiet" else 0.5 * GIB,
+        })
+
+        recs = DatabaseRightSizer(mock_config, catalog=PriceCatalog.builtin()).fetch()
+
+        assert [(r.resource_id, r.recommended_type) for r in recs] == [("quiet", "db.r5.large")]
+        assert recs[0].max_memory_pct == pytest.approx(84.4, abs=0.1)
+
+    def test_unavailable_instances_skipped(self, mock_config):
+        client = _client(mock_config, [{"DBInstances": [self._db(DBInstanceStatus="stopped")]}])
+
+        sizer = DatabaseRightSizer(mock_config, catalog=PriceCatalog.builtin())
+
+        assert sizer.fetch() == []
+        assert sizer.instances_analyzed == 0
+        client.get_metric_data.assert_not_called()
+
+
+class TestCacheRightSizer:
+    """Tests for CacheRightSizer."""
+
+    def test_cluster_sized_by_busiest_node_and_priced_per_node(self, mock_config):
+        cluster = {
+            "CacheClusterId": "sessions", "CacheNodeType": "cache.r5.xlarge", "Engine": "memcached",
+            "CacheClusterStatus": "available", "NumCacheNodes": 2,
+            "CacheNodes": [{"CacheNodeId": "0001"}, {"CacheNodeId": "0002"}],
+        }
+        client = _client(mock_config, [{"CacheClusters": [cluster]}])
+        client.get_metric_data.side_effect = _levels({
+            "CPUUtilization": lambda dims: 40.0 if dims["CacheNodeId"] == "0002" else 2.0,
+            "FreeableMemory": 24 * GIB,
+        })
+
+        recs = CacheRightSizer(mock_config, catalog=PriceCatalog.builtin()).fetch(cpu_threshold=50.0)
+
+        assert recs[0].recommended_type == "cache.r5.large"
+        assert recs[0].avg_cpu_pct == 40.0
+        assert recs[0].monthly_savings == pytest.approx(2 * (0.431 - 0.216) * 730)
+        client.get_paginator.return_value.paginate.assert_called_once_with(ShowCacheNodeInfo=True)
+
+
+class TestVolumeRightSizer:
+    """Tests for VolumeRightSizer."""
+
+    def test_attached_gp2_and_io1_volumes_moved_to_gp3(self, mock_config):
+        volumes = [
+            {"VolumeId": "vol-1", "VolumeType": "gp2", "Size": 100, "Tags": [{"Key": "Name", "Value": "data"}]},
+            {"VolumeId": "vol-2", "VolumeType": "io1", "Size": 200, "Iops": 5000},
+        ]
+        client = _client(mock_config, [{"Volumes": volumes}])
+        # 360,000 ops per hour is 100 IOPS
+        client.get_metric_data.side_effect = _levels({"VolumeReadOps": 180_000.0, "VolumeWriteOps": 180_000.0})
+
+        recs = VolumeRightSizer(mock_config, catalog=PriceCatalog.builtin()).fetch()
+
+        assert [(r.resource_id, r.current_type, r.recommended_type) for r in recs] == [
+            ("vol-2", "io1 5,000 IOPS", "gp3 3,000 IOPS"), ("vol-1", "gp2", "gp3 3,000 IOPS"),
+        ]
+        assert recs[1].name == "data"
+        filters = client.get_paginator.return_value.paginate.call_args.kwargs["Filters"]
+        assert {"Name": "volume-type", "Values": ["gp2", "io1", "io2"]} in filters
@@ -0,0 +1,208 @@
+"""Unit tests for the S3 storage waste analyzer."""
+
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from costpilot.models import ResourceType
+from costpilot.s3 import GB, BucketState, InventoryManifest, InventoryReader, InventoryStats, S3Analyzer
+
+NOW = datetime(2025, 6, 1, tzinfo=timezone.utc)
+SCHEMA = "Bucket, Key, VersionId, IsLatest, IsDeleteMarker, Size, LastModifiedDate, StorageClass"
+MB = 1024 ** 2
+
+
+def _row(key: str, size: int, age_days: int, latest: bool = True, marker: bool = False,
+         storage: str = "STANDARD") -> list:
+    modified = (NOW - timedelta(days=age_days)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    return ["logs", key, "v1", str(latest).lower(), str(marker).lower(), size, modified, storage]
+
+
+ROWS = [
+    _row("new", 10 * MB, 5),
+    _row("warm", 10 * MB, 60),
+    _row("cold", 10 * MB, 400),
+    _row("cold-ia", 10 * MB, 400, storage="STANDARD_IA"),
+    _row("tiny", 1024, 400),
+    _row("old-version", 30 * MB, 90, latest=False),
+    _row("deleted", 0, 10, marker=True),
+]
+
+
+def _manifest(tmp_path, file_format: str = "CSV", files: tuple[str, ...] = ("data/part-0.csv.gz",)) -> str:
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps({
+        "sourceBucket": "logs",
+        "destinationBucket": "arn:aws:s3:::inventory",
+        "fileFormat": file_format,
+        "fileSchema": SCHEMA,
+        "files": [{"key": key} for key in files],
+    }))
+    return str(path)
+
+
+def _write_csv(tmp_path, rows: list[list]) -> None:
+    (tmp_path / "data").mkdir(exist_ok=True)
+    with gzip.open(tmp_path / "data" / "part-0.csv.gz", "wt") as f:
+        for row in rows:
+            f.write(",".join(f'"{v}"' for v in row) + "\n")
+
+
+def _paginators(client: MagicMock, **pages: list[dict]) -> None:
+    """Serve ``pages[operation]`` from ``client.get_paginator(operation)``."""
+    def paginator(name: str) -> MagicMock:
+        return MagicMock(paginate=MagicMock(return_value=pages.get(name, [])))
+    client.get_paginator.side_effect = paginator
+
+
+class TestInventoryReader:
+    """Tests for streaming S3 Inventory files into counters."""
+
+    def _check(self, stats: InventoryStats) -> None:
+        assert stats.rows == 7
+        assert stats.current_objects == 5
+        assert stats.current_bytes == 40 * MB + 1024
+        assert stats.noncurrent_objects == 1
+        assert stats.noncurrent_bytes == 30 * MB
+        assert stats.noncurrent_class_bytes == {"STANDARD": 30 * MB}
+        assert stats.delete_markers == 1
+        assert stats.it_objects == 1
+        assert stats.it_bytes == 10 * MB
+        assert stats.glacier_objects == 2
+        assert stats.glacier_bytes == 20 * MB
+        assert stats.glacier_standard_bytes == 10 * MB
+
+    def test_csv(self, tmp_path):
+        pytest.importorskip("pyarrow")
+        _write_csv(tmp_path, ROWS)
+        manifest = InventoryManifest.load(_manifest(tmp_path))
+        assert manifest.destination_bucket == "inventory"
+        self._check(InventoryReader(now=NOW).read(manifest))
+
+    def test_parquet(self, tmp_path):
+        pa = pytest.importorskip("pyarrow")
+        import pyarrow.parquet as pq
+
+        names = [c.strip() for c in SCHEMA.split(",")]
+        table = pa.table({
+            "Bucket": [r[0] for r in ROWS],
+            "Key": [r[1] for r in ROWS],
+            "VersionId": [r[2] for r in ROWS],
+            "IsLatest": [r[3] == "true" for r in ROWS],
+            "IsDeleteMarker": [r[4] == "true" for r in ROWS],
+            "Size": pa.array([r[5] for r in ROWS], pa.int64()),
+            "LastModifiedDate": pa.array(
+                [datetime.strptime(r[6], "%Y-%m-%dT%H:%M:%S.000Z").replace(tzinfo=timezone.utc) for r in ROWS],
+                pa.timestamp("ms", "UTC"),
+            ),
+            "StorageClass": [r[7] for r in ROWS],
+        }).select(names)
+        pq.write_table(table, tmp_path / "part-0.parquet")
+        manifest = InventoryManifest.load(_manifest(tmp_path, "Parquet", ("inventory/logs/data/part-0.parquet",)))
+        self._check(InventoryReader(now=NOW).read(manifest))
+
+    def test_noncurrent_bytes_by_storage_class(self, tmp_path):
+        pytest.importorskip("pyarrow")
+        _write_csv(tmp_path, ROWS + [
+            _row("archived-version", 100 * MB, 300, latest=False, storage="DEEP_ARCHIVE"),
+            _row("ia-version", 20 * MB, 60, latest=False, storage="STANDARD_IA"),
+        ])
+        stats = InventoryReader(now=NOW).read(InventoryManifest.load(_manifest(tmp_path)))
+        assert stats.noncurrent_bytes == 150 * MB
+        assert stats.noncurrent_class_bytes == {"STANDARD": 30 * MB, "DEEP_ARCHIVE": 100 * MB, "STANDARD_IA": 20 * MB}
+
+    def test_missing_file_is_skipped(self, tmp_path):
+        pytest.importorskip("pyarrow")
+        manifest = InventoryManifest.load(_manifest(tmp_path, files=("data/missing.csv.gz",)))
+        stats = InventoryReader(now=NOW).read(manifest)
+        assert stats.rows == 0
+
+
+class TestS3Analyzer:
+    """Tests for S3Analyzer bucket checks and findings."""
+
+    def _analyzer(self, mock_config) -> tuple[S3Analyzer, MagicMock]:
+        client = mock_config.get_session.return_value.client.return_value
+        mock_config.get_session.return_value.region_name = "us-east-1"
+        return S3Analyzer(mock_config), client
+
+    def test_bucket_without_lifecycle(self, mock_config):
+        analyzer, s3 = self._analyzer(mock_config)
+        s3.get_bucket_lifecycle_configuration.side_effect = ClientError(
+            {"Error": {"Code": "NoSuchLifecycleConfiguration"}}, "GetBucketLifecycleConfiguration"
+        )
+        old = datetime.now(timezone.utc) - timedelta(days=30)
+        _paginators(
+            s3,
+            list_buckets=[{"Buckets": [{"Name": "logs"}]}],
+            list_multipart_uploads=[{"Uploads": [
+                {"Key": "a", "UploadId": "1", "Initiated": old},
+                {"Key": "b", "UploadId": "2", "Initiated": datetime.now(timezone.utc)},
+            ]}],
+            list_parts=[{"Parts": [{"Size": 5 * GB}]}],
+        )
+
+        findings = analyzer.fetch()
+
+        # A missing lifecycle configuration costs nothing by itself: an advisory, not a saving
+        assert {f.subtype for f in findings} == {"multipart"}
+        assert [(a.resource_id, a.subtype, a.monthly_cost) for a in analyzer.advisories] == [
+            ("logs", "no_lifecycle", 0.0)
+        ]
+        multipart = next(f for f in findings if f.subtype == "multipart")
+        assert multipart.resource_type == ResourceType.S3_BUCKET
+        assert multipart.size_gb == 5
+        assert multipart.monthly_cost == pytest.approx(0.12, abs=0.01)
+        # Only S3 is called: nothing is fetched that no finding reads
+        s3.get_bucket_versioning.assert_not_called()
+        s3.get_metric_data.assert_not_called()
+
+    def test_unreadable_lifecycle_is_not_a_finding(self, mock_config):
+        analyzer, s3 = self._analyzer(mock_config)
+        s3.get_bucket_lifecycle_configuration.side_effect = ClientError(
+            {"Error": {"Code": "AccessDenied"}}, "GetBucketLifecycleConfiguration"
+        )
+        _paginators(s3)
+        state = analyzer._bucket_state("logs")
+        assert state.rules is None
+        assert analyzer.findings(state) == []
+
+    def test_inventory_findings(self, mock_config):
+        analyzer, _ = self._analyzer(mock_config)
+        state = BucketState(
+            "logs", rules=[{"Status": "Enabled", "AbortIncompleteMultipartUpload": {"DaysAfterInitiation": 7}}]
+        )
+        inventory = InventoryStats(
+            "logs", current_bytes=100 * GB, noncurrent_bytes=50 * GB, noncurrent_objects=10,
+            it_objects=1000, it_bytes=40 * GB, glacier_objects=100, glacier_bytes=30 * GB,
+            glacier_standard_bytes=30 * GB,
+        )
+        findings = {f.subtype: f for f in analyzer.findings(state, inventory)}
+        assert set(findings) == {"noncurrent", "intelligent_tiering", "glacier"}
+        assert findings["noncurrent"].monthly_cost == pytest.approx(50 * 0.023, abs=0.01)
+        assert findings["glacier"].monthly_cost == pytest.approx(30 * (0.023 - 0.004), abs=0.01)
+
+    def test_noncurrent_priced_by_storage_class(self, mock_config):
+        analyzer, _ = self._analyzer(mock_config)
+        inventory = InventoryStats(
+            "logs", current_bytes=10 * GB, noncurrent_bytes=110 * GB, noncurrent_objects=10,
+            noncurrent_class_bytes={"STANDARD": 10 * GB, "DEEP_ARCHIVE": 100 * GB},
+        )
+        (finding,) = analyzer.findings(BucketState("logs", rules=[]), inventory)
+        assert finding.subtype == "noncurrent"
+        assert finding.size_gb == 110
+        assert finding.monthly_cost == pytest.approx(10 * 0.023 + 100 * 0.00099, abs=0.01)
+
+    def test_existing_rules_suppress_findings(self, mock_config):
+        analyzer, _ = self._analyzer(mock_config)
+        state = BucketState("logs", rules=[{
+            "Status": "Enabled",
+            "NoncurrentVersionExpiration": {"NoncurrentDays": 30},
+            "Transitions": [{"Days": 30, "StorageClass": "INTELLIGENT_TIERING"}],
+        }])
+        inventory = InventoryStats("logs", current_bytes=GB, noncurrent_bytes=GB, it_bytes=GB, glacier_bytes=GB)
+        assert analyzer.findings(state, inventory) == []
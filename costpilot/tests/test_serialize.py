@@ -0,0 +1,139 @@
+"""Unit tests for CostPilot report serialization."""
+
+import json
+import time
+import tracemalloc
+from datetime import date, datetime, timezone
+
+import pytest
+
+from costpilot import serialize
+from costpilot.models import (
+    Confidence,
+    CostAnalysis,
+    CostReport,
+    CostSource,
+    CostSpike,
+    ResourceType,
+    RightsizeRecommendation,
+    Severity,
+    UnusedResource,
+)
+
+CREATED = datetime(2025, 6, 1, tzinfo=timezone.utc)
+
+
+def _volume(i):
+    return UnusedResource(
+        resource_id=f"vol-{i:08x}",
+        resource_type=ResourceType.EBS_VOLUME,
+        region="us-east-1",
+        reason="Delete or snapshot and delete",
+        monthly_cost=8.0,
+        subtype="gp3",
+        size_gb=100,
+        created=CREATED,
+    )
+
+
+def _report(n=3):
+    return CostReport(
+        generated_at=CREATED,
+        analysis=CostAnalysis(
+            start_date=date(2026, 3, 1),
+            end_date=date(2026, 3, 31),
+            total_cost=1234.5,
+            projected_monthly=1300.0,
+            spikes=[CostSpike(date(2026, 3, 9), "Amazon EC2", 90.0, 40.0, 125.0, Severity.HIGH, 5.2)],
+        ),
+        rightsizing=[RightsizeRecommendation(
+            "i-1", "ec2", "us-east-1", "t3.xlarge", "t3.large", 5.0, 20.0, 0.1, 121.47, 60.74, 60.73,
+            confidence=Confidence.LOW, cost_source=CostSource.CUR,
+        )],
+        unused_resources=[_volume(i) for i in range(n)],
+    )
+
+
+class TestSerialize:
+    """Tests for report serialization."""
+
+    @pytest.mark.parametrize("fmt", ["json", "msgpack"])
+    def test_round_trip(self, fmt):
+        if fmt == "msgpack":
+            pytest.importorskip("msgpack")
+        report = _report()
+
+        restored = serialize.loads(serialize.dumps(report, fmt), fmt)
+
+        assert restored == report
+        assert restored.unused_resources[0].resource_type is ResourceType.EBS_VOLUME
+        assert restored.rightsizing[0].confidence is Confidence.LOW
+        assert restored.analysis.spikes[0].date == date(2026, 3, 9)
+
+    def test_lists_stored_column_wise(self):
+        doc = json.loads(serialize.dumps(_report(n=2)))
+
+        table = doc["report"]["unused_resources"]
+        assert table["fields"][0] == "resource_id"
+        assert table["columns"][0] == ["vol-00000000", "vol-00000001"]
+
+    def test_file_format_from_suffix(self, tmp_path):
+        pytest.importorskip("msgpack")
+        path = tmp_path / "report.msgpack"
+
+        serialize.dump(_report(), path)
+
+        assert path.read_bytes()[:1] != b"{"
+        assert serialize.load(path) == _report()
+
+    def test_unknown_version_rejected(self):
+        with pytest.raises(ValueError, match="version"):
+            serialize.from_document({"version": 99, "report": {}})
+
+    def test_calculate_savings_totals_findings(self):
+        report = _report()
+
+        assert report.calculate_savings() == pytest.approx(60.73 + 3 * 8.0)
+
+
+class TestFootprint:
+    """100k-finding scans: typed models vs the previous per-finding dicts."""
+
+    N = 100_000
+
+    def _legacy(self):
+        return [
+            {"id": f"vol-{i:08x}", "type": "EBS Volume", "size_gb": 100, "volume_type": "gp3",
+             "created": CREATED.isoformat(), "monthly_cost": 8.0, "cost_source": "estimate",
+             "action": "Delete or snapshot and delete"}
+            for i in range(self.N)
+        ]
+
+    def _measure(self, build):
+        tracemalloc.start()
+        items = build()
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return items, size
+
+    def test_memory_reduced(self):
+        _, legacy = self._measure(self._legacy)
+        _, typed = self._measure(lambda: [_volume(i) for i in range(self.N)])
+
+        # ~415 → ~200 bytes per finding
+        assert typed < legacy * 0.6
+
+    def test_serialization_faster_and_smaller(self):
+        pytest.importorskip("msgpack")
+        legacy = self._legacy()
+        report = CostReport(generated_at=CREATED, unused_resources=[_volume(i) for i in range(self.N)])
+
+        t0 = time.perf_counter()
+        legacy_bytes = json.dumps({"resources": legacy}).encode()
+        legacy_time = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        packed = serialize.dumps(report, "msgpack")
+        packed_time = time.perf_counter() - t0
+
+        assert len(packed) < len(legacy_bytes) * 0.6
+        assert packed_time < legacy_time
@@ -0,0 +1,199 @@
+"""Unit tests for the Savings Plans / RI purchase simulator."""
+
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from costpilot.simulator import CommitmentSimulator, HourlyUsage
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _naive_covered(matrix, discounts, commitment):
+    """Reference hour-by-hour Savings Plan application."""
+    order = np.argsort(-np.asarray(discounts), kind="stable")
+    covered = 0.0
+    for hour in range(matrix.shape[1]):
+        remaining = commitment
+        for g in order:
+            rate = 1 - discounts[g]
+            sp_cost = matrix[g, hour] * rate
+            used = min(remaining, sp_cost)
+            covered += used / rate
+            remaining -= used
+    return covered
+
+
+@pytest.fixture
+def usage():
+    rng = np.random.default_rng(7)
+    matrix = rng.uniform(0, 10, size=(3, 48))
+    return HourlyUsage([("m5", "us-east-1"), ("c5", "us-east-1"), ("r5", "eu-west-1")], START, matrix)
+
+
+class TestHourlyUsage:
+    """Tests for HourlyUsage."""
+
+    def test_from_records_aggregates_into_matrix(self):
+        usage = HourlyUsage.from_records([
+            (START, "m5", "us-east-1", 1.0),
+            (START, "m5", "us-east-1", 0.5),
+            (START + timedelta(hours=2), "c5", "us-east-1", 2.0),
+        ])
+
+        assert usage.groups == [("m5", "us-east-1"), ("c5", "us-east-1")]
+        assert usage.hours == 3
+        assert usage.matrix[0, 0] == 1.5
+        assert usage.matrix[1, 2] == 2.0
+
+    def test_from_csv(self, tmp_path):
+        path = tmp_path / "usage.csv"
+        path.write_text("hour,family,region,cost\n2026-01-01T00:00:00+00:00,m5,us-east-1,3.5\n")
+
+        usage = HourlyUsage.from_csv(str(path))
+
+        assert usage.matrix.tolist() == [[3.5]]
+
+    def test_from_cur_keeps_on_demand_instance_usage(self, tmp_path):
+        pa = pytest.importorskip("pyarrow")
+        import pyarrow.parquet as pq
+
+        lines = []
+        for hour in range(48):
+            ts = START + timedelta(hours=hour)
+            lines += [
+                (ts, "BoxUsage:m5.large", "us-east-1", "Usage", 0.096),
+                (ts, "BoxUsage:m5.xlarge", "us-east-1", "Usage", 0.192),
+                (ts, "EUW1-DedicatedUsage:c5.large", "eu-west-1", "Usage", 0.1),
+                # Already covered, or not an instance: not On-Demand compute
+                (ts, "BoxUsage:r5.large", "us-east-1", "DiscountedUsage", 0.0),
+                (ts, "EBS:VolumeUsage.gp3", "us-east-1", "Usage", 0.01),
+            ]
+        ts, usage_type, region, line_type, cost = zip(*lines)
+        path = tmp_path / "cur.parquet"
+        pq.write_table(pa.table({
+            "line_item_usage_start_date": pa.array(ts, pa.timestamp("ms", tz="UTC")),
+            "product_product_name": ["Amazon Elastic Compute Cloud"] * len(lines),
+            "product_region_code": region,
+            "line_item_usage_type": usage_type,
+            "line_item_line_item_type": line_type,
+            "line_item_unblended_cost": cost,
+        }), path)
+
+        usage = HourlyUsage.from_cur(str(path))
+
+        assert usage.start == START
+        assert usage.hours == 48
+        matrix = dict(zip(usage.groups, usage.matrix))
+        assert set(matrix) == {("m5", "us-east-1"), ("c5", "eu-west-1")}
+        assert matrix["m5", "us-east-1"] == pytest.approx([0.288] * 48)
+        assert matrix["c5", "eu-west-1"].sum() == pytest.approx(4.8)
+
+    def test_from_cur_window(self, tmp_path):
+        pa = pytest.importorskip("pyarrow")
+        import pyarrow.parquet as pq
+
+        days = [START + timedelta(days=d) for d in range(40)]
+        path = tmp_path / "cur.parquet"
+        pq.write_table(pa.table({
+            "line_item_usage_start_date": pa.array(days, pa.timestamp("ms", tz="UTC")),
+            "product_product_name": ["Amazon Elastic Compute Cloud"] * 40,
+            "line_item_usage_type": ["BoxUsage:m5.large"] * 40,
+            "line_item_unblended_cost": [1.0] * 40,
+        }), path)
+
+        usage = HourlyUsage.from_cur(str(path), days=10)
+
+        assert usage.start == days[30]
+        assert usage.matrix.sum() == 10
+        assert usage.groups == [("m5", "")]
+
+    def test_simulate_command_reads_cur(self, tmp_path):
+        pa = pytest.importorskip("pyarrow")
+        import pyarrow.parquet as pq
+        from click.testing import CliRunner
+
+        from costpilot.cli import cli
+
+        hours = [START + timedelta(hours=h) for h in range(24)]
+        path = tmp_path / "cur.parquet"
+        pq.write_table(pa.table({
+            "line_item_usage_start_date": pa.array(hours, pa.timestamp("ms", tz="UTC")),
+            "product_product_name": ["Amazon Elastic Compute Cloud"] * 24,
+            "line_item_usage_type": ["BoxUsage:m5.large"] * 24,
+            "line_item_unblended_cost": [1.0] * 24,
+        }), path)
+
+        result = CliRunner().invoke(cli, ["simulate", "--cur", str(path), "--commitment", "0.72"])
+
+        assert result.exit_code == 0, result.output
+        assert "Best commitment: $0.72/hr" in result.output
+        assert CliRunner().invoke(cli, ["simulate"]).exit_code == 2
+
+
+class TestCommitmentSimulator:
+    """Tests for CommitmentSimulator."""
+
+    def test_matches_hour_by_hour_reference(self, usage):
+        discounts = {"m5": 0.3, "c5": 0.2, "r5": 0.4}
+        sim = CommitmentSimulator(usage, discounts)
+
+        scenarios = sim.evaluate([0.0, 2.5, 7.0, 30.0])
+
+        for scenario in scenarios:
+            expected = _naive_covered(usage.matrix, [0.3, 0.2, 0.4], scenario.commitment_hourly)
+            assert scenario.covered_on_demand == pytest.approx(expected, abs=0.01)
+            assert scenario.net_savings == pytest.approx(expected - scenario.commitment_hourly * 48, abs=0.01)
+        assert scenarios[0].net_savings == 0.0
+
+    def test_flat_usage_fully_utilized(self):
+        usage = HourlyUsage([("m5", "us-east-1")], START, np.full((1, 24), 10.0))
+        sim = CommitmentSimulator(usage, 0.25)
+
+        # $7.50/hr of SP buys exactly $10/hr of on-demand usage
+        scenario = sim.evaluate([7.5])[0]
+
+        assert scenario.utilization_pct == 100.0
+        assert scenario.coverage_pct == 100.0
+        assert scenario.net_savings == pytest.approx(2.5 * 24)
+        assert sim.optimize().commitment_hourly == pytest.approx(7.5)
+
+    def test_optimize_beats_dense_grid(self, usage):
+        sim = CommitmentSimulator(usage, {"*": 0.3})
+        best = sim.optimize()
+
+        grid = sim.evaluate(np.linspace(0, 25, 501))
+
+        assert best.net_savings >= max(s.net_savings for s in grid) - 0.01
+        assert best.net_savings > 0
+        assert sim.optimize(max_commitment=1.0).commitment_hourly <= 1.0
+
+    def test_reserved_covers_only_its_group(self, usage):
+        sim = CommitmentSimulator(usage)
+
+        scenario = sim.reserved("r5", "eu-west-1", [100.0], discount=0.4)[0]
+
+        assert scenario.on_demand_cost == pytest.approx(usage.matrix[2].sum(), abs=0.01)
+        assert scenario.coverage_pct == 100.0
+
+    def test_invalid_discount_rejected(self, usage):
+        with pytest.raises(ValueError):
+            CommitmentSimulator(usage, 1.0)
+
+    def test_hundreds_of_scenarios_over_a_year_under_a_second(self):
+        rng = np.random.default_rng(1)
+        groups = [(f"f{i}", "us-east-1") for i in range(40)]
+        matrix = rng.gamma(2.0, 1.5, size=(40, 8760))
+        discounts = {family: d for (family, _), d in zip(groups, rng.uniform(0.1, 0.5, 40))}
+
+        started = time.perf_counter()
+        sim = CommitmentSimulator(HourlyUsage(groups, START, matrix), discounts)
+        scenarios = sim.evaluate(np.linspace(0, 150, 500))
+        best = sim.optimize()
+        elapsed = time.perf_counter() - started
+
+        assert len(scenarios) == 500
+        assert best.net_savings >= max(s.net_savings for s in scenarios) - 0.01
+        assert elapsed < 1.0
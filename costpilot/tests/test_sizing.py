@@ -0,0 +1,239 @@
+"""Unit tests for the vectorized rightsizing engine."""
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from costpilot.metrics import series_matrix
+from costpilot.pricing import PriceCatalog
+from costpilot.sizing import SizingEngine, gp3_target, longest_runs, profile
+
+HOURS = 14 * 24
+
+
+def _instance(instance_id, instance_type):
+    return {"InstanceId": instance_id, "InstanceType": instance_type}
+
+
+def _volume(volume_id, volume_type, size, iops=None):
+    volume = {"VolumeId": volume_id, "VolumeType": volume_type, "Size": size}
+    if iops:
+        volume["Iops"] = iops
+    return volume
+
+
+@pytest.fixture
+def engine():
+    return SizingEngine(PriceCatalog.builtin())
+
+
+class TestProfile:
+    """Tests for the fleet profiling helpers."""
+
+    def test_longest_runs(self):
+        mask = np.array([
+            [0, 1, 1, 0, 1, 1, 1, 0],
+            [0, 0, 0, 0, 0, 0, 0, 0],
+            [1, 1, 1, 1, 1, 1, 1, 1],
+        ], dtype=bool)
+        assert longest_runs(mask).tolist() == [3, 0, 8]
+
+    def test_profile_statistics(self):
+        matrix = np.array([
+            [10.0] * 99 + [100.0],
+            [np.nan] * 100,
+        ])
+        stats = profile(matrix, busy_pct=80.0)
+
+        assert stats.mean[0] == pytest.approx(10.9)
+        assert stats.peak[0] == 100.0
+        assert stats.busy_hours[0] == 1
+        assert stats.longest_busy_run[0] == 1
+        assert stats.coverage.tolist() == [1.0, 0.0]
+        assert np.isnan(stats.mean[1])
+
+    def test_series_matrix_places_points_on_grid(self):
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        series = {
+            "a": [(start, 1.0), (start + timedelta(hours=2), 3.0), (start + timedelta(hours=9), 9.0)],
+        }
+        matrix = series_matrix(series, ["a", "b"], start, hours=4)
+
+        assert matrix[0, 0] == 1.0
+        assert matrix[0, 2] == 3.0
+        assert np.isnan(matrix[0, 1])
+        assert np.isnan(matrix[1]).all()
+
+
+class TestSizingEngine:
+    """Tests for SizingEngine."""
+
+    def test_steady_idle_instance_downsized_with_high_confidence(self, engine):
+        cpu = np.full((1, HOURS), 6.0)
+        memory = np.full((1, HOURS), 40.0)
+
+        recs = engine.recommend([_instance("i-1", "m5.2xlarge")], cpu, "us-east-1", memory=memory)
+
+        assert len(recs) == 1
+        # 40% of 32 GiB at 80% target utilization needs 16 GiB
+        assert recs[0].recommended_type == "m5.xlarge"
+        assert recs[0].confidence == "high"
+        assert recs[0].monthly_savings == pytest.approx((0.384 - 0.192) * 730, abs=0.01)
+        assert (recs[0].avg_memory_pct, recs[0].max_memory_pct) == (40.0, 40.0)
+
+    def test_no_memory_data_is_low_confidence(self, engine):
+        cpu = np.full((1, HOURS), 6.0)
+
+        recs = engine.recommend([_instance("i-1", "m5.2xlarge")], cpu, "us-east-1")
+
+        # No memory data: memory may at most halve (32 GiB → 16 GiB), and only at low confidence
+        assert recs[0].recommended_type == "m5.xlarge"
+        assert recs[0].confidence == "low"
+        assert recs[0].max_memory_pct is None
+
+    def test_memory_bound_instance_kept(self, engine):
+        cpu = np.full((1, HOURS), 5.0)
+        memory = np.full((1, HOURS), 30.0)
+        memory[0, 200] = 85.0
+
+        # Idle CPU and 30% memory most of the time, but one peak needs more than r5.large's 16 GiB
+        assert engine.recommend([_instance("i-1", "r5.xlarge")], cpu, "us-east-1", memory=memory) == []
+
+    def test_network_throughput_limits_downsize(self, engine):
+        cpu = np.full((1, HOURS), 5.0)
+        memory = np.full((1, HOURS), 10.0)
+        network = np.full((1, HOURS), 900.0)
+
+        recs = engine.recommend(
+            [_instance("i-1", "m5.2xlarge")], cpu, "us-east-1", network_mbps=network, memory=memory
+        )
+
+        # 0.9 Gbps at 80% target needs m5.xlarge's 1.25 Gbps baseline, not m5.large's 0.75
+        assert recs[0].recommended_type == "m5.xlarge"
+
+    def test_memory_data_allows_deeper_downsize(self, engine):
+        cpu = np.full((1, HOURS), 6.0)
+        memory = np.full((1, HOURS), 10.0)
+
+        recs = engine.recommend([_instance("i-1", "m5.2xlarge")], cpu, "us-east-1", memory=memory)
+
+        assert recs[0].recommended_type == "m5.large"
+
+    def test_bursty_instance_not_downsized(self, engine):
+        # Mostly idle, but busy at 95% every afternoon for six hours
+        cpu = np.full((1, HOURS), 3.0)
+        for day in range(14):
+            cpu[0, day * 24 + 12:day * 24 + 18] = 95.0
+
+        recs = engine.recommend([_instance("i-1", "c5.2xlarge")], cpu, "us-east-1")
+
+        assert recs == []
+
+    def test_idle_instance_with_single_spike_downsized(self, engine):
+        cpu = np.full((1, HOURS), 4.0)
+        cpu[0, 100] = 100.0
+
+        memory = np.full((1, HOURS), 40.0)
+
+        recs = engine.recommend([_instance("i-1", "c5.2xlarge")], cpu, "us-east-1", memory=memory)
+
+        assert recs[0].recommended_type == "c5.xlarge"
+        assert recs[0].max_cpu_pct == 100.0
+        # One isolated busy hour makes the profile bursty, not steady
+        assert recs[0].confidence == "medium"
+
+    def test_mean_above_threshold_skipped(self, engine):
+        cpu = np.full((1, HOURS), 35.0)
+
+        assert engine.recommend([_instance("i-1", "m5.2xlarge")], cpu, "us-east-1", cpu_threshold=30.0) == []
+
+    def test_unknown_type_and_missing_data_skipped(self, engine):
+        cpu = np.full((2, HOURS), 5.0)
+        cpu[1] = np.nan
+
+        recs = engine.recommend(
+            [_instance("i-1", "z9.2xlarge"), _instance("i-2", "m5.2xlarge")], cpu, "us-east-1"
+        )
+
+        assert recs == []
+
+    def test_fleet_results_sorted_by_savings(self, engine):
+        cpu = np.full((3, HOURS), 5.0)
+        instances = [_instance("i-1", "t3.xlarge"), _instance("i-2", "r5.2xlarge"), _instance("i-3", "c5.xlarge")]
+
+        recs = engine.recommend(instances, cpu, "us-east-1")
+
+        assert [r.resource_id for r in recs] == ["i-2", "i-3", "i-1"]
+
+    def test_database_connections_floor_memory(self, engine):
+        cpu = np.full((1, HOURS), 5.0)
+        memory = np.full((1, HOURS), 10.0)
+        args = ("rds", ["db-1"], ["db.r5.2xlarge"], [("MySQL", "Single-AZ")], cpu, "us-east-1")
+
+        assert engine.size(*args, memory=memory)[0].recommended_type == "db.r5.large"
+        rec = engine.size(*args, memory=memory, min_memory_gib=np.array([20.0]))[0]
+
+        assert rec.recommended_type == "db.r5.xlarge"
+        assert rec.resource_type == "rds"
+
+    def test_units_multiply_node_prices(self, engine):
+        cpu = np.full((1, HOURS), 5.0)
+        args = ("elasticache", ["c-1"], ["cache.m5.xlarge"], [("Redis", "Shared")], cpu, "us-east-1")
+
+        memory = np.full((1, HOURS), 10.0)
+
+        single = engine.size(*args, memory=memory)[0]
+        triple = engine.size(*args, memory=memory, units=[3])[0]
+
+        assert single.recommended_type == "cache.m5.large"
+        assert triple.monthly_savings == pytest.approx(3 * single.monthly_savings, abs=0.02)
+
+
+class TestVolumeSizing:
+    """Tests for SizingEngine.recommend_volumes."""
+
+    def test_idle_gp2_moves_to_gp3(self, engine):
+        iops = np.full((1, HOURS), 50.0)
+        mibps = np.full((1, HOURS), 2.0)
+
+        recs = engine.recommend_volumes([_volume("vol-1", "gp2", 100)], iops, mibps, "us-east-1")
+
+        assert recs[0].current_type == "gp2"
+        assert recs[0].recommended_type == "gp3 3,000 IOPS"
+        assert recs[0].monthly_savings == pytest.approx(100 * (0.10 - 0.08))
+        assert recs[0].avg_cpu_pct == 16.7  # of gp2's 300 IOPS baseline
+        assert recs[0].confidence == "high"
+
+    def test_io1_within_gp3_limits_moves_to_gp3(self, engine):
+        iops = np.full((1, HOURS), 2000.0)
+        mibps = np.full((1, HOURS), 50.0)
+
+        recs = engine.recommend_volumes([_volume("vol-1", "io1", 500, 10_000)], iops, mibps, "us-east-1")
+
+        assert recs[0].recommended_type == "gp3 3,000 IOPS"
+        assert recs[0].monthly_savings == pytest.approx(500 * 0.125 + 10_000 * 0.065 - 500 * 0.08)
+
+    def test_io2_keeps_type_with_fewer_iops(self, engine):
+        iops = np.full((1, HOURS), 4000.0)
+        mibps = np.full((1, HOURS), 50.0)
+
+        recs = engine.recommend_volumes([_volume("vol-1", "io2", 500, 20_000)], iops, mibps, "us-east-1")
+
+        assert recs[0].recommended_type == "io2 5,000 IOPS"
+        assert recs[0].monthly_savings == pytest.approx(15_000 * 0.065)
+        # Hourly averages hide bursts, so cutting provisioned IOPS is never high confidence
+        assert recs[0].confidence == "medium"
+
+    def test_busy_io1_and_missing_data_skipped(self, engine):
+        iops = np.full((2, HOURS), 15_000.0)
+        iops[1] = np.nan
+        mibps = np.full((2, HOURS), 10.0)
+        volumes = [_volume("vol-1", "io1", 2000, 16_000), _volume("vol-2", "gp2", 100)]
+
+        assert engine.recommend_volumes(volumes, iops, mibps, "us-east-1") == []
+
+    def test_gp3_target_respects_limits(self):
+        assert gp3_target(8, 10_000, 500) == ("gp3", 4000, 500)
+        assert gp3_target(1000, 100, 10) == ("gp3", 3000, 125)
+        assert gp3_target(4000, 20_000, 2000) == ("gp3", 16_000, 1000)
@@ -1,11 +1,26 @@
 """Unit tests for CostPilot unused resource detector."""
 
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 from unittest.mock import MagicMock
 
 import pytest
 
-from costpilot.unused import UnusedDetector
+from costpilot.history import ScanHistory
+from costpilot.models import ResourceType
+from costpilot.unused import CLOUDTRAIL_LOOKBACK_DAYS, UnusedDetector, parse_stop_time
+
+
+def _paginators(client: MagicMock, **pages: list[dict] | MagicMock) -> None:
+    """Serve ``pages[operation]`` from ``client.get_paginator(operation)``.
+
+    A MagicMock value is used as the operation's ``paginate``. The config
+    fixture hands out one mock for every service, so this covers them all.
+    """
+    def paginator(name: str) -> MagicMock:
+        paginate = pages.get(name, [])
+        return MagicMock(paginate=paginate if isinstance(paginate, MagicMock) else MagicMock(return_value=paginate))
+    client.get_paginator.side_effect = paginator
 
 
 class TestUnusedDetector:
@@ -21,11 +36,8 @@ class TestUnusedDetector:
         elb = session.client("elbv2")
         cw = session.client("cloudwatch")
 
-        ec2.describe_volumes.return_value = {"Volumes": []}
         ec2.describe_addresses.return_value = {"Addresses": []}
-        ec2.describe_instances.return_value = {"Reservations": []}
-        ec2.describe_snapshots.return_value = {"Snapshots": []}
-        elb.describe_load_balancers.return_value = {"LoadBalancers": []}
+        _paginators(ec2)
         return ec2, elb, cw
 
     def test_scan_empty_account(self, mock_config):
@@ -39,16 +51,19 @@ class TestUnusedDetector:
 
     def test_unattached_ebs_detected(self, mock_config, sample_ebs_volumes):
         ec2, elb, cw = self._setup_empty(mock_config)
-        ec2.describe_volumes.return_value = sample_ebs_volumes
+        attached = {"VolumeId": "vol-root", "Size": 8, "VolumeType": "gp3", "State": "in-use"}
+        _paginators(ec2, describe_volumes=[sample_ebs_volumes, {"Volumes": [attached]}])
 
         detector = self._make_detector(mock_config)
         result = detector.scan()
 
         ebs = result["resources"]["ebs_volumes"]
         assert len(ebs) == 2
+        # One paged volume listing serves every check of the scan
+        ec2.describe_volumes.assert_not_called()
         assert ebs[0]["id"] == "vol-0aaa111"
         assert ebs[0]["monthly_cost"] == 8.00  # 100GB * $0.08
-        assert ebs[1]["monthly_cost"] == 4.00  # 50GB * $0.08
+        assert ebs[1]["monthly_cost"] == 5.00  # 50GB gp2 * $0.10
 
     def test_unassociated_eip_detected(self, mock_config, sample_addresses):
         ec2, elb, cw = self._setup_empty(mock_config)
@@ -66,15 +81,17 @@ class TestUnusedDetector:
     def test_idle_load_balancer_detected(self, mock_config):
         ec2, elb, cw = self._setup_empty(mock_config)
 
-        elb.describe_load_balancers.return_value = {
+        _paginators(elb, describe_load_balancers=[{
             "LoadBalancers": [
                 {
                     "LoadBalancerName": "idle-alb",
                     "LoadBalancerArn": "arn:aws:elasticloadbalancing:us-east-1:123:loadbalancer/app/idle-alb/abc123",
                 }
             ]
+        }])
+        cw.get_metric_data.return_value = {
+            "MetricDataResults": [{"Id": "m0", "Timestamps": [], "Values": []}]
         }
-        cw.get_metric_statistics.return_value = {"Datapoints": []}
 
         detector = self._make_detector(mock_config)
         result = detector.scan()
@@ -87,16 +104,18 @@ class TestUnusedDetector:
     def test_active_load_balancer_not_flagged(self, mock_config):
         ec2, elb, cw = self._setup_empty(mock_config)
 
-        elb.describe_load_balancers.return_value = {
+        _paginators(elb, describe_load_balancers=[{
             "LoadBalancers": [
                 {
                     "LoadBalancerName": "busy-alb",
                     "LoadBalancerArn": "arn:aws:elasticloadbalancing:us-east-1:123:loadbalancer/app/busy-alb/def456",
                 }
             ]
-        }
-        cw.get_metric_statistics.return_value = {
-            "Datapoints": [{"Sum": 50000.0}]
+        }])
+        cw.get_metric_data.return_value = {
+            "MetricDataResults": [
+                {"Id": "m0", "Timestamps": [datetime.now(timezone.utc) - timedelta(days=1)], "Values": [50000.0]}
+            ]
         }
 
         detector = self._make_detector(mock_config)
@@ -104,10 +123,48 @@ class TestUnusedDetector:
 
         assert len(result["resources"]["load_balancers"]) == 0
 
+    def test_idle_nlb_checked_with_flow_metric(self, mock_config):
+        ec2, elb, cw = self._setup_empty(mock_config)
+
+        _paginators(elb, describe_load_balancers=[{
+            "LoadBalancers": [
+                {
+                    "LoadBalancerName": "busy-alb",
+                    "Type": "application",
+                    "LoadBalancerArn": "arn:aws:elasticloadbalancing:us-east-1:123:loadbalancer/app/busy-alb/def456",
+                },
+                {
+                    "LoadBalancerName": "idle-nlb",
+                    "Type": "network",
+                    "LoadBalancerArn": "arn:aws:elasticloadbalancing:us-east-1:123:loadbalancer/net/idle-nlb/fed789",
+                },
+            ]
+        }])
+        cw.get_metric_data.return_value = {
+            "MetricDataResults": [
+                {"Id": "m0", "Timestamps": [datetime.now(timezone.utc) - timedelta(days=1)], "Values": [10.0]},
+                {"Id": "m1", "Timestamps": [], "Values": []},
+            ]
+        }
+
+        detector = self._make_detector(mock_config)
+        result = detector.scan()
+
+        # One GetMetricData call covers both load balancers
+        assert cw.get_metric_data.call_count == 1
+        queries = cw.get_metric_data.call_args.kwargs["MetricDataQueries"]
+        assert queries[1]["MetricStat"]["Metric"]["Namespace"] == "AWS/NetworkELB"
+        assert queries[1]["MetricStat"]["Metric"]["Dimensions"][0]["Value"] == "net/idle-nlb/fed789"
+
+        lbs = result["resources"]["load_balancers"]
+        assert len(lbs) == 1
+        assert lbs[0]["id"] == "idle-nlb"
+        assert lbs[0]["type"] == "Network Load Balancer"
+
     def test_stopped_instances_detected(self, mock_config):
         ec2, elb, cw = self._setup_empty(mock_config)
 
-        ec2.describe_instances.return_value = {
+        _paginators(ec2, describe_instances=[{
             "Reservations": [
                 {
                     "Instances": [
@@ -120,7 +177,7 @@ class TestUnusedDetector:
                     ]
                 }
             ]
-        }
+        }])
 
         detector = self._make_detector(mock_config)
         result = detector.scan()
@@ -132,15 +189,15 @@ class TestUnusedDetector:
     def test_old_snapshots_detected(self, mock_config):
         ec2, elb, cw = self._setup_empty(mock_config)
 
-        ec2.describe_snapshots.return_value = {
+        _paginators(ec2, describe_snapshots=[{
             "Snapshots": [
                 {
                     "SnapshotId": "snap-old1",
                     "VolumeSize": 200,
                     "StartTime": datetime(2025, 1, 1, tzinfo=timezone.utc),
                 }
-            ]
-        }
+            ],
+        }])
 
         detector = self._make_detector(mock_config)
         result = detector.scan()
@@ -149,14 +206,166 @@ class TestUnusedDetector:
         assert len(snaps) == 1
         assert snaps[0]["id"] == "snap-old1"
         assert snaps[0]["monthly_cost"] == 10.00  # 200GB * $0.05
+        assert snaps[0]["role"] == "orphaned"
 
     def test_total_savings_aggregated(self, mock_config, sample_ebs_volumes, sample_addresses):
         ec2, elb, cw = self._setup_empty(mock_config)
-        ec2.describe_volumes.return_value = sample_ebs_volumes
+        _paginators(ec2, describe_volumes=[sample_ebs_volumes])
         ec2.describe_addresses.return_value = sample_addresses
 
         detector = self._make_detector(mock_config)
         result = detector.scan()
 
-        # EBS: 8+4=12, EIP: 3.60 → total 15.60
-        assert result["potential_savings"] == 15.60
+        # EBS: 8+5=13, EIP: 3.60 → total 16.60
+        assert result["potential_savings"] == 16.60
+
+    def test_fetch_returns_typed_findings(self, mock_config, sample_ebs_volumes, sample_addresses):
+        ec2, elb, cw = self._setup_empty(mock_config)
+        _paginators(ec2, describe_volumes=[sample_ebs_volumes])
+        ec2.describe_addresses.return_value = sample_addresses
+
+        resources = self._make_detector(mock_config).fetch()
+
+        assert [r.resource_type for r in resources] == [
+            ResourceType.EBS_VOLUME, ResourceType.EBS_VOLUME, ResourceType.ELASTIC_IP,
+        ]
+        assert resources[2].secondary_id == "eipalloc-bbb"
+        assert not hasattr(resources[0], "__dict__")
+
+
+class TestStoppedInstances:
+    """Tests for stopped-instance age detection and pricing."""
+
+    def _setup(
+        self, mock_config, instances: list[dict], volumes: list[dict] = (), lookups: Optional[MagicMock] = None
+    ) -> MagicMock:
+        """Serve ``instances`` in two pages, ``volumes``, and CloudTrail lookups from ``lookups``."""
+        ec2 = mock_config.get_session().client("ec2")
+        half = len(instances) // 2
+        _paginators(
+            ec2,
+            describe_instances=[{"Reservations": [{"Instances": instances[:half]}]},
+                                {"Reservations": [{"Instances": instances[half:]}]}],
+            describe_volumes=[{"Volumes": list(volumes)}],
+            lookup_events=lookups if lookups is not None else [],
+        )
+        ec2.describe_addresses.return_value = {"Addresses": []}
+        return ec2
+
+    @staticmethod
+    def _stop_event(when: datetime, *instance_ids: str) -> dict:
+        return {"EventName": "StopInstances", "EventTime": when, "Resources": [
+            {"ResourceType": "AWS::EC2::Instance", "ResourceName": instance_id} for instance_id in instance_ids
+        ]}
+
+    def _instance(self, instance_id: str, reason: str = "", **extra) -> dict:
+        return {"InstanceId": instance_id, "InstanceType": "t3.medium", "StateTransitionReason": reason, **extra}
+
+    def test_parse_stop_time(self):
+        assert parse_stop_time("User initiated (2026-01-05 17:27:34 GMT)") == datetime(
+            2026, 1, 5, 17, 27, 34, tzinfo=timezone.utc
+        )
+        assert parse_stop_time("Server.ScheduledStop") is None
+        assert parse_stop_time("") is None
+
+    def test_filtered_by_configured_age(self, mock_config):
+        now = datetime.now(timezone.utc)
+        reason = "User initiated ({:%Y-%m-%d %H:%M:%S} GMT)"
+        self._setup(mock_config, [
+            self._instance("i-old", reason.format(now - timedelta(days=30))),
+            self._instance("i-recent", reason.format(now - timedelta(days=2))),
+        ])
+        mock_config.stopped_ec2_days = 14
+
+        found = UnusedDetector(mock_config)._find_stopped_instances()
+
+        assert [r.resource_id for r in found] == ["i-old"]
+        assert "stopped 30 days" in found[0].reason
+
+    def test_volumes_and_eips_priced_from_one_listing(self, mock_config):
+        ec2 = self._setup(mock_config, [self._instance(
+            "i-old", "User initiated (2025-01-01 00:00:00 GMT)",
+            BlockDeviceMappings=[{"Ebs": {"VolumeId": "vol-root"}}, {"Ebs": {"VolumeId": "vol-data"}}],
+        )], volumes=[
+            {"VolumeId": "vol-root", "Size": 100, "VolumeType": "gp3", "State": "in-use"},
+            {"VolumeId": "vol-data", "Size": 50, "VolumeType": "gp2", "State": "in-use"},
+        ])
+        ec2.describe_addresses.return_value = {"Addresses": [
+            {"PublicIp": "1.2.3.4", "AllocationId": "eipalloc-a", "AssociationId": "eipassoc-a", "InstanceId": "i-old"},
+        ]}
+
+        found = UnusedDetector(mock_config)._find_stopped_instances()
+
+        assert found[0].monthly_cost == 16.60  # 100GB gp3 $8 + 50GB gp2 $5 + EIP $3.60
+        ec2.describe_volumes.assert_not_called()
+
+    def test_cloudtrail_fallback_is_memoized(self, mock_config, tmp_path):
+        launched = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        stopped = datetime.now(timezone.utc) - timedelta(days=20)
+        lookups = MagicMock(return_value=[{"Events": [
+            self._stop_event(stopped + timedelta(days=1), "i-other"),
+            self._stop_event(stopped, "i-other", "i-quiet"),
+            self._stop_event(stopped - timedelta(days=5), "i-quiet"),
+        ]}])
+        self._setup(mock_config, [self._instance("i-quiet", "", LaunchTime=launched)], lookups=lookups)
+
+        with ScanHistory(tmp_path / "history.db") as history:
+            found = UnusedDetector(mock_config, history=history)._find_stopped_instances()
+            assert found[0].last_used == stopped
+            assert "stopped 20 days" in found[0].reason
+
+            again = UnusedDetector(mock_config, history=history)._find_stopped_instances()
+            assert lookups.call_count == 1
+            assert again[0].last_used == found[0].last_used
+
+    def test_one_cloudtrail_lookup_for_all_instances(self, mock_config):
+        now = datetime.now(timezone.utc)
+        lookups = MagicMock(return_value=[
+            {"Events": [self._stop_event(now - timedelta(days=10), "i-0", "i-1")]},
+            {"Events": [self._stop_event(now - timedelta(days=30), "i-2")]},
+        ])
+        self._setup(mock_config, [self._instance(f"i-{n}", "") for n in range(4)], lookups=lookups)
+
+        found = {r.resource_id: r for r in UnusedDetector(mock_config)._find_stopped_instances()}
+
+        lookups.assert_called_once()
+        assert lookups.call_args.kwargs["LookupAttributes"] == [
+            {"AttributeKey": "EventName", "AttributeValue": "StopInstances"},
+        ]
+        assert [(now - found[i].last_used).days for i in ("i-0", "i-1", "i-2")] == [10, 10, 30]
+        assert found["i-3"].last_used is None
+
+    def test_no_cloudtrail_event_means_stopped_before_lookback(self, mock_config, tmp_path):
+        lookups = MagicMock(return_value=[])
+        launched = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self._setup(mock_config, [self._instance("i-ancient", "", LaunchTime=launched)], lookups=lookups)
+
+        with ScanHistory(tmp_path / "history.db") as history:
+            detector = UnusedDetector(mock_config, history=history)
+            found = detector._find_stopped_instances()
+
+            # Only a lower bound: not reported, cached or stored as a stop time
+            assert found[0].last_used is None
+            assert f"stopped {CLOUDTRAIL_LOOKBACK_DAYS}+ days" in found[0].reason
+            assert history.stop_times({"i-ancient": "2024-01-01T00:00:00+00:00"}) == {}
+            assert detector._find_stopped_instances()[0].reason == found[0].reason
+            assert lookups.call_count == 1
+
+    def test_lower_bound_does_not_prove_longer_threshold(self, mock_config):
+        self._setup(mock_config, [
+            self._instance("i-ancient", "", LaunchTime=datetime.now(timezone.utc) - timedelta(days=100)),
+        ])
+        mock_config.stopped_ec2_days = CLOUDTRAIL_LOOKBACK_DAYS + 30
+
+        assert UnusedDetector(mock_config)._find_stopped_instances() == []
+
+    def test_unknown_stop_time_after_recent_launch_skipped(self, mock_config):
+        self._setup(mock_config, [
+            self._instance("i-new", "", LaunchTime=datetime.now(timezone.utc) - timedelta(days=1)),
+            self._instance("i-old", "", LaunchTime=datetime(2024, 1, 1, tzinfo=timezone.utc)),
+        ], lookups=MagicMock(side_effect=Exception("AccessDenied")))
+
+        found = UnusedDetector(mock_config)._find_stopped_instances()
+
+        assert [r.resource_id for r in found] == ["i-old"]
+        assert found[0].last_used is None